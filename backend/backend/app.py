@@ -11,9 +11,21 @@ import os
 from werkzeug.exceptions import HTTPException
 
 from config import get_config
-from models import init_db
+from models import init_db, GeneratedPDF
+from services import metrics
+from services.counter_buffer import counters
+from services.analytics import analytics
+from services.storage import artifacts
+from services.storage_lifecycle import lifecycle
+from services.db_profiles import sqlite_maintenance
+from services.autosave_buffer import autosave
+from services.image_derivatives import derivatives
+from services.signed_urls import check_signing_config
 from routes.pdf_routes import pdf_bp
 from routes.auth_routes import auth_bp
+from routes.file_routes import files_bp
+from routes.project_routes import project_bp
+from routes.admin_routes import admin_bp
 # from routes.html_pdf_routes import pdf_bp as html_pdf_bp  # Disabled: requires GTK libraries on Windows
 
 # Configure logging
@@ -40,6 +52,9 @@ def create_app(config_name=None):
     config_class = get_config()
     app.config.from_object(config_class)
     
+    # No X-Accel or signed links with a missing or published secret
+    check_signing_config(app.config)
+    
     # Ensure directories exist
     Path(app.config['PDF_OUTPUT_DIR']).mkdir(parents=True, exist_ok=True)
     Path(app.config['UPLOAD_FOLDER']).mkdir(parents=True, exist_ok=True)
@@ -47,6 +62,25 @@ def create_app(config_name=None):
     # Initialize database
     init_db(app)
     
+    # Write-behind counters (flushed in batches, see services/counter_buffer.py)
+    counters.init_app(app)
+    counters.register('generated_pdfs.download_count', GeneratedPDF.__table__.c.download_count)
+    
+    # School dashboard aggregates (write-behind, see services/analytics.py)
+    analytics.init_app(app)
+    
+    # Shared artifact storage (S3 / shared directory; off by default)
+    artifacts.init_app(app)
+    
+    # Storage retention / disk budget / orphan sweeping
+    lifecycle.init_app(app)
+    
+    # Autosave coalescing (also flushes spools left by a crashed run)
+    autosave.init_app(app)
+    
+    # Thumbnails and field-ready renditions of uploads (background executor)
+    derivatives.init_app(app)
+    
     # Enable CORS - allow all origins in development
     CORS(app, resources={
         r"/api/*": {
@@ -78,6 +112,13 @@ def create_app(config_name=None):
             except:
                 pass
     
+    @app.before_request
+    def start_background_tasks():
+        """Start per-process background tasks (threads do not survive gunicorn's fork)"""
+        lifecycle.ensure_started()
+        sqlite_maintenance.ensure_started()
+        autosave.ensure_started()
+    
     @app.after_request
     def log_response(response):
         """Log response and timing"""
@@ -92,6 +133,9 @@ def create_app(config_name=None):
     # ─────────────────────────────────────────────────────────────
     app.register_blueprint(auth_bp)
     app.register_blueprint(pdf_bp)  # Legacy coordinate-based PDF generation
+    app.register_blueprint(files_bp)  # Signed-link file delivery (nginx fallback)
+    app.register_blueprint(project_bp)  # Project / PDF history listings
+    app.register_blueprint(admin_bp)  # School administration (admin API key)
     # app.register_blueprint(html_pdf_bp)  # Disabled: requires GTK libraries on Windows
     
     # ─────────────────────────────────────────────────────────────
@@ -108,6 +152,14 @@ def create_app(config_name=None):
             'timestamp': time.time()
         })
     
+    @app.route('/api/metrics', methods=['GET'])
+    def show_metrics():
+        """Operational counters for the worker serving this request"""
+        return jsonify({
+            'pid': os.getpid(),
+            'counters': metrics.snapshot()
+        })
+    
     @app.route('/api/routes', methods=['GET'])
     def list_routes():
         """Debug endpoint: List all registered routes"""
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+"""
+Project Archive CLI
+Move long-completed projects into the cold archive (services/project_archive.py)
+and report hot-table size and query latency before and after
+
+Usage:
+    python archive_projects.py [OPTIONS]
+
+Options:
+    --days N            Archive projects completed more than N days ago
+                        (default: ARCHIVE_AFTER_DAYS)
+    --limit N           Maximum projects to archive (default: all eligible)
+    --batch N           Projects selected per query (default: 100)
+    --dry-run           Only list the eligible projects
+    --rehydrate ID      Restore one archived project instead
+    --samples N         Queries per latency measurement (default: 200)
+
+Examples:
+    python archive_projects.py --dry-run
+    python archive_projects.py --days 180 --limit 500
+    python archive_projects.py --rehydrate 42
+"""
+import sys
+import argparse
+import random
+import statistics
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import func, text
+
+from app import create_app
+from models import db, Project, Response, ImageUpload
+from services.project_archive import (
+    ARCHIVED_STATUS, archive_project, find_archivable, rehydrate_project
+)
+
+HOT_TABLES = ('responses', 'image_uploads', 'generated_pdfs')
+REPORT_TABLES = HOT_TABLES + ('archived_projects',)
+
+
+def table_sizes():
+    """
+    Rows and on-disk bytes (table + indexes) of the hot and archive tables
+
+    Bytes come from dbstat on SQLite and pg_total_relation_size on
+    PostgreSQL; None where neither is available.
+    """
+    dialect = db.engine.dialect.name
+    sizes = {}
+    for table in REPORT_TABLES:
+        rows = db.session.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        sizes[table] = {'rows': rows, 'bytes': None}
+
+    try:
+        if dialect == 'sqlite':
+            result = db.session.execute(text(
+                "SELECT m.tbl_name, SUM(s.pgsize) FROM dbstat s "
+                "JOIN sqlite_schema m ON m.name = s.name GROUP BY m.tbl_name"
+            ))
+            for table, size in result:
+                if table in sizes:
+                    sizes[table]['bytes'] = size
+        elif dialect == 'postgresql':
+            for table in REPORT_TABLES:
+                sizes[table]['bytes'] = db.session.execute(
+                    text("SELECT pg_total_relation_size(:table)"), {'table': table}
+                ).scalar()
+    except Exception:
+        db.session.rollback()  # dbstat is an optional SQLite build feature
+    return sizes
+
+
+def query_latency(samples):
+    """
+    Median and p95 milliseconds of typical hot-path queries on active projects
+
+    Returns:
+        dict: query name -> (median_ms, p95_ms), empty without active projects
+    """
+    project_ids = [
+        pid for (pid,) in db.session.query(Project.id)
+        .filter(Project.status != ARCHIVED_STATUS)
+        .order_by(func.random())
+        .limit(samples)
+    ]
+    if not project_ids:
+        return {}
+
+    fields = [name for (name,) in db.session.query(Response.field_name).distinct().limit(50)] or ['name']
+    queries = {
+        'response by field': lambda pid: db.session.query(Response.field_value)
+            .filter_by(project_id=pid, field_name=random.choice(fields)).first(),
+        'project images': lambda pid: ImageUpload.query.filter_by(project_id=pid).all(),
+        'response count': lambda pid: db.session.query(func.count(Response.id))
+            .filter_by(project_id=pid).scalar(),
+    }
+
+    results = {}
+    for name, run in queries.items():
+        timings = []
+        for _ in range(samples):
+            pid = random.choice(project_ids)
+            start = time.perf_counter()
+            run(pid)
+            timings.append((time.perf_counter() - start) * 1000)
+            db.session.expunge_all()
+        timings.sort()
+        results[name] = (statistics.median(timings), timings[int(len(timings) * 0.95) - 1])
+    db.session.rollback()
+    return results
+
+
+def print_report(title, sizes, latency):
+    """Print one before/after block"""
+    print(f"\n{title}")
+    for table, size in sizes.items():
+        on_disk = f"{size['bytes']:,} bytes" if size['bytes'] is not None else "size n/a"
+        print(f"   {table:<18} {size['rows']:>10,} rows   {on_disk}")
+    for name, (median, p95) in latency.items():
+        print(f"   {name:<18} median {median:.3f} ms   p95 {p95:.3f} ms")
+
+
+def run_archive(archive_dir, days, limit, batch, dry_run, samples):
+    """Archive eligible projects in batches"""
+    if dry_run:
+        eligible = find_archivable(days, limit or 1000000)
+        print(f"✓ {len(eligible)} projects completed more than {days} days ago")
+        for project_id in eligible[:50]:
+            print(f"   - project {project_id}")
+        if len(eligible) > 50:
+            print(f"   ... and {len(eligible) - 50} more")
+        return
+
+    sizes_before = table_sizes()
+    latency_before = query_latency(samples)
+
+    archived = skipped = raw = compressed = 0
+    while limit is None or archived < limit:
+        size = batch if limit is None else min(batch, limit - archived)
+        project_ids = find_archivable(days, size)
+        if not project_ids:
+            break
+        archived_in_batch = 0
+        for project_id in project_ids:
+            try:
+                result = archive_project(project_id, archive_dir)
+            except Exception as e:
+                print(f"❌ Project {project_id}: {e}")
+                skipped += 1
+                continue
+            if result is None:
+                skipped += 1
+                continue
+            archived += 1
+            archived_in_batch += 1
+            raw += result['raw_size']
+            compressed += result['compressed_size']
+        if not archived_in_batch:
+            break  # Nothing but failures: do not select the same projects again
+
+    print(f"✓ Archived {archived} projects ({raw:,} → {compressed:,} bytes of rows), {skipped} skipped")
+
+    if archived:
+        print_report("Before:", sizes_before, latency_before)
+        print_report("After:", table_sizes(), query_latency(samples))
+
+
+def run_rehydrate(config, project_id):
+    """Restore one archived project"""
+    if rehydrate_project(project_id, config['ARCHIVE_DIR'], config['UPLOAD_FOLDER']):
+        print(f"✓ Project {project_id} rehydrated")
+        return True
+    print(f"❌ Project {project_id} is not archived")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Project Archive Tool",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+
+    parser.add_argument('--days', type=int,
+                        help='Archive projects completed more than N days ago')
+    parser.add_argument('--limit', type=int,
+                        help='Maximum projects to archive')
+    parser.add_argument('--batch', type=int, default=100,
+                        help='Projects selected per query')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only list eligible projects')
+    parser.add_argument('--rehydrate', type=int, metavar='ID',
+                        help='Restore an archived project')
+    parser.add_argument('--samples', type=int, default=200,
+                        help='Queries per latency measurement')
+
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        if args.rehydrate is not None:
+            return 0 if run_rehydrate(app.config, args.rehydrate) else 1
+
+        days = args.days if args.days is not None else app.config['ARCHIVE_AFTER_DAYS']
+        run_archive(app.config['ARCHIVE_DIR'], days, args.limit, max(1, args.batch),
+                    args.dry_run, max(1, args.samples))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,126 @@
 """
 Authentication and Authorization Utilities
 """
+import hmac
 import jwt
+import time
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
-from models import User, Project
+from sqlalchemy import event, inspect as sa_inspect
+from models import db, User, Project
+from utils.ttl_cache import TTLCache
+
+
+# ============================================================================
+# PER-WORKER AUTH CACHES
+# Verified tokens are memoized until they expire; user identities and
+# project ownership for AUTH_CACHE_TTL_SECONDS. ORM events below invalidate
+# entries changed in this worker; the TTL bounds staleness across workers.
+# ============================================================================
+
+_token_cache = TTLCache(maxsize=10000)      # token -> decoded payload
+_identity_cache = TTLCache(maxsize=10000)   # user_id -> AuthenticatedUser
+_ownership_cache = TTLCache(maxsize=50000)  # project_id -> owner user_id
+
+
+class AuthenticatedUser:
+    """
+    Detached, read-only identity of the requesting user
+
+    Safe to cache across requests (unlike a session-bound User row). Routes
+    needing the ORM object can load it with db.session.get(User, user.id).
+    """
+    __slots__ = ('id', 'username', 'email', 'full_name', 'grade', 'school', 'created_at')
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.full_name = user.full_name
+        self.grade = user.grade
+        self.school = user.school
+        self.created_at = user.created_at
+
+    def to_dict(self):
+        """Convert to dictionary (same shape as User.to_dict)"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'full_name': self.full_name,
+            'grade': self.grade,
+            'school': self.school,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+def _auth_cache_ttl() -> float:
+    return current_app.config.get('AUTH_CACHE_TTL_SECONDS', 60)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop cached identity for a user (tokens re-resolve on next request)"""
+    _identity_cache.invalidate(user_id)
+
+
+def invalidate_project(project_id: int) -> None:
+    """Drop cached ownership for a project"""
+    _ownership_cache.invalidate(project_id)
+
+
+def clear_auth_caches() -> None:
+    """Drop all cached auth state (tests, key rotation)"""
+    _token_cache.clear()
+    _identity_cache.clear()
+    _ownership_cache.clear()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+@event.listens_for(Project, 'after_delete')
+def _project_deleted(mapper, connection, target):
+    invalidate_project(target.id)
+
+
+@event.listens_for(Project, 'after_update')
+def _project_updated(mapper, connection, target):
+    # Snapshot writes update the row on every save; only ownership matters
+    if sa_inspect(target).attrs.user_id.history.has_changes():
+        invalidate_project(target.id)
+
+
+def project_owner_id(project_id: int):
+    """
+    Get the owner of a project (cached)
+
+    Args:
+        project_id: Project ID
+
+    Returns:
+        int: Owner user ID, or None if the project does not exist
+    """
+    owner_id = _ownership_cache.get(project_id)
+    if owner_id is not None:
+        return owner_id
+
+    owner_id = db.session.query(Project.user_id).filter(Project.id == project_id).scalar()
+    if owner_id is not None:
+        _ownership_cache.set(project_id, owner_id, ttl=_auth_cache_ttl())
+    return owner_id
+
+
+def user_owns_project(user, project_id) -> bool:
+    """Check whether the user owns the project (cached)"""
+    try:
+        project_id = int(project_id)
+    except (TypeError, ValueError):
+        return False
+    return project_owner_id(project_id) == user.id
 
 
 def generate_token(user_id: int, expiration_hours: int = 24) -> str:
@@ -54,12 +169,33 @@ def decode_token(token: str) -> dict:
     )
 
 
+def decode_token_cached(token: str) -> dict:
+    """
+    Decode a JWT token, memoizing the verified payload until it expires
+    
+    Raises:
+        jwt.InvalidTokenError: If token is invalid or expired
+    """
+    payload = _token_cache.get(token)
+    if payload is not None:
+        return payload
+    
+    payload = decode_token(token)
+    remaining = payload.get('exp', 0) - time.time()
+    if remaining > 0:
+        _token_cache.set(token, payload, ttl=remaining)
+    return payload
+
+
 def get_current_user():
     """
     Get current user from request Authorization header
     
+    Token verification and the user lookup are cached per worker, so
+    repeated requests with the same token do not query the database.
+    
     Returns:
-        User: Current user object or None
+        AuthenticatedUser: Current user identity or None
     """
     auth_header = request.headers.get('Authorization')
     
@@ -69,11 +205,19 @@ def get_current_user():
     try:
         # Extract token from "Bearer <token>"
         token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = decode_token(token)
-        user = User.query.get(payload['user_id'])
-        return user
+        payload = decode_token_cached(token)
+        user_id = payload['user_id']
     except (jwt.InvalidTokenError, IndexError, KeyError):
         return None
+    
+    identity = _identity_cache.get(user_id)
+    if identity is None:
+        user = db.session.get(User, user_id)
+        if not user:
+            return None
+        identity = AuthenticatedUser(user)
+        _identity_cache.set(user_id, identity, ttl=_auth_cache_ttl())
+    return identity
 
 
 def login_required(f):
@@ -120,27 +264,55 @@ def project_access_required(f):
                 'message': 'project_id is required'
             }), 400
         
-        # Verify project exists and belongs to user
-        project = Project.query.get(project_id)
+        # Verify project exists and belongs to user (cached ownership)
+        owner_id = project_owner_id(project_id)
         
-        if not project:
+        if owner_id is None:
             return jsonify({
                 'error': 'Not found',
                 'message': 'Project not found'
             }), 404
         
-        if project.user_id != user.id:
+        if owner_id != user.id:
             return jsonify({
                 'error': 'Forbidden',
                 'message': 'You do not have access to this project'
             }), 403
         
         # Pass user and project to the route function
+        project = db.session.get(Project, project_id)
         return f(user=user, project=project, *args, **kwargs)
     
     return decorated_function
 
 
+def admin_key_required(f):
+    """
+    Decorator for school administration endpoints (roster import, provisioning)
+    Requires the ADMIN_API_KEY value in the X-Admin-Key header; the
+    endpoints are disabled while ADMIN_API_KEY is unset.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = current_app.config.get('ADMIN_API_KEY')
+        if not expected:
+            return jsonify({
+                'error': 'Forbidden',
+                'message': 'Admin API is disabled (ADMIN_API_KEY not configured)'
+            }), 403
+        
+        provided = request.headers.get('X-Admin-Key', '')
+        if not hmac.compare_digest(provided.encode(), expected.encode()):
+            return jsonify({
+                'error': 'Unauthorized',
+                'message': 'Missing or invalid admin key'
+            }), 401
+        
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+
 def validate_file_upload(file, allowed_extensions: set, max_size_mb: int) -> tuple:
     """
     Validate uploaded file
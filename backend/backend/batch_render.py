@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+"""
+Batch Render CLI
+Regenerate playbook PDFs for many projects at once, e.g. after
+recalibrating pdf_mappings.py, on a pool of worker processes that each
+load the template once (services/render_pool.py)
+
+Usage:
+    python batch_render.py [OPTIONS]
+
+Options:
+    --school NAME       Only students of this school
+    --grade GRADE       Only students of this grade
+    --status STATUS     Only projects with this status (e.g. completed)
+    --project ID ...    Only these projects
+    --updated-since D   Only projects changed on or after D (YYYY-MM-DD)
+    --missing-only      Skip projects that already have a PDF of their
+                        current answers (otherwise every project is rendered)
+    --limit N           Render at most N projects
+    --workers N         Render processes (default: CPU count)
+    --batch N           GeneratedPDF rows written per commit (default: 50)
+    --checkpoint FILE   Project IDs already done, one per line (default:
+                        batch_render.checkpoint); a rerun skips them
+    --restart           Ignore and replace an existing checkpoint
+    --report-every S    Seconds between progress lines (default: 5)
+
+A project is added to the checkpoint once its GeneratedPDF row is
+committed, so an interrupted run resumes without losing or repeating
+finished work. Projects without answers are skipped and checkpointed;
+failed renders are not, so the next run retries them. Archived projects
+are never rendered.
+
+Examples:
+    python batch_render.py --workers 8
+    python batch_render.py --school "SNS Academy" --grade 3 --status completed
+    python batch_render.py --missing-only --checkpoint backfill.checkpoint
+"""
+import sys
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import create_app
+from models import db, User, Project, GeneratedPDF
+from services.analytics import analytics
+from services.project_archive import ARCHIVED_STATUS
+from services.render_pool import RenderPool, build_render_job, record_render
+from services.storage import artifacts
+from services.storage_lifecycle import lifecycle
+
+
+def select_projects(args, done):
+    """IDs of the projects to render, in ID order, minus the checkpointed ones"""
+    query = (
+        db.session.query(Project.id)
+        .join(User, User.id == Project.user_id)
+        .filter(Project.status != ARCHIVED_STATUS)
+        .order_by(Project.id)
+    )
+    if args.school:
+        query = query.filter(User.school == args.school)
+    if args.grade:
+        query = query.filter(User.grade == args.grade)
+    if args.status:
+        query = query.filter(Project.status == args.status)
+    if args.project:
+        query = query.filter(Project.id.in_(args.project))
+    if args.updated_since:
+        query = query.filter(Project.updated_at >= args.updated_since)
+    if args.missing_only:
+        query = query.filter(~db.session.query(GeneratedPDF.id).filter(
+            GeneratedPDF.project_id == Project.id,
+            GeneratedPDF.project_revision == Project.revision
+        ).exists())
+
+    project_ids = [project_id for (project_id,) in query if project_id not in done]
+    return project_ids[:args.limit] if args.limit else project_ids
+
+
+def load_checkpoint(path, restart):
+    """Project IDs finished by earlier runs"""
+    if restart or not path.exists():
+        path.write_text('')
+        return set()
+    return {int(line) for line in path.read_text().split() if line.strip()}
+
+
+class Checkpoint:
+    """Append-only list of finished project IDs, synced after every batch"""
+
+    def __init__(self, path):
+        self._file = open(path, 'a')
+
+    def add(self, project_ids):
+        if project_ids:
+            self._file.write(''.join(f"{project_id}\n" for project_id in project_ids))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class Stats:
+    """Throughput (wall clock) and per-PDF render times (measured in the workers)"""
+
+    def __init__(self, total):
+        self.total = total
+        self.rendered = self.skipped = self.failed = 0
+        self.timings = []
+        self.start = time.perf_counter()
+
+    def line(self):
+        elapsed = time.perf_counter() - self.start
+        done = self.rendered + self.skipped + self.failed
+        rate = self.rendered / elapsed if elapsed else 0.0
+        text = f"   {done:,}/{self.total:,}  rendered {self.rendered:,}  {rate:.2f} PDFs/s"
+        if self.timings:
+            timings = sorted(self.timings)
+            p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+            text += f"  p50 {statistics.median(timings) * 1000:.0f} ms  p95 {p95 * 1000:.0f} ms"
+        if self.skipped or self.failed:
+            text += f"  skipped {self.skipped:,}  failed {self.failed:,}"
+        return text
+
+
+def write_batch(finished, skipped, checkpoint):
+    """Commit the rows of finished renders, then checkpoint them with the skipped projects"""
+    project_ids = []
+    for job, result in finished:
+        project = db.session.get(Project, job['project_id'])
+        record_render(project, job, result)
+        project_ids.append(project.id)
+    db.session.commit()
+
+    for project_id in project_ids:
+        try:
+            lifecycle.enforce_retention(project_id)
+        except Exception as e:
+            db.session.rollback()
+            print(f"   ⚠ Retention failed for project {project_id}: {e}")
+
+    checkpoint.add(project_ids + skipped)
+    finished.clear()
+    skipped.clear()
+
+
+def run(args, app):
+    """Render the selected projects; returns the final Stats"""
+    done = load_checkpoint(args.checkpoint, args.restart)
+    project_ids = select_projects(args, done)
+    if done:
+        print(f"Resuming: {len(done):,} projects already done ({args.checkpoint}; --restart to start over)")
+    print(f"Rendering {len(project_ids):,} projects on {args.workers} workers")
+
+    stats = Stats(len(project_ids))
+    checkpoint = Checkpoint(args.checkpoint)
+    queue = iter(project_ids)
+    in_flight = {}
+    finished, skipped = [], []
+    last_report = time.perf_counter()
+
+    with RenderPool(artifacts.template_path(), app.config['PDF_OUTPUT_DIR'], args.workers) as pool:
+        def fill():
+            # Keep every worker busy with one job queued behind it
+            while len(in_flight) < max(1, args.workers) * 2:
+                project_id = next(queue, None)
+                if project_id is None:
+                    return
+                job = build_render_job(db.session.get(Project, project_id))
+                if job is None:
+                    stats.skipped += 1
+                    skipped.append(project_id)
+                else:
+                    in_flight[pool.submit(job)] = job
+
+        try:
+            fill()
+            while in_flight:
+                completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    job = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        stats.failed += 1
+                        print(f"   ❌ Project {job['project_id']}: {e}")
+                        continue
+                    stats.rendered += 1
+                    stats.timings.append(result['seconds'])
+                    finished.append((job, result))
+
+                if len(finished) + len(skipped) >= args.batch:
+                    write_batch(finished, skipped, checkpoint)
+                fill()
+
+                if time.perf_counter() - last_report >= args.report_every:
+                    print(stats.line())
+                    last_report = time.perf_counter()
+        finally:
+            # Keep whatever finished before an interruption
+            write_batch(finished, skipped, checkpoint)
+            checkpoint.close()
+            analytics.flush()
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Batch Render Tool",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+
+    parser.add_argument('--school', help='Only students of this school')
+    parser.add_argument('--grade', help='Only students of this grade')
+    parser.add_argument('--status', help='Only projects with this status')
+    parser.add_argument('--project', type=int, nargs='+',
+                        help='Only these project IDs')
+    parser.add_argument('--updated-since', type=datetime.fromisoformat,
+                        help='Only projects changed on or after this date')
+    parser.add_argument('--missing-only', action='store_true',
+                        help='Skip projects with a PDF of their current answers')
+    parser.add_argument('--limit', type=int,
+                        help='Render at most N projects')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Render processes')
+    parser.add_argument('--batch', type=int, default=50,
+                        help='GeneratedPDF rows per commit')
+    parser.add_argument('--checkpoint', type=Path, default=Path('batch_render.checkpoint'),
+                        help='Checkpoint file of finished project IDs')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore an existing checkpoint')
+    parser.add_argument('--report-every', type=float, default=5.0,
+                        help='Seconds between progress lines')
+
+    args = parser.parse_args()
+    args.workers = max(1, args.workers)
+    args.batch = max(1, args.batch)
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            stats = run(args, app)
+        except KeyboardInterrupt:
+            print("\n❌ Interrupted; rerun the same command to resume")
+            return 130
+        except Exception as e:
+            print(f"❌ Batch render failed: {e}")
+            return 1
+
+        print(stats.line())
+        elapsed = time.perf_counter() - stats.start
+        print(f"✓ Rendered {stats.rendered:,} PDFs in {elapsed:.1f}s "
+              f"({stats.skipped:,} without answers, {stats.failed:,} failed)")
+
+    return 1 if stats.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+Database Contention Benchmark
+Simulate concurrent autosaves (upserts) and project reads from several
+processes and compare engine profiles (see services/db_profiles.py)
+
+Usage:
+    python benchmark_db_contention.py [OPTIONS]
+
+Options:
+    --profile NAME      'tuned' (the app's profile), 'default' (bare engine) or 'both'
+    --database-url URL  Database to benchmark (default: temporary SQLite file)
+    --processes N       Concurrent worker processes (default: 8)
+    --operations N      Operations per process (default: 300)
+    --read-ratio R      Fraction of operations that are reads (default: 0.5)
+    --projects N        Distinct projects written to (default: 20)
+
+Examples:
+    python benchmark_db_contention.py --profile both
+    python benchmark_db_contention.py --profile tuned --database-url postgresql://user:pw@localhost/bench
+"""
+import sys
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import (
+    Column, Integer, MetaData, String, Table, Text, UniqueConstraint,
+    create_engine, func, select
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+from services.db_profiles import engine_options_for, install_sqlite_pragmas, is_sqlite
+
+metadata = MetaData()
+bench_responses = Table(
+    'bench_responses', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('project_id', Integer, nullable=False),
+    Column('field_name', String(100), nullable=False),
+    Column('field_value', Text),
+    UniqueConstraint('project_id', 'field_name', name='bench_unique_field')
+)
+
+SETTINGS = {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+
+
+def make_engine(url: str, profile: str):
+    """Create an engine with the tuned profile or SQLAlchemy defaults"""
+    if profile == 'default':
+        return create_engine(url)
+
+    engine = create_engine(url, **engine_options_for(url, SETTINGS))
+    if is_sqlite(url):
+        install_sqlite_pragmas(engine, SETTINGS)
+    return engine
+
+
+def run_worker(args):
+    """One process: returns (latencies, errors) for its operations"""
+    url, profile, operations, read_ratio, projects, seed = args
+    rng = random.Random(seed)
+    engine = make_engine(url, profile)
+    insert = postgresql_insert if engine.dialect.name == 'postgresql' else sqlite_insert
+
+    latencies, errors = [], 0
+    for _ in range(operations):
+        project_id = rng.randrange(projects)
+        start = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                if rng.random() < read_ratio:
+                    connection.execute(
+                        select(bench_responses.c.field_name, bench_responses.c.field_value)
+                        .where(bench_responses.c.project_id == project_id)
+                    ).all()
+                else:
+                    statement = insert(bench_responses).values(
+                        project_id=project_id,
+                        field_name=f'field_{rng.randrange(40)}',
+                        field_value='x' * rng.randrange(10, 400)
+                    )
+                    connection.execute(statement.on_conflict_do_update(
+                        index_elements=['project_id', 'field_name'],
+                        set_={'field_value': statement.excluded.field_value}
+                    ))
+        except OperationalError:
+            errors += 1  # "database is locked", lock or statement timeout
+            continue
+        latencies.append(time.perf_counter() - start)
+
+    engine.dispose()
+    return latencies, errors
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_benchmark(url, profile, processes, operations, read_ratio, projects):
+    """Run one profile and print throughput, lock errors and latency percentiles"""
+    engine = make_engine(url, profile)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    engine.dispose()
+
+    jobs = [(url, profile, operations, read_ratio, projects, seed) for seed in range(processes)]
+    start = time.perf_counter()
+    with Pool(processes) as pool:
+        results = pool.map(run_worker, jobs)
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+    errors = sum(worker_errors for _, worker_errors in results)
+
+    engine = make_engine(url, profile)
+    with engine.connect() as connection:
+        rows = connection.execute(select(func.count()).select_from(bench_responses)).scalar()
+    metadata.drop_all(engine)
+    engine.dispose()
+
+    print(f"\nProfile: {profile}")
+    print(f"  Operations:   {len(latencies)} ok, {errors} failed ({rows} rows)")
+    print(f"  Throughput:   {len(latencies) / elapsed:,.0f} ops/s over {elapsed:.2f}s")
+    if latencies:
+        print(f"  Latency mean: {statistics.mean(latencies) * 1000:.2f} ms")
+        print(f"  Latency p50:  {percentile(latencies, 0.50) * 1000:.2f} ms")
+        print(f"  Latency p95:  {percentile(latencies, 0.95) * 1000:.2f} ms")
+        print(f"  Latency p99:  {percentile(latencies, 0.99) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Database Contention Benchmark",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+
+    parser.add_argument('--profile', choices=['tuned', 'default', 'both'], default='both',
+                        help='Engine profile to benchmark')
+    parser.add_argument('--database-url',
+                        help='Database URL (default: temporary SQLite file)')
+    parser.add_argument('--processes', type=int, default=8,
+                        help='Concurrent worker processes')
+    parser.add_argument('--operations', type=int, default=300,
+                        help='Operations per process')
+    parser.add_argument('--read-ratio', type=float, default=0.5,
+                        help='Fraction of operations that are reads')
+    parser.add_argument('--projects', type=int, default=20,
+                        help='Distinct projects')
+
+    args = parser.parse_args()
+    profiles = ['default', 'tuned'] if args.profile == 'both' else [args.profile]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in profiles:
+            # Fresh SQLite file per profile: journal_mode=WAL persists in the file
+            url = args.database_url or f"sqlite:///{Path(tmp) / f'bench_{profile}.db'}"
+            run_benchmark(url, profile, args.processes, args.operations,
+                          args.read_ratio, args.projects)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -30,20 +30,119 @@ class Config:
         f'sqlite:///{BASE_DIR / "dt_playbook.db"}'
     )
     
+    # Database engine profile (see services/db_profiles.py); explicit
+    # SQLALCHEMY_ENGINE_OPTIONS override individual profile options
+    # SQLite
+    DB_SQLITE_JOURNAL_MODE = os.getenv('DB_SQLITE_JOURNAL_MODE', 'WAL')
+    DB_SQLITE_SYNCHRONOUS = os.getenv('DB_SQLITE_SYNCHRONOUS', 'NORMAL')
+    DB_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('DB_SQLITE_BUSY_TIMEOUT_MS', 5000))
+    DB_SQLITE_MMAP_SIZE = int(os.getenv('DB_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    DB_SQLITE_CACHE_SIZE = int(os.getenv('DB_SQLITE_CACHE_SIZE', -64 * 1024))  # negative = KiB
+    DB_SQLITE_MAINTENANCE_INTERVAL_SECONDS = int(os.getenv('DB_SQLITE_MAINTENANCE_INTERVAL_SECONDS', 600))  # 0 = off
+    # PostgreSQL (per worker process)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+    DB_LOCK_TIMEOUT_MS = int(os.getenv('DB_LOCK_TIMEOUT_MS', 5000))
+    
+    # Autosave write-behind buffer (see services/autosave_buffer.py). Opt-in:
+    # buffered saves return no response_id, and the spool must be shared by all nodes
+    AUTOSAVE_BUFFER_ENABLED = os.getenv('AUTOSAVE_BUFFER_ENABLED', 'false').lower() == 'true'
+    AUTOSAVE_FLUSH_INTERVAL_SECONDS = float(os.getenv('AUTOSAVE_FLUSH_INTERVAL_SECONDS', 2))
+    AUTOSAVE_SPOOL_DIR = Path(os.getenv('AUTOSAVE_SPOOL_DIR', BASE_DIR / 'autosave_spool'))  # shared by all workers
+    AUTOSAVE_FSYNC = os.getenv('AUTOSAVE_FSYNC', 'false').lower() == 'true'  # also survive power loss
+    
     # PDF Settings
     PDF_TEMPLATE_PATH = PDF_TEMPLATE_PATH
     PDF_OUTPUT_DIR = BASE_DIR / 'generated_pdfs'
     MAX_PDF_SIZE_MB = int(os.getenv('MAX_PDF_SIZE_MB', 50))
     
+    # Request timeout shared with gunicorn.conf.py; renders are cancelled a
+    # little before it so the worker can answer instead of being killed
+    REQUEST_TIMEOUT_SECONDS = int(os.getenv('REQUEST_TIMEOUT', 300))
+    PDF_RENDER_DEADLINE_MARGIN_SECONDS = int(os.getenv('PDF_RENDER_DEADLINE_MARGIN_SECONDS', 15))
+    
+    # Write-behind counters (download counts etc.)
+    COUNTER_FLUSH_INTERVAL_SECONDS = float(os.getenv('COUNTER_FLUSH_INTERVAL_SECONDS', 5))
+    
+    # School dashboard aggregates (see services/analytics.py)
+    ANALYTICS_FLUSH_INTERVAL_SECONDS = float(os.getenv('ANALYTICS_FLUSH_INTERVAL_SECONDS', 5))
+    
+    # Browser cache lifetime for downloaded PDFs (content per pdf_id never changes)
+    PDF_DOWNLOAD_MAX_AGE_SECONDS = int(os.getenv('PDF_DOWNLOAD_MAX_AGE_SECONDS', 7 * 24 * 3600))
+    
     # Security
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
     JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', 24))
+    AUTH_CACHE_TTL_SECONDS = int(os.getenv('AUTH_CACHE_TTL_SECONDS', 60))  # identity/ownership cache per worker; 0 disables
+    ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')  # X-Admin-Key for /api/admin/*; unset = disabled
+    
+    # Roster import (see services/roster_import.py)
+    ROSTER_MAX_ROWS = int(os.getenv('ROSTER_MAX_ROWS', 2000))
+    ROSTER_HASH_WORKERS = int(os.getenv('ROSTER_HASH_WORKERS', 0))  # 0 = CPU count
+    ROSTER_INSERT_BATCH = int(os.getenv('ROSTER_INSERT_BATCH', 200))
     
     # File Upload
     UPLOAD_FOLDER = BASE_DIR / 'uploads'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
     MAX_IMAGE_SIZE_MB = int(os.getenv('MAX_IMAGE_SIZE_MB', 5))
     
+    # Storage lifecycle (see services/storage_lifecycle.py)
+    PDF_RETENTION_PER_PROJECT = int(os.getenv('PDF_RETENTION_PER_PROJECT', 5))  # 0 = keep all
+    STORAGE_BUDGET_MB = int(os.getenv('STORAGE_BUDGET_MB', 0))  # 0 = unlimited
+    STORAGE_ORPHAN_GRACE_SECONDS = int(os.getenv('STORAGE_ORPHAN_GRACE_SECONDS', 3600))
+    STORAGE_SWEEP_INTERVAL_SECONDS = int(os.getenv('STORAGE_SWEEP_INTERVAL_SECONDS', 300))  # 0 = CLI only
+    STORAGE_SWEEP_BATCH = int(os.getenv('STORAGE_SWEEP_BATCH', 500))
+    
+    # Content-addressed image blobs (see services/blob_store.py)
+    BLOB_RETENTION_SECONDS = int(os.getenv('BLOB_RETENTION_SECONDS', 7 * 24 * 3600))  # Unreferenced blobs
+    BLOB_CHECK_MAX_HASHES = int(os.getenv('BLOB_CHECK_MAX_HASHES', 500))
+    
+    # Shared artifact storage (see services/storage.py); unset = local disk only
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', '')  # '', 'local' or 's3'
+    STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT', '')  # 'local' backend directory (e.g. a shared mount)
+    S3_BUCKET = os.getenv('S3_BUCKET', '')
+    S3_PREFIX = os.getenv('S3_PREFIX', '')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None  # MinIO and other S3-compatible stores
+    S3_REGION = os.getenv('S3_REGION') or None
+    STORAGE_MULTIPART_THRESHOLD_MB = int(os.getenv('STORAGE_MULTIPART_THRESHOLD_MB', 16))
+    STORAGE_MULTIPART_CHUNK_MB = int(os.getenv('STORAGE_MULTIPART_CHUNK_MB', 8))
+    STORAGE_CACHE_DIR = Path(os.getenv('STORAGE_CACHE_DIR', str(BASE_DIR / 'storage_cache')))
+    STORAGE_CACHE_MAX_MB = int(os.getenv('STORAGE_CACHE_MAX_MB', 512))
+    PDF_TEMPLATE_KEY = os.getenv('PDF_TEMPLATE_KEY', '')  # Read the template from the backend instead
+    
+    # Cold archive of long-completed projects (see services/project_archive.py)
+    ARCHIVE_DIR = Path(os.getenv('ARCHIVE_DIR', str(BASE_DIR / 'archive')))
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+    
+    # Bulk class PDF downloads (see services/pdf_export.py)
+    PDF_EXPORT_RENDER_WORKERS = int(os.getenv('PDF_EXPORT_RENDER_WORKERS', 2))  # Processes; 0 = render in the request
+    PDF_EXPORT_MAX_PROJECTS = int(os.getenv('PDF_EXPORT_MAX_PROJECTS', 1000))
+    PDF_EXPORT_RETENTION_DAYS = int(os.getenv('PDF_EXPORT_RETENTION_DAYS', 7))
+    
+    # Research exports (see services/response_export.py)
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 500))
+    EXPORT_SAFETY_LAG_SECONDS = int(os.getenv('EXPORT_SAFETY_LAG_SECONDS', 60))  # Incremental cutoff behind the clock
+    
+    # Upload derivatives (see services/image_derivatives.py)
+    IMAGE_DERIVATIVES_ENABLED = os.getenv('IMAGE_DERIVATIVES_ENABLED', 'true').lower() == 'true'
+    IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', 1))
+    IMAGE_RENDITION_DPI = int(os.getenv('IMAGE_RENDITION_DPI', 72))  # 72 = one pixel per PDF point
+    IMAGE_THUMBNAIL_SIZE = int(os.getenv('IMAGE_THUMBNAIL_SIZE', 256))
+    IMAGE_THUMBNAIL_MAX_AGE_SECONDS = int(os.getenv('IMAGE_THUMBNAIL_MAX_AGE_SECONDS', 86400))
+    
+    # File delivery via nginx (see nginx.conf)
+    # X-Accel-Redirect: Python authorizes, nginx streams the file
+    X_ACCEL_REDIRECT_ENABLED = os.getenv('X_ACCEL_REDIRECT_ENABLED', 'false').lower() == 'true'
+    X_ACCEL_PREFIX = os.getenv('X_ACCEL_PREFIX', '/')  # internal locations /generated_pdfs/, /uploads/
+    # Signed links: nginx validates the signature, no Python or DB hit.
+    # Unset: no signed links; required with X-Accel (create_app refuses to start)
+    SIGNED_URL_SECRET = os.getenv('SIGNED_URL_SECRET', '')
+    SIGNED_URL_TTL_SECONDS = int(os.getenv('SIGNED_URL_TTL_SECONDS', 3600))
+    SIGNED_URL_PREFIX = os.getenv('SIGNED_URL_PREFIX', '/files/')  # public /files/generated_pdfs/, /files/uploads/
+    
     # CORS
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
 
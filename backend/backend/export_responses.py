@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Response Export CLI
+Export student answers for research analysis: one row per project, one
+column per playbook field (services/response_export.py)
+
+Usage:
+    python export_responses.py [OPTIONS]
+
+Options:
+    --format F          csv (default), parquet or arrow (Arrow IPC stream);
+                        parquet and arrow need pyarrow
+    --output FILE       Write to FILE (default: stdout)
+    --school NAME       Only students of this school
+    --grade GRADE       Only students of this grade
+    --since TIME        Only projects updated at or after TIME (YYYY-MM-DD or ISO, UTC)
+    --until TIME        Only projects updated before TIME
+    --state FILE        Incremental export: start where the previous run with
+                        this state file stopped, and record where this one stops
+    --batch N           Projects per batch (default: EXPORT_BATCH_SIZE)
+
+Progress and the summary go to stderr, so the export can be piped.
+
+Examples:
+    python export_responses.py --format parquet --output responses.parquet
+    python export_responses.py --school "SNS Academy" --since 2026-09-01 > sns.csv
+    python export_responses.py --format parquet --state export_state.json --output delta.parquet
+"""
+import sys
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import create_app
+from services.response_export import (
+    ExportError, check_format, export_cutoff, iter_export_batches, parse_export_time, stream_export
+)
+
+
+def load_state(path):
+    """Cutoff recorded by the previous incremental run, or None on the first run"""
+    if not path.exists():
+        return None
+    return parse_export_time(json.loads(path.read_text())['cutoff'])
+
+
+def save_state(path, cutoff):
+    """Record the cutoff atomically, so a failed run never advances it"""
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    tmp.write_text(json.dumps({'cutoff': cutoff.isoformat()}))
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Response Export Tool",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+
+    parser.add_argument('--format', default='csv',
+                        help='csv, parquet or arrow')
+    parser.add_argument('--output', type=Path,
+                        help='Output file (default: stdout)')
+    parser.add_argument('--school', help='Only students of this school')
+    parser.add_argument('--grade', help='Only students of this grade')
+    parser.add_argument('--since', help='Only projects updated at or after this time')
+    parser.add_argument('--until', help='Only projects updated before this time')
+    parser.add_argument('--state', type=Path,
+                        help='State file for incremental exports')
+    parser.add_argument('--batch', type=int,
+                        help='Projects per batch')
+
+    args = parser.parse_args()
+
+    try:
+        check_format(args.format)
+        since = parse_export_time(args.since) if args.since else None
+        until = parse_export_time(args.until) if args.until else None
+        if args.state and not since:
+            since = load_state(args.state)
+    except (ExportError, ValueError, KeyError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    app = create_app()
+
+    with app.app_context():
+        cutoff = export_cutoff(until, app.config['EXPORT_SAFETY_LAG_SECONDS'])
+        batch_size = max(1, args.batch or app.config['EXPORT_BATCH_SIZE'])
+        window = f"{since.isoformat() if since else 'the beginning'} to {cutoff.isoformat()}"
+        print(f"Exporting projects updated from {window}", file=sys.stderr)
+
+        projects = 0
+
+        def counted(batches):
+            nonlocal projects
+            for batch in batches:
+                projects += len(batch)
+                yield batch
+
+        batches = counted(iter_export_batches(
+            school=args.school, grade=args.grade, since=since, cutoff=cutoff, batch_size=batch_size
+        ))
+        start = time.perf_counter()
+        written = 0
+        out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        try:
+            for chunk in stream_export(args.format, batches):
+                out.write(chunk)
+                written += len(chunk)
+            out.flush()
+        except Exception as e:
+            print(f"❌ Export failed: {e}", file=sys.stderr)
+            return 1
+        finally:
+            if args.output:
+                out.close()
+
+        if args.state:
+            save_state(args.state, cutoff)
+        elapsed = time.perf_counter() - start
+        print(f"✓ Exported {projects:,} projects ({written / 1024:,.1f} KB) in {elapsed:.1f}s", file=sys.stderr)
+        if args.state:
+            print(f"✓ Next incremental run starts at {cutoff.isoformat()}", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
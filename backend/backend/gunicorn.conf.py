@@ -14,7 +14,7 @@ worker_class = 'sync'  # Use 'gevent' or 'eventlet' for async
 worker_connections = 1000
 max_requests = 1000  # Restart workers after handling this many requests
 max_requests_jitter = 50  # Add randomness to prevent all workers restarting at once
-timeout = 300  # 5 minutes for PDF generation
+timeout = int(os.getenv('REQUEST_TIMEOUT', 300))  # 5 minutes for PDF generation (renders cancel slightly earlier)
 keepalive = 2
 
 # Logging
@@ -80,6 +80,13 @@ def post_worker_init(worker):
 
 def worker_exit(server, worker):
     """Called just after a worker has been exited."""
+    # Write out buffered counters and autosaves before the process goes away
+    from services.counter_buffer import counters
+    from services.autosave_buffer import autosave
+    from services.analytics import analytics
+    counters.flush()
+    autosave.flush()
+    analytics.flush()
     print(f"Worker exited (pid: {worker.pid})")
 
 def child_exit(server, worker):
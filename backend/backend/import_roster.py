@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Roster Import CLI
+Register a school's students in bulk from a CSV or JSONL roster
+
+Usage:
+    python import_roster.py ROSTER [OPTIONS]
+
+Options:
+    --format FMT            csv or jsonl (default: from the file extension)
+    --school NAME           School for rows that leave it blank
+    --grade GRADE           Grade for rows that leave it blank
+    --generate-passwords    Create passwords for rows without one
+    --workers N             Password hashing processes (default: CPU count)
+    --batch-size N          Users per insert transaction (default: 200)
+    --dry-run               Validate only
+    --report PATH           Write the per-row report as JSONL
+
+CSV rosters need a header row with: username, email, password
+(optional: full_name, grade, school).
+
+Examples:
+    python import_roster.py grade3.csv --school "SNS Academy" --grade 3
+    python import_roster.py roster.jsonl --generate-passwords --report passwords.jsonl
+"""
+import sys
+import argparse
+import json
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import create_app
+from services.roster_import import parse_roster, import_roster, RosterFormatError
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Roster Import Tool",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+
+    parser.add_argument('roster', type=Path,
+                        help='CSV or JSONL roster file')
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help='Roster format')
+    parser.add_argument('--school',
+                        help='Default school')
+    parser.add_argument('--grade',
+                        help='Default grade')
+    parser.add_argument('--generate-passwords', action='store_true',
+                        help='Create passwords for rows without one')
+    parser.add_argument('--workers', type=int,
+                        help='Password hashing processes')
+    parser.add_argument('--batch-size', type=int, default=200,
+                        help='Users per insert transaction')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Validate only')
+    parser.add_argument('--report', type=Path,
+                        help='Write the per-row report (JSONL)')
+
+    args = parser.parse_args()
+
+    fmt = args.format or ('jsonl' if args.roster.suffix.lower() in ('.jsonl', '.ndjson') else 'csv')
+    try:
+        rows = parse_roster(args.roster.read_bytes(), fmt)
+    except (OSError, RosterFormatError) as e:
+        print(f"❌ Cannot read roster: {e}")
+        return 1
+
+    app = create_app()
+
+    with app.app_context():
+        start = time.perf_counter()
+        report = import_roster(
+            rows,
+            defaults={'school': args.school, 'grade': args.grade},
+            hash_workers=args.workers,
+            batch_size=args.batch_size,
+            generate_passwords=args.generate_passwords,
+            dry_run=args.dry_run
+        )
+        elapsed = time.perf_counter() - start
+
+    for entry in report['rows']:
+        if entry['status'] not in ('created', 'valid'):
+            print(f"  Row {entry['row']:4d} | {entry['status']:9s} | "
+                  f"{entry.get('username') or '-'}: {entry.get('message')}")
+
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            for entry in report['rows']:
+                report_file.write(json.dumps(entry) + '\n')
+        print(f"Report written to {args.report}")
+
+    verb = 'validated' if args.dry_run else 'created'
+    valid = len(rows) - report['failed']
+    print(f"✓ {valid if args.dry_run else report['created']} users {verb}, "
+          f"{report['failed']} rows failed ({len(rows)} rows in {elapsed:.1f}s)")
+
+    return 0 if report['failed'] == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
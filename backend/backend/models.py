@@ -1,9 +1,10 @@
 """
 Database Models
 """
+import json
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import JSON
+from sqlalchemy import JSON, inspect, text
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
@@ -67,6 +68,25 @@ class Project(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
     
+    # Denormalized current state: {"responses": {field: value}, "images": {field: file_path},
+    # "revisions": {field: revision of its last change}}
+    # Maintained by services/project_state.py; Response/ImageUpload rows stay the audit trail
+    snapshot = db.Column(JSON, nullable=True)
+    
+    # Incremented by every committed change (ETag / delta sync of responses)
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    
+    # Completeness counters (see services/coverage.py), kept in step with snapshot
+    coverage = db.Column(JSON, nullable=True)
+    
+    # Starter project this one was provisioned from (services/provisioning.py)
+    source_project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=True, index=True)
+    
+    # Keyset pagination of a user's projects (newest first)
+    __table_args__ = (
+        db.Index('ix_projects_user_id_id', 'user_id', 'id'),
+    )
+    
     # Relationships
     responses = db.relationship('Response', backref='project', lazy=True, cascade='all, delete-orphan')
     images = db.relationship('ImageUpload', backref='project', lazy=True, cascade='all, delete-orphan')
@@ -81,7 +101,9 @@ class Project(db.Model):
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'revision': self.revision,
+            'source_project_id': self.source_project_id
         }
 
 
@@ -128,13 +150,34 @@ class ImageUpload(db.Model):
     # Image metadata
     field_name = db.Column(db.String(100), nullable=False, index=True)
     filename = db.Column(db.String(255), nullable=False)
-    file_path = db.Column(db.String(500), nullable=False)
+    file_path = db.Column(db.String(500), nullable=False, index=True)  # May be shared (provisioning)
     file_size = db.Column(db.Integer)  # In bytes
     mime_type = db.Column(db.String(50))
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # Blob.sha256 (NULL: legacy file)
+    
+    # Derivatives (services/image_derivatives.py; NULL until processed)
+    image_width = db.Column(db.Integer)
+    image_height = db.Column(db.Integer)
+    crop_box = db.Column(JSON, nullable=True)  # [left, top, right, bottom] of non-white content
+    dominant_mode = db.Column(db.String(8))  # L, RGB or RGBA
+    thumbnail_path = db.Column(db.String(500), index=True)
+    rendition_path = db.Column(db.String(500), index=True)
+    rendition_meta = db.Column(JSON, nullable=True)  # {"rect": [x0, y0, x1, y1], "dpi", "key"}
+    derived_at = db.Column(db.DateTime)
     
     # Timestamps
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    DERIVED_COLUMNS = (
+        'image_width', 'image_height', 'crop_box', 'dominant_mode',
+        'thumbnail_path', 'rendition_path', 'rendition_meta', 'derived_at'
+    )
+    
+    def clear_derivatives(self):
+        """Forget derivatives of a previous file (call when file_path changes)"""
+        for column in self.DERIVED_COLUMNS:
+            setattr(self, column, None)
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -144,10 +187,41 @@ class ImageUpload(db.Model):
             'filename': self.filename,
             'file_size': self.file_size,
             'mime_type': self.mime_type,
+            'content_hash': self.content_hash,
+            'width': self.image_width,
+            'height': self.image_height,
+            'dominant_mode': self.dominant_mode,
+            'has_thumbnail': self.thumbnail_path is not None,
             'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None
         }
 
 
+class Blob(db.Model):
+    """Content-addressed image file, shared by every ImageUpload with the same bytes"""
+    __tablename__ = 'blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    file_path = db.Column(db.String(500), nullable=False, index=True)
+    file_size = db.Column(db.Integer)  # In bytes
+    mime_type = db.Column(db.String(50))
+    
+    # ImageUpload rows with this content_hash (maintained by services.blob_store)
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'sha256': self.sha256,
+            'file_size': self.file_size,
+            'mime_type': self.mime_type,
+            'ref_count': self.ref_count
+        }
+
+
 class GeneratedPDF(db.Model):
     """Generated PDF files"""
     __tablename__ = 'generated_pdfs'
@@ -159,10 +233,22 @@ class GeneratedPDF(db.Model):
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer)  # In bytes
+    content_hash = db.Column(db.String(64))  # SHA-256 of the file, used as strong ETag
     
     # Generation info
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
     download_count = db.Column(db.Integer, default=0)
+    project_revision = db.Column(db.Integer)  # Project.revision rendered; NULL = unknown (older PDFs)
+    
+    # Disk budget LRU: refreshed on download; set when the budget dropped
+    # the local copy of a PDF kept in shared storage
+    last_accessed_at = db.Column(db.DateTime, default=datetime.utcnow,
+                                 info={'backfill_from': 'generated_at'})
+    evicted_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_generated_pdfs_lru', 'evicted_at', 'last_accessed_at'),
+    )
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -171,21 +257,174 @@ class GeneratedPDF(db.Model):
             'project_id': self.project_id,
             'filename': self.filename,
             'file_size': self.file_size,
+            'content_hash': self.content_hash,
             'generated_at': self.generated_at.isoformat() if self.generated_at else None,
             'download_count': self.download_count
         }
 
 
+class ArchivedProject(db.Model):
+    """Cold copy of an archived project's rows (services/project_archive.py)"""
+    __tablename__ = 'archived_projects'
+    
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), primary_key=True)
+    
+    # zlib-compressed JSON: {"version", "project", "responses", "images", "generated_pdfs"}
+    payload = db.Column(db.LargeBinary, nullable=False)
+    raw_size = db.Column(db.Integer)  # In bytes, before compression
+    compressed_size = db.Column(db.Integer)
+    file_count = db.Column(db.Integer, default=0)  # Files moved to ARCHIVE_DIR
+    
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'project_id': self.project_id,
+            'raw_size': self.raw_size,
+            'compressed_size': self.compressed_size,
+            'file_count': self.file_count,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
+        }
+
+
+class ArchivedPDF(db.Model):
+    """Where a generated PDF of an archived project went, so its ID still resolves"""
+    __tablename__ = 'archived_pdfs'
+    
+    pdf_id = db.Column(db.Integer, primary_key=True)  # GeneratedPDF.id before archiving
+    project_id = db.Column(db.Integer, db.ForeignKey('archived_projects.project_id'), nullable=False, index=True)
+
+
+class PdfExport(db.Model):
+    """
+    Bulk ZIP download of a class's PDFs (services/pdf_export.py)
+    
+    The project list is fixed when the export is created; entries are
+    resolved (reused or rendered) in that order and recorded before their
+    bytes are sent, so the ZIP layout never changes once streamed.
+    """
+    __tablename__ = 'pdf_exports'
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    school = db.Column(db.String(200), nullable=False)
+    grade = db.Column(db.String(20))
+    
+    project_ids = db.Column(JSON, nullable=False)
+    # One per resolved project, in order: {"pdf_id", "name", "path", "size", "crc",
+    # "modified", "rendered"}, {"project_id", "failed": true}, or null (nothing to export)
+    entries = db.Column(JSON, nullable=False, default=list)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)  # All entries resolved
+
+
+class AnalyticsDaily(db.Model):
+    """
+    Activity and content counters per school, grade, day and page
+    (maintained incrementally by services/analytics.py)
+    
+    Row with page 0 holds project-level counters. Content columns are
+    deltas: summed over all days up to a date they give the state on that
+    date; activity columns count events on the day.
+    """
+    __tablename__ = 'analytics_daily'
+    
+    school = db.Column(db.String(200), primary_key=True, default='')  # '' = no school
+    grade = db.Column(db.String(50), primary_key=True, default='')
+    day = db.Column(db.Date, primary_key=True)
+    page = db.Column(db.Integer, primary_key=True, default=0)
+    
+    # Activity (events on the day)
+    projects_created = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    projects_completed = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    pdfs_generated = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    edits = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    image_uploads = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    
+    # Content (net change on the day)
+    fields_filled = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    pages_completed = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    text_responses = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    text_chars = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    images = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    
+    __table_args__ = (
+        db.Index('ix_analytics_daily_day', 'day'),
+    )
+    
+    COUNTER_COLUMNS = (
+        'projects_created', 'projects_completed', 'pdfs_generated', 'edits', 'image_uploads',
+        'fields_filled', 'pages_completed', 'text_responses', 'text_chars', 'images'
+    )
+
+
 def init_db(app):
     """Initialize database"""
+    from services.db_profiles import apply_engine_profile, is_memory_sqlite, sqlite_maintenance
+    from services.response_search import install_search_index
+    
+    apply_engine_profile(app)
     db.init_app(app)
     
     with app.app_context():
+        sqlite_maintenance.init_app(app, db.engine)
         # Create all tables
         db.create_all()
+        upgrade_schema()
+        app.extensions['response_search'] = install_search_index(db.engine)
+        
+        # gunicorn preloads the app before forking: never hand pooled
+        # connections to the workers (an in-memory database lives in its
+        # only connection, so it is kept)
+        if not is_memory_sqlite(db.engine.url):
+            db.engine.dispose()
         print("Database tables created successfully!")
 
 
+def upgrade_schema():
+    """
+    Add columns and indexes introduced after a table was first created
+
+    db.create_all() never alters existing tables, so new nullable (or
+    server-defaulted) columns are added here with ALTER TABLE, and missing
+    indexes are created. A column with info={'backfill_from': <column>}
+    is filled from that column of the existing rows.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            
+            present = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    default_sql = f"'{default}'" if isinstance(default, str) else str(default)
+                    ddl += f' DEFAULT {default_sql}'
+                
+                conn.execute(text(ddl))
+                backfill_from = column.info.get('backfill_from')
+                if backfill_from:
+                    conn.execute(text(f'UPDATE {table.name} SET {column.name} = {backfill_from}'))
+                print(f"Added column {table.name}.{column.name}")
+            
+            present_indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in present_indexes:
+                    index.create(conn)
+                    print(f"Added index {index.name}")
+
+
 def get_project_responses(project_id: int) -> dict:
     """
     Get all responses for a project as a dictionary
@@ -214,33 +453,136 @@ def get_project_images(project_id: int) -> dict:
     return {img.field_name: img.file_path for img in images}
 
 
-def save_response(project_id: int, field_name: str, field_value: str, page_number: int = None):
+def get_project_renditions(project_id: int, images: dict) -> tuple:
     """
-    Save or update a response
+    Field-ready renditions of a project's current images (one query)
     
     Args:
         project_id: Project ID
-        field_name: Field name
-        field_value: Field value
-        page_number: Optional page number
-    """
-    response = Response.query.filter_by(
-        project_id=project_id,
-        field_name=field_name
-    ).first()
-    
-    if response:
-        response.field_value = field_value
-        response.page_number = page_number
-        response.updated_at = datetime.utcnow()
-    else:
-        response = Response(
-            project_id=project_id,
-            field_name=field_name,
-            field_value=field_value,
-            page_number=page_number
+        images: field_name -> file_path being rendered (e.g. from the snapshot)
+        
+    Returns:
+        tuple: (field_name -> {"path", "rect", "dpi", "key"},
+                IDs of image rows that have no rendition yet)
+    """
+    renditions = {}
+    unprocessed = []
+    rows = db.session.query(
+        ImageUpload.id, ImageUpload.field_name, ImageUpload.file_path,
+        ImageUpload.rendition_path, ImageUpload.rendition_meta, ImageUpload.derived_at
+    ).filter(ImageUpload.project_id == project_id)
+    for image_id, field_name, file_path, rendition_path, rendition_meta, derived_at in rows:
+        if images.get(field_name) != file_path:
+            continue
+        if rendition_path and rendition_meta:
+            renditions[field_name] = {'path': rendition_path, **rendition_meta}
+        elif derived_at is None:
+            unprocessed.append(image_id)
+    return renditions, unprocessed
+
+
+def build_project_snapshot(project_id: int, revision: int = 0) -> dict:
+    """Build a snapshot from the Response and ImageUpload rows (all fields at `revision`)."""
+    responses = get_project_responses(project_id)
+    return {
+        'responses': responses,
+        'images': get_project_images(project_id),
+        'revisions': {field: revision for field in responses}
+    }
+
+
+def normalize_field_value(value) -> str:
+    """
+    Coerce a submitted field value to the text stored in Response.field_value
+    
+    Table fields (e.g. validation_scores) arrive as dicts or lists and are
+    stored as JSON; other non-strings are stored as their str().
+    
+    Args:
+        value: Submitted value (not None)
+        
+    Returns:
+        str: Value to store
+    """
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if not isinstance(value, str):
+        return str(value)
+    return value
+
+
+# Rows per INSERT statement (keeps bound parameters well below SQLite's limit)
+UPSERT_CHUNK_SIZE = 150
+
+
+def _dialect_insert():
+    """Dialect-specific insert() supporting ON CONFLICT, or None if unsupported."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def bulk_upsert_responses(project_id: int, items: list) -> int:
+    """
+    Insert or update many responses of a project without committing
+    
+    Uses a single INSERT ... ON CONFLICT (project_id, field_name) DO UPDATE
+    per chunk on SQLite/PostgreSQL; other databases fall back to an update
+    or insert row by row.
+    
+    Args:
+        project_id: Project ID
+        items: List of dicts with field_name, field_value and optional page_number
+        
+    Returns:
+        int: Number of responses written
+    """
+    if not items:
+        return 0
+    
+    now = datetime.utcnow()
+    rows = [{
+        'project_id': project_id,
+        'field_name': item['field_name'],
+        'field_value': item['field_value'],
+        'page_number': item.get('page_number'),
+        'created_at': now,
+        'updated_at': now
+    } for item in items]
+    
+    insert = _dialect_insert()
+    if insert is None:
+        existing = {
+            r.field_name: r for r in Response.query.filter(
+                Response.project_id == project_id,
+                Response.field_name.in_([row['field_name'] for row in rows])
+            )
+        }
+        for row in rows:
+            response = existing.get(row['field_name'])
+            if response:
+                response.field_value = row['field_value']
+                response.page_number = row['page_number']
+                response.updated_at = now
+            else:
+                db.session.add(Response(**row))
+        return len(rows)
+    
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        statement = insert(Response.__table__).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        statement = statement.on_conflict_do_update(
+            index_elements=['project_id', 'field_name'],
+            set_={
+                'field_value': statement.excluded.field_value,
+                'page_number': statement.excluded.page_number,
+                'updated_at': statement.excluded.updated_at
+            }
         )
-        db.session.add(response)
+        db.session.execute(statement)
     
-    db.session.commit()
-    return response
+    return len(rows)
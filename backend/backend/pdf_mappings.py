@@ -693,6 +693,34 @@ PDF_FIELD_MAPPINGS = {
 }
 
 
+def is_required_field(config):
+    """
+    Whether a mapped field counts as required for completeness
+    
+    Fields are required unless their mapping sets "required": False or the
+    description marks them "(optional)".
+    """
+    if 'required' in config:
+        return bool(config['required'])
+    return '(optional)' not in config.get('description', '').lower()
+
+
+def _build_field_index():
+    index = {}
+    for page_num, fields in PDF_FIELD_MAPPINGS.items():
+        for field_name, config in fields.items():
+            index.setdefault(field_name, {
+                'page': page_num,
+                'field_type': config.get('field_type', 'text'),
+                'required': is_required_field(config)
+            })
+    return index
+
+
+# field_name -> {"page", "field_type", "required"} (first mapping wins)
+FIELD_INDEX = _build_field_index()
+
+
 def get_field_mapping(page_number, field_name):
     """
     Get coordinate mapping for a specific field
@@ -707,6 +735,22 @@ def get_field_mapping(page_number, field_name):
     return PDF_FIELD_MAPPINGS.get(page_number, {}).get(field_name)
 
 
+def get_field_page(field_name):
+    """
+    Get the page a field is mapped to
+    
+    Args:
+        field_name: Name of the field
+        
+    Returns:
+        int: PDF page number (1-indexed) or None if the field is unmapped
+    """
+    for page_num, fields in PDF_FIELD_MAPPINGS.items():
+        if field_name in fields:
+            return page_num
+    return None
+
+
 def get_page_fields(page_number):
     """
     Get all fields for a specific page
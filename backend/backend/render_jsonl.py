@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""
+JSONL Render CLI
+Render playbook PDFs from JSONL records (services/stream_renderer.py)
+with one warm generator per worker, no Flask app and no database. For
+data pipelines, and as a repeatable load generator for the renderer.
+
+Usage:
+    python render_jsonl.py [INPUT] (--output-dir DIR | --tar FILE | --stdout) [OPTIONS]
+
+Arguments:
+    INPUT               JSONL file, one record per line (default: stdin)
+
+Output (one of):
+    --output-dir DIR    Write <id>.pdf files into DIR
+    --tar FILE          Write an uncompressed tar stream to FILE (- for stdout)
+    --stdout            Write the single record's PDF to stdout
+
+Options:
+    --template PATH     PDF template (default: PDF_TEMPLATE_PATH)
+    --workers N         Render processes (default: 0 = render in this process)
+    --lookahead N       Records queued ahead of the output (default: 2 x workers)
+    --fail-fast         Stop at the first bad record or failed render
+
+Record format:
+    {"id": "asha-3", "responses": {"field": "value"},
+     "images": {"field": "photo.png" or "data:image/png;base64,..."}}
+
+stderr gets one JSON line per record ({"line", "name", "status",
+"seconds", "latency", "size", "error"}) and a summary line with PDFs/s and
+p50/p95 render times, so stdout stays clean for the tar or PDF stream.
+The exit status is 1 if any record failed.
+
+Examples:
+    python render_jsonl.py records.jsonl --output-dir out/ --workers 4
+    cat records.jsonl | python render_jsonl.py --tar - > pdfs.tar
+    echo '{"responses": {"student_name": "Asha"}}' | python render_jsonl.py --stdout > asha.pdf
+    python render_jsonl.py records.jsonl --tar /dev/null --workers 8 2> timings.jsonl
+"""
+import sys
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import Config
+from services.render_pool import RenderPool
+from services.stream_renderer import open_sink, read_records, render_stream
+
+
+def report(data):
+    print(json.dumps(data), file=sys.stderr, flush=True)
+
+
+def summary(results, elapsed):
+    """Summary line: counts, throughput and render time percentiles"""
+    timings = sorted(result['seconds'] for result in results if result['status'] == 'ok')
+    data = {
+        'summary': True,
+        'records': len(results),
+        'rendered': len(timings),
+        'failed': len(results) - len(timings),
+        'elapsed': round(elapsed, 3),
+        'pdfs_per_second': round(len(timings) / elapsed, 2) if elapsed else 0.0
+    }
+    if timings:
+        data['p50'] = round(statistics.median(timings), 4)
+        data['p95'] = round(timings[max(0, int(len(timings) * 0.95) - 1)], 4)
+    return data
+
+
+def claim_stdout():
+    """
+    Binary stream to the real stdout; file descriptor 1 then points at stderr
+
+    Libraries print notices to stdout (PyMuPDF does on import), and spawned
+    render workers inherit descriptor 1, so nothing but the output may
+    keep it.
+    """
+    stream = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return stream
+
+
+def run(args, stdout):
+    """Render every record; returns the per-record results"""
+    tar_stream = None
+    if args.tar:
+        tar_stream = stdout if args.tar == '-' else open(args.tar, 'wb')
+    sink, scratch = open_sink(output_dir=args.output_dir, tar_stream=tar_stream,
+                              pdf_stream=stdout if args.stdout else None)
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+
+    results = []
+    try:
+        with RenderPool(args.template, sink.render_dir, args.workers) as pool:
+            stream = render_stream(read_records(source), sink, pool, scratch, args.lookahead)
+            for result in stream:
+                report(result)
+                results.append(result)
+                if args.fail_fast and result['status'] != 'ok':
+                    stream.close()
+                    break
+        sink.close()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if tar_stream is not None and tar_stream is not stdout:
+            tar_stream.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="JSONL Render Tool",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+
+    parser.add_argument('input', nargs='?', default='-',
+                        help='JSONL file (default: stdin)')
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--output-dir', type=Path,
+                        help='Directory for the PDFs')
+    output.add_argument('--tar',
+                        help='Tar stream file (- for stdout)')
+    output.add_argument('--stdout', action='store_true',
+                        help="Write the single record's PDF to stdout")
+    parser.add_argument('--template', default=Config.PDF_TEMPLATE_PATH,
+                        help='PDF template')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Render processes (0 = in this process)')
+    parser.add_argument('--lookahead', type=int,
+                        help='Records queued ahead of the output')
+    parser.add_argument('--fail-fast', action='store_true',
+                        help='Stop at the first failed record')
+
+    args = parser.parse_args()
+    args.workers = max(0, args.workers)
+    args.lookahead = args.lookahead or max(1, args.workers * 2)
+
+    # Coverage reports are logged per render; only warnings belong on stderr
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+
+    if not Path(args.template).exists():
+        print(f"❌ PDF template not found: {args.template}", file=sys.stderr)
+        return 1
+
+    stdout = claim_stdout()
+    start = time.perf_counter()
+    try:
+        results = run(args, stdout)
+    except KeyboardInterrupt:
+        print("\n❌ Interrupted", file=sys.stderr)
+        return 130
+    except Exception as e:
+        print(f"❌ Render failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        stdout.close()
+
+    data = summary(results, time.perf_counter() - start)
+    report(data)
+    return 1 if data['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,533 @@
+"""
+API Routes for School Administration
+Protected by the admin API key (X-Admin-Key), not user tokens
+"""
+from datetime import date
+
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+
+from services.roster_import import parse_roster, normalize_row, import_roster, RosterFormatError
+from services.provisioning import provision_projects, ProvisioningError, SourceProjectNotFound
+from services.response_search import search_responses, SearchQueryError
+from services.analytics import analytics, summarize
+from services.pdf_export import (
+    ExportFilesChanged, PdfExportError, check_files, complete_export, create_export,
+    export_progress, resolve_entries, zip_entries
+)
+from services.render_pool import RenderPool
+from services.storage import artifacts
+from services.response_export import (
+    EXPORT_FORMATS, ExportError, check_format, export_cutoff, iter_export_batches,
+    parse_export_time, stream_export
+)
+from auth import admin_key_required, sanitize_filename
+from models import db, PdfExport
+from utils.zipstream import archive_size, stream_zip
+
+# Create blueprint
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+_ROSTER_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+}
+
+
+def _flag(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or '').lower() in ('1', 'true', 'yes')
+
+
+def _read_roster_request():
+    """
+    Extract roster rows and options from a JSON, multipart or raw CSV/JSONL request
+
+    Returns:
+        tuple: (rows, options dict)
+
+    Raises:
+        RosterFormatError: If the roster is missing or malformed
+    """
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        students = data.get('students')
+        if not isinstance(students, list) or not all(isinstance(s, dict) for s in students):
+            raise RosterFormatError("'students' must be a list of objects")
+        return [normalize_row(student) for student in students], data
+
+    if 'roster' in request.files:
+        file = request.files['roster']
+        fmt = request.form.get('format') or file.filename.rsplit('.', 1)[-1]
+        fmt = 'jsonl' if fmt.lower() in ('jsonl', 'ndjson') else fmt
+        return parse_roster(file.read(), fmt), {**request.form, **request.args}
+
+    fmt = request.args.get('format') or _ROSTER_CONTENT_TYPES.get(request.mimetype)
+    if not fmt or not request.data:
+        raise RosterFormatError("Provide a 'roster' file, a JSON 'students' list, or a CSV/JSONL body")
+    return parse_roster(request.data, fmt), dict(request.args)
+
+
+@admin_bp.route('/roster-import', methods=['POST'])
+@admin_key_required
+def roster_import():
+    """
+    Register a roster of students in bulk
+
+    Accepts:
+    - multipart/form-data with a 'roster' file (.csv with a header row, or .jsonl)
+    - application/json: {"students": [{"username", "email", "password", ...}], ...}
+    - a text/csv or application/x-ndjson body
+
+    Options (form fields, query parameters or JSON keys):
+        school, grade: Defaults for rows that leave them blank
+        generate_passwords: Create passwords for rows without one
+        dry_run: Validate only
+
+    Returns:
+    {
+        "created": 598,
+        "failed": 2,
+        "rows": [
+            {"row": 1, "username": "asha", "status": "created", "user_id": 17},
+            {"row": 2, "username": "ben", "status": "duplicate", "message": "Username already exists"}
+        ]
+    }
+    """
+    try:
+        try:
+            rows, options = _read_roster_request()
+        except RosterFormatError as e:
+            return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+
+        max_rows = current_app.config.get('ROSTER_MAX_ROWS', 2000)
+        if len(rows) > max_rows:
+            return jsonify({
+                'error': 'Bad request',
+                'message': f'Roster has {len(rows)} rows; the limit is {max_rows} per request'
+            }), 400
+
+        report = import_roster(
+            rows,
+            defaults={'school': options.get('school'), 'grade': options.get('grade')},
+            hash_workers=current_app.config.get('ROSTER_HASH_WORKERS') or None,
+            batch_size=current_app.config.get('ROSTER_INSERT_BATCH', 200),
+            generate_passwords=_flag(options.get('generate_passwords')),
+            dry_run=_flag(options.get('dry_run'))
+        )
+        return jsonify(report), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Roster import error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@admin_bp.route('/provision', methods=['POST'])
+@admin_key_required
+def provision():
+    """
+    Give every selected student a copy of a starter project
+
+    Expected JSON:
+    {
+        "source_project_id": 12,
+        "user_ids": [17, 18, 19],          // or:
+        "school": "SNS Academy",
+        "grade": "3",                      // optional, with school
+        "title": "My Playbook"             // optional
+    }
+
+    Students who already have a copy of this starter are skipped.
+
+    Returns:
+    {
+        "created": 2,
+        "projects": [{"user_id": 17, "project_id": 40}, ...]
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        source_project_id = data.get('source_project_id')
+        user_ids = data.get('user_ids')
+
+        if not isinstance(source_project_id, int):
+            return jsonify({'error': 'Bad request', 'message': 'source_project_id is required'}), 400
+        if user_ids is not None and (
+            not isinstance(user_ids, list) or not all(isinstance(u, int) for u in user_ids)
+        ):
+            return jsonify({'error': 'Bad request', 'message': 'user_ids must be a list of integers'}), 400
+
+        try:
+            projects = provision_projects(
+                source_project_id,
+                user_ids=user_ids,
+                school=data.get('school'),
+                grade=data.get('grade'),
+                title=data.get('title')
+            )
+        except SourceProjectNotFound as e:
+            return jsonify({'error': 'Not found', 'message': str(e)}), 404
+        except ProvisioningError as e:
+            return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+
+        return jsonify({'created': len(projects), 'projects': projects}), 201
+
+    except Exception as e:
+        current_app.logger.error(f"Provisioning error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@admin_bp.route('/search', methods=['GET'])
+@admin_key_required
+def search():
+    """
+    Find projects by what students wrote
+
+    Query Parameters:
+        q: Words (all must match), "quoted phrases" and prefixes (bottl*)
+        school, grade: Only students of this school / grade
+        page_number: Only responses on this playbook page
+        field_name: Only this field
+        limit: Page size (default 20, max 100)
+        cursor: next_cursor from the previous page
+
+    Returns:
+    {
+        "results": [{
+            "response_id": 901, "field_name": "problem_statement", "page_number": 2,
+            "updated_at": "...", "score": 7.41,
+            "snippet": "…refill a <mark>water bottle</mark> at school…",
+            "project": {"id": 40, "title": "...", "status": "in_progress"},
+            "student": {"id": 17, "username": "asha", "school": "SNS", "grade": "3"}
+        }],
+        "next_cursor": 20
+    }
+
+    Snippets are HTML-escaped apart from the <mark> tags. Best matches come
+    first; archived projects are not searched.
+    """
+    try:
+        if not current_app.extensions.get('response_search'):
+            return jsonify({
+                'error': 'Service unavailable',
+                'message': 'Full-text search is not available on this database'
+            }), 503
+
+        limit = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+        cursor = request.args.get('cursor', 0, type=int)
+        page_number = request.args.get('page_number', type=int)
+        if limit is None or limit < 1 or cursor is None or cursor < 0 or (
+            'page_number' in request.args and page_number is None
+        ):
+            return jsonify({
+                'error': 'Bad request',
+                'message': 'limit, cursor and page_number must be integers'
+            }), 400
+
+        try:
+            result = search_responses(
+                request.args.get('q', ''),
+                school=request.args.get('school'),
+                grade=request.args.get('grade'),
+                page_number=page_number,
+                field_name=request.args.get('field_name'),
+                limit=min(limit, SEARCH_MAX_PAGE_SIZE),
+                offset=cursor
+            )
+        except SearchQueryError as e:
+            return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Search error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@admin_bp.route('/analytics', methods=['GET'])
+@admin_key_required
+def analytics_summary():
+    """
+    Dashboard figures per school and grade
+
+    Query Parameters:
+        school, grade: Cohort filters (omit for all)
+        from, to: Activity range, YYYY-MM-DD (default: the 30 days up to today)
+
+    Returns:
+    {
+        "school": "SNS Academy", "grade": "3", "from": "2026-09-20", "to": "2026-10-19",
+        "projects": 120,
+        "pages": [{
+            "page": 3, "fields": 4, "fields_filled": 310,
+            "fill_rate": 0.6458, "completion_rate": 0.55,
+            "avg_text_length": 142.3, "images": 0
+        }],
+        "activity": {
+            "totals": {"projects_created": 4, "projects_completed": 30, "pdfs_generated": 41,
+                       "edits": 5120, "image_uploads": 260},
+            "daily": [{"day": "2026-10-18", "edits": 811, ...}]
+        }
+    }
+
+    Page figures describe the state at the end of the range. Figures lag
+    live activity by up to ANALYTICS_FLUSH_INTERVAL_SECONDS.
+    """
+    try:
+        try:
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+        except ValueError:
+            return jsonify({'error': 'Bad request', 'message': 'from and to must be YYYY-MM-DD dates'}), 400
+        if start and end and start > end:
+            return jsonify({'error': 'Bad request', 'message': 'from must not be after to'}), 400
+
+        analytics.flush()  # This worker's buffered deltas
+        return jsonify(summarize(
+            school=request.args.get('school'),
+            grade=request.args.get('grade'),
+            start=start,
+            end=end
+        )), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Analytics error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@admin_bp.route('/export', methods=['GET'])
+@admin_key_required
+def export_responses():
+    """
+    Download all responses, one row per project and one column per field
+
+    Query Parameters:
+        format: csv (default), parquet or arrow (Arrow IPC stream)
+        school, grade: Only students of this school / grade
+        since: Only projects updated at or after this time (YYYY-MM-DD or ISO, UTC)
+        until: Only projects updated before this time
+
+    Returns:
+        The export, streamed. The X-Export-Cutoff header holds the end of
+        the exported window: pass it as `since` next time to fetch only
+        what changed in between.
+    """
+    try:
+        fmt = request.args.get('format', 'csv').lower()
+        try:
+            check_format(fmt)
+            since = parse_export_time(request.args['since']) if request.args.get('since') else None
+            until = parse_export_time(request.args['until']) if request.args.get('until') else None
+        except ExportError as e:
+            return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+
+        cutoff = export_cutoff(until, current_app.config['EXPORT_SAFETY_LAG_SECONDS'])
+        batches = iter_export_batches(
+            school=request.args.get('school'),
+            grade=request.args.get('grade'),
+            since=since,
+            cutoff=cutoff,
+            batch_size=current_app.config['EXPORT_BATCH_SIZE']
+        )
+        mimetype, extension = EXPORT_FORMATS[fmt]
+        filename = f"responses-{cutoff:%Y%m%dT%H%M%S}{extension}"
+        return Response(
+            stream_with_context(stream_export(fmt, batches)),
+            mimetype=mimetype,
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'X-Export-Cutoff': cutoff.isoformat(),
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"Export error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+def _render_pool() -> RenderPool:
+    return RenderPool(
+        artifacts.template_path(),
+        current_app.config['PDF_OUTPUT_DIR'],
+        workers=current_app.config['PDF_EXPORT_RENDER_WORKERS']
+    )
+
+
+def _take(chunks, length: int):
+    """The first `length` bytes of a chunk stream"""
+    for chunk in chunks:
+        if length <= 0:
+            break
+        yield chunk[:length]
+        length -= len(chunk)
+
+
+@admin_bp.route('/pdf-exports', methods=['POST'])
+@admin_key_required
+def create_pdf_export():
+    """
+    Start a ZIP download of a class's playbook PDFs
+
+    Expected JSON:
+    {
+        "school": "SNS Academy",
+        "grade": "3"            // optional: whole school if omitted
+    }
+
+    Returns (201):
+    {
+        "export_id": "9f1c...", "status": "pending", "projects": 32, "processed": 0, ...,
+        "download_url": "/api/admin/pdf-exports/9f1c.../download"
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        school = (data.get('school') or '').strip()
+        if not school:
+            return jsonify({'error': 'Bad request', 'message': 'school is required'}), 400
+
+        try:
+            export = create_export(
+                school,
+                grade=(data.get('grade') or '').strip() or None,
+                max_projects=current_app.config['PDF_EXPORT_MAX_PROJECTS'],
+                retention_days=current_app.config['PDF_EXPORT_RETENTION_DAYS']
+            )
+        except PdfExportError as e:
+            return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+
+        return jsonify({
+            **export_progress(export),
+            'download_url': f'/api/admin/pdf-exports/{export.id}/download'
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"PDF export error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@admin_bp.route('/pdf-exports/<export_id>', methods=['GET'])
+@admin_key_required
+def pdf_export_status(export_id):
+    """
+    Progress of a class PDF export
+
+    Returns:
+    {
+        "export_id": "9f1c...", "status": "pending", "projects": 32,
+        "processed": 12, "rendered": 3, "reused": 8, "failed": 0, "skipped": 1,
+        "size": null            // ZIP size in bytes once complete
+    }
+    """
+    try:
+        export = db.session.get(PdfExport, export_id)
+        if export is None:
+            return jsonify({'error': 'Not found', 'message': 'Export not found'}), 404
+        return jsonify(export_progress(export)), 200
+
+    except Exception as e:
+        current_app.logger.error(f"PDF export status error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@admin_bp.route('/pdf-exports/<export_id>/download', methods=['GET'])
+@admin_key_required
+def download_pdf_export(export_id):
+    """
+    Download a class PDF export as a ZIP (stored entries, ZIP64 when large)
+
+    The first download streams while missing or outdated PDFs are rendered,
+    without a Content-Length. Range requests (with If-Range: the ETag) resume
+    an interrupted download: the remaining projects are resolved first, then
+    the requested bytes are served with 206. Once the export is complete,
+    every download has a Content-Length and supports ranges.
+
+    Returns 410 if PDFs recorded in the export were removed since.
+    """
+    try:
+        export = db.session.get(PdfExport, export_id)
+        if export is None:
+            return jsonify({'error': 'Not found', 'message': 'Export not found'}), 404
+
+        byte_range = request.range
+        if byte_range is not None and request.if_range.etag and request.if_range.etag != export.id:
+            byte_range = None  # A different archive: send it whole
+
+        name = sanitize_filename(f"{export.school}_{export.grade or 'all'}_playbooks.zip")
+        headers = {
+            'Content-Disposition': f'attachment; filename="{name}"',
+            'Accept-Ranges': 'bytes',
+            'ETag': f'"{export.id}"',
+            'X-Accel-Buffering': 'no'
+        }
+        lookahead = max(1, current_app.config['PDF_EXPORT_RENDER_WORKERS']) * 2
+
+        if export.completed_at is None and byte_range is None:
+            if not check_files(zip_entries(export)):
+                raise ExportFilesChanged(f"PDFs of export {export.id} were removed; create a new export")
+
+            def stream():
+                pool = _render_pool()
+                try:
+                    yield from stream_zip(resolve_entries(export, pool, lookahead))
+                finally:
+                    pool.close(wait=False)
+
+            return Response(stream_with_context(stream()), mimetype='application/zip', headers=headers)
+
+        with _render_pool() as pool:
+            entries = complete_export(export, pool, lookahead)
+        total = archive_size(entries)
+
+        span = byte_range.range_for_length(total) if byte_range is not None else (0, total)
+        if span is None:
+            return Response(status=416, headers={'Content-Range': f'bytes */{total}'})
+
+        start, stop = span
+        response = Response(
+            stream_with_context(_take(stream_zip(entries, start), stop - start)),
+            mimetype='application/zip',
+            headers=headers
+        )
+        response.content_length = stop - start
+        if byte_range is not None:
+            response.status_code = 206
+            response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{total}'
+        return response
+
+    except ExportFilesChanged as e:
+        return jsonify({'error': 'Gone', 'message': str(e)}), 410
+
+    except Exception as e:
+        current_app.logger.error(f"PDF export download error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
@@ -0,0 +1,149 @@
+"""
+File Delivery Helpers and Signed-Link Routes
+
+Stored files (generated PDFs, uploads) are delivered in one of three ways:
+- X-Accel-Redirect: Python authorizes, nginx streams (X_ACCEL_REDIRECT_ENABLED)
+- send_file: Python streams (default, development)
+- Signed links: /files/<kind>/<path>?md5=..&expires=.. validated by nginx
+  (or by serve_signed_file below when nginx is not in front) - no DB hit;
+  only when SIGNED_URL_SECRET is set
+
+nginx only sees this node's disk. With a STORAGE_BACKEND, files that are
+not on it are sent from the read-through cache, and /files/ must be
+proxied here rather than aliased (nginx.conf).
+"""
+from flask import Blueprint, request, jsonify, send_file, current_app
+from typing import Optional
+from werkzeug.security import safe_join
+
+from services.signed_urls import (
+    build_signed_url, verify_signature, location_for, x_accel_response
+)
+from services.storage import ARTIFACT_KINDS, artifacts
+
+# Create blueprint
+files_bp = Blueprint('files', __name__, url_prefix='/files')
+
+# URI name -> config key of the storage root it exposes (also the storage key prefixes)
+STORAGE_KINDS = ARTIFACT_KINDS
+
+
+def _locations(prefix: str) -> dict:
+    """Map every storage root to '<prefix><kind>/'."""
+    base = prefix.rstrip('/')
+    return {
+        str(current_app.config[config_key]): f"{base}/{kind}/"
+        for kind, config_key in STORAGE_KINDS.items()
+    }
+
+
+def signed_link_for(path) -> Optional[dict]:
+    """
+    Build a signed, expiring link for a stored file
+
+    Returns:
+        dict: {'url': str, 'expires': int} or None if signed links are off
+            (no SIGNED_URL_SECRET) or the file is outside the storage roots
+    """
+    if not current_app.config.get('SIGNED_URL_SECRET'):
+        return None
+
+    uri = location_for(path, _locations(current_app.config['SIGNED_URL_PREFIX']))
+    if uri is None:
+        return None
+
+    return build_signed_url(
+        uri,
+        current_app.config['SIGNED_URL_SECRET'],
+        current_app.config['SIGNED_URL_TTL_SECONDS']
+    )
+
+
+def deliver_file(
+    path,
+    download_name: str,
+    mimetype: str,
+    as_attachment: bool = True,
+    etag=True,
+    last_modified=None,
+    max_age: Optional[int] = None
+):
+    """
+    Deliver an already-authorized file, via nginx when enabled
+
+    Args:
+        path: File path on disk
+        download_name: Filename suggested to the browser
+        mimetype: Content type
+        as_attachment: Attachment or inline
+        etag: ETag string, or True for send_file's default
+        last_modified: Last-Modified datetime
+        max_age: Browser cache lifetime; responses are always private
+    """
+    response = None
+
+    if current_app.config.get('X_ACCEL_REDIRECT_ENABLED'):
+        internal_uri = location_for(path, _locations(current_app.config['X_ACCEL_PREFIX']))
+        if internal_uri is not None:
+            # nginx handles Range and conditional requests with its own validators
+            response = x_accel_response(internal_uri, download_name, mimetype, as_attachment)
+            if max_age is not None:
+                response.cache_control.max_age = max_age
+        elif not artifacts.is_cached_copy(path):
+            current_app.logger.warning(f"X-Accel-Redirect: {path} is outside the storage roots")
+
+    if response is None:
+        response = send_file(
+            path,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            mimetype=mimetype,
+            conditional=True,
+            etag=etag,
+            last_modified=last_modified,
+            max_age=max_age
+        )
+
+    # Per-user content: browsers may cache it, shared caches may not
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+
+@files_bp.route('/<kind>/<path:relative_path>', methods=['GET'])
+def serve_signed_file(kind, relative_path):
+    """
+    Serve a file from a signed link (fallback when nginx is not in front)
+
+    Only the signature is checked - no authentication header, no DB query.
+    """
+    config_key = STORAGE_KINDS.get(kind)
+    if not config_key or not current_app.config.get('SIGNED_URL_SECRET'):
+        return jsonify({'error': 'Not found', 'message': 'Unknown file location'}), 404
+
+    if not verify_signature(
+        request.path,
+        request.args.get('md5'),
+        request.args.get('expires'),
+        current_app.config['SIGNED_URL_SECRET']
+    ):
+        return jsonify({
+            'error': 'Forbidden',
+            'message': 'Invalid or expired link'
+        }), 403
+
+    file_path = safe_join(str(current_app.config[config_key]), relative_path)
+    if file_path is not None:
+        file_path = artifacts.local_path(file_path)
+    if file_path is None:
+        return jsonify({'error': 'Not found', 'message': 'File not found on server'}), 404
+
+    response = send_file(
+        file_path,
+        as_attachment=kind == 'generated_pdfs',
+        conditional=True,
+        max_age=current_app.config['SIGNED_URL_TTL_SECONDS']
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
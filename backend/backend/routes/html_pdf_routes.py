@@ -9,6 +9,8 @@ import os
 
 from models import db, Response, Project, GeneratedPDF, ImageUpload
 from services.html_pdf_generator import HTMLPDFGenerator
+from services.analytics import stage_project_event
+from services.storage import artifacts
 
 logger = logging.getLogger(__name__)
 
@@ -80,10 +82,11 @@ def generate_pdf_from_html():
             project_id=project_id,
             project_name=project.title or f'Project {project_id}',
             user_responses=user_responses,
-            images=images
+            images=artifacts.localize(images)
         )
         
         # Save to database
+        artifacts.publish(pdf_path)
         pdf_record = GeneratedPDF(
             project_id=project_id,
             file_path=str(pdf_path),
@@ -91,6 +94,7 @@ def generate_pdf_from_html():
             file_size=pdf_path.stat().st_size
         )
         db.session.add(pdf_record)
+        stage_project_event(project.user_id, pdfs_generated=1)
         db.session.commit()
         
         logger.info(f"✅ PDF generated successfully: {pdf_path.name}")
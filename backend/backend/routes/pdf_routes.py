@@ -2,21 +2,46 @@
 API Routes for PDF Generation
 """
 from flask import Blueprint, request, jsonify, send_file, current_app
-from werkzeug.utils import secure_filename
 from pathlib import Path
 import base64
+import json
 import os
 import re
 import shutil
 import uuid
 from datetime import datetime
+from sqlalchemy.orm import defer
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 
 from models import (
-    db, Project, Response, ImageUpload, GeneratedPDF,
-    get_project_responses, get_project_images
+    db, Project, ImageUpload, GeneratedPDF,
+    bulk_upsert_responses, get_project_renditions, normalize_field_value
 )
+from pdf_mappings import get_field_page
 from services.pdf_generator import PDFGeneratorService
-from auth import login_required, project_access_required, validate_file_upload, sanitize_filename
+from services.counter_buffer import counters
+from services.analytics import stage_project_event
+from services.autosave_buffer import autosave
+from services.coverage import compute_coverage, coverage_summary
+from services.storage import artifacts
+from services.storage_lifecycle import lifecycle, touch_access_time
+from services.upload_service import store_uploaded_file, describe_blob, assign_image, release_file
+from services.blob_store import store_blob, resolve_blobs, parse_hash_reference, is_valid_hash
+from services.image_derivatives import derivatives, localize_renditions
+from services.project_archive import archived_pdf_project, ensure_hot
+from services.project_state import (
+    record_project_changes, get_project_snapshot, get_project_coverage, get_responses_since,
+    save_response as store_response
+)
+from services.render_cancellation import (
+    CancellationToken, RenderCancelled, REASON_DEADLINE, client_disconnect_probe
+)
+from utils.hashing import sha256_file
+from routes.file_routes import deliver_file, signed_link_for
+from auth import (
+    login_required, project_access_required, user_owns_project, get_current_user,
+    validate_file_upload, sanitize_filename
+)
 
 # Create blueprint
 pdf_bp = Blueprint('pdf', __name__, url_prefix='/api')
@@ -42,11 +67,40 @@ def _require_api_key_if_configured():
     return None
 
 
+def _render_cancel_token() -> CancellationToken:
+    """Build a cancellation token for a render started by the current request.
+
+    The token trips when the client disconnects or shortly before the endpoint
+    timeout (REQUEST_TIMEOUT_SECONDS - PDF_RENDER_DEADLINE_MARGIN_SECONDS).
+    """
+    timeout = current_app.config.get('REQUEST_TIMEOUT_SECONDS', 300)
+    margin = current_app.config.get('PDF_RENDER_DEADLINE_MARGIN_SECONDS', 15)
+    return CancellationToken.with_timeout(
+        max(1, timeout - margin),
+        probes=[client_disconnect_probe(request.environ)]
+    )
+
+
+def _render_cancelled_response(error: RenderCancelled):
+    """Response for a cancelled render (only seen by clients still connected)."""
+    if error.reason == REASON_DEADLINE:
+        return jsonify({
+            'error': 'Gateway timeout',
+            'message': 'PDF generation exceeded the request deadline'
+        }), 504
+
+    # 499: client closed request (nginx convention) - nobody will read this
+    return jsonify({
+        'error': 'Client closed request',
+        'message': str(error)
+    }), 499
+
+
 _DATA_URL_RE = re.compile(r'^data:(image\/(png|jpeg));base64,(.*)$', re.IGNORECASE | re.DOTALL)
 
 
-def _save_data_url_image(data_url: str, output_dir: Path, field_name: str) -> str:
-    """Persist a data URL image to disk and return its file path."""
+def _decode_data_url_image(data_url: str, field_name: str, max_bytes: int) -> tuple:
+    """Decode a data URL image; returns (raw bytes, mime type)."""
     match = _DATA_URL_RE.match(data_url.strip())
     if not match:
         raise ValueError(f"Invalid image data URL for field '{field_name}'")
@@ -59,11 +113,17 @@ def _save_data_url_image(data_url: str, output_dir: Path, field_name: str) -> st
     except Exception as e:
         raise ValueError(f"Invalid base64 payload for field '{field_name}': {e}")
 
+    if len(raw) > max_bytes:
+        raise ValueError(f"Image for field '{field_name}' is too large")
+
+    return raw, mime
+
+
+def _save_data_url_image(raw: bytes, mime: str, output_dir: Path, field_name: str) -> str:
+    """Write a decoded data URL image to a transient file and return its path."""
     ext = 'png' if mime.endswith('png') else 'jpg'
-    safe_field = sanitize_filename(field_name)
-    filename = f"{safe_field}.{ext}"
     output_dir.mkdir(parents=True, exist_ok=True)
-    file_path = output_dir / filename
+    file_path = output_dir / f"{sanitize_filename(field_name)}.{ext}"
     file_path.write_bytes(raw)
     return str(file_path)
 
@@ -83,6 +143,7 @@ def create_project(user):
 
         project = Project(user_id=user.id, title=title, status='in_progress')
         db.session.add(project)
+        stage_project_event(user.id, projects_created=1)
         db.session.commit()
 
         return jsonify({
@@ -142,9 +203,12 @@ def generate_pdf_endpoint(user):
                 'message': 'You do not have access to this project'
             }), 403
         
-        # Get all responses and images for the project
-        user_responses = get_project_responses(project_id)
-        images = get_project_images(project_id)
+        # Archived projects are restored on first use
+        ensure_hot(project_id)
+        
+        # Get all responses and images for the project (single snapshot read)
+        autosave.flush_project(project_id)
+        user_responses, images = get_project_snapshot(project)
         
         if not user_responses:
             return jsonify({
@@ -152,39 +216,58 @@ def generate_pdf_endpoint(user):
                 'message': 'No responses found for this project'
             }), 400
         
+        # Precomputed field-ready images; queue any the ingest pipeline missed
+        renditions, unprocessed = get_project_renditions(project_id, images)
+        derivatives.submit(unprocessed)
+        
         # Generate filename
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         output_filename = f"design_thinking_playbook_{user.username}_{timestamp}.pdf"
         
         # Initialize PDF generator
         generator = PDFGeneratorService(
-            template_path=current_app.config['PDF_TEMPLATE_PATH'],
+            template_path=artifacts.template_path(),
             output_dir=current_app.config['PDF_OUTPUT_DIR']
         )
         
-        # Generate the PDF
+        # Generate the PDF (images uploaded on other nodes come from shared storage)
         pdf_path = generator.generate_filled_pdf(
             user_responses=user_responses,
             output_filename=output_filename,
-            images=images
+            images=artifacts.localize(images),
+            cancel_token=_render_cancel_token(),
+            coverage=get_project_coverage(project),
+            renditions=localize_renditions(renditions)
         )
         
         # Save PDF record to database
+        artifacts.publish(pdf_path)
         generated_pdf = GeneratedPDF(
             project_id=project_id,
             filename=output_filename,
             file_path=str(pdf_path),
-            file_size=pdf_path.stat().st_size
+            file_size=pdf_path.stat().st_size,
+            content_hash=sha256_file(pdf_path),
+            project_revision=project.revision
         )
         db.session.add(generated_pdf)
         
         # Update project status if not already completed
-        if project.status != 'completed':
+        completed_now = project.status != 'completed'
+        if completed_now:
             project.status = 'completed'
             project.completed_at = datetime.utcnow()
+        stage_project_event(project.user_id, pdfs_generated=1, projects_completed=int(completed_now))
         
         db.session.commit()
         
+        # Keep only the latest PDF_RETENTION_PER_PROJECT PDFs of this project
+        try:
+            lifecycle.enforce_retention(project_id)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"PDF retention failed for project {project_id}: {e}")
+        
         return jsonify({
             'success': True,
             'pdf_id': generated_pdf.id,
@@ -192,6 +275,10 @@ def generate_pdf_endpoint(user):
             'filename': output_filename,
             'file_size': generated_pdf.file_size
         }), 200
+    
+    except RenderCancelled as e:
+        current_app.logger.warning(f"PDF generation cancelled: {e}")
+        return _render_cancelled_response(e)
         
     except Exception as e:
         current_app.logger.error(f"PDF generation error: {e}")
@@ -203,22 +290,31 @@ def generate_pdf_endpoint(user):
 
 @pdf_bp.route('/generate-pdf-direct', methods=['POST'])
 def generate_pdf_direct():
-    """Generate a PDF directly from posted responses (no DB, no auth).
+    """Generate a PDF directly from posted responses (no project, no auth).
 
     This endpoint is intended for the Next.js app integration, so the app can
     use the backend's PDFGeneratorService instead of client-side PDF rendering.
 
     Security:
     - If PDF_API_KEY is set, requests must include X-API-Key.
+    - Without PDF_API_KEY callers are anonymous: "sha256:" references are
+      refused (401) and data URL images are only kept for this render.
 
     Expected JSON:
     {
       "responses": { "student_name": "...", ... },
-      "images": { "idea_1_drawing": "data:image/png;base64,...", ... },
+      "images": {
+        "idea_1_drawing": "data:image/png;base64,...",
+        "class_logo": "sha256:<hex>"    // already stored (see /api/blobs/check)
+      },
       "filename": "my-playbook.pdf"  // optional
     }
 
-    Returns: application/pdf as an attachment.
+    With an API key, data URL images are added to the blob store, so later
+    requests can reference them by hash.
+
+    Returns: application/pdf as an attachment, or 409 with "missing" hashes
+    when referenced images are not stored (resend those as data URLs).
     """
     api_key_error = _require_api_key_if_configured()
     if api_key_error:
@@ -247,31 +343,74 @@ def generate_pdf_direct():
         filename = f"{filename}.pdf"
 
     trace_id = str(uuid.uuid4())[:8]
-    temp_dir = Path(current_app.config['UPLOAD_FOLDER']) / 'direct' / trace_id
+    upload_root = current_app.config['UPLOAD_FOLDER']
+    max_bytes = current_app.config['MAX_IMAGE_SIZE_MB'] * 1024 * 1024
     images: dict[str, str] = {}
+    referenced: dict[str, str] = {}
+    
+    # Only API key callers may use or grow the shared blob store
+    trusted = bool(os.environ.get('PDF_API_KEY'))
+    temp_dir = Path(upload_root) / 'direct' / trace_id
 
     try:
         for field_name, value in images_in.items():
-            if not value:
+            if not value or not isinstance(value, str):
                 continue
 
-            if isinstance(value, str) and value.strip().lower().startswith('data:image/'):
-                images[str(field_name)] = _save_data_url_image(value, temp_dir, str(field_name))
+            digest = parse_hash_reference(value)
+            if digest:
+                if not trusted:
+                    return jsonify({
+                        'error': 'Unauthorized',
+                        'message': 'Image hash references require an API key; send data URLs'
+                    }), 401
+                referenced[str(field_name)] = digest
+                continue
+
+            if value.strip().lower().startswith('data:image/'):
+                try:
+                    raw, mime = _decode_data_url_image(value, str(field_name), max_bytes)
+                except ValueError as e:
+                    db.session.rollback()
+                    return jsonify({
+                        'error': 'Bad request',
+                        'message': str(e)
+                    }), 400
+                if trusted:
+                    images[str(field_name)] = store_blob(raw, upload_root, mime).file_path
+                else:
+                    images[str(field_name)] = _save_data_url_image(raw, mime, temp_dir, str(field_name))
                 continue
 
             # Allow passing an existing local file path (advanced/debug use)
-            if isinstance(value, str) and Path(value).exists():
+            if Path(value).exists():
                 images[str(field_name)] = value
 
+        if referenced:
+            blobs = resolve_blobs(referenced.values())
+            missing = sorted(set(referenced.values()) - set(blobs))
+            if missing:
+                db.session.commit()
+                return jsonify({
+                    'error': 'Conflict',
+                    'message': 'Some referenced images are not stored; resend them as data URLs',
+                    'missing': missing
+                }), 409
+            for field_name, digest in referenced.items():
+                images[field_name] = blobs[digest].file_path
+
+        db.session.commit()
+
         generator = PDFGeneratorService(
-            template_path=current_app.config['PDF_TEMPLATE_PATH'],
+            template_path=artifacts.template_path(),
             output_dir=current_app.config['PDF_OUTPUT_DIR']
         )
 
         pdf_path = generator.generate_filled_pdf(
             user_responses=responses,
             output_filename=filename,
-            images=images
+            images=artifacts.localize(images),
+            cancel_token=_render_cancel_token()
         )
 
         return send_file(
@@ -281,20 +420,130 @@ def generate_pdf_direct():
             mimetype='application/pdf'
         )
 
+    except RenderCancelled as e:
+        current_app.logger.warning(f"Direct PDF generation cancelled [{trace_id}]: {e}")
+        return _render_cancelled_response(e)
+
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"Direct PDF generation error [{trace_id}]: {e}")
         return jsonify({
             'error': 'Internal server error',
             'message': str(e)
         }), 500
-
+    
     finally:
-        # Best-effort cleanup of transient uploaded images
-        try:
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir, ignore_errors=True)
-        except Exception:
-            pass
+        # Transient images of anonymous requests
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pdf_bp.route('/blobs/check', methods=['POST'])
+def check_blobs():
+    """
+    Report which images the server already stores (by SHA-256)
+
+    Clients hash their images, ask here, and upload only the missing ones;
+    the rest can be referenced as "sha256:<hex>" in /api/generate-pdf-direct
+    or by content_hash in /api/upload-image.
+
+    Requires a user token (only blobs the user's own images use are
+    reported present) or, when PDF_API_KEY is set, X-API-Key (any blob).
+    Checking does not extend a blob's retention; using it does.
+
+    Expected JSON:
+    {
+        "hashes": ["<sha256 hex>", ...]
+    }
+
+    Returns:
+    {
+        "present": ["<hex>", ...],
+        "missing": ["<hex>", ...]
+    }
+    """
+    user = get_current_user()
+    if user is None:
+        if not os.environ.get('PDF_API_KEY'):
+            return jsonify({
+                'error': 'Authentication required',
+                'message': 'Please provide a valid authentication token'
+            }), 401
+        api_key_error = _require_api_key_if_configured()
+        if api_key_error:
+            return api_key_error
+
+    try:
+        hashes = (request.get_json(silent=True) or {}).get('hashes')
+        max_hashes = current_app.config.get('BLOB_CHECK_MAX_HASHES', 500)
+
+        if not isinstance(hashes, list) or not all(isinstance(h, str) for h in hashes):
+            return jsonify({
+                'error': 'Bad request',
+                'message': 'hashes must be a list of strings'
+            }), 400
+
+        if len(hashes) > max_hashes:
+            return jsonify({
+                'error': 'Bad request',
+                'message': f'At most {max_hashes} hashes per request'
+            }), 400
+
+        hashes = [h.strip().lower() for h in hashes]
+        invalid = [h for h in hashes if not is_valid_hash(h)]
+        if invalid:
+            return jsonify({
+                'error': 'Bad request',
+                'message': f'Not a SHA-256 hex digest: {invalid[0]}'
+            }), 400
+
+        present = resolve_blobs(hashes, touch=False, owner_id=user.id if user else None)
+
+        return jsonify({
+            'present': [h for h in dict.fromkeys(hashes) if h in present],
+            'missing': [h for h in dict.fromkeys(hashes) if h not in present]
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Blob check error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+def _get_owned_pdf(user, pdf_id: int):
+    """
+    Load a GeneratedPDF owned by user, or return an error response tuple.
+    
+    A PDF of an archived project rehydrates the project first (once the
+    user is known to own it), so old links keep working.
+    """
+    pdf_record = GeneratedPDF.query.get(pdf_id)
+    project_id = pdf_record.project_id if pdf_record else archived_pdf_project(pdf_id)
+    if project_id is None:
+        return None, (jsonify({
+            'error': 'Not found',
+            'message': 'PDF not found'
+        }), 404)
+    
+    # Verify user has access to this PDF (cached ownership)
+    if not user_owns_project(user, project_id):
+        return None, (jsonify({
+            'error': 'Forbidden',
+            'message': 'You do not have access to this PDF'
+        }), 403)
+    
+    if pdf_record is None:
+        ensure_hot(project_id)
+        pdf_record = GeneratedPDF.query.get(pdf_id)
+        if pdf_record is None:  # Its file was gone when the project was rehydrated
+            return None, (jsonify({
+                'error': 'Not found',
+                'message': 'PDF not found'
+            }), 404)
+    
+    return pdf_record, None
 
 
 @pdf_bp.route('/download-pdf/<int:pdf_id>', methods=['GET'])
@@ -303,48 +552,273 @@ def download_pdf(user, pdf_id):
     """
     Download a generated PDF
     
+    Supports HTTP caching and resumable downloads:
+    - Strong ETag (SHA-256 of the file) and Last-Modified validators
+    - If-None-Match / If-Modified-Since answered with 304
+    - Range / If-Range requests answered with 206
+    
     Returns: PDF file as attachment
     """
     try:
-        # Get PDF record
-        pdf_record = GeneratedPDF.query.get(pdf_id)
+        pdf_record, error = _get_owned_pdf(user, pdf_id)
+        if error:
+            return error
         
-        if not pdf_record:
+        # Check if file exists (here, or in shared storage)
+        pdf_path = artifacts.local_path(pdf_record.file_path)
+        if pdf_path is None:
             return jsonify({
                 'error': 'Not found',
-                'message': 'PDF not found'
+                'message': 'PDF file not found on server'
             }), 404
         
-        # Verify user has access to this PDF
-        project = Project.query.get(pdf_record.project_id)
-        if project.user_id != user.id:
+        # Backfill the content hash for PDFs generated before it was stored
+        if not pdf_record.content_hash:
+            pdf_record.content_hash = sha256_file(pdf_path)
+            db.session.commit()
+        
+        # Send file (send_file or nginx evaluates the conditional and Range headers)
+        response = deliver_file(
+            pdf_path,
+            download_name=pdf_record.filename,
+            mimetype='application/pdf',
+            etag=pdf_record.content_hash,
+            last_modified=pdf_record.generated_at,
+            max_age=current_app.config['PDF_DOWNLOAD_MAX_AGE_SECONDS']
+        )
+        
+        # A pdf_id never changes content, so the cached copy is immutable
+        response.cache_control.immutable = True
+        
+        # Count a download once: full responses, or the first chunk of a
+        # ranged download (resumed chunks and 304s are not new downloads)
+        if _is_new_download(response):
+            counters.increment('generated_pdfs.download_count', pdf_record.id)
+            touch_access_time(pdf_record)  # LRU order for disk budget eviction
+        
+        return response
+        
+    except RequestedRangeNotSatisfiable:
+        raise  # 416 from send_file, not a server error
+        
+    except Exception as e:
+        current_app.logger.error(f"PDF download error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+def _is_new_download(response) -> bool:
+    """Whether a download response starts a new download (for download_count)."""
+    if 'X-Accel-Redirect' in response.headers:
+        # nginx evaluates the conditional and Range headers: a revalidation
+        # is most likely answered with 304, and only downloads from byte 0 count
+        if request.if_none_match or request.if_modified_since:
+            return False
+        byte_range = request.range
+        return byte_range is None or byte_range.ranges[0][0] == 0
+    
+    if response.status_code == 200:
+        return True
+    
+    if response.status_code == 206:
+        content_range = response.content_range
+        return content_range is not None and content_range.start == 0
+    
+    return False
+
+
+@pdf_bp.route('/download-pdf/<int:pdf_id>/link', methods=['GET'])
+@login_required
+def download_pdf_link(user, pdf_id):
+    """
+    Get a signed, expiring download link for a generated PDF
+    
+    The link is validated by nginx (secure_link) without authentication or
+    a DB query, so repeat downloads never reach a Python worker.
+    
+    Returns:
+    {
+        "url": "/files/generated_pdfs/...pdf?md5=...&expires=...",
+        "expires": 1700000000
+    }
+    """
+    try:
+        pdf_record, error = _get_owned_pdf(user, pdf_id)
+        if error:
+            return error
+        
+        link = signed_link_for(pdf_record.file_path)
+        if not link:
             return jsonify({
-                'error': 'Forbidden',
-                'message': 'You do not have access to this PDF'
-            }), 403
+                'error': 'Not found',
+                'message': 'PDF file is not available for direct download'
+            }), 404
+        
+        # Downloads through the link bypass Python; count the link instead
+        counters.increment('generated_pdfs.download_count', pdf_record.id)
+        
+        return jsonify(link), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"PDF link error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+def _get_owned_image(user, image_id: int):
+    """Load an ImageUpload owned by user, or return an error response tuple."""
+    image_record = ImageUpload.query.get(image_id)
+    if not image_record:
+        return None, (jsonify({
+            'error': 'Not found',
+            'message': 'Image not found'
+        }), 404)
+    
+    if not user_owns_project(user, image_record.project_id):
+        return None, (jsonify({
+            'error': 'Forbidden',
+            'message': 'You do not have access to this image'
+        }), 403)
+    
+    return image_record, None
+
+
+@pdf_bp.route('/image/<int:image_id>', methods=['GET'])
+@login_required
+def get_image(user, image_id):
+    """
+    Get an uploaded image (served by nginx when X-Accel-Redirect is enabled)
+    
+    Returns: image file (inline)
+    """
+    try:
+        image_record, error = _get_owned_image(user, image_id)
+        if error:
+            return error
         
-        # Check if file exists
-        pdf_path = Path(pdf_record.file_path)
-        if not pdf_path.exists():
+        image_path = artifacts.local_path(image_record.file_path)
+        if image_path is None:
             return jsonify({
                 'error': 'Not found',
-                'message': 'PDF file not found on server'
+                'message': 'Image file not found on server'
             }), 404
         
-        # Increment download count
-        pdf_record.download_count += 1
-        db.session.commit()
+        return deliver_file(
+            image_path,
+            download_name=image_record.filename,
+            mimetype=image_record.mime_type or 'application/octet-stream',
+            as_attachment=False,
+            last_modified=image_record.uploaded_at,
+            max_age=0
+        )
         
-        # Send file
-        return send_file(
-            pdf_path,
-            as_attachment=True,
-            download_name=pdf_record.filename,
-            mimetype='application/pdf'
+    except Exception as e:
+        current_app.logger.error(f"Image download error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@pdf_bp.route('/image/<int:image_id>/thumbnail', methods=['GET'])
+@login_required
+def get_image_thumbnail(user, image_id):
+    """
+    Get a small JPEG preview of an uploaded image
+    
+    Query params:
+        v: Content hash of the image (from the upload response); versioned
+           URLs are cacheable for IMAGE_THUMBNAIL_MAX_AGE_SECONDS
+    
+    The thumbnail is built on demand if the ingest pipeline has not
+    produced it yet. Revalidation uses an ETag derived from the content.
+    
+    Returns: image/jpeg (inline)
+    """
+    try:
+        image_record, error = _get_owned_image(user, image_id)
+        if error:
+            return error
+        
+        # Built on any node: a local file, or a cached copy from shared storage
+        thumbnail_path = artifacts.local_path(image_record.thumbnail_path) if image_record.thumbnail_path else None
+        if thumbnail_path is None:
+            if not artifacts.exists(image_record.file_path):
+                return jsonify({
+                    'error': 'Not found',
+                    'message': 'Image file not found on server'
+                }), 404
+            try:
+                derivatives.process_image(image_id)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"Thumbnail build failed for image {image_id}: {e}")
+                return jsonify({
+                    'error': 'Unprocessable image',
+                    'message': 'A thumbnail could not be built from this image'
+                }), 422
+            db.session.refresh(image_record)
+
+            # Replaced or removed while the thumbnail was being built
+            thumbnail_path = artifacts.local_path(image_record.thumbnail_path) if image_record.thumbnail_path else None
+            if thumbnail_path is None:
+                return jsonify({
+                    'error': 'Not found',
+                    'message': 'Thumbnail not available'
+                }), 404
+
+        versioned = bool(image_record.content_hash) and request.args.get('v') == image_record.content_hash
+        
+        return deliver_file(
+            thumbnail_path,
+            download_name=f"thumbnail_{image_id}.jpg",
+            mimetype='image/jpeg',
+            as_attachment=False,
+            etag=Path(image_record.thumbnail_path).stem,
+            last_modified=image_record.uploaded_at,
+            max_age=current_app.config.get('IMAGE_THUMBNAIL_MAX_AGE_SECONDS', 86400) if versioned else 0
         )
         
     except Exception as e:
-        current_app.logger.error(f"PDF download error: {e}")
+        current_app.logger.error(f"Thumbnail error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@pdf_bp.route('/image/<int:image_id>/link', methods=['GET'])
+@login_required
+def get_image_link(user, image_id):
+    """
+    Get a signed, expiring link for an uploaded image
+    
+    Returns:
+    {
+        "url": "/files/uploads/...png?md5=...&expires=...",
+        "expires": 1700000000
+    }
+    """
+    try:
+        image_record, error = _get_owned_image(user, image_id)
+        if error:
+            return error
+        
+        link = signed_link_for(image_record.file_path)
+        if not link:
+            return jsonify({
+                'error': 'Not found',
+                'message': 'Image file is not available for direct download'
+            }), 404
+        
+        return jsonify(link), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Image link error: {e}")
         return jsonify({
             'error': 'Internal server error',
             'message': str(e)
@@ -361,19 +835,25 @@ def upload_image(user):
     - project_id: int
     - field_name: str (e.g., 'idea_1_drawing')
     - image: file
+      or content_hash: SHA-256 of an already stored image (see /api/blobs/check;
+      also accepted as a JSON body with project_id, field_name, content_hash)
     
     Returns:
     {
         "success": true,
         "image_id": 789,
         "field_name": "idea_1_drawing",
-        "filename": "drawing_123.png"
+        "filename": "drawing_123.png",
+        "content_hash": "<sha256 hex>",
+        "thumbnail_url": "/api/image/789/thumbnail?v=<sha256 hex>"
     }
     """
     try:
         # Validate form data
-        project_id = request.form.get('project_id')
-        field_name = request.form.get('field_name')
+        form = (request.get_json(silent=True) or {}) if request.is_json else request.form
+        project_id = form.get('project_id')
+        field_name = form.get('field_name')
+        content_hash = str(form.get('content_hash') or '').strip().lower()
         
         if not project_id or not field_name:
             return jsonify({
@@ -383,94 +863,81 @@ def upload_image(user):
         
         project_id = int(project_id)
         
-        # Verify project access
-        project = Project.query.get(project_id)
-        if not project or project.user_id != user.id:
+        # Verify project access (cached ownership)
+        if not user_owns_project(user, project_id):
             return jsonify({
                 'error': 'Forbidden',
                 'message': 'Invalid project access'
             }), 403
         
-        # Validate file
-        if 'image' not in request.files:
-            return jsonify({
-                'error': 'Bad request',
-                'message': 'No image file provided'
-            }), 400
-        
-        file = request.files['image']
-        is_valid, error = validate_file_upload(
-            file,
-            current_app.config['ALLOWED_EXTENSIONS'],
-            current_app.config['MAX_IMAGE_SIZE_MB']
-        )
-        
-        if not is_valid:
-            return jsonify({
-                'error': 'Bad request',
-                'message': error
-            }), 400
-        
-        # Save file
-        original_filename = secure_filename(file.filename)
-        sanitized_name = sanitize_filename(original_filename)
-        
-        # Create unique filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{user.id}_{project_id}_{field_name}_{timestamp}_{sanitized_name}"
+        ensure_hot(project_id)
         
-        upload_dir = Path(current_app.config['UPLOAD_FOLDER']) / str(user.id) / str(project_id)
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        
-        file_path = upload_dir / filename
-        file.save(str(file_path))
-        
-        # Get file info
-        file_size = file_path.stat().st_size
-        mime_type = file.content_type
-        
-        # Check if image already exists for this field
-        existing_image = ImageUpload.query.filter_by(
-            project_id=project_id,
-            field_name=field_name
-        ).first()
-        
-        if existing_image:
-            # Delete old file
-            old_path = Path(existing_image.file_path)
-            if old_path.exists():
-                old_path.unlink()
+        if content_hash:
+            # Reference an image the server already has
+            if not is_valid_hash(content_hash):
+                return jsonify({
+                    'error': 'Bad request',
+                    'message': 'content_hash must be a SHA-256 hex digest'
+                }), 400
+            
+            blob = resolve_blobs([content_hash], owner_id=user.id).get(content_hash)
+            if blob is None:
+                return jsonify({
+                    'error': 'Not found',
+                    'message': 'No stored image has this content_hash; upload the file instead'
+                }), 404
             
-            # Update record
-            existing_image.filename = filename
-            existing_image.file_path = str(file_path)
-            existing_image.file_size = file_size
-            existing_image.mime_type = mime_type
-            existing_image.uploaded_at = datetime.utcnow()
-            image_record = existing_image
+            stored = describe_blob(blob, user.id, project_id, field_name)
         else:
-            # Create new record
-            image_record = ImageUpload(
-                project_id=project_id,
-                field_name=field_name,
-                filename=filename,
-                file_path=str(file_path),
-                file_size=file_size,
-                mime_type=mime_type
+            # Validate file
+            if 'image' not in request.files:
+                return jsonify({
+                    'error': 'Bad request',
+                    'message': 'No image file provided'
+                }), 400
+            
+            file = request.files['image']
+            is_valid, error = validate_file_upload(
+                file,
+                current_app.config['ALLOWED_EXTENSIONS'],
+                current_app.config['MAX_IMAGE_SIZE_MB']
             )
-            db.session.add(image_record)
+            
+            if not is_valid:
+                return jsonify({
+                    'error': 'Bad request',
+                    'message': error
+                }), 400
+            
+            # Save file (stored once per distinct content)
+            stored = store_uploaded_file(
+                file, current_app.config['UPLOAD_FOLDER'], user.id, project_id, field_name
+            )
+        
+        filename = stored['filename']
+        file_size = stored['file_size']
+        
+        image_record, replaced_path = assign_image(project_id, field_name, stored)
+        record_project_changes(project_id, images={field_name: stored['file_path']})
         
         db.session.commit()
         
+        # Delete old file only once the new one is committed
+        release_file(replaced_path)
+        derivatives.submit([image_record.id])
+        
         return jsonify({
             'success': True,
             'image_id': image_record.id,
             'field_name': field_name,
             'filename': filename,
-            'file_size': file_size
+            'file_size': file_size,
+            'content_hash': stored['content_hash'],
+            'thumbnail_url': f"/api/image/{image_record.id}/thumbnail?v={stored['content_hash']}"
         }), 201
         
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"Image upload error: {e}")
         return jsonify({
             'error': 'Internal server error',
@@ -497,6 +964,13 @@ def save_response(user):
         "success": true,
         "response_id": 456
     }
+    or, when the autosave buffer is enabled (AUTOSAVE_BUFFER_ENABLED, off by
+    default; the row is written by the next flush, so its ID is not known yet):
+    {
+        "success": true,
+        "response_id": null,
+        "buffered": true
+    }
     """
     try:
         data = request.json
@@ -511,34 +985,26 @@ def save_response(user):
                 'message': 'project_id, field_name, and field_value are required'
             }), 400
         
-        # Verify project access
-        project = Project.query.get(project_id)
-        if not project or project.user_id != user.id:
+        # Verify project access (cached ownership)
+        if not user_owns_project(user, project_id):
             return jsonify({
                 'error': 'Forbidden',
                 'message': 'Invalid project access'
             }), 403
         
-        # Save or update response
-        response = Response.query.filter_by(
-            project_id=project_id,
-            field_name=field_name
-        ).first()
+        ensure_hot(project_id)
+        field_value = normalize_field_value(field_value)
         
-        if response:
-            response.field_value = field_value
-            response.page_number = page_number
-            response.updated_at = datetime.utcnow()
-        else:
-            response = Response(
-                project_id=project_id,
-                field_name=field_name,
-                field_value=field_value,
-                page_number=page_number
-            )
-            db.session.add(response)
+        # Coalesce keystroke-rate saves; flushed in batches
+        if autosave.enabled:
+            autosave.put(project_id, field_name, field_value, page_number)
+            return jsonify({
+                'success': True,
+                'response_id': None,
+                'buffered': True
+            }), 200
         
-        db.session.commit()
+        response = store_response(project_id, field_name, field_value, page_number)
         
         return jsonify({
             'success': True,
@@ -557,11 +1023,20 @@ def save_response(user):
 @login_required
 def get_responses(user, project_id):
     """
-    Get all responses for a project
+    Get all responses for a project, or only those changed since a revision
+    
+    Query Parameters:
+        since: Revision the client already has (delta mode)
+    
+    The project revision is the ETag; a matching If-None-Match gets 304.
+    Saves still in the autosave buffer are overlaid on the stored values
+    (and always count as changed); such a response carries no ETag.
     
     Returns:
     {
         "project_id": 123,
+        "revision": 42,
+        "full": true,
         "responses": {
             "problem_who_it_helps": "This will help...",
             "empathy_who": "My user is..."
@@ -569,23 +1044,301 @@ def get_responses(user, project_id):
     }
     """
     try:
-        # Verify project access
-        project = Project.query.get(project_id)
-        if not project or project.user_id != user.id:
+        since = request.args.get('since', type=int)
+        if 'since' in request.args and (since is None or since < 0):
+            return jsonify({
+                'error': 'Bad request',
+                'message': 'since must be a non-negative integer'
+            }), 400
+        
+        # Verify project access (cached ownership)
+        if not user_owns_project(user, project_id):
             return jsonify({
                 'error': 'Forbidden',
                 'message': 'Invalid project access'
             }), 403
         
-        responses = get_project_responses(project_id)
+        ensure_hot(project_id)
+        
+        # Read-your-writes without forcing a flush: pending saves are newer
+        # than any revision, so they are overlaid rather than versioned
+        pending = autosave.pending(project_id)
+        
+        # Snapshot is only loaded if the client's copy is stale
+        project = db.session.get(Project, project_id, options=[defer(Project.snapshot)])
+        
+        if (not pending and project.revision
+                and request.if_none_match.contains(str(project.revision))):
+            response = current_app.response_class(status=304)
+        else:
+            if since is None or since > project.revision:
+                responses, _ = get_project_snapshot(project)
+                full = True
+            else:
+                responses = get_responses_since(project, since)
+                full = False
+            responses.update(pending)
+            
+            response = jsonify({
+                'project_id': project_id,
+                'revision': project.revision,
+                'full': full,
+                'responses': responses
+            })
+        
+        if not pending:
+            response.set_etag(str(project.revision))
+        response.cache_control.private = True
+        response.cache_control.no_cache = True  # Always revalidate
+        return response
+        
+    except Exception as e:
+        current_app.logger.error(f"Get responses error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@pdf_bp.route('/project/<int:project_id>/progress', methods=['GET'])
+@login_required
+def get_progress(user, project_id):
+    """
+    Get a project's completeness from its coverage counters
+    
+    Returns:
+    {
+        "project_id": 123,
+        "revision": 42,
+        "progress": {
+            "filled": 12, "total": 48, "percent_complete": 25.0,
+            "complete": false,
+            "pages": {"3": {"filled": 2, "total": 4}, ...},
+            "images": {"filled": 1, "total": 12},
+            "missing_required": ["problem_statement", ...],
+            "unmapped": 0
+        }
+    }
+    """
+    try:
+        # Verify project access (cached ownership)
+        if not user_owns_project(user, project_id):
+            return jsonify({
+                'error': 'Forbidden',
+                'message': 'Invalid project access'
+            }), 403
+        
+        ensure_hot(project_id)
+        
+        pending = autosave.pending(project_id)
+        
+        project = db.session.get(Project, project_id, options=[defer(Project.snapshot)])
+        
+        if pending:
+            # Count buffered saves too (recomputed; the counters lag the buffer)
+            responses, images = get_project_snapshot(project)
+            responses.update(pending)
+            coverage = compute_coverage(responses, images)
+        else:
+            coverage = get_project_coverage(project)
         
         return jsonify({
             'project_id': project_id,
-            'responses': responses
+            'revision': project.revision,
+            'progress': coverage_summary(coverage)
         }), 200
         
     except Exception as e:
-        current_app.logger.error(f"Get responses error: {e}")
+        current_app.logger.error(f"Get progress error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+# Multipart file keys for bulk sync: images[<field_name>]
+_SYNC_IMAGE_KEY_RE = re.compile(r'^images\[(?P<field>[^\]]+)\]$')
+_MAX_FIELD_NAME_LENGTH = 100
+
+
+def _normalize_sync_value(field_name, raw):
+    """Validate one bulk sync entry and return (field_value, page_number)."""
+    page_number = get_field_page(field_name)
+    value = raw
+    if isinstance(raw, dict) and 'field_value' in raw:
+        value = raw.get('field_value')
+        page_number = raw.get('page_number', page_number)
+    
+    if value is None:
+        raise ValueError('field_value is required')
+    value = normalize_field_value(value)  # Table fields (e.g. validation_scores)
+    
+    if page_number is not None and not isinstance(page_number, int):
+        raise ValueError('page_number must be an integer')
+    
+    return value, page_number
+
+
+@pdf_bp.route('/project/<int:project_id>/sync', methods=['POST'])
+@login_required
+def sync_project(user, project_id):
+    """
+    Save many responses and images of a project in one request and one transaction
+    
+    JSON body, or multipart form with a "responses" JSON field:
+    {
+        "responses": {
+            "student_name": "Asha",
+            "problem_because": {"field_value": "...", "page_number": 3}
+        }
+    }
+    Multipart files: images[<field_name>] (e.g. images[idea_1_drawing])
+    
+    page_number defaults to the page the field is mapped to.
+    
+    Returns:
+    {
+        "success": true,
+        "responses": {"student_name": {"status": "saved"}, ...},
+        "images": {"idea_1_drawing": {"status": "saved", "image_id": 7, ...}, ...}
+    }
+    """
+    try:
+        # Verify project access (cached ownership)
+        if not user_owns_project(user, project_id):
+            return jsonify({
+                'error': 'Forbidden',
+                'message': 'Invalid project access'
+            }), 403
+        
+        ensure_hot(project_id)
+        
+        if request.is_json:
+            responses_in = (request.get_json(silent=True) or {}).get('responses') or {}
+        else:
+            try:
+                responses_in = json.loads(request.form.get('responses') or '{}')
+            except ValueError:
+                return jsonify({
+                    'error': 'Bad request',
+                    'message': 'responses must be valid JSON'
+                }), 400
+        
+        if not isinstance(responses_in, dict):
+            return jsonify({
+                'error': 'Bad request',
+                'message': 'responses must be an object'
+            }), 400
+        
+        response_results = {}
+        image_results = {}
+        
+        # Validate responses
+        items = []
+        for field_name, raw in responses_in.items():
+            if not field_name or len(field_name) > _MAX_FIELD_NAME_LENGTH:
+                response_results[field_name] = {'status': 'error', 'message': 'invalid field_name'}
+                continue
+            try:
+                field_value, page_number = _normalize_sync_value(field_name, raw)
+            except ValueError as e:
+                response_results[field_name] = {'status': 'error', 'message': str(e)}
+                continue
+            items.append({
+                'field_name': field_name,
+                'field_value': field_value,
+                'page_number': page_number
+            })
+        
+        # Validate and store image files (content-addressed blobs)
+        images_to_assign = {}
+        for key in request.files:
+            match = _SYNC_IMAGE_KEY_RE.match(key)
+            if not match:
+                continue
+            field_name = match.group('field')
+            if len(field_name) > _MAX_FIELD_NAME_LENGTH:
+                image_results[field_name] = {'status': 'error', 'message': 'invalid field_name'}
+                continue
+            
+            file = request.files[key]
+            is_valid, error = validate_file_upload(
+                file,
+                current_app.config['ALLOWED_EXTENSIONS'],
+                current_app.config['MAX_IMAGE_SIZE_MB']
+            )
+            if not is_valid:
+                image_results[field_name] = {'status': 'error', 'message': error}
+                continue
+            
+            stored = store_uploaded_file(
+                file, current_app.config['UPLOAD_FOLDER'], user.id, project_id, field_name
+            )
+            images_to_assign[field_name] = stored
+        
+        # Older buffered autosaves must not overwrite the synced values later
+        if items:
+            autosave.flush_project(project_id)
+        
+        # One transaction: response upsert + image rows
+        bulk_upsert_responses(project_id, items)
+        
+        existing_images = {
+            img.field_name: img for img in ImageUpload.query.filter(
+                ImageUpload.project_id == project_id,
+                ImageUpload.field_name.in_(list(images_to_assign))
+            )
+        } if images_to_assign else {}
+        
+        image_records = {}
+        replaced_paths = []
+        for field_name, stored in images_to_assign.items():
+            image_record, replaced_path = assign_image(
+                project_id, field_name, stored, existing_images.get(field_name)
+            )
+            image_records[field_name] = image_record
+            replaced_paths.append(replaced_path)
+        
+        if items or image_records:
+            record_project_changes(
+                project_id,
+                responses={item['field_name']: item['field_value'] for item in items},
+                images={field: stored['file_path'] for field, stored in images_to_assign.items()}
+            )
+        
+        db.session.commit()
+        
+        for replaced_path in replaced_paths:
+            release_file(replaced_path)
+        derivatives.submit(image_record.id for image_record in image_records.values())
+        
+        for item in items:
+            response_results[item['field_name']] = {'status': 'saved'}
+        for field_name, image_record in image_records.items():
+            image_results[field_name] = {
+                'status': 'saved',
+                'image_id': image_record.id,
+                'filename': image_record.filename,
+                'file_size': image_record.file_size
+            }
+        
+        all_saved = all(
+            result['status'] == 'saved'
+            for result in list(response_results.values()) + list(image_results.values())
+        )
+        
+        return jsonify({
+            'success': all_saved,
+            'project_id': project_id,
+            'responses': response_results,
+            'images': image_results
+        }), 200
+        
+    except Exception as e:
+        # Blobs stored before the failure stay unreferenced and are reclaimed
+        # by the storage lifecycle
+        db.session.rollback()
+        current_app.logger.error(f"Project sync error: {e}")
         return jsonify({
             'error': 'Internal server error',
             'message': str(e)
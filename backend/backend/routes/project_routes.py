@@ -0,0 +1,254 @@
+"""
+API Routes for Project and PDF History Listings
+Keyset-paginated (newest first); each page is one query with per-project
+aggregates computed in SQL
+"""
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from models import db, Project, Response, ImageUpload, GeneratedPDF, ArchivedPDF
+from services.coverage import coverage_summary
+from services.project_archive import ARCHIVED_STATUS, ensure_hot
+from auth import login_required
+
+# Create blueprint
+project_bp = Blueprint('projects', __name__, url_prefix='/api')
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _page_args():
+    """
+    Parse limit/cursor query parameters
+
+    The cursor is the last ID of the previous page (items are ordered by
+    descending ID, so it is stable while new rows are added).
+
+    Returns:
+        tuple: (limit, cursor or None)
+
+    Raises:
+        ValueError: If a parameter is not a positive integer
+    """
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', type=int)
+    for name, value in (('limit', limit), ('cursor', cursor)):
+        if name in request.args and (value is None or value < 1):
+            raise ValueError('limit and cursor must be positive integers')
+    limit = limit or DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE), cursor
+
+
+def _count_of(model):
+    """Correlated COUNT(*) of a model's rows for the outer Project row."""
+    return (
+        select(func.count(model.id))
+        .where(model.project_id == Project.id)
+        .correlate(Project)
+        .scalar_subquery()
+    )
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+@project_bp.route('/projects', methods=['GET'])
+@login_required
+def list_projects(user):
+    """
+    List the user's projects with aggregates
+
+    Query Parameters:
+        limit: Page size (default 20, max 100)
+        cursor: next_cursor from the previous page
+        status: Only projects with this status
+
+    Returns:
+    {
+        "projects": [{
+            "id": 123, "title": "...", "status": "in_progress", "revision": 42,
+            "created_at": "...", "updated_at": "...", "completed_at": null,
+            "field_count": 30, "image_count": 4, "pdf_count": 2,
+            "last_pdf": {"id": 9, "generated_at": "...", "file_size": 52754},
+            "coverage": {"filled": 34, "total": 48, "percent_complete": 70.8,
+                         "complete": false, "missing_required": 13}
+        }],
+        "next_cursor": 101
+    }
+    
+    field_count, image_count and pdf_count count the stored rows: saves
+    still in the autosave buffer (a few seconds) are not included yet, and
+    for archived projects, whose rows are in the archive, the counts and
+    last_pdf are null (coverage is kept for listings).
+    """
+    try:
+        try:
+            limit, cursor = _page_args()
+        except ValueError as e:
+            return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+
+        last_pdf = aliased(GeneratedPDF)
+        last_pdf_id = (
+            select(func.max(GeneratedPDF.id))
+            .where(GeneratedPDF.project_id == Project.id)
+            .correlate(Project)
+            .scalar_subquery()
+        )
+
+        query = (
+            select(
+                Project.id, Project.title, Project.status, Project.revision,
+                Project.created_at, Project.updated_at, Project.completed_at,
+                Project.coverage,
+                _count_of(Response).label('field_count'),
+                _count_of(ImageUpload).label('image_count'),
+                _count_of(GeneratedPDF).label('pdf_count'),
+                last_pdf.id.label('last_pdf_id'),
+                last_pdf.generated_at.label('last_pdf_generated_at'),
+                last_pdf.file_size.label('last_pdf_file_size')
+            )
+            .outerjoin(last_pdf, last_pdf.id == last_pdf_id)
+            .where(Project.user_id == user.id)
+            .order_by(Project.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            query = query.where(Project.id < cursor)
+        status = request.args.get('status')
+        if status:
+            query = query.where(Project.status == status)
+
+        rows = db.session.execute(query).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        projects = []
+        for row in rows:
+            archived = row.status == ARCHIVED_STATUS
+            coverage = None
+            if row.coverage:
+                summary = coverage_summary(row.coverage)
+                coverage = {
+                    'filled': summary['filled'],
+                    'total': summary['total'],
+                    'percent_complete': summary['percent_complete'],
+                    'complete': summary['complete'],
+                    'missing_required': len(summary['missing_required'])
+                }
+            projects.append({
+                'id': row.id,
+                'title': row.title,
+                'status': row.status,
+                'revision': row.revision,
+                'created_at': _iso(row.created_at),
+                'updated_at': _iso(row.updated_at),
+                'completed_at': _iso(row.completed_at),
+                'field_count': None if archived else row.field_count,
+                'image_count': None if archived else row.image_count,
+                'pdf_count': None if archived else row.pdf_count,
+                'last_pdf': {
+                    'id': row.last_pdf_id,
+                    'generated_at': _iso(row.last_pdf_generated_at),
+                    'file_size': row.last_pdf_file_size
+                } if row.last_pdf_id else None,
+                'coverage': coverage
+            })
+
+        return jsonify({
+            'projects': projects,
+            'next_cursor': rows[-1].id if has_more else None
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f"List projects error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@project_bp.route('/pdfs', methods=['GET'])
+@login_required
+def list_pdfs(user):
+    """
+    List the user's generated PDFs (history), newest first
+
+    Query Parameters:
+        limit: Page size (default 20, max 100)
+        cursor: next_cursor from the previous page
+        project_id: Only PDFs of this project
+
+    Returns:
+    {
+        "pdfs": [{
+            "id": 9, "project_id": 123, "project_title": "...",
+            "filename": "...", "file_size": 52754, "content_hash": "...",
+            "generated_at": "...", "download_count": 3,
+            "download_url": "/api/download-pdf/9"
+        }],
+        "next_cursor": 4
+    }
+    """
+    try:
+        try:
+            limit, cursor = _page_args()
+        except ValueError as e:
+            return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+
+        project_id = request.args.get('project_id', type=int)
+
+        # PDFs of archived projects come back with their project
+        archived = (
+            select(ArchivedPDF.project_id).distinct()
+            .join(Project, Project.id == ArchivedPDF.project_id)
+            .where(Project.user_id == user.id)
+        )
+        if project_id:
+            archived = archived.where(ArchivedPDF.project_id == project_id)
+        for archived_project_id in db.session.scalars(archived).all():
+            ensure_hot(archived_project_id)
+
+        query = (
+            select(
+                GeneratedPDF.id, GeneratedPDF.project_id, Project.title.label('project_title'),
+                GeneratedPDF.filename, GeneratedPDF.file_size, GeneratedPDF.content_hash,
+                GeneratedPDF.generated_at, GeneratedPDF.download_count
+            )
+            .join(Project, Project.id == GeneratedPDF.project_id)
+            .where(Project.user_id == user.id)
+            .order_by(GeneratedPDF.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            query = query.where(GeneratedPDF.id < cursor)
+        if project_id:
+            query = query.where(GeneratedPDF.project_id == project_id)
+
+        rows = db.session.execute(query).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return jsonify({
+            'pdfs': [{
+                'id': row.id,
+                'project_id': row.project_id,
+                'project_title': row.project_title,
+                'filename': row.filename,
+                'file_size': row.file_size,
+                'content_hash': row.content_hash,
+                'generated_at': _iso(row.generated_at),
+                'download_count': row.download_count or 0,
+                'download_url': f'/api/download-pdf/{row.id}'
+            } for row in rows],
+            'next_cursor': rows[-1].id if has_more else None
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f"List PDFs error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
@@ -0,0 +1,540 @@
+"""
+School Analytics
+Dashboard aggregates per school, grade, day and page (AnalyticsDaily),
+kept current incrementally so dashboards never scan users, projects and
+responses:
+
+- Writers stage deltas on the database session: record_project_changes
+  (saves and uploads), project creation, provisioning and PDF generation.
+  Staged deltas reach the buffer only when the session commits, so
+  rolled-back work is never counted
+- Each worker buffers deltas and flushes them every
+  ANALYTICS_FLUSH_INTERVAL_SECONDS as additive upserts (col = col + delta),
+  like the counter buffer
+- rebuild() recomputes the table from the source rows in one streaming
+  pass (backfill, or after students moved school or grade)
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.orm import Session
+
+from models import (
+    db, User, Project, Response, ImageUpload, GeneratedPDF, ArchivedProject, AnalyticsDaily,
+    build_project_snapshot, _dialect_insert
+)
+from pdf_mappings import FIELD_INDEX
+from services import metrics
+from services.background import PeriodicTask
+from services.coverage import compute_coverage, empty_coverage
+from services.project_archive import read_document
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PROJECT_PAGE = 0  # AnalyticsDaily.page of project-level counters
+_STAGED_KEY = 'analytics_staged'
+
+# user_id -> (school, grade)
+_cohorts = TTLCache(maxsize=50000, ttl=300)
+
+Key = Tuple[str, str, date, int]
+PageDeltas = Dict[int, Dict[str, int]]
+
+
+def _norm(value) -> str:
+    return (value or '').strip()
+
+
+def cohort_of(user_id: int) -> Tuple[str, str]:
+    """(school, grade) of a user ('' when unset), cached per worker"""
+    cohort = _cohorts.get(user_id)
+    if cohort is None:
+        row = db.session.execute(select(User.school, User.grade).where(User.id == user_id)).first()
+        cohort = (_norm(row.school), _norm(row.grade)) if row else ('', '')
+        _cohorts.set(user_id, cohort)
+    return cohort
+
+
+def _prime_cohorts(user_ids: List[int]) -> None:
+    """Load the cohorts of many users with one query per 500"""
+    missing = [user_id for user_id in dict.fromkeys(user_ids) if _cohorts.get(user_id) is None]
+    for start in range(0, len(missing), 500):
+        rows = db.session.execute(
+            select(User.id, User.school, User.grade).where(User.id.in_(missing[start:start + 500]))
+        )
+        for row in rows:
+            _cohorts.set(row.id, (_norm(row.school), _norm(row.grade)))
+
+
+# ============================================================================
+# DELTAS
+# ============================================================================
+
+def _is_filled(value) -> bool:
+    return bool(value.strip()) if isinstance(value, str) else value is not None
+
+
+def field_stats(field: str, value) -> Optional[Tuple[int, Dict[str, int]]]:
+    """
+    Content counters of one field value
+
+    Returns:
+        tuple: (page, counters), or None for fields not on the playbook
+    """
+    info = FIELD_INDEX.get(field)
+    if info is None:
+        return None
+    if not _is_filled(value):
+        return info['page'], {}
+    if info['field_type'] == 'image':
+        return info['page'], {'fields_filled': 1, 'images': 1}
+    return info['page'], {'fields_filled': 1, 'text_responses': 1, 'text_chars': len(str(value).strip())}
+
+
+def _add(target: Dict[str, int], counters: Dict[str, int], sign: int = 1) -> None:
+    for name, amount in counters.items():
+        target[name] = target.get(name, 0) + sign * amount
+
+
+def _completed_pages(coverage: Optional[Dict]) -> set:
+    if not coverage:
+        return set()
+    return {int(page) for page, counts in coverage['pages'].items() if counts['filled'] >= counts['total']}
+
+
+def snapshot_stats(responses: Dict, images: Dict, coverage: Optional[Dict] = None) -> PageDeltas:
+    """
+    Content counters of a whole project, per page
+
+    Args:
+        responses: field_name -> field_value
+        images: field_name -> file_path
+        coverage: The project's coverage (computed if omitted)
+
+    Returns:
+        dict: page -> counters
+    """
+    pages: PageDeltas = defaultdict(dict)
+    for field, value in {**responses, **images}.items():
+        stats = field_stats(field, images.get(field) or responses.get(field))
+        if stats:
+            _add(pages[stats[0]], stats[1])
+    for page in _completed_pages(coverage or compute_coverage(responses, images)):
+        _add(pages[page], {'pages_completed': 1})
+    return pages
+
+
+def change_stats(
+    old_responses: Dict,
+    old_images: Dict,
+    old_coverage: Optional[Dict],
+    responses: Optional[Dict],
+    images: Optional[Dict],
+    new_coverage: Dict
+) -> PageDeltas:
+    """
+    Counter deltas of one save (only the changed fields are examined)
+
+    Args:
+        old_responses, old_images: Snapshot values before the change
+        old_coverage: Coverage before the change
+        responses, images: Changed values
+        new_coverage: Coverage after the change
+
+    Returns:
+        dict: page -> counter deltas (edits and image_uploads included)
+    """
+    pages: PageDeltas = defaultdict(dict)
+    for field in set(responses or {}) | set(images or {}):
+        before = old_images.get(field) or old_responses.get(field)
+        after = (images or {}).get(field) or (responses or {}).get(field, old_responses.get(field))
+        old_stats, new_stats = field_stats(field, before), field_stats(field, after)
+        if new_stats is None:
+            continue
+        page = new_stats[0]
+        _add(pages[page], old_stats[1], -1)
+        _add(pages[page], new_stats[1])
+        _add(pages[page], {'image_uploads': 1} if field in (images or {}) else {'edits': 1})
+
+    old_completed = _completed_pages(old_coverage or empty_coverage())
+    new_completed = _completed_pages(new_coverage)
+    for page in new_completed - old_completed:
+        _add(pages[page], {'pages_completed': 1})
+    for page in old_completed - new_completed:
+        _add(pages[page], {'pages_completed': -1})
+    return pages
+
+
+def stage(user_id: int, page_deltas: PageDeltas, day: Optional[date] = None) -> None:
+    """
+    Stage deltas for a user's cohort on the current session
+
+    They are buffered when the session commits and dropped on rollback.
+
+    Args:
+        user_id: Student whose school and grade the deltas count towards
+        page_deltas: page -> counter deltas (page 0: project-level counters)
+        day: Day the activity is counted on (default: today, UTC)
+    """
+    school, grade = cohort_of(user_id)
+    day = day or datetime.utcnow().date()
+    staged = db.session.info.setdefault(_STAGED_KEY, [])
+    for page, deltas in page_deltas.items():
+        if any(deltas.values()):
+            staged.append(((school, grade, day, page), dict(deltas)))
+
+
+def stage_project_event(user_id: int, **deltas: int) -> None:
+    """Stage project-level counters, e.g. stage_project_event(uid, pdfs_generated=1)"""
+    stage(user_id, {PROJECT_PAGE: deltas})
+
+
+def stage_provisioned(
+    project_rows: List[Tuple[int, int]],
+    snapshot: Optional[Dict],
+    coverage: Optional[Dict]
+) -> None:
+    """
+    Stage the counters of projects created by provisioning
+
+    Args:
+        project_rows: (project_id, user_id) of the new projects
+        snapshot: The starter's snapshot (shared by every copy)
+        coverage: The starter's coverage
+    """
+    _prime_cohorts([user_id for _, user_id in project_rows])
+    snapshot = snapshot or {}
+    per_project = snapshot_stats(snapshot.get('responses') or {}, snapshot.get('images') or {}, coverage)
+    for _, user_id in project_rows:
+        stage(user_id, {PROJECT_PAGE: {'projects_created': 1}, **per_project})
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_staged(session):
+    staged = session.info.pop(_STAGED_KEY, None)
+    if staged:
+        analytics.add_many(staged)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_staged(session):
+    session.info.pop(_STAGED_KEY, None)
+
+
+# ============================================================================
+# BUFFER
+# ============================================================================
+
+class AnalyticsBuffer:
+    """In-process aggregator for AnalyticsDaily deltas"""
+
+    def __init__(self, flush_interval: float = 5.0):
+        """
+        Args:
+            flush_interval: Seconds between background flushes
+        """
+        self._pending: Dict[Key, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self._app = None
+        self._task = PeriodicTask('analytics-flush', flush_interval, self.flush)
+
+    def init_app(self, app) -> None:
+        """Bind to the Flask app and flush on shutdown"""
+        self._app = app
+        self._task.interval = app.config.get('ANALYTICS_FLUSH_INTERVAL_SECONDS', self._task.interval)
+        app.extensions['analytics'] = self
+        atexit.register(self.flush)
+
+    def add_many(self, entries: Iterable[Tuple[Key, Dict[str, int]]]) -> None:
+        """Buffer committed deltas; the write happens on the next flush"""
+        with self._lock:
+            for key, deltas in entries:
+                pending = self._pending[key]
+                for name, amount in deltas.items():
+                    pending[name] += amount
+
+        if self._app is not None:
+            self._task.ensure_started()
+
+    def flush(self) -> int:
+        """
+        Write all buffered deltas
+
+        Returns:
+            int: Number of rows upserted
+        """
+        with self._lock:
+            batch = {key: dict(deltas) for key, deltas in self._pending.items()}
+            self._pending.clear()
+
+        if not batch:
+            return 0
+
+        try:
+            if self._app is not None:
+                with self._app.app_context():
+                    written = write_deltas(batch)
+            else:
+                written = write_deltas(batch)
+        except Exception as e:
+            # Put the deltas back so they are retried on the next flush
+            logger.error(f"Analytics flush failed, will retry: {e}")
+            self.add_many(batch.items())
+            return 0
+
+        metrics.increment('analytics.flushed_rows', written)
+        return written
+
+
+def write_deltas(batch: Dict[Key, Dict[str, int]], commit: bool = True) -> int:
+    """
+    Add deltas to AnalyticsDaily rows (one executemany upsert)
+
+    Args:
+        batch: (school, grade, day, page) -> counter deltas
+        commit: Commit the transaction
+
+    Returns:
+        int: Number of rows written
+    """
+    rows = [{
+        'school': school, 'grade': grade, 'day': day, 'page': page,
+        **{name: deltas.get(name, 0) for name in AnalyticsDaily.COUNTER_COLUMNS}
+    } for (school, grade, day, page), deltas in batch.items()]
+
+    try:
+        insert = _dialect_insert()
+        if insert is None:
+            for row in rows:
+                key = (row['school'], row['grade'], row['day'], row['page'])
+                record = db.session.get(AnalyticsDaily, key)
+                if record is None:
+                    db.session.add(AnalyticsDaily(**row))
+                    db.session.flush()
+                    continue
+                for name in AnalyticsDaily.COUNTER_COLUMNS:
+                    setattr(record, name, getattr(record, name) + row[name])
+        else:
+            table = AnalyticsDaily.__table__
+            statement = insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=['school', 'grade', 'day', 'page'],
+                set_={name: table.c[name] + statement.excluded[name] for name in AnalyticsDaily.COUNTER_COLUMNS}
+            )
+            db.session.execute(statement, rows)
+        if commit:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(rows)
+
+
+# Shared instance (one per worker process)
+analytics = AnalyticsBuffer()
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+def summarize(
+    school: Optional[str] = None,
+    grade: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Dashboard figures for a school and/or grade
+
+    Content figures (completion, text length, images) describe the state
+    at the end of the range; activity figures count events inside it.
+
+    Args:
+        school: School filter (None: all schools)
+        grade: Grade filter (None: all grades)
+        start: First day of the activity range (default: 30 days before end)
+        end: Last day (default: today, UTC)
+
+    Returns:
+        dict: {'projects', 'pages': [...], 'activity': {'totals', 'daily'}}
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+
+    filters = []
+    if school is not None:
+        filters.append(AnalyticsDaily.school == _norm(school))
+    if grade is not None:
+        filters.append(AnalyticsDaily.grade == _norm(grade))
+
+    content_columns = ('fields_filled', 'pages_completed', 'text_responses', 'text_chars', 'images')
+    content = {
+        row.page: row for row in db.session.execute(
+            select(AnalyticsDaily.page, func.sum(AnalyticsDaily.projects_created).label('projects'),
+                   *(func.sum(getattr(AnalyticsDaily, name)).label(name) for name in content_columns))
+            .where(AnalyticsDaily.day <= end, *filters)
+            .group_by(AnalyticsDaily.page)
+        )
+    }
+    projects = int(content[PROJECT_PAGE].projects or 0) if PROJECT_PAGE in content else 0
+
+    pages = []
+    for page, counts in sorted(empty_coverage()['pages'].items(), key=lambda item: int(item[0])):
+        row = content.get(int(page))
+        filled, completed, texts, chars, images = (
+            (int(getattr(row, name) or 0) for name in content_columns) if row else (0, 0, 0, 0, 0)
+        )
+        pages.append({
+            'page': int(page),
+            'fields': counts['total'],
+            'fields_filled': filled,
+            'fill_rate': round(filled / (projects * counts['total']), 4) if projects else 0.0,
+            'completion_rate': round(completed / projects, 4) if projects else 0.0,
+            'avg_text_length': round(chars / texts, 1) if texts else 0.0,
+            'images': images
+        })
+
+    activity_columns = ('projects_created', 'projects_completed', 'pdfs_generated', 'edits', 'image_uploads')
+    daily = [
+        {'day': row.day.isoformat(), **{name: int(getattr(row, name) or 0) for name in activity_columns}}
+        for row in db.session.execute(
+            select(AnalyticsDaily.day,
+                   *(func.sum(getattr(AnalyticsDaily, name)).label(name) for name in activity_columns))
+            .where(AnalyticsDaily.day >= start, AnalyticsDaily.day <= end, *filters)
+            .group_by(AnalyticsDaily.day)
+            .order_by(AnalyticsDaily.day)
+        )
+    ]
+
+    return {
+        'school': school,
+        'grade': grade,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'projects': projects,
+        'pages': pages,
+        'activity': {
+            'totals': {name: sum(day[name] for day in daily) for name in activity_columns},
+            'daily': daily
+        }
+    }
+
+
+# ============================================================================
+# BACKFILL
+# ============================================================================
+
+def _as_date(value) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _page_of(field: str) -> Optional[int]:
+    info = FIELD_INDEX.get(field)
+    return info['page'] if info else None
+
+
+def rebuild(batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Recompute AnalyticsDaily from the source rows in one streaming pass (commits)
+
+    Projects are streamed with their snapshots (yield_per: a server-side
+    cursor on PostgreSQL); content counts on the day of each project's
+    last update. Activity comes from the rows still on record: edits are
+    the responses' last updates, and PDFs removed by retention are not
+    counted. Archived projects are read from their archive documents.
+
+    Args:
+        batch_size: Rows fetched per round trip
+
+    Returns:
+        dict: Projects scanned and rows written
+    """
+    totals: Dict[Key, Dict[str, int]] = defaultdict(dict)
+
+    def count(school, grade, day, page, counters):
+        if day is not None:
+            _add(totals[(_norm(school), _norm(grade), day, page)], counters)
+
+    projects = db.session.execute(
+        select(Project.id, Project.status, Project.created_at, Project.updated_at, Project.completed_at,
+               Project.snapshot, Project.coverage, User.school, User.grade, ArchivedProject.payload)
+        .join(User, User.id == Project.user_id)
+        .outerjoin(ArchivedProject, ArchivedProject.project_id == Project.id)
+        .execution_options(yield_per=batch_size)
+    )
+    scanned = 0
+    for row in projects:
+        scanned += 1
+        count(row.school, row.grade, _as_date(row.created_at), PROJECT_PAGE, {'projects_created': 1})
+        count(row.school, row.grade, _as_date(row.completed_at), PROJECT_PAGE, {'projects_completed': 1})
+
+        if row.payload is not None:
+            document = read_document(row.payload)
+            responses = {r['field_name']: r['field_value'] for r in document['responses']}
+            images = {i['field_name']: i['file_path'] for i in document['images']}
+            for entry in document['responses']:
+                count(row.school, row.grade, _as_date(entry.get('updated_at')),
+                      _page_of(entry['field_name']), {'edits': 1})
+            for entry in document['images']:
+                count(row.school, row.grade, _as_date(entry.get('uploaded_at')),
+                      _page_of(entry['field_name']), {'image_uploads': 1})
+            for entry in document['generated_pdfs']:
+                count(row.school, row.grade, _as_date(entry.get('generated_at')),
+                      PROJECT_PAGE, {'pdfs_generated': 1})
+            coverage = None
+        elif row.snapshot is not None:
+            responses, images = row.snapshot.get('responses') or {}, row.snapshot.get('images') or {}
+            coverage = row.coverage
+        else:
+            snapshot = build_project_snapshot(row.id)
+            responses, images, coverage = snapshot['responses'], snapshot['images'], None
+
+        for page, counters in snapshot_stats(responses, images, coverage).items():
+            count(row.school, row.grade, _as_date(row.updated_at), page, counters)
+
+    # Activity of the hot rows, aggregated by the database
+    for model, timestamp, counter, by_field in (
+        (Response, Response.updated_at, 'edits', True),
+        (ImageUpload, ImageUpload.uploaded_at, 'image_uploads', True),
+        (GeneratedPDF, GeneratedPDF.generated_at, 'pdfs_generated', False),
+    ):
+        group = [User.school, User.grade, func.date(timestamp)] + ([model.field_name] if by_field else [])
+        result = db.session.execute(
+            select(*group, func.count())
+            .select_from(model)
+            .join(Project, Project.id == model.project_id)
+            .join(User, User.id == Project.user_id)
+            .group_by(*group)
+            .execution_options(yield_per=batch_size)
+        )
+        for values in result:
+            page = _page_of(values[3]) if by_field else PROJECT_PAGE
+            count(values[0], values[1], _as_date(values[2]), page, {counter: values[-1]})
+
+    totals = {key: counters for key, counters in totals.items() if key[3] is not None}
+    try:
+        db.session.execute(delete(AnalyticsDaily))
+        items = list(totals.items())
+        for start in range(0, len(items), batch_size):
+            write_deltas(dict(items[start:start + batch_size]), commit=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.info(f"Rebuilt analytics: {scanned} projects, {len(totals)} rows")
+    return {'projects': scanned, 'rows': len(totals)}
+
@@ -0,0 +1,385 @@
+"""
+Autosave Coalescing Buffer
+Absorbs keystroke-rate save_response traffic and writes only the latest
+value per (project, field) in batched transactions.
+
+Off by default, like the other write-behind features; AUTOSAVE_BUFFER_ENABLED
+turns it on and changes the save contract: /api/save-response answers
+{"response_id": null, "buffered": true}, since the row only exists after
+the next flush. AUTOSAVE_SPOOL_DIR must be visible to every node that
+serves the project (one host, or a shared mount with working flock);
+otherwise reads on other nodes miss the pending values.
+
+Each save is appended to a per-project spool file (one JSON line, under an
+exclusive flock) instead of committing a database transaction. Spool files
+are shared by all gunicorn workers, so:
+
+- order: appends to a project are serialized, the last line wins
+- read-your-writes: any worker can overlay a project's pending values
+  (pending(); the responses and progress reads do, without flushing)
+- durability: a crashed worker's spool is flushed by the next flush pass
+  (AUTOSAVE_FSYNC also survives power loss)
+
+Every AUTOSAVE_FLUSH_INTERVAL_SECONDS one worker (file lock) coalesces all
+spool files and writes them with bulk_upsert_responses and
+record_project_changes in one transaction. Paths that need every pending
+value in the database (PDF generation, bulk sync, export, archiving) call
+flush_project() first.
+
+A save the database refuses (anything but an OperationalError, which is
+retried) is moved to <project_id>.jsonl.rejected next to the spool and
+logged, so one bad value cannot hold back the project's later saves.
+"""
+import atexit
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+from sqlalchemy.exc import OperationalError
+
+from models import db, Project, bulk_upsert_responses, normalize_field_value
+from services.project_state import record_project_changes
+from services.background import PeriodicTask
+from services import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves go straight to the database
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SPOOL_SUFFIX = '.jsonl'
+REJECTED_SUFFIX = '.rejected'
+FLUSH_LOCK_FILENAME = '.flush.lock'
+
+
+class AutosaveBuffer:
+    """Write-behind buffer for response saves, shared across worker processes"""
+
+    def __init__(self):
+        self._app = None
+        self._spool_dir: Optional[Path] = None
+        self._fsync = False
+        self._task = PeriodicTask('autosave-flush', 2, self.flush)
+
+    def init_app(self, app) -> None:
+        """Bind to the Flask app and write out spools left by a previous run"""
+        if not app.config.get('AUTOSAVE_BUFFER_ENABLED', False) or fcntl is None:
+            return
+
+        self._app = app
+        self._spool_dir = Path(app.config['AUTOSAVE_SPOOL_DIR'])
+        self._spool_dir.mkdir(parents=True, exist_ok=True)
+        self._fsync = app.config.get('AUTOSAVE_FSYNC', False)
+        self._task.interval = app.config.get('AUTOSAVE_FLUSH_INTERVAL_SECONDS', 2)
+        app.extensions['autosave_buffer'] = self
+        atexit.register(self.flush)
+
+        # Crash recovery: anything still spooled was never committed
+        self.flush()
+
+    @property
+    def enabled(self) -> bool:
+        return self._app is not None
+
+    def ensure_started(self) -> None:
+        """Start the flush thread in this process (no-op if disabled)"""
+        if self.enabled and self._task.interval > 0:
+            self._task.ensure_started()
+
+    # ========================================================================
+    # WRITES AND READS
+    # ========================================================================
+
+    def put(self, project_id: int, field_name: str, field_value: str, page_number: int = None) -> None:
+        """
+        Record a response save (durable once this returns)
+
+        Args:
+            project_id: Project ID
+            field_name: Field name
+            field_value: Field value (dicts/lists are stored as JSON)
+            page_number: Page number
+        """
+        line = json.dumps({
+            'field_name': field_name,
+            'field_value': normalize_field_value(field_value),
+            'page_number': page_number,
+            'ts': time.time()
+        }) + '\n'
+
+        with self._locked_spool(project_id, fcntl.LOCK_EX, create=True) as spool:
+            if self._ends_torn(spool):
+                line = '\n' + line  # Never merge with a crashed writer's partial line
+            spool.write(line)
+            spool.flush()
+            if self._fsync:
+                os.fsync(spool.fileno())
+
+        metrics.increment('autosave.buffered')
+        self.ensure_started()
+
+    def pending(self, project_id: int) -> Dict[str, str]:
+        """
+        Values saved but not yet flushed for a project (read-your-writes overlay)
+
+        Returns:
+            dict: field_name -> latest pending field_value
+        """
+        if not self.enabled:
+            return {}
+
+        with self._locked_spool(project_id, fcntl.LOCK_SH) as spool:
+            if spool is None:
+                return {}
+            entries = self._read_entries(spool)
+        return {field: entry['field_value'] for field, entry in entries.items()}
+
+    # ========================================================================
+    # FLUSHING
+    # ========================================================================
+
+    def flush_project(self, project_id: int) -> int:
+        """
+        Write a project's pending saves now (blocks concurrent saves to it)
+
+        Raises:
+            OperationalError: The database is unavailable (saves stay spooled)
+
+        Returns:
+            int: Number of responses written
+        """
+        if not self.enabled:
+            return 0
+
+        with self._locked_spool(project_id, fcntl.LOCK_EX) as spool:
+            if spool is None:
+                return 0
+            entries = self._read_entries(spool)
+            written = self._write_project(project_id, entries, spool) if entries else 0
+            self._discard(spool)
+        return written
+
+    def flush(self) -> int:
+        """
+        Write every project's pending saves in one transaction
+
+        Only one process flushes at a time; the others skip the pass.
+
+        Returns:
+            int: Number of responses written
+        """
+        if not self.enabled:
+            return 0
+
+        with self._exclusive() as acquired:
+            if not acquired:
+                return 0
+            with self._app.app_context():
+                try:
+                    return self._flush_all()
+                finally:
+                    db.session.remove()
+
+    def _flush_all(self) -> int:
+        spools = {}
+        try:
+            # Lock every spool with pending saves: appends to these projects
+            # wait for the commit instead of racing it
+            for path in sorted(self._spool_dir.glob(f'*/*{SPOOL_SUFFIX}')):
+                try:
+                    project_id = int(path.stem)
+                except ValueError:
+                    continue
+                spool = self._open_locked(path, fcntl.LOCK_EX)
+                if spool is not None:
+                    spools[project_id] = spool
+
+            batch = {pid: self._read_entries(spool) for pid, spool in spools.items()}
+            batch = {pid: entries for pid, entries in batch.items() if entries}
+            if not batch:
+                for spool in spools.values():
+                    self._discard(spool)
+                return 0
+
+            try:
+                written = self._write(batch)
+                done = set(batch)
+            except Exception as e:
+                # One bad project must not hold back the rest
+                logger.error(f"Autosave batch flush failed, retrying per project: {e}")
+                written, done = 0, set()
+                for project_id, entries in batch.items():
+                    try:
+                        written += self._write_project(project_id, entries, spools[project_id])
+                        done.add(project_id)
+                    except OperationalError as project_error:
+                        logger.error(f"Autosave flush failed for project {project_id}: {project_error}")
+
+            for project_id, spool in spools.items():
+                if project_id in done or project_id not in batch:
+                    self._discard(spool)
+
+            metrics.increment('autosave.flushed', written)
+            return written
+        finally:
+            for spool in spools.values():
+                spool.close()  # Releases the flock
+
+    def _write_project(self, project_id: int, entries: Dict[str, dict], spool) -> int:
+        """
+        Write one project's entries, quarantining the ones the database refuses
+
+        OperationalErrors (database down or locked) propagate so the spool is
+        kept and retried; any other failure is narrowed down to the offending
+        fields, which are moved to the rejected file.
+        """
+        try:
+            return self._write({project_id: entries})
+        except OperationalError:
+            raise
+        except Exception as e:
+            logger.error(f"Autosave flush failed for project {project_id}, retrying per field: {e}")
+
+        written = 0
+        for field, entry in entries.items():
+            try:
+                written += self._write({project_id: {field: entry}})
+            except OperationalError:
+                raise
+            except Exception as e:
+                self._reject(spool, entry, e)
+        return written
+
+    def _write(self, batch: Dict[int, Dict[str, dict]]) -> int:
+        """Upsert coalesced entries and fold them into the snapshots (one commit)."""
+        existing = {
+            pid for (pid,) in db.session.query(Project.id).filter(Project.id.in_(list(batch)))
+        }
+        written = 0
+        try:
+            for project_id, entries in batch.items():
+                if project_id not in existing:
+                    logger.warning(f"Dropping {len(entries)} autosaves of deleted project {project_id}")
+                    continue
+                items = [
+                    {'field_name': field, 'field_value': entry['field_value'],
+                     'page_number': entry.get('page_number')}
+                    for field, entry in entries.items()
+                ]
+                bulk_upsert_responses(project_id, items)
+                record_project_changes(
+                    project_id,
+                    responses={item['field_name']: item['field_value'] for item in items}
+                )
+                written += len(items)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return written
+
+    # ========================================================================
+    # SPOOL FILES
+    # ========================================================================
+
+    def _spool_path(self, project_id: int) -> Path:
+        # Bucket by ID so no directory grows past ~1000 entries
+        return self._spool_dir / f'{int(project_id) // 1000:04d}' / f'{int(project_id)}{SPOOL_SUFFIX}'
+
+    @contextmanager
+    def _locked_spool(self, project_id: int, mode: int, create: bool = False):
+        path = self._spool_path(project_id)
+        if create:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        spool = self._open_locked(path, mode, create=create)
+        try:
+            yield spool
+        finally:
+            if spool is not None:
+                spool.close()
+
+    @staticmethod
+    def _open_locked(path: Path, mode: int, create: bool = False):
+        """
+        Open and flock a spool file; None if it does not exist
+
+        A flusher may unlink the file between our open() and flock(); the
+        handle would then point at a deleted inode, so retry on a fresh one.
+        """
+        while True:
+            try:
+                spool = open(path, 'a+' if create else 'r+')
+            except FileNotFoundError:
+                return None
+            fcntl.flock(spool, mode)
+            try:
+                same_file = os.fstat(spool.fileno()).st_ino == os.stat(path).st_ino
+            except FileNotFoundError:
+                same_file = False
+            if same_file:
+                return spool
+            spool.close()
+            if not create:
+                return None
+
+    @staticmethod
+    def _read_entries(spool) -> Dict[str, dict]:
+        """Coalesce a spool: the last line per field wins."""
+        spool.seek(0)
+        entries = {}
+        for line in spool:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Torn final line from a crash mid-write
+            entries[entry['field_name']] = entry
+        return entries
+
+    @staticmethod
+    def _ends_torn(spool) -> bool:
+        """True if the spool's last line has no newline (a crash mid-write)."""
+        size = os.fstat(spool.fileno()).st_size
+        return size > 0 and os.pread(spool.fileno(), 1, size - 1) != b'\n'
+
+    @staticmethod
+    def _reject(spool, entry: dict, error: Exception) -> None:
+        """Move a save the database refused to the project's rejected file."""
+        logger.error(
+            f"Autosave of {entry.get('field_name')!r} rejected, kept in "
+            f"{spool.name}{REJECTED_SUFFIX}: {error}"
+        )
+        with open(spool.name + REJECTED_SUFFIX, 'a') as rejected:
+            rejected.write(json.dumps(dict(entry, error=str(error))) + '\n')
+        metrics.increment('autosave.rejected')
+
+    @staticmethod
+    def _discard(spool) -> None:
+        """Remove a flushed spool (caller holds its exclusive lock)."""
+        try:
+            os.unlink(spool.name)
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def _exclusive(self):
+        """Non-blocking inter-process lock; yields False if another worker holds it."""
+        with open(self._spool_dir / FLUSH_LOCK_FILENAME, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Shared instance (one per worker process)
+autosave = AutosaveBuffer()
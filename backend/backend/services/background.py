@@ -0,0 +1,65 @@
+"""
+Background Periodic Tasks
+Fork-safe daemon threads for flushes and maintenance work.
+
+gunicorn runs create_app() in the master (preload_app = True) and then
+forks workers; threads do not survive a fork. Tasks therefore start lazily
+from ensure_started(), which (re)starts the thread in the current process.
+"""
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Run a callable every `interval` seconds on a daemon thread"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], None]):
+        """
+        Args:
+            name: Thread name (for logs)
+            interval: Seconds between runs
+            func: Callable to run; exceptions are logged, not raised
+        """
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_started(self) -> None:
+        """Start the thread if it is not running in this process"""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+            logger.debug(f"Started background task '{self.name}' (pid {self._pid})")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the thread (if running in this process)"""
+        self._stop.set()
+        if self._thread and self._pid == os.getpid() and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def run_once(self) -> None:
+        """Run the task immediately on the calling thread"""
+        try:
+            self.func()
+        except Exception as e:
+            logger.error(f"Background task '{self.name}' failed: {e}", exc_info=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
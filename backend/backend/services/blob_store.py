@@ -0,0 +1,271 @@
+"""
+Content-Addressed Blob Store
+Image bytes are stored once, keyed by their SHA-256, under
+UPLOAD_FOLDER/blobs/<h0h1>/<h2h3>/<sha256>.<ext>. Every ImageUpload with
+the same content points at the same file.
+
+- Blob.ref_count counts the ImageUpload rows using a blob; ORM listeners
+  keep it current, set-based writers (provisioning) update it themselves
+- Clients can ask which hashes are already stored and then reference
+  those images by "sha256:<hex>" instead of re-sending the bytes; a
+  user only ever sees blobs one of their own images uses, so a hash
+  cannot be used to probe for (or obtain) someone else's image
+- Unreferenced blobs are kept for BLOB_RETENTION_SECONDS after their last
+  use, then reclaimed by the storage lifecycle (collect_unused_blobs)
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import event, func, update
+from sqlalchemy import inspect as sa_inspect
+
+from models import db, Blob, ImageUpload, Project, _dialect_insert
+from services.storage import artifacts
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIRNAME = 'blobs'
+HASH_REFERENCE_PREFIX = 'sha256:'
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+_EXTENSIONS = {'image/png': '.png', 'image/jpeg': '.jpg', 'image/jpg': '.jpg'}
+
+
+def is_valid_hash(value) -> bool:
+    """True for a lowercase 64-character SHA-256 hex digest"""
+    return isinstance(value, str) and bool(_HASH_RE.match(value))
+
+
+def parse_hash_reference(value) -> Optional[str]:
+    """Digest of a "sha256:<hex>" image reference, or None for anything else."""
+    if not isinstance(value, str) or not value.startswith(HASH_REFERENCE_PREFIX):
+        return None
+    digest = value[len(HASH_REFERENCE_PREFIX):].strip().lower()
+    return digest if is_valid_hash(digest) else None
+
+
+def blob_path(upload_root: Union[str, Path], digest: str, mime_type: Optional[str] = None) -> Path:
+    """
+    Get the storage path of a blob (directories are not created)
+
+    Args:
+        upload_root: UPLOAD_FOLDER
+        digest: SHA-256 hex digest
+        mime_type: Content type (only picks the file extension)
+
+    Returns:
+        Path: upload_root/blobs/<h0h1>/<h2h3>/<digest><ext>
+    """
+    extension = _EXTENSIONS.get((mime_type or '').lower(), '')
+    return Path(upload_root, BLOB_DIRNAME, digest[:2], digest[2:4], digest + extension)
+
+
+def store_blob(
+    source: Union[bytes, BinaryIO],
+    upload_root: Union[str, Path],
+    mime_type: Optional[str] = None
+) -> Blob:
+    """
+    Store image bytes (once) and register the blob (does not commit)
+
+    The bytes are hashed while they are written to a temporary file, which
+    then atomically replaces the blob file. Rewriting identical content is
+    harmless and refreshes the file's mtime, so a concurrent collector
+    never removes a file that was just stored.
+
+    Args:
+        source: Image bytes or a binary stream (e.g. FileStorage.stream)
+        upload_root: UPLOAD_FOLDER
+        mime_type: Content type of the image
+
+    Returns:
+        Blob: The (possibly pre-existing) blob row
+    """
+    root = Path(upload_root, BLOB_DIRNAME)
+    root.mkdir(parents=True, exist_ok=True)
+
+    # No leading dot: the orphan sweep reclaims leftovers of crashed writes
+    fd, temp_name = tempfile.mkstemp(dir=root, prefix='incoming-', suffix='.tmp')
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            if isinstance(source, (bytes, bytearray)):
+                chunks = [bytes(source)]
+            else:
+                chunks = iter(lambda: source.read(CHUNK_SIZE), b'')
+            for chunk in chunks:
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        sha256 = digest.hexdigest()
+        existing = db.session.get(Blob, sha256)
+        final_path = Path(existing.file_path) if existing else blob_path(upload_root, sha256, mime_type)
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_name, final_path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+    if existing is None:
+        artifacts.publish(final_path)
+
+    _register_blob(sha256, str(final_path), size, mime_type)
+    return db.session.get(Blob, sha256, populate_existing=True)
+
+
+def _register_blob(sha256: str, file_path: str, size: int, mime_type: Optional[str]) -> None:
+    """Insert the blob row, or refresh last_used_at if another request got there first."""
+    now = datetime.utcnow()
+    values = {
+        'sha256': sha256,
+        'file_path': file_path,
+        'file_size': size,
+        'mime_type': mime_type,
+        'ref_count': 0,
+        'created_at': now,
+        'last_used_at': now
+    }
+
+    insert = _dialect_insert()
+    if insert is None:
+        blob = db.session.get(Blob, sha256)
+        if blob is None:
+            db.session.add(Blob(**values))
+        else:
+            blob.last_used_at = now
+        db.session.flush()
+        return
+
+    statement = insert(Blob.__table__).values(values)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['sha256'],
+        set_={'last_used_at': now}
+    ))
+
+
+def resolve_blobs(
+    digests: Iterable[str],
+    touch: bool = True,
+    owner_id: Optional[int] = None
+) -> Dict[str, Blob]:
+    """
+    Look up stored blobs whose files still exist (does not commit)
+
+    Args:
+        digests: SHA-256 hex digests
+        touch: Refresh last_used_at so the blobs survive until they are used
+        owner_id: Only blobs used by an image in one of this user's
+            projects (None: any blob, for trusted API key callers)
+
+    Returns:
+        dict: digest -> Blob for the digests that are available
+    """
+    digests = list(dict.fromkeys(digests))
+    found = {}
+    for start in range(0, len(digests), 500):
+        chunk = digests[start:start + 500]
+        query = Blob.query.filter(Blob.sha256.in_(chunk))
+        if owner_id is not None:
+            owned = (
+                db.session.query(ImageUpload.content_hash)
+                .join(Project, Project.id == ImageUpload.project_id)
+                .filter(Project.user_id == owner_id, ImageUpload.content_hash.in_(chunk))
+            )
+            query = query.filter(Blob.sha256.in_(owned))
+        for blob in query:
+            if artifacts.exists(blob.file_path):
+                found[blob.sha256] = blob
+
+    if touch and found:
+        db.session.execute(
+            update(Blob)
+            .where(Blob.sha256.in_(list(found)))
+            .values(last_used_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+    return found
+
+
+def collect_unused_blobs(retention_seconds: int, batch_size: int = 200) -> List[str]:
+    """
+    Delete rows of blobs unreferenced for longer than the retention period
+
+    ref_count is re-checked against the image rows first: bulk deletes
+    bypass the ORM listeners, so a stored count may have drifted.
+
+    Args:
+        retention_seconds: Minimum time since the blob was last used
+        batch_size: Blobs to examine
+
+    Returns:
+        list: File paths of the deleted blobs (the caller removes the files)
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=retention_seconds)
+    candidates = (
+        Blob.query
+        .filter(Blob.ref_count <= 0, Blob.last_used_at < cutoff)
+        .limit(batch_size)
+        .all()
+    )
+    if not candidates:
+        return []
+
+    in_use = dict(
+        db.session.query(ImageUpload.content_hash, func.count(ImageUpload.id))
+        .filter(ImageUpload.content_hash.in_([blob.sha256 for blob in candidates]))
+        .group_by(ImageUpload.content_hash)
+    )
+
+    removed = []
+    for blob in candidates:
+        if in_use.get(blob.sha256):
+            blob.ref_count = in_use[blob.sha256]
+            continue
+        removed.append(blob.file_path)
+        db.session.delete(blob)
+
+    db.session.commit()
+    return removed
+
+
+# ============================================================================
+# REFERENCE COUNTING
+# ============================================================================
+
+def _adjust_ref_count(connection, sha256: Optional[str], delta: int) -> None:
+    if not sha256:
+        return
+    values = {'ref_count': Blob.ref_count + delta}
+    if delta > 0:
+        values['last_used_at'] = datetime.utcnow()
+    connection.execute(update(Blob.__table__).where(Blob.sha256 == sha256).values(values))
+
+
+@event.listens_for(ImageUpload, 'after_insert')
+def _image_inserted(mapper, connection, target):
+    _adjust_ref_count(connection, target.content_hash, 1)
+
+
+@event.listens_for(ImageUpload, 'after_delete')
+def _image_deleted(mapper, connection, target):
+    _adjust_ref_count(connection, target.content_hash, -1)
+
+
+@event.listens_for(ImageUpload, 'after_update')
+def _image_updated(mapper, connection, target):
+    history = sa_inspect(target).attrs.content_hash.history
+    if not history.has_changes():
+        return
+    for old_hash in history.deleted:
+        _adjust_ref_count(connection, old_hash, -1)
+    for new_hash in history.added:
+        _adjust_ref_count(connection, new_hash, 1)
@@ -0,0 +1,141 @@
+"""
+Write-Behind Counter Buffer
+Accumulates hot counter increments (downloads, views, generations) in memory
+and flushes them as one batched UPDATE per counter per interval.
+
+Each gunicorn worker buffers its own deltas and applies them additively
+(col = col + delta), so the database converges to the exact total within
+one flush interval regardless of the number of workers.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict
+
+from sqlalchemy import bindparam, func, update
+
+from models import db
+from services.background import PeriodicTask
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """In-process aggregator for integer counter columns"""
+
+    def __init__(self, flush_interval: float = 5.0):
+        """
+        Args:
+            flush_interval: Seconds between background flushes
+        """
+        self._columns = {}
+        self._pending: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        # Serializes flushes: an exit flush waits for an in-flight background one
+        self._flush_lock = threading.Lock()
+        self._app = None
+        self._task = PeriodicTask('counter-flush', flush_interval, self.flush)
+
+    def init_app(self, app) -> None:
+        """Bind to the Flask app and flush on shutdown"""
+        self._app = app
+        self._task.interval = app.config.get('COUNTER_FLUSH_INTERVAL_SECONDS', self._task.interval)
+        app.extensions['counter_buffer'] = self
+        atexit.register(self.flush)
+
+    def register(self, name: str, column) -> None:
+        """
+        Register a counter
+
+        Args:
+            name: Counter name, e.g. 'generated_pdfs.download_count'
+            column: Integer column on a table with an 'id' primary key
+        """
+        self._columns[name] = column
+
+    def increment(self, name: str, row_id: int, amount: int = 1) -> None:
+        """
+        Add to a counter; the write happens on the next flush
+
+        Raises:
+            KeyError: If the counter is not registered
+        """
+        if name not in self._columns:
+            raise KeyError(f"Unknown counter: {name}")
+
+        with self._lock:
+            self._pending[name][row_id] += amount
+
+        if self._app is not None and self._task.interval > 0:
+            self._task.ensure_started()
+
+    def pending(self, name: str, row_id: int) -> int:
+        """Increments buffered in this worker and not yet flushed"""
+        with self._lock:
+            return self._pending.get(name, {}).get(row_id, 0)
+
+    def flush(self) -> int:
+        """
+        Write all buffered increments
+
+        Returns:
+            int: Number of rows updated
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            batch = {name: dict(rows) for name, rows in self._pending.items() if rows}
+            self._pending.clear()
+
+        if not batch:
+            return 0
+
+        try:
+            if self._app is not None:
+                with self._app.app_context():
+                    updated = self._write(batch)
+            else:
+                updated = self._write(batch)
+        except Exception as e:
+            # Put the deltas back so they are retried on the next flush
+            logger.error(f"Counter flush failed, will retry: {e}")
+            with self._lock:
+                for name, rows in batch.items():
+                    for row_id, amount in rows.items():
+                        self._pending[name][row_id] += amount
+            return 0
+
+        metrics.increment('counters.flushed_rows', updated)
+        return updated
+
+    def _write(self, batch: Dict[str, Dict[int, int]]) -> int:
+        """One executemany UPDATE per counter, all in one transaction."""
+        updated = 0
+        try:
+            for name, rows in batch.items():
+                column = self._columns[name]
+                table = column.table
+                statement = (
+                    update(table)
+                    .where(table.c.id == bindparam('row_id'))
+                    .values({column.name: func.coalesce(column, 0) + bindparam('amount')})
+                )
+                db.session.execute(
+                    statement,
+                    [{'row_id': row_id, 'amount': amount} for row_id, amount in rows.items()],
+                    execution_options={'synchronize_session': False}
+                )
+                updated += len(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return updated
+
+
+# Shared instance (one per worker process)
+counters = CounterBuffer()
@@ -0,0 +1,154 @@
+"""
+Project Coverage Counters
+Per-project completeness (filled fields per page, missing required fields,
+image counts) kept up to date incrementally from each save, so progress can
+be read without scanning every mapping against the project's data.
+
+Coverage document stored on Project.coverage:
+{
+    "filled": 12, "total": 48,
+    "pages": {"3": {"filled": 2, "total": 4}, ...},
+    "images": {"filled": 1, "total": 12},
+    "missing_required": ["problem_statement", ...],
+    "unmapped": 0
+}
+"""
+from typing import Dict, Optional
+
+from pdf_mappings import FIELD_INDEX
+
+
+def _is_filled(value) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return bool(value.strip())
+    return True
+
+
+def empty_coverage() -> Dict:
+    """Coverage of a project with no data"""
+    pages = {}
+    for info in FIELD_INDEX.values():
+        page = pages.setdefault(str(info['page']), {'filled': 0, 'total': 0})
+        page['total'] += 1
+
+    return {
+        'filled': 0,
+        'total': len(FIELD_INDEX),
+        'pages': pages,
+        'images': {
+            'filled': 0,
+            'total': sum(1 for info in FIELD_INDEX.values() if info['field_type'] == 'image')
+        },
+        'missing_required': sorted(
+            field for field, info in FIELD_INDEX.items() if info['required']
+        ),
+        'unmapped': 0
+    }
+
+
+def compute_coverage(responses: Dict, images: Dict) -> Dict:
+    """
+    Full coverage computation (backfill for projects without counters)
+
+    Args:
+        responses: field_name -> field_value
+        images: field_name -> file_path
+
+    Returns:
+        dict: Coverage document
+    """
+    return update_coverage(empty_coverage(), {}, {}, responses, images)
+
+
+def update_coverage(
+    coverage: Dict,
+    old_responses: Dict,
+    old_images: Dict,
+    responses: Optional[Dict] = None,
+    images: Optional[Dict] = None
+) -> Dict:
+    """
+    Apply changed fields to a coverage document
+
+    Only the changed fields are examined: each one moves the counters by
+    at most one in either direction.
+
+    Args:
+        coverage: Current coverage document (not modified)
+        old_responses: Responses before the change
+        old_images: Images before the change
+        responses: Changed responses (field_name -> new value)
+        images: Changed images (field_name -> new file_path)
+
+    Returns:
+        dict: New coverage document
+    """
+    coverage = {
+        **coverage,
+        'pages': {page: dict(counts) for page, counts in coverage['pages'].items()},
+        'images': dict(coverage['images']),
+    }
+    missing = set(coverage['missing_required'])
+
+    changed = set(responses or {}) | set(images or {})
+    for field in changed:
+        was_filled = _is_filled(old_responses.get(field)) or _is_filled(old_images.get(field))
+        now_filled = (
+            _is_filled((responses or {}).get(field, old_responses.get(field))) or
+            _is_filled((images or {}).get(field, old_images.get(field)))
+        )
+        if was_filled == now_filled:
+            continue
+
+        delta = 1 if now_filled else -1
+        info = FIELD_INDEX.get(field)
+        if info is None:
+            coverage['unmapped'] += delta
+            continue
+
+        coverage['filled'] += delta
+        coverage['pages'][str(info['page'])]['filled'] += delta
+        if info['field_type'] == 'image':
+            coverage['images']['filled'] += delta
+        if info['required']:
+            if now_filled:
+                missing.discard(field)
+            else:
+                missing.add(field)
+
+    coverage['missing_required'] = sorted(missing)
+    return coverage
+
+
+def coverage_summary(coverage: Dict) -> Dict:
+    """Coverage document plus derived percentages (for API responses)"""
+    total = coverage['total']
+    return {
+        **coverage,
+        'percent_complete': round(coverage['filled'] / total * 100, 1) if total else 100.0,
+        'complete': not coverage['missing_required'],
+    }
+
+
+def format_coverage_report(coverage: Dict, trace_id: str = "unknown") -> str:
+    """Log-friendly report from counters (replaces the full coverage scan)"""
+    summary = coverage_summary(coverage)
+    report = [
+        f"\n{'='*60}",
+        f"PDF FIELD COVERAGE [{trace_id}] (incremental counters)",
+        f"{'='*60}",
+        f"Filled fields:         {summary['filled']}/{summary['total']}",
+        f"Images:                {summary['images']['filled']}/{summary['images']['total']}",
+        f"Coverage:              {summary['percent_complete']:.1f}%",
+    ]
+    if summary['missing_required']:
+        report.append(f"⚠️  MISSING REQUIRED ({len(summary['missing_required'])}): "
+                      f"{', '.join(summary['missing_required'])}")
+    else:
+        report.append("✅ All required fields have data")
+    if summary['unmapped']:
+        report.append(f"⚠️  UNMAPPED DATA: {summary['unmapped']} fields")
+    report.append(f"{'='*60}\n")
+    return "\n".join(report)
@@ -0,0 +1,172 @@
+"""
+Database Engine Profiles
+Per-dialect engine tuning, selected from SQLALCHEMY_DATABASE_URI:
+
+- SQLite: WAL journal, synchronous=NORMAL, busy_timeout, mmap and page
+  cache pragmas on every new connection, plus a periodic WAL checkpoint and
+  PRAGMA optimize (see SQLiteMaintenance)
+- PostgreSQL: sized connection pool with pre-ping and recycling, and
+  server-side statement/lock timeouts passed as connection options
+
+Options explicitly set in SQLALCHEMY_ENGINE_OPTIONS win over the profile.
+"""
+import logging
+from typing import Dict, Mapping
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+
+from services.background import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(settings: Mapping, name: str, default):
+    return settings.get(name, default) if settings is not None else default
+
+
+def is_sqlite(uri: str) -> bool:
+    return make_url(str(uri)).get_backend_name() == 'sqlite'
+
+
+def is_memory_sqlite(uri: str) -> bool:
+    url = make_url(str(uri))
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options_for(uri: str, settings: Mapping = None) -> Dict:
+    """
+    Engine options for a database URI
+
+    Args:
+        uri: SQLAlchemy database URI
+        settings: Config mapping (app.config or a dict) with DB_* settings
+
+    Returns:
+        dict: Keyword arguments for create_engine
+    """
+    backend = make_url(str(uri)).get_backend_name()
+
+    if backend == 'sqlite':
+        busy_ms = _setting(settings, 'DB_SQLITE_BUSY_TIMEOUT_MS', 5000)
+        # pysqlite's own lock wait, matching busy_timeout
+        return {'connect_args': {'timeout': busy_ms / 1000.0}}
+
+    if backend == 'postgresql':
+        statement_ms = _setting(settings, 'DB_STATEMENT_TIMEOUT_MS', 30000)
+        lock_ms = _setting(settings, 'DB_LOCK_TIMEOUT_MS', 5000)
+        options = f'-c statement_timeout={int(statement_ms)} -c lock_timeout={int(lock_ms)}'
+        return {
+            'pool_size': _setting(settings, 'DB_POOL_SIZE', 5),
+            'max_overflow': _setting(settings, 'DB_MAX_OVERFLOW', 10),
+            'pool_timeout': _setting(settings, 'DB_POOL_TIMEOUT', 30),
+            'pool_recycle': _setting(settings, 'DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': True,
+            'connect_args': {
+                'options': options,
+                'application_name': _setting(settings, 'DB_APPLICATION_NAME', 'dt-playbook'),
+            },
+        }
+
+    return {'pool_pre_ping': True}
+
+
+def sqlite_pragmas(settings: Mapping = None, memory: bool = False) -> Dict[str, object]:
+    """PRAGMA name -> value applied to each new SQLite connection (in order)."""
+    pragmas = {}
+    if not memory:
+        pragmas['journal_mode'] = _setting(settings, 'DB_SQLITE_JOURNAL_MODE', 'WAL')
+    pragmas['synchronous'] = _setting(settings, 'DB_SQLITE_SYNCHRONOUS', 'NORMAL')
+    pragmas['busy_timeout'] = _setting(settings, 'DB_SQLITE_BUSY_TIMEOUT_MS', 5000)
+    if not memory:
+        pragmas['mmap_size'] = _setting(settings, 'DB_SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+        pragmas['journal_size_limit'] = 64 * 1024 * 1024
+    # Negative cache_size is KiB rather than pages
+    pragmas['cache_size'] = _setting(settings, 'DB_SQLITE_CACHE_SIZE', -64 * 1024)
+    pragmas['temp_store'] = 'MEMORY'
+    return pragmas
+
+
+def install_sqlite_pragmas(engine, settings: Mapping = None) -> None:
+    """Apply sqlite_pragmas() whenever the engine opens a connection"""
+    pragmas = sqlite_pragmas(settings, memory=is_memory_sqlite(engine.url))
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def apply_engine_profile(app) -> None:
+    """
+    Merge the dialect profile into SQLALCHEMY_ENGINE_OPTIONS (before db.init_app)
+
+    Args:
+        app: Flask app
+    """
+    profile = engine_options_for(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+    overrides = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+
+    options = {**profile, **overrides}
+    if 'connect_args' in profile and 'connect_args' in overrides:
+        options['connect_args'] = {**profile['connect_args'], **overrides['connect_args']}
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+class SQLiteMaintenance:
+    """Periodic WAL checkpoint and PRAGMA optimize for the SQLite profile"""
+
+    def __init__(self):
+        self._app = None
+        self._task = PeriodicTask('sqlite-maintenance', 600, self.run)
+
+    def init_app(self, app, engine) -> None:
+        """Install pragmas on the engine and schedule maintenance (SQLite only)"""
+        if not is_sqlite(engine.url):
+            return
+
+        # Call before the engine's first connection (i.e. before create_all)
+        install_sqlite_pragmas(engine, app.config)
+
+        if not is_memory_sqlite(engine.url):
+            self._app = app
+            self._task.interval = app.config.get('DB_SQLITE_MAINTENANCE_INTERVAL_SECONDS', 600)
+        app.extensions['sqlite_maintenance'] = self
+
+    def ensure_started(self) -> None:
+        """Start the maintenance thread in this process (no-op if not SQLite/disabled)"""
+        if self._app is not None and self._task.interval > 0:
+            self._task.ensure_started()
+
+    def run(self) -> Dict[str, int]:
+        """
+        Checkpoint the WAL into the database file and refresh planner stats
+
+        PASSIVE never waits on readers or writers; once the WAL has been
+        fully checkpointed SQLite reuses it from the start, and
+        journal_size_limit bounds the file left on disk.
+
+        Returns:
+            dict: {'busy', 'wal_pages', 'checkpointed'} from wal_checkpoint
+        """
+        from models import db
+
+        with self._app.app_context():
+            with db.engine.connect() as connection:
+                busy, wal_pages, checkpointed = connection.execute(
+                    text('PRAGMA wal_checkpoint(PASSIVE)')
+                ).one()
+                connection.execute(text('PRAGMA optimize'))
+                connection.commit()
+
+        logger.debug(f"SQLite checkpoint: {checkpointed}/{wal_pages} WAL pages (busy={busy})")
+        return {'busy': busy, 'wal_pages': wal_pages, 'checkpointed': checkpointed}
+
+
+# Shared instance (one per worker process)
+sqlite_maintenance = SQLiteMaintenance()
@@ -0,0 +1,330 @@
+"""
+Image Derivatives
+Ingest-time processing of uploaded images, run on a background executor
+after the upload commits:
+
+- Metadata: pixel dimensions, content bounding box (non-white area) and
+  dominant mode ('L' for grayscale drawings, 'RGB', or 'RGBA' when the
+  image has transparency)
+- Field-ready rendition: autocropped, resized to the mapped box at
+  IMAGE_RENDITION_DPI and placed exactly as the PDF generator would place
+  it, so generation inserts it without decoding or resizing
+- Thumbnail: a small JPEG for the frontend
+
+Derived files live under UPLOAD_FOLDER/derived and are named by content
+hash, so identical images (shared blobs, provisioned projects) are
+processed once. With a STORAGE_BACKEND they are published like any other
+upload, so every node can serve and render with them. The generator falls back to processing the original when a
+rendition is missing or was made for a different field geometry.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from PIL import Image, ImageChops
+from sqlalchemy import update
+
+from models import db, ImageUpload
+from pdf_mappings import FIELD_INDEX, get_field_mapping
+from services import metrics
+from services.storage import artifacts
+from utils.hashing import sha256_file
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIRNAME = 'derived'
+PDF_POINTS_PER_INCH = 72
+
+
+# ============================================================================
+# IMAGE PROCESSING
+# ============================================================================
+
+def content_box(img: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box of everything that is not white or transparent (None if blank)."""
+    rgba = img if img.mode == 'RGBA' else img.convert('RGBA')
+    # Flatten onto white: getbbox() of an RGBA difference only looks at alpha
+    flattened = Image.new('RGB', rgba.size, (255, 255, 255))
+    flattened.paste(rgba, mask=rgba.getchannel('A'))
+    return ImageChops.difference(flattened, Image.new('RGB', rgba.size, (255, 255, 255))).getbbox()
+
+
+def dominant_mode(img: Image.Image) -> str:
+    """'RGBA' if any pixel is transparent, 'L' if all pixels are gray, else 'RGB'."""
+    rgba = img if img.mode == 'RGBA' else img.convert('RGBA')
+    if rgba.getchannel('A').getextrema()[0] < 255:
+        return 'RGBA'
+    red, green, blue, _ = rgba.split()
+    if ImageChops.difference(red, green).getbbox() is None and \
+            ImageChops.difference(green, blue).getbbox() is None:
+        return 'L'
+    return 'RGB'
+
+
+def fit_image_to_field(
+    img: Image.Image,
+    field_config: Dict[str, Any],
+    dpi: int = PDF_POINTS_PER_INCH
+) -> Tuple[Image.Image, Tuple[float, float, float, float]]:
+    """
+    Autocrop and resize an image for a mapped image field
+
+    Blank canvas margins are cropped (keeping crop_padding), the image is
+    scaled to the box ('contain' or 'cover') and centered.
+
+    Args:
+        img: Source image
+        field_config: Field mapping (x, y, width, height, fit, crop_padding)
+        dpi: Output resolution (72 = one pixel per PDF point)
+
+    Returns:
+        tuple: (resized RGBA image, placement rect (x0, y0, x1, y1) in PDF points)
+    """
+    x = field_config['x']
+    y = field_config['y']
+    width = field_config['width']
+    height = field_config['height']
+    fit = field_config.get('fit', 'contain')
+
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+
+    # Crop away large blank canvas margins (common for drawings)
+    # This keeps drawings "comfy" inside placeholders and avoids giant white boxes.
+    try:
+        bbox = content_box(img)
+        if bbox:
+            pad = int(field_config.get('crop_padding', 10))
+            left = max(0, bbox[0] - pad)
+            top = max(0, bbox[1] - pad)
+            right = min(img.size[0], bbox[2] + pad)
+            bottom = min(img.size[1], bbox[3] + pad)
+            img = img.crop((left, top, right, bottom))
+    except Exception:
+        # Cropping is best-effort.
+        pass
+
+    # Calculate scaling to maintain aspect ratio
+    img_width, img_height = img.size
+    scale_w = width / img_width
+    scale_h = height / img_height
+    scale = min(scale_w, scale_h) if fit == 'contain' else max(scale_w, scale_h)
+
+    new_width = int(img_width * scale)
+    new_height = int(img_height * scale)
+
+    # Center image in field
+    offset_x = (width - new_width) / 2
+    offset_y = (height - new_height) / 2
+    rect = (x + offset_x, y + offset_y, x + offset_x + new_width, y + offset_y + new_height)
+
+    pixel_size = (
+        max(1, round(new_width * dpi / PDF_POINTS_PER_INCH)),
+        max(1, round(new_height * dpi / PDF_POINTS_PER_INCH))
+    )
+    return img.resize(pixel_size, Image.Resampling.LANCZOS), rect
+
+
+def field_geometry_key(field_config: Dict[str, Any], dpi: int) -> str:
+    """Short key of everything a rendition depends on besides the image."""
+    geometry = [field_config.get(key) for key in ('x', 'y', 'width', 'height', 'fit', 'crop_padding')]
+    return hashlib.sha1(json.dumps(geometry + [dpi]).encode('utf-8')).hexdigest()[:12]
+
+
+def derived_path(upload_root, content_key: str, suffix: str) -> Path:
+    """UPLOAD_FOLDER/derived/<h0h1>/<h2h3>/<content_key>-<suffix>"""
+    return Path(upload_root, DERIVED_DIRNAME, content_key[:2], content_key[2:4], f"{content_key}-{suffix}")
+
+
+def _save_atomic(img: Image.Image, path: Path, **save_options) -> None:
+    """Write through a temporary file so readers never see a partial image, then publish it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix='incoming-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            img.save(out, **save_options)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+    artifacts.publish(path)
+
+
+def build_derivatives(
+    source_path: str,
+    content_key: str,
+    field_config: Optional[Dict[str, Any]],
+    upload_root,
+    dpi: int = PDF_POINTS_PER_INCH,
+    thumbnail_size: int = 256
+) -> Dict[str, Any]:
+    """
+    Produce the metadata, thumbnail and field rendition of an image
+
+    Files that already exist (same content, same geometry), on this node or
+    in shared storage, are reused.
+
+    Args:
+        source_path: Original image file
+        content_key: SHA-256 of the original (names the derived files)
+        field_config: Mapping of the image field (None: no rendition)
+        upload_root: UPLOAD_FOLDER
+        dpi: Rendition resolution
+        thumbnail_size: Longest thumbnail side in pixels
+
+    Returns:
+        dict: ImageUpload column values (image_width, image_height, crop_box,
+            dominant_mode, thumbnail_path, rendition_path, rendition_meta)
+    """
+    with Image.open(source_path) as img:
+        img.load()
+        rgba = img.convert('RGBA')
+
+    mode = dominant_mode(rgba)
+    bbox = content_box(rgba)
+    values = {
+        'image_width': rgba.size[0],
+        'image_height': rgba.size[1],
+        'crop_box': list(bbox) if bbox else None,
+        'dominant_mode': mode,
+        'rendition_path': None,
+        'rendition_meta': None,
+    }
+
+    thumbnail_path = derived_path(upload_root, content_key, f"thumb{thumbnail_size}.jpg")
+    if not artifacts.exists(thumbnail_path):
+        thumbnail = Image.new('RGB', rgba.size, (255, 255, 255))
+        thumbnail.paste(rgba, mask=rgba.getchannel('A'))
+        thumbnail.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+        _save_atomic(thumbnail, thumbnail_path, format='JPEG', quality=80, optimize=True)
+    values['thumbnail_path'] = str(thumbnail_path)
+
+    if field_config:
+        key = field_geometry_key(field_config, dpi)
+        rendition, rect = fit_image_to_field(rgba, field_config, dpi)
+        rendition_path = derived_path(upload_root, content_key, f"{key}.png")
+        if not artifacts.exists(rendition_path):
+            if mode != 'RGBA':
+                rendition = rendition.convert(mode)
+            _save_atomic(rendition, rendition_path, format='PNG')
+        values['rendition_path'] = str(rendition_path)
+        values['rendition_meta'] = {'rect': list(rect), 'dpi': dpi, 'key': key}
+
+    return values
+
+
+def usable_rendition(rendition: Optional[Dict[str, Any]], field_config: Dict[str, Any]) -> bool:
+    """True if a stored rendition exists and matches the field's current geometry."""
+    if not rendition or not rendition.get('path'):
+        return False
+    if rendition.get('key') != field_geometry_key(field_config, rendition.get('dpi')):
+        return False
+    return Path(rendition['path']).exists()
+
+
+def localize_renditions(renditions: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Renditions with local paths (cached copies of ones built on other nodes)"""
+    paths = artifacts.localize({name: rendition['path'] for name, rendition in renditions.items()})
+    return {name: {**rendition, 'path': paths[name]} for name, rendition in renditions.items()}
+
+
+# ============================================================================
+# BACKGROUND PIPELINE
+# ============================================================================
+
+class ImageDerivativePipeline:
+    """Builds derivatives of committed uploads on a per-process thread pool"""
+
+    def __init__(self):
+        self._app = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        """Bind to the Flask app"""
+        self._app = app
+        app.extensions['image_derivatives'] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self._app is not None and self._app.config.get('IMAGE_DERIVATIVES_ENABLED', True)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Executor threads do not survive gunicorn's fork: one pool per process
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._app.config.get('IMAGE_DERIVATIVE_WORKERS', 1),
+                        thread_name_prefix='image-derivatives'
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, image_ids: Iterable[int]) -> None:
+        """Queue derivative builds for committed ImageUpload rows"""
+        if not self.enabled:
+            return
+        for image_id in image_ids:
+            self._pool().submit(self._run, image_id)
+
+    def _run(self, image_id: int) -> None:
+        with self._app.app_context():
+            try:
+                self.process_image(image_id)
+            except Exception as e:
+                db.session.rollback()
+                metrics.increment('images.derivatives_failed')
+                logger.warning(f"Image derivatives failed for image {image_id}: {e}")
+            finally:
+                db.session.remove()
+
+    def process_image(self, image_id: int) -> bool:
+        """
+        Build and record the derivatives of one image (commits)
+
+        The row is only updated if it still points at the processed file;
+        a newer upload to the same field gets its own run.
+
+        Returns:
+            bool: True if the row was updated
+        """
+        image = db.session.get(ImageUpload, image_id)
+        source = artifacts.local_path(image.file_path) if image is not None else None
+        if source is None:
+            return False
+
+        config = self._app.config
+        field = FIELD_INDEX.get(image.field_name)
+        field_config = get_field_mapping(field['page'], image.field_name) \
+            if field and field['field_type'] == 'image' else None
+
+        values = build_derivatives(
+            str(source),
+            image.content_hash or sha256_file(source),
+            field_config,
+            config['UPLOAD_FOLDER'],
+            dpi=config.get('IMAGE_RENDITION_DPI', PDF_POINTS_PER_INCH),
+            thumbnail_size=config.get('IMAGE_THUMBNAIL_SIZE', 256)
+        )
+        result = db.session.execute(
+            update(ImageUpload)
+            .where(ImageUpload.id == image_id, ImageUpload.file_path == image.file_path)
+            .values(derived_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        metrics.increment('images.derivatives_built')
+        return result.rowcount > 0
+
+
+# Global instance (bound in create_app)
+derivatives = ImageDerivativePipeline()
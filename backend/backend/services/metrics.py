@@ -0,0 +1,48 @@
+"""
+In-Process Metrics Counters
+Lightweight, thread-safe counters for operational visibility.
+
+Counters are kept per worker process (gunicorn forks several), so the
+values exposed by /api/metrics describe the worker that served the request.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = defaultdict(int)
+
+
+def increment(name: str, value: int = 1) -> None:
+    """
+    Increment a named counter
+
+    Args:
+        name: Counter name (dotted, e.g. 'pdf_render.cancelled')
+        value: Amount to add
+    """
+    with _lock:
+        _counters[name] += value
+
+
+def get(name: str) -> int:
+    """Get the current value of a counter (0 if never incremented)"""
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot() -> Dict[str, int]:
+    """
+    Get a copy of all counters
+
+    Returns:
+        dict: counter name -> value
+    """
+    with _lock:
+        return dict(_counters)
+
+
+def reset() -> None:
+    """Reset all counters (used by tests)"""
+    with _lock:
+        _counters.clear()
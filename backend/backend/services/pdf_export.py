@@ -0,0 +1,284 @@
+"""
+Bulk PDF Export
+One ZIP download with the PDFs of a whole class (school and grade).
+
+- An export fixes its project list when created (PdfExport row). The ZIP
+  is then streamed in that order: a project's latest PDF is reused when it
+  was rendered at the project's current revision, otherwise the project is
+  rendered on a bounded RenderPool a few projects ahead of the stream
+- Each entry (size and CRC-32 included) is recorded on the export row
+  before its bytes are sent. The archive layout is therefore fixed by the
+  recorded entries (utils/zipstream.py), which gives resumable downloads:
+  a Range request regenerates the stream from any offset
+- The row doubles as the progress registry: every worker (and the status
+  endpoint) sees how many projects were resolved, rendered or skipped
+
+Projects without any answers have no PDF and are skipped, as are archived
+projects; a project whose render fails is recorded as failed and left out.
+"""
+import logging
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from models import db, User, Project, GeneratedPDF, PdfExport
+from services import metrics
+from services.autosave_buffer import autosave
+from services.project_archive import ARCHIVED_STATUS
+from services.render_pool import RenderPool, build_render_job, record_render
+from services.storage import artifacts
+from services.storage_lifecycle import lifecycle
+from utils.zipstream import archive_size, crc32_file
+
+logger = logging.getLogger(__name__)
+
+
+class PdfExportError(ValueError):
+    """Raised when an export cannot be created (e.g. too many projects)"""
+
+
+class ExportFilesChanged(Exception):
+    """Raised when a recorded PDF is gone, so the archive can no longer be reproduced"""
+
+
+def create_export(
+    school: str,
+    grade: Optional[str] = None,
+    max_projects: int = 1000,
+    retention_days: int = 7
+) -> PdfExport:
+    """
+    Create an export of a class's projects (commits)
+
+    Args:
+        school: School of the students
+        grade: Grade of the students (omit for the whole school)
+        max_projects: Refuse larger exports
+        retention_days: Exports older than this are deleted first
+
+    Returns:
+        PdfExport: The new export
+
+    Raises:
+        PdfExportError: If the class has more than max_projects projects
+    """
+    PdfExport.query.filter(
+        PdfExport.created_at < datetime.utcnow() - timedelta(days=retention_days)
+    ).delete(synchronize_session=False)
+
+    query = (
+        db.session.query(Project.id)
+        .join(User, User.id == Project.user_id)
+        .filter(User.school == school, Project.status != ARCHIVED_STATUS)
+        .order_by(User.username, Project.id)
+    )
+    if grade:
+        query = query.filter(User.grade == grade)
+    project_ids = [project_id for (project_id,) in query.limit(max_projects + 1)]
+    if len(project_ids) > max_projects:
+        raise PdfExportError(f"More than {max_projects} projects; export one grade at a time")
+
+    export = PdfExport(id=uuid.uuid4().hex, school=school, grade=grade or None,
+                       project_ids=project_ids, entries=[])
+    db.session.add(export)
+    db.session.commit()
+    return export
+
+
+def export_progress(export: PdfExport) -> Dict[str, Any]:
+    """Progress of an export (also the status endpoint's payload)"""
+    entries = export.entries or []
+    recorded = [entry for entry in entries if entry and 'path' in entry]
+    failed = sum(1 for entry in entries if entry and entry.get('failed'))
+    complete = export.completed_at is not None
+    return {
+        'export_id': export.id,
+        'school': export.school,
+        'grade': export.grade,
+        'status': 'complete' if complete else 'pending',
+        'projects': len(export.project_ids),
+        'processed': len(entries),
+        'rendered': sum(1 for entry in recorded if entry.get('rendered')),
+        'reused': sum(1 for entry in recorded if not entry.get('rendered')),
+        'failed': failed,
+        'skipped': len(entries) - len(recorded) - failed,
+        'size': archive_size(zip_entries(export)) if complete else None,
+        'created_at': export.created_at.isoformat() if export.created_at else None,
+        'completed_at': export.completed_at.isoformat() if complete else None
+    }
+
+
+def zip_entries(export: PdfExport) -> List[Dict[str, Any]]:
+    """utils.zipstream entries of the projects resolved so far"""
+    return [_zip_entry(entry) for entry in export.entries or [] if entry and 'path' in entry]
+
+
+def check_files(entries: List[Dict[str, Any]]) -> bool:
+    """Whether every recorded PDF still exists (here or in shared storage) with its recorded size"""
+    for entry in entries:
+        path = artifacts.local_path(entry['path'])
+        if path is None or path.stat().st_size != entry['size']:
+            return False
+    return True
+
+
+def _zip_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {**entry, 'modified': datetime.fromisoformat(entry['modified']) if entry.get('modified') else None}
+
+
+# ============================================================================
+# RESOLVING ENTRIES
+# ============================================================================
+
+def _local_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The entry with a path this node can read (recorded paths are canonical)"""
+    path = artifacts.local_path(entry['path'])
+    return {**entry, 'path': str(path)} if path is not None else entry
+
+
+def _pdf_entry(project: Project, pdf: GeneratedPDF, local_path: Path, rendered: bool) -> Dict[str, Any]:
+    return {
+        'pdf_id': pdf.id,
+        'name': f"{project.user.username}_{project.id}.pdf",
+        'path': pdf.file_path,
+        'size': local_path.stat().st_size,
+        'crc': crc32_file(local_path),
+        'modified': pdf.generated_at.isoformat() if pdf.generated_at else None,
+        'rendered': rendered
+    }
+
+
+def _plan(project_id: int) -> tuple:
+    """
+    Decide how a project is exported
+
+    Returns:
+        tuple: ('entry', entry), ('render', job) or ('skip', None)
+    """
+    autosave.flush_project(project_id)
+    project = db.session.get(Project, project_id)
+    if project is None or project.status == ARCHIVED_STATUS:
+        return 'skip', None
+
+    latest = (
+        GeneratedPDF.query
+        .filter_by(project_id=project_id, project_revision=project.revision)
+        .order_by(GeneratedPDF.id.desc())
+        .first()
+    )
+    local_path = artifacts.local_path(latest.file_path) if latest is not None else None
+    if local_path is not None:
+        return 'entry', _pdf_entry(project, latest, local_path, rendered=False)
+
+    job = build_render_job(project)
+    if job is None:
+        return 'skip', None
+    return 'render', job
+
+
+def _record_rendered(job: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    project = db.session.get(Project, job['project_id'])
+    pdf = record_render(project, job, result)
+    db.session.commit()
+    metrics.increment('pdf_export.rendered')
+
+    try:
+        lifecycle.enforce_retention(project.id)
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"PDF retention failed for project {project.id}: {e}")
+    return _pdf_entry(project, pdf, Path(result['path']), rendered=True)
+
+
+def _record_entry(export_id: str, index: int, entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Record the entry of project `index` (commits)
+
+    Returns:
+        The recorded entry: another download of the same export may have
+        recorded this index first, and its entry wins
+    """
+    export = db.session.get(PdfExport, export_id, with_for_update=True, populate_existing=True)
+    entries = list(export.entries or [])
+    if len(entries) > index:
+        db.session.rollback()
+        return entries[index]
+
+    entries.append(entry)
+    export.entries = entries
+    if len(entries) == len(export.project_ids):
+        export.completed_at = datetime.utcnow()
+    db.session.commit()
+    return entry
+
+
+def resolve_entries(export: PdfExport, pool: RenderPool, lookahead: int = 4) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the export's ZIP entries in order, resolving the remaining projects
+
+    Projects already recorded are replayed as they are. For the others, up
+    to `lookahead` projects are planned ahead of the one being yielded so
+    their renders overlap with streaming; each entry is recorded before it
+    is yielded.
+
+    Args:
+        export: The export
+        pool: Pool for projects that need a render
+        lookahead: Projects planned ahead of the stream
+
+    Yields:
+        dict: utils.zipstream entries (skipped projects yield nothing)
+    """
+    export_id = export.id
+    project_ids = list(export.project_ids)
+    recorded = list(export.entries or [])
+
+    for entry in recorded:
+        if entry and 'path' in entry:
+            yield _local_entry(_zip_entry(entry))
+
+    pending = deque()
+    next_index = len(recorded)
+
+    def plan_ahead():
+        nonlocal next_index
+        while next_index < len(project_ids) and len(pending) < max(1, lookahead):
+            kind, value = _plan(project_ids[next_index])
+            if kind == 'render':
+                value = (value, pool.submit(value))
+            pending.append((next_index, kind, value))
+            next_index += 1
+
+    plan_ahead()
+    while pending:
+        index, kind, value = pending.popleft()
+        entry = value if kind == 'entry' else None
+        if kind == 'render':
+            job, future = value
+            try:
+                entry = _record_rendered(job, future.result())
+            except Exception as e:
+                db.session.rollback()
+                entry = {'project_id': job['project_id'], 'failed': True}
+                metrics.increment('pdf_export.render_failed')
+                logger.warning(f"Export {export_id}: rendering project {job['project_id']} failed: {e}")
+
+        entry = _record_entry(export_id, index, entry)
+        plan_ahead()
+        if entry and 'path' in entry:
+            yield _local_entry(_zip_entry(entry))
+
+
+def complete_export(export: PdfExport, pool: RenderPool, lookahead: int = 4) -> List[Dict[str, Any]]:
+    """
+    Resolve every remaining project and return all ZIP entries
+
+    Raises:
+        ExportFilesChanged: If a recorded PDF is gone or changed
+    """
+    entries = list(resolve_entries(export, pool, lookahead))
+    if not check_files(entries):
+        raise ExportFilesChanged(f"PDFs of export {export.id} were removed; create a new export")
+    return entries
@@ -11,7 +11,6 @@ GUARANTEES:
 """
 import fitz  # PyMuPDF
 from PIL import Image
-from PIL import ImageChops
 import io
 import textwrap
 from pathlib import Path
@@ -30,6 +29,11 @@ from pdf_mappings import (
 )
 from services.pdf_field_validator import PDFFieldValidator
 from services.pdf_debug_renderer import PDFDebugRenderer
+from services.render_cancellation import CancellationToken, RenderCancelled
+from services.coverage import format_coverage_report
+from services.image_derivatives import fit_image_to_field, usable_rendition
+from services import metrics
+from utils.sharding import shard_path
 
 logger = logging.getLogger(__name__)
 
@@ -73,7 +77,10 @@ class PDFGeneratorService:
         self,
         user_responses: Dict[str, Any],
         output_filename: str,
-        images: Optional[Dict[str, str]] = None
+        images: Optional[Dict[str, str]] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        coverage: Optional[Dict[str, Any]] = None,
+        renditions: Optional[Dict[str, Dict[str, Any]]] = None
     ) -> Path:
         """
         Generate a filled PDF with GUARANTEED RENDERING
@@ -89,6 +96,12 @@ class PDFGeneratorService:
             user_responses: Dictionary of field_name -> value
             output_filename: Name for the output PDF file
             images: Dictionary of field_name -> image_path
+            cancel_token: Optional token checked between pages and image fields
+            coverage: Project coverage counters; when given, the report is
+                built from them instead of scanning every mapping
+            renditions: field_name -> precomputed field-ready image
+                ({"path", "rect", "dpi", "key"}); inserted as-is when they
+                match the field geometry, otherwise the original is processed
             
         Returns:
             Path: Path to the generated PDF
@@ -97,6 +110,8 @@ class PDFGeneratorService:
             FileNotFoundError: If template doesn't exist
             ValueError: If rendering fails
             RuntimeError: If critical field cannot be rendered
+            RenderCancelled: If cancel_token was tripped (checked last before the
+                save, so a cancelled render never writes a file)
         """
         trace_id = str(uuid.uuid4())[:8]
         start_time = time.time()
@@ -112,9 +127,12 @@ class PDFGeneratorService:
             logger.warning(f"[{trace_id}] ⚠️  No user data provided - generating empty PDF")
         
         # Generate coverage report
-        coverage_report = self.validator.generate_coverage_report(
-            user_responses, images, trace_id
-        )
+        if coverage is not None:
+            coverage_report = format_coverage_report(coverage, trace_id)
+        else:
+            coverage_report = self.validator.generate_coverage_report(
+                user_responses, images, trace_id
+            )
         logger.info(coverage_report)
         
         # Generate debug PDF if enabled
@@ -144,6 +162,9 @@ class PDFGeneratorService:
             
             # GUARANTEED RENDERING - Process each page
             for page_num in range(1, len(pdf_document) + 1):
+                if cancel_token:
+                    cancel_token.check()
+                
                 page = pdf_document[page_num - 1]  # 0-indexed in PyMuPDF
                 page_fields = get_page_fields(page_num)
                 
@@ -175,7 +196,19 @@ class PDFGeneratorService:
                         
                         elif field_type == 'image':
                             image_path = images.get(field_name) if images else None
-                            if image_path and Path(image_path).exists():
+                            if image_path and cancel_token:
+                                cancel_token.check()
+                            
+                            rendition = renditions.get(field_name) if renditions and image_path else None
+                            if rendition and usable_rendition(rendition, field_config):
+                                logger.info(f"[{trace_id}]   ✓ image      '{field_name}' = {Path(image_path).name} (rendition)")
+                                
+                                # Precomputed at ingest: only the coordinates need checking
+                                self._validate_text_field(page, field_config, field_name, page_num)
+                                self._insert_rendition(page, rendition, field_name, trace_id)
+                                fields_with_data += 1
+                            
+                            elif image_path and Path(image_path).exists():
                                 logger.info(f"[{trace_id}]   ✓ image      '{field_name}' = {Path(image_path).name}")
                                 
                                 # GUARANTEE: Validate before rendering
@@ -211,6 +244,9 @@ class PDFGeneratorService:
                                 else:
                                     logger.debug(f"[{trace_id}]   - table      '{field_name}' [NO DATA]")
                     
+                    except RenderCancelled:
+                        raise
+                    
                     except Exception as e:
                         fields_failed += 1
                         failed_fields.append({
@@ -221,10 +257,15 @@ class PDFGeneratorService:
                         })
                         logger.error(f"[{trace_id}]   ✗ FAILED: '{field_name}' on page {page_num}: {e}", exc_info=True)
             
+            # Last chance to abort before paying for the save
+            if cancel_token:
+                cancel_token.check()
+            
             # Generate unique output filename to avoid race conditions
             timestamp = int(time.time() * 1000)
             safe_filename = f"{timestamp}_{output_filename}"
-            output_path = self.output_dir / safe_filename
+            output_path = shard_path(self.output_dir, safe_filename)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
             
             # GUARANTEE: Save with error handling
             try:
@@ -264,8 +305,16 @@ class PDFGeneratorService:
                     raise RuntimeError(f"More fields failed ({fields_failed}) than succeeded ({fields_with_data})")
             
             logger.info(f"[{trace_id}] {'='*60}")
+            metrics.increment('pdf_render.completed')
             
             return output_path
+        
+        except RenderCancelled as e:
+            metrics.increment('pdf_render.cancelled')
+            metrics.increment(f'pdf_render.cancelled.{e.reason}')
+            duration = time.time() - start_time
+            logger.warning(f"[{trace_id}] 🛑 PDF GENERATION CANCELLED ({e.reason}) after {duration:.2f}s")
+            raise
             
         finally:
             pdf_document.close()
@@ -457,54 +506,14 @@ class PDFGeneratorService:
         """Insert image with guaranteed rendering - raises on failure"""
         x = field_config['x']
         y = field_config['y']
-        width = field_config['width']
-        height = field_config['height']
-        fit = field_config.get('fit', 'contain')
         
         try:
             with Image.open(image_path) as img:
-                # Convert to RGB if necessary
-                if img.mode not in ('RGBA', 'RGB', 'L'):
-                    img = img.convert('RGBA')
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
-
-                # Crop away large blank canvas margins (common for drawings)
-                # This keeps drawings "comfy" inside placeholders and avoids giant white boxes.
-                try:
-                    bg = Image.new('RGBA', img.size, (255, 255, 255, 255))
-                    diff = ImageChops.difference(img, bg)
-                    bbox = diff.getbbox()
-                    if bbox:
-                        pad = int(field_config.get('crop_padding', 10))
-                        left = max(0, bbox[0] - pad)
-                        top = max(0, bbox[1] - pad)
-                        right = min(img.size[0], bbox[2] + pad)
-                        bottom = min(img.size[1], bbox[3] + pad)
-                        img = img.crop((left, top, right, bottom))
-                except Exception:
-                    # Cropping is best-effort.
-                    pass
-                
-                # Calculate scaling to maintain aspect ratio
                 img_width, img_height = img.size
-                scale_w = width / img_width
-                scale_h = height / img_height
                 
-                if fit == 'contain':
-                    scale = min(scale_w, scale_h)
-                else:
-                    scale = max(scale_w, scale_h)
-                
-                new_width = int(img_width * scale)
-                new_height = int(img_height * scale)
-                
-                # Center image in field
-                offset_x = (width - new_width) / 2
-                offset_y = (height - new_height) / 2
-                
-                # Resize image
-                img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                # Autocrop, scale and center in the field (same as ingest renditions)
+                img_resized, rect = fit_image_to_field(img, field_config)
+                new_width, new_height = img_resized.size
                 
                 # Convert to bytes
                 img_bytes = io.BytesIO()
@@ -512,13 +521,7 @@ class PDFGeneratorService:
                 img_bytes.seek(0)
                 
                 # PyMuPDF uses TOP-LEFT origin for Rect
-                # Define image rectangle directly without coordinate conversion
-                img_rect = fitz.Rect(
-                    x + offset_x,
-                    y + offset_y,
-                    x + offset_x + new_width,
-                    y + offset_y + new_height
-                )
+                img_rect = fitz.Rect(*rect)
                 
                 # Insert image with overlay=True to ensure visibility
                 page.insert_image(img_rect, stream=img_bytes.getvalue(), overlay=True)
@@ -529,6 +532,22 @@ class PDFGeneratorService:
             logger.error(f"[{trace_id}] Image insertion failed for '{field_name}': {e}")
             raise
     
+    def _insert_rendition(
+        self,
+        page: fitz.Page,
+        rendition: Dict[str, Any],
+        field_name: str,
+        trace_id: str
+    ) -> None:
+        """Insert a precomputed field-ready image at its stored placement - raises on failure"""
+        try:
+            page.insert_image(fitz.Rect(*rendition['rect']), filename=rendition['path'], overlay=True)
+            metrics.increment('pdf_render.renditions_used')
+            logger.debug(f"[{trace_id}]     → Rendition at {rendition['rect']} ({rendition['dpi']} dpi)")
+        except Exception as e:
+            logger.error(f"[{trace_id}] Rendition insertion failed for '{field_name}': {e}")
+            raise
+    
     def _insert_single_line_safe(
         self,
         page: fitz.Page,
@@ -917,7 +936,10 @@ def generate_pdf(
     output_dir: str,
     user_responses: Dict[str, Any],
     output_filename: str,
-    images: Optional[Dict[str, str]] = None
+    images: Optional[Dict[str, str]] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    coverage: Optional[Dict[str, Any]] = None,
+    renditions: Optional[Dict[str, Dict[str, Any]]] = None
 ) -> Path:
     """
     Generate a filled PDF (convenience function)
@@ -928,9 +950,14 @@ def generate_pdf(
         user_responses: User response data
         output_filename: Output filename
         images: Image paths dictionary
+        cancel_token: Optional cancellation token
+        coverage: Optional coverage counters (skips the coverage scan)
+        renditions: Optional precomputed field-ready images
         
     Returns:
         Path to generated PDF
     """
     generator = PDFGeneratorService(template_path, output_dir)
-    return generator.generate_filled_pdf(user_responses, output_filename, images)
+    return generator.generate_filled_pdf(
+        user_responses, output_filename, images, cancel_token, coverage, renditions
+    )
@@ -0,0 +1,346 @@
+"""
+Project Archive
+Moves long-completed projects out of the hot tables:
+
+- Archive: the project's responses, image rows and PDF rows become one
+  zlib-compressed JSON document in archived_projects, and its files move
+  to ARCHIVE_DIR/<id // 1000>/<id>/. The projects row stays (status
+  'archived', coverage kept for listings) so ownership and listings work.
+  archived_pdfs keeps each PDF ID's project, so old download links and
+  the PDF history can rehydrate the project they belong to.
+- Rehydrate: the first read or write of an archived project restores the
+  rows and files (ensure_hot), then the project is an ordinary one again.
+
+Image files that are shared (blobs, provisioned starters) are linked or
+copied into the archive; the originals are only released after the
+archive commits, through the usual reference checks.
+"""
+import json
+import logging
+import os
+import shutil
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import delete, update
+
+from models import (
+    db, Project, Response, ImageUpload, GeneratedPDF, ArchivedProject, ArchivedPDF, build_project_snapshot
+)
+from services import metrics
+from services.coverage import compute_coverage
+from services.storage import artifacts
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT_VERSION = 1
+ARCHIVED_STATUS = 'archived'
+
+# project_id -> True once known not to be archived (per worker)
+_hot_cache = TTLCache(maxsize=50000)
+
+
+def archive_dir_for(archive_root, project_id: int) -> Path:
+    """ARCHIVE_DIR/<project_id // 1000>/<project_id>"""
+    return Path(archive_root, str(project_id // 1000), str(project_id))
+
+
+def _row_values(row, exclude=()) -> Dict[str, Any]:
+    values = {}
+    for column in row.__table__.columns:
+        if column.name in exclude:
+            continue
+        value = getattr(row, column.name)
+        values[column.name] = value.isoformat() if isinstance(value, datetime) else value
+    return values
+
+
+def _restore_values(values: Dict[str, Any], model) -> Dict[str, Any]:
+    restored = {}
+    for column in model.__table__.columns:
+        if column.name not in values:
+            continue
+        value = values[column.name]
+        if value is not None and isinstance(column.type, db.DateTime):
+            value = datetime.fromisoformat(value)
+        restored[column.name] = value
+    return restored
+
+
+def _link_or_copy(source: str, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.unlink(missing_ok=True)  # Left by an earlier, rolled-back attempt
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def read_document(payload: bytes) -> Dict[str, Any]:
+    """Decode an ArchivedProject payload: {"version", "project", "responses", "images", "generated_pdfs"}"""
+    return json.loads(zlib.decompress(payload))
+
+
+def find_archivable(older_than_days: int, limit: int = 100) -> List[int]:
+    """
+    IDs of projects completed (and untouched) for more than `older_than_days`
+
+    Args:
+        older_than_days: Minimum days since completion and last update
+        limit: Maximum IDs to return
+
+    Returns:
+        list: Project IDs, oldest completion first
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    rows = (
+        db.session.query(Project.id)
+        .filter(
+            Project.status == 'completed',
+            Project.completed_at < cutoff,
+            Project.updated_at < cutoff
+        )
+        .order_by(Project.completed_at)
+        .limit(limit)
+    )
+    return [project_id for (project_id,) in rows]
+
+
+def archive_project(project_id: int, archive_root) -> Optional[Dict[str, int]]:
+    """
+    Move a completed project's rows and files into the archive (commits)
+
+    Args:
+        project_id: Project ID (must have status 'completed')
+        archive_root: ARCHIVE_DIR
+
+    Returns:
+        dict: Row counts and payload sizes, or None if the project was not archivable
+    """
+    from services.autosave_buffer import autosave
+    from services.upload_service import release_file, remove_file_quietly
+
+    autosave.flush_project(project_id)
+
+    # Claim the project first: takes the write lock, and loses cleanly to
+    # a concurrent archive run or a new edit
+    claimed = db.session.execute(
+        update(Project)
+        .where(Project.id == project_id, Project.status == 'completed')
+        .values(status=ARCHIVED_STATUS)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        return None
+
+    try:
+        project = db.session.get(Project, project_id, populate_existing=True)
+        responses = Response.query.filter_by(project_id=project_id).all()
+        images = ImageUpload.query.filter_by(project_id=project_id).all()
+        pdfs = GeneratedPDF.query.filter_by(project_id=project_id).all()
+        target = archive_dir_for(archive_root, project_id)
+
+        image_entries = []
+        for image in images:
+            entry = _row_values(image, exclude=('project_id', *ImageUpload.DERIVED_COLUMNS))
+            source = artifacts.local_path(image.file_path)
+            if source is not None:
+                entry['archive_path'] = f"images/{image.id}_{Path(image.file_path).name}"
+                _link_or_copy(source, target / entry['archive_path'])
+            image_entries.append(entry)
+
+        pdf_entries = []
+        for pdf in pdfs:
+            entry = _row_values(pdf, exclude=('project_id',))
+            source = artifacts.local_path(pdf.file_path)
+            if source is not None:
+                entry['archive_path'] = f"pdfs/{pdf.id}_{Path(pdf.file_path).name}"
+                _link_or_copy(source, target / entry['archive_path'])
+            pdf_entries.append(entry)
+
+        document = {
+            'version': ARCHIVE_FORMAT_VERSION,
+            'project': {
+                'status': 'completed',
+                'completed_at': project.completed_at.isoformat() if project.completed_at else None,
+                'revision': project.revision or 0
+            },
+            'responses': [_row_values(r, exclude=('id', 'project_id')) for r in responses],
+            'images': image_entries,
+            'generated_pdfs': pdf_entries
+        }
+        raw = json.dumps(document, separators=(',', ':')).encode('utf-8')
+        payload = zlib.compress(raw, 9)
+
+        db.session.add(ArchivedProject(
+            project_id=project_id,
+            payload=payload,
+            raw_size=len(raw),
+            compressed_size=len(payload),
+            file_count=sum(1 for entry in image_entries + pdf_entries if 'archive_path' in entry)
+        ))
+        db.session.add_all(ArchivedPDF(pdf_id=pdf.id, project_id=project_id) for pdf in pdfs)
+
+        # Image rows go through the ORM so blob reference counts drop
+        for image in images:
+            db.session.delete(image)
+        db.session.execute(delete(Response).where(Response.project_id == project_id))
+        db.session.execute(delete(GeneratedPDF).where(GeneratedPDF.project_id == project_id))
+        project.snapshot = None  # Rebuilt from the rows on rehydration
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        shutil.rmtree(archive_dir_for(archive_root, project_id), ignore_errors=True)
+        raise
+
+    # Originals only go once the archive is committed
+    for entry in pdf_entries:
+        remove_file_quietly(entry['file_path'])
+    for entry in image_entries:
+        release_file(entry['file_path'])
+
+    _hot_cache.invalidate(project_id)
+    metrics.increment('archive.projects_archived')
+    logger.info(f"Archived project {project_id}: {len(responses)} responses, {len(images)} images, "
+                f"{len(pdfs)} PDFs ({len(raw):,} → {len(payload):,} bytes)")
+
+    return {
+        'responses': len(responses),
+        'images': len(images),
+        'generated_pdfs': len(pdfs),
+        'raw_size': len(raw),
+        'compressed_size': len(payload)
+    }
+
+
+def rehydrate_project(project_id: int, archive_root, upload_root) -> bool:
+    """
+    Restore an archived project's rows and files (commits)
+
+    Rows written while the project was archived (a worker that had not
+    noticed yet) win over archived rows for the same field.
+
+    Args:
+        project_id: Project ID
+        archive_root: ARCHIVE_DIR
+        upload_root: UPLOAD_FOLDER (blob-backed images are stored again)
+
+    Returns:
+        bool: True if the project was rehydrated, False if it was not archived
+    """
+    from services.blob_store import store_blob
+
+    # Same no-op claim as archive_project: serializes concurrent rehydrations
+    claimed = db.session.execute(
+        update(Project)
+        .where(Project.id == project_id, Project.status == ARCHIVED_STATUS)
+        .values(status=ARCHIVED_STATUS)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    archived = db.session.get(ArchivedProject, project_id) if claimed else None
+    if archived is None:
+        db.session.rollback()
+        return False
+
+    source = archive_dir_for(archive_root, project_id)
+    try:
+        document = read_document(archived.payload)
+        project = db.session.get(Project, project_id, populate_existing=True)
+
+        present_fields = {
+            name for (name,) in db.session.query(Response.field_name).filter_by(project_id=project_id)
+        }
+        db.session.add_all(
+            Response(project_id=project_id, **_restore_values(entry, Response))
+            for entry in document['responses'] if entry['field_name'] not in present_fields
+        )
+
+        present_images = {
+            name for (name,) in db.session.query(ImageUpload.field_name).filter_by(project_id=project_id)
+        }
+        for entry in document['images']:
+            if entry['field_name'] in present_images:
+                continue
+            values = _restore_values(entry, ImageUpload)
+            archived_file = source / entry['archive_path'] if 'archive_path' in entry else None
+            if archived_file is not None and archived_file.exists():
+                if entry.get('content_hash'):
+                    with open(archived_file, 'rb') as f:
+                        values['file_path'] = store_blob(f, upload_root, entry.get('mime_type')).file_path
+                elif not Path(entry['file_path']).exists():
+                    Path(entry['file_path']).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(archived_file, entry['file_path'])
+                    artifacts.publish(entry['file_path'])
+            if db.session.get(ImageUpload, values['id']) is not None:
+                del values['id']  # ID reused meanwhile
+            db.session.add(ImageUpload(project_id=project_id, **values))
+
+        for entry in document['generated_pdfs']:
+            values = _restore_values(entry, GeneratedPDF)
+            archived_file = source / entry['archive_path'] if 'archive_path' in entry else None
+            if archived_file is None or not archived_file.exists():
+                continue  # Regenerable: drop PDFs whose file is gone
+            Path(entry['file_path']).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(archived_file, entry['file_path'])
+            artifacts.publish(entry['file_path'])
+            if db.session.get(GeneratedPDF, values['id']) is not None:
+                del values['id']
+            db.session.add(GeneratedPDF(project_id=project_id, **values))
+
+        db.session.flush()
+
+        # Rows are the source of truth: rebuild the snapshot at a new revision
+        project.status = document['project']['status']
+        project.revision = max(project.revision or 0, document['project']['revision']) + 1
+        project.snapshot = build_project_snapshot(project_id, project.revision)
+        project.coverage = compute_coverage(project.snapshot['responses'], project.snapshot['images'])
+        db.session.execute(delete(ArchivedPDF).where(ArchivedPDF.project_id == project_id))
+        db.session.delete(archived)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    shutil.rmtree(source, ignore_errors=True)
+    _hot_cache.set(project_id, True)
+    metrics.increment('archive.projects_rehydrated')
+    logger.info(f"Rehydrated project {project_id} from the archive")
+    return True
+
+
+def archived_pdf_project(pdf_id: int) -> Optional[int]:
+    """
+    Project of a generated PDF that was archived with it
+
+    Returns:
+        int: Project ID (pass it to ensure_hot), or None if the PDF was not archived
+    """
+    return db.session.query(ArchivedPDF.project_id).filter(ArchivedPDF.pdf_id == pdf_id).scalar()
+
+
+def ensure_hot(project_id: int) -> bool:
+    """
+    Rehydrate a project if it is archived (call before reading or writing its rows)
+
+    Projects known to be hot are cached per worker for AUTH_CACHE_TTL_SECONDS,
+    so the check costs one primary-key lookup per project per TTL.
+
+    Returns:
+        bool: True if the project was rehydrated by this call
+    """
+    if _hot_cache.get(project_id):
+        return False
+
+    status = db.session.query(Project.status).filter(Project.id == project_id).scalar()
+    rehydrated = False
+    if status == ARCHIVED_STATUS:
+        config = current_app.config
+        rehydrated = rehydrate_project(project_id, config['ARCHIVE_DIR'], config['UPLOAD_FOLDER'])
+    if status is not None:
+        _hot_cache.set(project_id, True, ttl=current_app.config.get('AUTH_CACHE_TTL_SECONDS', 60))
+    return rehydrated
@@ -0,0 +1,180 @@
+"""
+Project State
+Keeps a project's derived state current as its responses and images are
+saved: the snapshot (latest value of every field, with the revision that
+changed it), the coverage counters and the staged analytics deltas.
+
+Writers call record_project_changes() in the transaction that writes the
+Response/ImageUpload rows; readers use get_project_snapshot(),
+get_project_coverage() and get_responses_since().
+"""
+from datetime import datetime
+
+from models import db, Project, Response, build_project_snapshot
+from services.analytics import change_stats, stage
+from services.coverage import compute_coverage, update_coverage
+
+
+def record_project_changes(project, responses: dict = None, images: dict = None) -> dict:
+    """
+    Fold saved values into the project's snapshot (does not commit)
+    
+    Call inside the same transaction as the Response/ImageUpload writes so
+    the snapshot never disagrees with the rows. The project row is reloaded
+    (and locked on PostgreSQL) to merge onto the latest snapshot, and its
+    revision is bumped; changed response fields are stamped with it.
+    Coverage counters are adjusted for the changed fields only, and the
+    analytics deltas of the change are staged for commit.
+    
+    Args:
+        project: Project being written, or its ID (loaded here, saving a
+            separate ownership query in the route)
+        responses: field_name -> field_value saved in this transaction
+        images: field_name -> file_path saved in this transaction
+        
+    Returns:
+        dict: The updated snapshot
+    """
+    db.session.flush()
+    if isinstance(project, Project):
+        db.session.refresh(project, with_for_update=True)
+    else:
+        project = db.session.get(Project, project, with_for_update=True, populate_existing=True)
+    
+    project.revision = (project.revision or 0) + 1
+    
+    old = project.snapshot
+    if old is None:
+        # First write since the column was added: build from the rows
+        # (which already include this transaction's changes)
+        snapshot = build_project_snapshot(project.id, project.revision)
+    else:
+        snapshot = {
+            'responses': dict(old.get('responses') or {}),
+            'images': dict(old.get('images') or {}),
+            'revisions': dict(old.get('revisions') or {})
+        }
+        snapshot['responses'].update(responses or {})
+        snapshot['images'].update(images or {})
+        snapshot['revisions'].update({field: project.revision for field in responses or {}})
+    
+    if old is None or project.coverage is None:
+        coverage = compute_coverage(snapshot['responses'], snapshot['images'])
+    else:
+        coverage = update_coverage(
+            project.coverage,
+            old.get('responses') or {}, old.get('images') or {},
+            responses, images
+        )
+    
+    stage(project.user_id, change_stats(
+        (old or {}).get('responses') or {}, (old or {}).get('images') or {}, project.coverage,
+        responses, images, coverage
+    ))
+    
+    # Reassign (not mutate) so the JSON columns are marked dirty
+    project.snapshot = snapshot
+    project.coverage = coverage
+    return snapshot
+
+
+def get_project_snapshot(project: Project) -> tuple:
+    """
+    Get all current responses and images of a project from its snapshot
+    
+    Projects written before the snapshot existed are backfilled once.
+    
+    Args:
+        project: Project
+        
+    Returns:
+        tuple: (responses dict, images dict)
+    """
+    snapshot = project.snapshot
+    if snapshot is None:
+        project.revision = (project.revision or 0) + 1
+        snapshot = build_project_snapshot(project.id, project.revision)
+        project.snapshot = snapshot
+        project.coverage = compute_coverage(snapshot['responses'], snapshot['images'])
+        db.session.commit()
+    
+    return dict(snapshot.get('responses') or {}), dict(snapshot.get('images') or {})
+
+
+def get_project_coverage(project: Project) -> dict:
+    """
+    Get a project's coverage counters (computed once for older projects)
+    
+    Args:
+        project: Project
+        
+    Returns:
+        dict: Coverage document (see services/coverage.py)
+    """
+    if project.coverage is None:
+        responses, images = get_project_snapshot(project)
+        if project.coverage is None:
+            project.coverage = compute_coverage(responses, images)
+            db.session.commit()
+    return project.coverage
+
+
+def get_responses_since(project: 'Project', since: int) -> dict:
+    """
+    Responses changed after a revision (delta sync)
+    
+    Fields without a recorded revision (snapshots written before revisions
+    existed) are always included.
+    
+    Args:
+        project: Project
+        since: Revision the client already has
+        
+    Returns:
+        dict: field_name -> field_value changed after `since`
+    """
+    responses, _ = get_project_snapshot(project)
+    revisions = project.snapshot.get('revisions') or {}
+    return {
+        field: value for field, value in responses.items()
+        if revisions.get(field, since + 1) > since
+    }
+
+
+def save_response(project_id: int, field_name: str, field_value: str, page_number: int = None):
+    """
+    Save or update a response and fold it into the snapshot (commits)
+    
+    Args:
+        project_id: Project ID
+        field_name: Field name
+        field_value: Field value (already normalized)
+        page_number: Optional page number
+        
+    Returns:
+        Response: The saved row
+    """
+    response = Response.query.filter_by(
+        project_id=project_id,
+        field_name=field_name
+    ).first()
+    
+    if response:
+        response.field_value = field_value
+        response.page_number = page_number
+        response.updated_at = datetime.utcnow()
+    else:
+        response = Response(
+            project_id=project_id,
+            field_name=field_name,
+            field_value=field_value,
+            page_number=page_number
+        )
+        db.session.add(response)
+    
+    project = db.session.get(Project, project_id)
+    if project:
+        record_project_changes(project, responses={field_name: field_value})
+    
+    db.session.commit()
+    return response
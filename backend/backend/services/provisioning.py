@@ -0,0 +1,171 @@
+"""
+Project Provisioning
+Clone a starter project (pre-filled responses and images) to many students
+with set-based INSERT ... SELECT statements: one for the projects, one for
+the responses and one for the image rows, whatever the class size.
+
+Image files are shared by reference: the new ImageUpload rows point at the
+starter project's files, and blob reference counts are raised in one more
+statement (see services/blob_store.py).
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, exists, func, insert, literal, select, update
+from sqlalchemy.orm import aliased
+
+from models import db, User, Project, Response, ImageUpload, Blob
+from services import metrics
+from services.analytics import stage_provisioned
+
+logger = logging.getLogger(__name__)
+
+
+class ProvisioningError(ValueError):
+    """Raised when a provisioning request cannot be carried out"""
+
+
+class SourceProjectNotFound(ProvisioningError):
+    """Raised when the starter project does not exist"""
+
+
+def provision_projects(
+    source_project_id: int,
+    user_ids: Optional[List[int]] = None,
+    school: Optional[str] = None,
+    grade: Optional[str] = None,
+    title: Optional[str] = None
+) -> List[Dict]:
+    """
+    Create a copy of a starter project for each selected user
+
+    Users who already have a project provisioned from this source are
+    skipped, so repeating a request only fills in the missing students.
+
+    Args:
+        source_project_id: Starter project to clone
+        user_ids: Users to provision
+        school: Or: every user of this school (optionally narrowed by grade)
+        grade: Grade filter (with school)
+        title: Title of the new projects (default: the starter's title)
+
+    Returns:
+        list: [{'user_id': int, 'project_id': int}] for the created projects
+
+    Raises:
+        SourceProjectNotFound: If the source project does not exist
+        ProvisioningError: If no users are selected
+    """
+    # Buffered edits of the starter must be part of the copy
+    from services.autosave_buffer import autosave
+    from services.project_archive import ensure_hot
+    autosave.flush_project(source_project_id)
+    ensure_hot(source_project_id)
+
+    source = db.session.get(Project, source_project_id)
+    if source is None:
+        raise SourceProjectNotFound(f"Source project {source_project_id} not found")
+
+    if user_ids:
+        user_filter = User.id.in_([int(user_id) for user_id in user_ids])
+    elif school:
+        user_filter = User.school == school
+        if grade:
+            user_filter = and_(user_filter, User.grade == grade)
+    else:
+        raise ProvisioningError("Provide user_ids or a school")
+
+    now = datetime.utcnow()
+    src = aliased(Project)
+    already_provisioned = exists().where(
+        Project.user_id == User.id,
+        Project.source_project_id == source_project_id
+    )
+
+    try:
+        # 1. Projects (snapshot, coverage and revision travel with the copy)
+        project_rows = db.session.execute(
+            insert(Project)
+            .from_select(
+                ['user_id', 'title', 'status', 'created_at', 'updated_at',
+                 'snapshot', 'coverage', 'revision', 'source_project_id'],
+                select(
+                    User.id,
+                    literal(title or source.title or 'Design Thinking Playbook'),
+                    literal('in_progress'),
+                    literal(now),
+                    literal(now),
+                    src.snapshot,
+                    src.coverage,
+                    src.revision,
+                    src.id
+                )
+                .select_from(User)
+                .join(src, src.id == source_project_id)
+                .where(user_filter, ~already_provisioned)
+            )
+            .returning(Project.id, Project.user_id)
+        ).all()
+
+        new_ids = [project_id for project_id, _ in project_rows]
+        if new_ids:
+            new_project = aliased(Project)
+
+            # 2. Responses
+            db.session.execute(
+                insert(Response).from_select(
+                    ['project_id', 'field_name', 'field_value', 'page_number',
+                     'created_at', 'updated_at'],
+                    select(
+                        new_project.id, Response.field_name, Response.field_value,
+                        Response.page_number, literal(now), literal(now)
+                    )
+                    .join(Response, Response.project_id == new_project.source_project_id)
+                    .where(new_project.id.in_(new_ids))
+                )
+            )
+
+            # 3. Image rows referencing the starter's files (and derivatives)
+            db.session.execute(
+                insert(ImageUpload).from_select(
+                    ['project_id', 'field_name', 'filename', 'file_path',
+                     'file_size', 'mime_type', 'content_hash', 'uploaded_at',
+                     *ImageUpload.DERIVED_COLUMNS],
+                    select(
+                        new_project.id, ImageUpload.field_name, ImageUpload.filename,
+                        ImageUpload.file_path, ImageUpload.file_size,
+                        ImageUpload.mime_type, ImageUpload.content_hash, literal(now),
+                        *(getattr(ImageUpload, column) for column in ImageUpload.DERIVED_COLUMNS)
+                    )
+                    .join(ImageUpload, ImageUpload.project_id == new_project.source_project_id)
+                    .where(new_project.id.in_(new_ids))
+                )
+            )
+
+            # 4. Blob reference counts (Core inserts bypass the ORM listeners)
+            new_references = (
+                select(func.count(ImageUpload.id))
+                .where(ImageUpload.content_hash == Blob.sha256, ImageUpload.project_id.in_(new_ids))
+                .scalar_subquery()
+            )
+            db.session.execute(
+                update(Blob)
+                .where(Blob.sha256.in_(
+                    select(ImageUpload.content_hash).where(ImageUpload.project_id.in_(new_ids))
+                ))
+                .values(ref_count=Blob.ref_count + new_references)
+                .execution_options(synchronize_session=False)
+            )
+
+            stage_provisioned(project_rows, source.snapshot, source.coverage)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    metrics.increment('provisioning.projects_created', len(project_rows))
+    logger.info(f"Provisioned {len(project_rows)} projects from project {source_project_id}")
+
+    return [{'user_id': user_id, 'project_id': project_id} for project_id, user_id in project_rows]
@@ -0,0 +1,139 @@
+"""
+Cooperative Cancellation for PDF Rendering
+A render checks its CancellationToken between pages and between image fields
+and aborts early when the client has gone away or the deadline has passed.
+"""
+import logging
+import socket
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cancellation reasons (also used as metrics suffixes)
+REASON_DEADLINE = 'deadline'
+REASON_CLIENT_DISCONNECT = 'client_disconnect'
+REASON_CANCELLED = 'cancelled'
+
+
+class RenderCancelled(Exception):
+    """Raised inside a render when its cancellation token has been tripped"""
+
+    def __init__(self, reason: str = REASON_CANCELLED):
+        super().__init__(f"PDF render cancelled ({reason})")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    Cancellation token shared between a request and the render it started
+
+    The token is tripped explicitly via cancel(), implicitly when the
+    deadline passes, or when one of the probes reports a cancel reason.
+    """
+
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        probes: Iterable[Callable[[], Optional[str]]] = ()
+    ):
+        """
+        Args:
+            deadline: Absolute time.monotonic() value after which the render is cancelled
+            probes: Callables returning a cancel reason, or None while the work is still wanted
+        """
+        self.deadline = deadline
+        self._probes = [p for p in probes if p is not None]
+        self._reason: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def with_timeout(
+        cls,
+        seconds: Optional[float],
+        probes: Iterable[Callable[[], Optional[str]]] = ()
+    ) -> 'CancellationToken':
+        """Create a token that expires `seconds` from now (no deadline if None)"""
+        deadline = time.monotonic() + seconds if seconds else None
+        return cls(deadline=deadline, probes=probes)
+
+    def cancel(self, reason: str = REASON_CANCELLED) -> None:
+        """Trip the token (first reason wins)"""
+        with self._lock:
+            if self._reason is None:
+                self._reason = reason
+
+    @property
+    def reason(self) -> Optional[str]:
+        """Reason the token was tripped, or None"""
+        return self._reason
+
+    @property
+    def cancelled(self) -> bool:
+        """Evaluate deadline and probes; True once the token is tripped"""
+        if self._reason is not None:
+            return True
+
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(REASON_DEADLINE)
+            return True
+
+        for probe in self._probes:
+            try:
+                reason = probe()
+            except Exception as e:
+                logger.debug(f"Cancellation probe failed: {e}")
+                continue
+            if reason:
+                self.cancel(reason)
+                return True
+
+        return False
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None when there is no deadline)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self) -> None:
+        """
+        Raise RenderCancelled if the token has been tripped
+
+        Raises:
+            RenderCancelled: If the work should stop
+        """
+        if self.cancelled:
+            raise RenderCancelled(self._reason)
+
+
+def client_disconnect_probe(environ: dict) -> Optional[Callable[[], Optional[str]]]:
+    """
+    Build a probe that detects a closed client connection
+
+    Works with servers exposing the raw socket in the WSGI environ
+    (gunicorn sync workers: 'gunicorn.socket', werkzeug: 'werkzeug.socket').
+    A zero-byte MSG_PEEK read means the peer (client or nginx) closed the
+    connection; nginx closes the upstream when the browser aborts.
+
+    Args:
+        environ: WSGI environ of the current request
+
+    Returns:
+        Callable or None if the server does not expose its socket
+    """
+    sock = environ.get('gunicorn.socket') or environ.get('werkzeug.socket')
+    if sock is None or not hasattr(sock, 'recv'):
+        return None
+
+    def probe() -> Optional[str]:
+        try:
+            data = sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+        except (BlockingIOError, InterruptedError):
+            return None  # Connection open, nothing pending
+        except OSError:
+            return REASON_CLIENT_DISCONNECT
+        return REASON_CLIENT_DISCONNECT if data == b'' else None
+
+    return probe
@@ -0,0 +1,178 @@
+"""
+PDF Render Pool
+Render playbook PDFs on a bounded pool of worker processes.
+
+PyMuPDF is not thread-safe, and rendering is CPU-bound, so bulk renders
+run in separate processes. Each worker loads and validates the template
+once (PDFGeneratorService) and then renders any number of jobs. Workers
+never touch the database: a job carries everything the render needs, and
+the caller records the result.
+
+A job is a dict: {"project_id", "revision", "responses", "images",
+"filename", "coverage", "renditions"} (see build_render_job). The result:
+{"path", "size", "content_hash", "seconds"}.
+
+Scripts that use a pool with workers need an `if __name__ == '__main__'`
+guard: worker processes are spawned and import the main module.
+"""
+import logging
+import multiprocessing
+import signal
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from utils.hashing import sha256_file
+
+logger = logging.getLogger(__name__)
+
+# Per-process generator, built by _init_worker (or lazily for inline renders)
+_generator = None
+_generator_args = None
+
+
+def _init_worker(template_path: str, output_dir: str) -> None:
+    global _generator, _generator_args
+    from services.pdf_generator import PDFGeneratorService
+    _generator = PDFGeneratorService(template_path=template_path, output_dir=output_dir)
+    _generator_args = (template_path, output_dir)
+
+
+def _init_worker_process(template_path: str, output_dir: str) -> None:
+    # Per-render INFO logs (coverage reports) would drown the caller's output
+    logging.getLogger().setLevel(logging.WARNING)
+    # Ctrl+C is for the parent, which stops the pool and keeps finished work
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_worker(template_path, output_dir)
+
+
+def render_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Render one job with this process's generator (see module docstring)"""
+    start = time.perf_counter()
+    path = _generator.generate_filled_pdf(
+        user_responses=job['responses'],
+        output_filename=job['filename'],
+        images=job.get('images'),
+        coverage=job.get('coverage'),
+        renditions=job.get('renditions')
+    )
+    path = Path(path)
+    return {
+        'path': str(path),
+        'size': path.stat().st_size,
+        'content_hash': sha256_file(path),
+        'seconds': time.perf_counter() - start
+    }
+
+
+def build_render_job(project) -> Optional[Dict[str, Any]]:
+    """
+    Render job for a project's current answers (in the app, not a worker)
+
+    Args:
+        project: Project
+
+    Returns:
+        dict: The job, or None if the project has no answers yet
+    """
+    from models import get_project_renditions
+    from services.project_state import get_project_snapshot, get_project_coverage
+    from services.image_derivatives import derivatives, localize_renditions
+    from services.storage import artifacts
+
+    responses, images = get_project_snapshot(project)
+    if not responses:
+        return None
+
+    # Precomputed field-ready images; queue any the ingest pipeline missed
+    renditions, unprocessed = get_project_renditions(project.id, images)
+    derivatives.submit(unprocessed)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return {
+        'project_id': project.id,
+        'revision': project.revision,
+        'responses': responses,
+        'images': artifacts.localize(images),
+        'coverage': get_project_coverage(project),
+        'renditions': localize_renditions(renditions),
+        'filename': f"design_thinking_playbook_{project.user.username}_{project.id}_{timestamp}.pdf"
+    }
+
+
+def record_render(project, job: Dict[str, Any], result: Dict[str, Any]):
+    """
+    Publish a finished render and add its GeneratedPDF row (the caller commits)
+
+    Returns:
+        GeneratedPDF: The new row
+    """
+    from models import db, GeneratedPDF
+    from services.analytics import stage_project_event
+    from services.storage import artifacts
+
+    artifacts.publish(result['path'])
+    pdf = GeneratedPDF(
+        project_id=job['project_id'],
+        filename=job['filename'],
+        file_path=result['path'],
+        file_size=result['size'],
+        content_hash=result['content_hash'],
+        project_revision=job['revision']
+    )
+    db.session.add(pdf)
+    stage_project_event(project.user_id, pdfs_generated=1)
+    return pdf
+
+
+class RenderPool:
+    """At most `workers` concurrent renders; workers=0 renders inline on the calling thread"""
+
+    def __init__(self, template_path: str, output_dir: str, workers: int = 2):
+        """
+        Args:
+            template_path: PDF template (loaded once per worker)
+            output_dir: PDF_OUTPUT_DIR
+            workers: Worker processes (0 = render in this process, on submit)
+        """
+        self.template_path = str(template_path)
+        self.output_dir = str(output_dir)
+        self.workers = max(0, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, job: Dict[str, Any]) -> Future:
+        """Queue a render; the future resolves to the result dict"""
+        if self.workers == 0:
+            future = Future()
+            try:
+                if _generator_args != (self.template_path, self.output_dir):
+                    _init_worker(self.template_path, self.output_dir)
+                future.set_result(render_job(job))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        if self._executor is None:
+            # spawn: gunicorn workers run background threads, which fork does not carry over safely
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker_process,
+                initargs=(self.template_path, self.output_dir)
+            )
+            logger.info(f"Started PDF render pool ({self.workers} workers)")
+        return self._executor.submit(render_job, job)
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the workers; queued renders are cancelled when not waiting"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close(wait=exc[0] is None)
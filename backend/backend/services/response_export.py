@@ -0,0 +1,293 @@
+"""
+Response Export
+Streams student answers for offline analysis: one row per project, one
+column per mapped field (PDF_FIELD_MAPPINGS order) after the project
+columns.
+
+- Formats: chunked CSV, and Parquet (one row group per batch) or an Arrow
+  IPC stream when pyarrow is installed
+- Projects are read with yield_per (a server-side cursor on PostgreSQL)
+  and written batch by batch, so memory stays flat whatever the dataset
+  size. Rows come from the project snapshots, which are already pivoted;
+  archived projects are read from their archive documents, and projects
+  that predate snapshots from their rows (two queries per batch)
+- Incremental exports select projects updated in [since, cutoff). The
+  cutoff lags the clock by EXPORT_SAFETY_LAG_SECONDS so transactions
+  still in flight land in the next run, which starts at this cutoff
+
+Students appear by user ID, school and grade only (no names or emails).
+Image fields hold the stored file name (the content hash for blobs).
+"""
+import csv
+import io
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+
+from models import db, User, Project, Response, ImageUpload, ArchivedProject
+from pdf_mappings import FIELD_INDEX
+from services import metrics
+from services.project_archive import read_document
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # CSV only
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrows'),
+}
+PROJECT_COLUMNS = (
+    'project_id', 'user_id', 'school', 'grade', 'title', 'status',
+    'created_at', 'updated_at', 'completed_at', 'revision'
+)
+_INTEGER_COLUMNS = ('project_id', 'user_id', 'revision')
+_TIMESTAMP_COLUMNS = ('created_at', 'updated_at', 'completed_at')
+
+
+class ExportError(ValueError):
+    """Raised for an unknown or unavailable export format or a malformed time"""
+
+
+def export_columns() -> List[str]:
+    """Column names of an export, in order"""
+    return [*PROJECT_COLUMNS, *FIELD_INDEX]
+
+
+def check_format(fmt: str) -> None:
+    """
+    Raises:
+        ExportError: If the format is unknown or needs pyarrow
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown format '{fmt}' (use {', '.join(EXPORT_FORMATS)})")
+    if fmt != 'csv' and pa is None:
+        raise ExportError(f"The {fmt} format needs pyarrow (pip install pyarrow)")
+
+
+def parse_export_time(value: str) -> datetime:
+    """
+    Parse a YYYY-MM-DD date or ISO 8601 timestamp into naive UTC
+
+    Raises:
+        ExportError: If the value is not a date or timestamp
+    """
+    try:
+        moment = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        raise ExportError(f"'{value}' is not a YYYY-MM-DD date or ISO timestamp")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def export_cutoff(until: Optional[datetime], safety_lag_seconds: int) -> datetime:
+    """End of an export window: `until`, but never later than now minus the safety lag."""
+    latest = datetime.utcnow() - timedelta(seconds=safety_lag_seconds)
+    return min(until, latest) if until else latest
+
+
+# ============================================================================
+# ROWS
+# ============================================================================
+
+def _source_fields(project_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Responses and images of projects without a snapshot, two queries per batch"""
+    fields: Dict[int, Dict[str, Any]] = {project_id: {} for project_id in project_ids}
+    if not project_ids:
+        return fields
+    responses = db.session.execute(
+        select(Response.project_id, Response.field_name, Response.field_value)
+        .where(Response.project_id.in_(project_ids))
+    )
+    for project_id, field, value in responses:
+        if value is not None:
+            fields[project_id][field] = value
+    images = db.session.execute(
+        select(ImageUpload.project_id, ImageUpload.field_name, ImageUpload.file_path)
+        .where(ImageUpload.project_id.in_(project_ids))
+        .order_by(ImageUpload.id)
+    )
+    for project_id, field, path in images:
+        if path:
+            fields[project_id][field] = Path(path).name
+    return fields
+
+
+def _document_fields(row) -> Optional[Dict[str, Any]]:
+    """Field values from the archive document or snapshot; None if there is neither"""
+    if row.payload is not None:
+        document = read_document(row.payload)
+        responses = {r['field_name']: r['field_value'] for r in document['responses']}
+        images = {i['field_name']: i['file_path'] for i in document['images']}
+    elif row.snapshot is not None:
+        responses, images = row.snapshot.get('responses') or {}, row.snapshot.get('images') or {}
+    else:
+        return None
+
+    values = {field: value for field, value in responses.items() if value is not None}
+    values.update({field: Path(path).name for field, path in images.items() if path})
+    return values
+
+
+def iter_export_batches(
+    school: Optional[str] = None,
+    grade: Optional[str] = None,
+    since: Optional[datetime] = None,
+    cutoff: Optional[datetime] = None,
+    batch_size: int = 500
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Export rows in batches of up to `batch_size` projects
+
+    Args:
+        school, grade: Only students of this school / grade
+        since: Only projects updated at or after this time (UTC)
+        cutoff: Only projects updated before this time (UTC)
+        batch_size: Projects per batch (and per database round trip)
+
+    Yields:
+        list: Row dicts keyed by export_columns() (missing fields omitted)
+    """
+    query = (
+        select(Project.id, Project.user_id, User.school, User.grade, Project.title, Project.status,
+               Project.created_at, Project.updated_at, Project.completed_at, Project.revision,
+               Project.snapshot, ArchivedProject.payload)
+        .join(User, User.id == Project.user_id)
+        .outerjoin(ArchivedProject, ArchivedProject.project_id == Project.id)
+        .order_by(Project.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if school:
+        query = query.where(User.school == school)
+    if grade:
+        query = query.where(User.grade == grade)
+    if since:
+        query = query.where(Project.updated_at >= since)
+    if cutoff:
+        query = query.where(Project.updated_at < cutoff)
+
+    for partition in db.session.execute(query).partitions():
+        values = {row.id: _document_fields(row) for row in partition}
+        values.update(_source_fields([project_id for project_id, v in values.items() if v is None]))
+        yield [{
+            'project_id': row.id, 'user_id': row.user_id, 'school': row.school, 'grade': row.grade,
+            'title': row.title, 'status': row.status, 'created_at': row.created_at,
+            'updated_at': row.updated_at, 'completed_at': row.completed_at, 'revision': row.revision,
+            **values[row.id]
+        } for row in partition]
+
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands its bytes over as they are produced"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema(columns: List[str]):
+    fields = []
+    for name in columns:
+        if name in _INTEGER_COLUMNS:
+            fields.append(pa.field(name, pa.int64()))
+        elif name in _TIMESTAMP_COLUMNS:
+            fields.append(pa.field(name, pa.timestamp('us')))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+def _record_batch(schema, rows: List[Dict[str, Any]]):
+    arrays = []
+    for field in schema:
+        values = [row.get(field.name) for row in rows]
+        if pa.types.is_string(field.type):
+            values = [None if value is None else str(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _csv_value(value) -> Any:
+    if value is None:
+        return ''
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def stream_export(fmt: str, batches: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """
+    Encode export batches as a byte stream
+
+    Args:
+        fmt: 'csv', 'parquet' or 'arrow'
+        batches: Output of iter_export_batches()
+
+    Yields:
+        bytes: Encoded chunks (one or more per batch)
+
+    Raises:
+        ExportError: If the format is unknown or unavailable
+    """
+    check_format(fmt)
+    columns = export_columns()
+    exported = 0
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows([_csv_value(row.get(column)) for column in columns] for row in batch)
+            exported += len(batch)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    else:
+        schema = _arrow_schema(columns)
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression='zstd') if fmt == 'parquet' \
+            else pa_ipc.new_stream(sink, schema)
+        try:
+            for batch in batches:
+                if batch:
+                    writer.write_batch(_record_batch(schema, batch))
+                    exported += len(batch)
+                    yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    metrics.increment('export.projects_exported', exported)
+    logger.info(f"Exported {exported} projects as {fmt}")
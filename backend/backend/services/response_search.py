@@ -0,0 +1,270 @@
+"""
+Response Search
+Full-text index over Response.field_value, kept current by the database
+itself so every writer (autosave upserts, sync, provisioning's INSERT ...
+SELECT, archive and rehydration) updates it in the same transaction:
+
+- SQLite: an FTS5 external-content table (responses_fts) over the
+  responses table, maintained by insert/update/delete triggers; ranked
+  with bm25() and excerpted with snippet()
+- PostgreSQL: a generated tsvector column with a GIN index; ranked with
+  ts_rank_cd() and excerpted with ts_headline()
+
+Queries are free text: words are ANDed, "quoted phrases" match in order
+and a trailing * matches prefixes (water*). Archived projects have no
+response rows, so they are not searchable until they are rehydrated.
+"""
+import html
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'responses_fts'
+PG_VECTOR_COLUMN = 'search_vector'
+PG_CONFIG = 'simple'  # Student writing mixes languages and names: no stemming
+
+# Snippet highlight markers: control characters that cannot appear in
+# responses, replaced by <mark> after the excerpt is HTML-escaped
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+SNIPPET_TOKENS = 16
+
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+_SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON responses BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, field_value) VALUES (new.id, new.field_value);
+        END""",
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON responses BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, field_value)
+            VALUES ('delete', old.id, old.field_value);
+        END""",
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF field_value ON responses BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, field_value)
+            VALUES ('delete', old.id, old.field_value);
+            INSERT INTO {FTS_TABLE}(rowid, field_value) VALUES (new.id, new.field_value);
+        END""",
+}
+
+
+class SearchQueryError(ValueError):
+    """Raised when a search query has no searchable terms"""
+
+
+def install_search_index(engine) -> bool:
+    """
+    Create the full-text index if it is missing (idempotent)
+
+    On SQLite the index is rebuilt from the responses table whenever it or
+    one of its triggers had to be (re)created, so an existing database is
+    indexed on the first start after an upgrade.
+
+    Args:
+        engine: SQLAlchemy engine
+
+    Returns:
+        bool: True if search is available on this database
+    """
+    dialect = engine.dialect.name
+    try:
+        if dialect == 'sqlite':
+            return _install_sqlite(engine)
+        if dialect == 'postgresql':
+            return _install_postgresql(engine)
+    except Exception as e:
+        logger.warning(f"Response search unavailable: {e}")
+        return False
+    logger.info(f"Response search is not supported on {dialect}")
+    return False
+
+
+def _install_sqlite(engine) -> bool:
+    with engine.begin() as conn:
+        present = {
+            name for (name,) in conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE name = :table OR "
+                "(type = 'trigger' AND tbl_name = 'responses')"
+            ), {'table': FTS_TABLE})
+        }
+        missing = [name for name in (FTS_TABLE, *_SQLITE_TRIGGERS) if name not in present]
+        if not missing:
+            return True
+
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "field_value, content='responses', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+        for ddl in _SQLITE_TRIGGERS.values():
+            conn.execute(text(ddl))
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    logger.info(f"Built full-text index {FTS_TABLE} (missing: {', '.join(missing)})")
+    return True
+
+
+def _install_postgresql(engine) -> bool:
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"ALTER TABLE responses ADD COLUMN IF NOT EXISTS {PG_VECTOR_COLUMN} tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('{PG_CONFIG}', coalesce(field_value, ''))) STORED"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_responses_{PG_VECTOR_COLUMN} "
+            f"ON responses USING gin ({PG_VECTOR_COLUMN})"
+        ))
+    return True
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+def parse_query(query: str) -> List[Dict[str, Any]]:
+    """
+    Split free text into search terms
+
+    Args:
+        query: e.g. 'water "plastic bottle" recycl*'
+
+    Returns:
+        list: [{'words': ['plastic', 'bottle'], 'prefix': False}, ...]
+            (punctuation is dropped, so terms are safe to quote)
+    """
+    terms = []
+    for phrase, word in _TERM_RE.findall(query or ''):
+        source = phrase or word
+        words = [w.lower() for w in _WORD_RE.findall(source)]
+        if words:
+            terms.append({'words': words, 'prefix': not phrase and source.endswith('*')})
+    return terms
+
+
+def fts5_match(terms: List[Dict[str, Any]]) -> str:
+    """FTS5 MATCH expression: quoted phrases, implicitly ANDed."""
+    parts = []
+    for term in terms:
+        part = '"' + ' '.join(term['words']) + '"'
+        parts.append(part + '*' if term['prefix'] else part)
+    return ' '.join(parts)
+
+
+def pg_tsquery(terms: List[Dict[str, Any]]) -> str:
+    """to_tsquery() input: words of a phrase joined with <->, terms with &."""
+    parts = []
+    for term in terms:
+        words = [f"'{w}'" for w in term['words']]
+        if term['prefix']:
+            words[-1] += ':*'
+        parts.append(words[0] if len(words) == 1 else '(' + ' <-> '.join(words) + ')')
+    return ' & '.join(parts)
+
+
+def _highlight(snippet: Optional[str]) -> str:
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def search_responses(
+    query: str,
+    school: Optional[str] = None,
+    grade: Optional[str] = None,
+    page_number: Optional[int] = None,
+    field_name: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Dict[str, Any]:
+    """
+    Ranked search over student responses
+
+    Args:
+        query: Free-text query (see parse_query)
+        school, grade: Filter by the student's school and grade
+        page_number: Filter by playbook page
+        field_name: Filter by field
+        limit: Results per page
+        offset: Results to skip (the previous page's next_cursor)
+
+    Returns:
+        dict: {'results': [...], 'next_cursor': int or None}; each result
+            has the response, its project and student, a score (higher is
+            better) and an HTML snippet with <mark>ed matches
+
+    Raises:
+        SearchQueryError: If the query has no searchable terms
+    """
+    terms = parse_query(query)
+    if not terms:
+        raise SearchQueryError('Query has no searchable words')
+
+    filters = []
+    params = {'limit': limit + 1, 'offset': offset}
+    for column, name, value in (
+        ('u.school', 'school', school), ('u.grade', 'grade', grade),
+        ('r.page_number', 'page_number', page_number), ('r.field_name', 'field_name', field_name)
+    ):
+        if value is not None and value != '':
+            filters.append(f"{column} = :{name}")
+            params[name] = value
+    where = ''.join(f" AND {condition}" for condition in filters)
+
+    columns = (
+        "r.id AS response_id, r.field_name, r.page_number, r.updated_at, "
+        "p.id AS project_id, p.title, p.status, u.id AS user_id, u.username, u.school, u.grade"
+    )
+    if db.engine.dialect.name == 'postgresql':
+        params['query'] = pg_tsquery(terms)
+        params['headline_options'] = (
+            f"StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords={SNIPPET_TOKENS}, MinWords=6"
+        )
+        statement = text(
+            f"SELECT {columns}, "
+            f"ts_headline('{PG_CONFIG}', r.field_value, q, :headline_options) AS snippet, "
+            f"ts_rank_cd(r.{PG_VECTOR_COLUMN}, q) AS score "
+            f"FROM responses r CROSS JOIN to_tsquery('{PG_CONFIG}', :query) q "
+            "JOIN projects p ON p.id = r.project_id JOIN users u ON u.id = p.user_id "
+            f"WHERE r.{PG_VECTOR_COLUMN} @@ q{where} "
+            "ORDER BY score DESC, r.id LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params['query'] = fts5_match(terms)
+        params['mark_start'], params['mark_end'] = _MARK_START, _MARK_END
+        statement = text(
+            f"SELECT {columns}, "
+            f"snippet({FTS_TABLE}, 0, :mark_start, :mark_end, '…', {SNIPPET_TOKENS}) AS snippet, "
+            f"-bm25({FTS_TABLE}) AS score "
+            f"FROM {FTS_TABLE} JOIN responses r ON r.id = {FTS_TABLE}.rowid "
+            "JOIN projects p ON p.id = r.project_id JOIN users u ON u.id = p.user_id "
+            f"WHERE {FTS_TABLE} MATCH :query{where} "
+            f"ORDER BY bm25({FTS_TABLE}), r.id LIMIT :limit OFFSET :offset"
+        )
+
+    rows = db.session.execute(statement.columns(updated_at=db.DateTime), params).mappings().all()
+    has_more = len(rows) > limit
+
+    results = []
+    for row in rows[:limit]:
+        results.append({
+            'response_id': row['response_id'],
+            'field_name': row['field_name'],
+            'page_number': row['page_number'],
+            'updated_at': row['updated_at'].isoformat() if row['updated_at'] else None,
+            'snippet': _highlight(row['snippet']),
+            'score': float(row['score']),
+            'project': {'id': row['project_id'], 'title': row['title'], 'status': row['status']},
+            'student': {
+                'id': row['user_id'], 'username': row['username'],
+                'school': row['school'], 'grade': row['grade']
+            }
+        })
+
+    return {'results': results, 'next_cursor': offset + limit if has_more else None}
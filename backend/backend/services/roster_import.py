@@ -0,0 +1,262 @@
+"""
+Roster Import
+Bulk student registration from CSV or JSONL rosters.
+
+- Validation and in-batch duplicate detection happen in Python
+- Uniqueness against existing users is one set-based query per 500 rows
+- Password hashing (deliberately slow) runs across a process pool
+- Users are inserted in batched transactions
+
+Every input row gets an entry in the report, so a partially bad roster
+still creates all of its good rows.
+"""
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from models import db, User
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+ROSTER_FIELDS = ('username', 'email', 'password', 'full_name', 'grade', 'school')
+UNIQUENESS_CHUNK_SIZE = 500
+
+# Below this many passwords a process pool costs more than it saves
+MIN_ROWS_FOR_POOL = 8
+
+STATUS_CREATED = 'created'
+STATUS_VALID = 'valid'  # dry run
+STATUS_DUPLICATE = 'duplicate'
+STATUS_ERROR = 'error'
+
+
+class RosterFormatError(ValueError):
+    """Raised when a roster cannot be parsed"""
+
+
+def parse_roster(content, fmt: str) -> List[Dict]:
+    """
+    Parse a roster into row dicts
+
+    Args:
+        content: Roster text (str) or bytes
+        fmt: 'csv' (header row with column names) or 'jsonl' (one object per line)
+
+    Returns:
+        list: Row dicts restricted to ROSTER_FIELDS (values stripped)
+
+    Raises:
+        RosterFormatError: If the content cannot be parsed
+    """
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError as e:
+            raise RosterFormatError(f"Roster must be UTF-8: {e}")
+
+    fmt = (fmt or '').lower()
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames:
+            raise RosterFormatError("CSV roster has no header row")
+        records = [
+            {(key or '').strip().lower(): value for key, value in record.items()}
+            for record in reader
+        ]
+    elif fmt == 'jsonl':
+        records = []
+        for line_number, line in enumerate(content.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise RosterFormatError(f"Line {line_number}: invalid JSON ({e})")
+            if not isinstance(record, dict):
+                raise RosterFormatError(f"Line {line_number}: expected a JSON object")
+            records.append(record)
+    else:
+        raise RosterFormatError(f"Unsupported roster format '{fmt}' (use csv or jsonl)")
+
+    return [normalize_row(record) for record in records]
+
+
+def normalize_row(record: Dict) -> Dict:
+    """Keep roster fields only, as stripped strings (None when blank)."""
+    row = {}
+    for field in ROSTER_FIELDS:
+        value = record.get(field)
+        value = str(value).strip() if value is not None else ''
+        row[field] = value or None
+    return row
+
+
+def hash_passwords(passwords: List[str], workers: Optional[int] = None) -> List[str]:
+    """
+    Hash passwords in parallel (same format as User.set_password)
+
+    Args:
+        passwords: Plain-text passwords
+        workers: Process count (default: CPU count; 1 hashes inline)
+
+    Returns:
+        list: Password hashes in input order
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(passwords) < MIN_ROWS_FOR_POOL:
+        return [generate_password_hash(password) for password in passwords]
+
+    # spawn: forking a threaded web worker is unsafe, and the children
+    # only need werkzeug
+    context = multiprocessing.get_context('spawn')
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(generate_password_hash, passwords, chunksize=chunksize))
+
+
+def _existing_identities(usernames: Iterable[str], emails: Iterable[str]) -> tuple:
+    """Usernames and emails already registered (one query per chunk)."""
+    usernames, emails = list(usernames), list(emails)
+    taken_usernames, taken_emails = set(), set()
+    for start in range(0, max(len(usernames), len(emails)), UNIQUENESS_CHUNK_SIZE):
+        username_chunk = usernames[start:start + UNIQUENESS_CHUNK_SIZE]
+        email_chunk = emails[start:start + UNIQUENESS_CHUNK_SIZE]
+        query = select(User.username, User.email).where(or_(
+            User.username.in_(username_chunk),
+            User.email.in_(email_chunk)
+        ))
+        for username, email in db.session.execute(query):
+            taken_usernames.add(username)
+            taken_emails.add(email)
+    return taken_usernames, taken_emails
+
+
+def import_roster(
+    rows: List[Dict],
+    defaults: Optional[Dict] = None,
+    hash_workers: Optional[int] = None,
+    batch_size: int = 200,
+    generate_passwords: bool = False,
+    dry_run: bool = False
+) -> Dict:
+    """
+    Create users for a roster
+
+    Args:
+        rows: Rows from parse_roster() (or normalize_row())
+        defaults: Values for blank columns, e.g. {'school': ..., 'grade': ...}
+        hash_workers: Password hashing processes (default: CPU count)
+        batch_size: Users per insert transaction
+        generate_passwords: Generate a password for rows without one
+            (returned once in the report) instead of rejecting the row
+        dry_run: Validate only; nothing is hashed or written
+
+    Returns:
+        dict: {'created': int, 'failed': int, 'rows': [per-row report]}
+    """
+    defaults = {key: value for key, value in (defaults or {}).items() if value}
+    report = []
+    candidates = []
+    seen_usernames, seen_emails = set(), set()
+
+    for index, row in enumerate(rows, 1):
+        row = {**row, **{key: value for key, value in defaults.items() if not row.get(key)}}
+        entry = {'row': index, 'username': row.get('username')}
+        report.append(entry)
+
+        if not row.get('username') or not row.get('email'):
+            entry.update(status=STATUS_ERROR, message='username and email are required')
+            continue
+        if not row.get('password'):
+            if not generate_passwords:
+                entry.update(status=STATUS_ERROR, message='password is required')
+                continue
+            row['password'] = secrets.token_urlsafe(9)
+            entry['generated_password'] = row['password']
+        if len(row['username']) > 80 or len(row['email']) > 120:
+            entry.update(status=STATUS_ERROR, message='username or email is too long')
+            continue
+        if '@' not in row['email']:
+            entry.update(status=STATUS_ERROR, message='email is invalid')
+            continue
+        if row['username'] in seen_usernames or row['email'] in seen_emails:
+            entry.update(status=STATUS_DUPLICATE, message='duplicate of an earlier roster row')
+            continue
+
+        seen_usernames.add(row['username'])
+        seen_emails.add(row['email'])
+        candidates.append((entry, row))
+
+    taken_usernames, taken_emails = _existing_identities(seen_usernames, seen_emails)
+    pending = []
+    for entry, row in candidates:
+        if row['username'] in taken_usernames:
+            entry.update(status=STATUS_DUPLICATE, message='Username already exists')
+        elif row['email'] in taken_emails:
+            entry.update(status=STATUS_DUPLICATE, message='Email already exists')
+        elif dry_run:
+            entry['status'] = STATUS_VALID
+        else:
+            pending.append((entry, row))
+
+    if pending:
+        hashes = hash_passwords([row['password'] for _, row in pending], hash_workers)
+        for start in range(0, len(pending), batch_size):
+            _insert_batch(pending[start:start + batch_size], hashes[start:start + batch_size])
+
+    created = sum(1 for entry in report if entry['status'] == STATUS_CREATED)
+    failed = sum(1 for entry in report if entry['status'] in (STATUS_ERROR, STATUS_DUPLICATE))
+    metrics.increment('roster.users_created', created)
+    logger.info(f"Roster import: {created} created, {failed} failed of {len(rows)} rows"
+                f"{' (dry run)' if dry_run else ''}")
+
+    return {'created': created, 'failed': failed, 'rows': report}
+
+
+def _user_values(row: Dict, password_hash: str) -> Dict:
+    return {
+        'username': row['username'],
+        'email': row['email'],
+        'password_hash': password_hash,
+        'full_name': row.get('full_name'),
+        'grade': row.get('grade'),
+        'school': row.get('school'),
+    }
+
+
+def _insert_batch(batch: List[tuple], hashes: List[str]) -> None:
+    """One transaction per batch; row by row only if a concurrent signup collides."""
+    values = [_user_values(row, password_hash) for (_, row), password_hash in zip(batch, hashes)]
+    try:
+        result = db.session.execute(
+            insert(User).returning(User.id, User.username, sort_by_parameter_order=True),
+            values
+        )
+        ids = [user_id for user_id, _ in result]
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        for (entry, _), row_values in zip(batch, values):
+            try:
+                user_id = db.session.execute(insert(User).returning(User.id), row_values).scalar_one()
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                entry.update(status=STATUS_DUPLICATE, message='Username or email already exists')
+                continue
+            entry.update(status=STATUS_CREATED, user_id=user_id)
+        return
+
+    for (entry, _), user_id in zip(batch, ids):
+        entry.update(status=STATUS_CREATED, user_id=user_id)
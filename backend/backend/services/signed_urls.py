@@ -0,0 +1,147 @@
+"""
+Signed, Expiring File URLs and nginx X-Accel-Redirect Helpers
+
+Signatures use the nginx secure_link_md5 scheme so nginx can validate a
+link and serve the file itself, without reaching a Python worker:
+
+    secure_link $arg_md5,$arg_expires;
+    secure_link_md5 "$secure_link_expires$uri <SIGNED_URL_SECRET>";
+
+Both only resolve files under the local storage roots. With a
+STORAGE_BACKEND, a node may not have the file: X-Accel delivery then falls
+back to send_file from the read-through cache, and the /files/ locations
+must be proxied to the backend (serve_signed_file) instead of aliased, see
+nginx.conf.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+from urllib.parse import quote
+
+from flask import Response
+
+# Values shipped in nginx.conf and .env.example: known to everyone
+PLACEHOLDER_SECRETS = frozenset({'CHANGE_THIS_SIGNED_URL_SECRET', 'your-signed-url-secret'})
+
+
+class SigningConfigError(RuntimeError):
+    """Raised at startup when file delivery needs a signing secret that is missing"""
+
+
+def check_signing_config(config) -> None:
+    """
+    Refuse a placeholder SIGNED_URL_SECRET, or none while X-Accel delivery is on
+
+    Raises:
+        SigningConfigError: If the configuration is unsafe
+    """
+    secret = config.get('SIGNED_URL_SECRET')
+    if secret in PLACEHOLDER_SECRETS:
+        raise SigningConfigError('SIGNED_URL_SECRET is the placeholder from the examples; set a random secret '
+                                 '(and the same one in nginx.conf)')
+    if config.get('X_ACCEL_REDIRECT_ENABLED') and not secret:
+        raise SigningConfigError('X_ACCEL_REDIRECT_ENABLED needs SIGNED_URL_SECRET '
+                                 '(the secure_link_md5 secret in nginx.conf)')
+
+
+def secure_link_signature(uri: str, expires: int, secret: str) -> str:
+    """
+    Compute the nginx secure_link_md5 signature for a URI
+
+    Args:
+        uri: Decoded request path (nginx $uri)
+        expires: Expiry as a Unix timestamp
+        secret: Shared secret (must match nginx.conf)
+
+    Returns:
+        str: base64url digest without padding
+    """
+    digest = hashlib.md5(f"{expires}{uri} {secret}".encode('utf-8')).digest()
+    return base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+
+
+def build_signed_url(uri: str, secret: str, ttl_seconds: int, now: Optional[float] = None) -> Dict[str, Union[str, int]]:
+    """
+    Build a signed, time-limited URL for a public file URI
+
+    Args:
+        uri: Decoded path, e.g. '/files/generated_pdfs/ab/cd/x.pdf'
+        secret: Shared secret
+        ttl_seconds: Link lifetime in seconds
+        now: Current time (for tests)
+
+    Returns:
+        dict: {'url': str, 'expires': int}
+    """
+    expires = int((now if now is not None else time.time()) + ttl_seconds)
+    signature = secure_link_signature(uri, expires, secret)
+    return {
+        'url': f"{quote(uri)}?md5={signature}&expires={expires}",
+        'expires': expires
+    }
+
+
+def verify_signature(uri: str, signature: str, expires: str, secret: str, now: Optional[float] = None) -> bool:
+    """
+    Verify a signed URL (Python fallback for deployments without nginx)
+
+    Returns:
+        bool: True if the signature matches and the link has not expired
+    """
+    try:
+        expires_at = int(expires)
+    except (TypeError, ValueError):
+        return False
+
+    if expires_at < (now if now is not None else time.time()):
+        return False
+
+    expected = secure_link_signature(uri, expires_at, secret)
+    return hmac.compare_digest(expected, signature or '')
+
+
+def location_for(path: Union[str, Path], locations: Dict[str, str]) -> Optional[str]:
+    """
+    Map a file path to a URI under one of the configured locations
+
+    Args:
+        path: Absolute file path on disk
+        locations: storage root directory -> URI prefix (ending with '/')
+
+    Returns:
+        str: URI for the file, or None if it is outside every root
+    """
+    resolved = Path(path).resolve()
+    for root, prefix in locations.items():
+        try:
+            relative = resolved.relative_to(Path(root).resolve())
+        except ValueError:
+            continue
+        return prefix + relative.as_posix()
+    return None
+
+
+def x_accel_response(internal_uri: str, download_name: str, mimetype: str, as_attachment: bool = True) -> Response:
+    """
+    Build an empty response that tells nginx to serve an internal location
+
+    nginx streams the file (including Range and conditional requests), so
+    the Python worker is released as soon as this response is returned.
+
+    Args:
+        internal_uri: Decoded internal URI, e.g. '/generated_pdfs/ab/cd/x.pdf'
+        download_name: Filename suggested to the browser
+        mimetype: Content type of the file
+        as_attachment: Send as attachment instead of inline
+    """
+    response = Response(status=200, mimetype=mimetype)
+    response.headers['X-Accel-Redirect'] = quote(internal_uri)
+    response.headers.set(
+        'Content-Disposition',
+        'attachment' if as_attachment else 'inline',
+        filename=download_name
+    )
+    return response
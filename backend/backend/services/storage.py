@@ -0,0 +1,464 @@
+"""
+Shared Artifact Storage
+Uploads and generated PDFs are written to UPLOAD_FOLDER / PDF_OUTPUT_DIR
+on the node that produced them. With STORAGE_BACKEND set, every new
+artifact is also published to a shared backend, so any node can serve or
+render from it without a shared filesystem:
+
+- LocalStorage: a directory (e.g. a shared mount); writes are atomic
+- S3Storage: any S3-compatible store (AWS, MinIO); boto3's managed
+  transfers switch to multipart above STORAGE_MULTIPART_THRESHOLD_MB,
+  for uploads and (as parallel ranged GETs) for downloads
+
+Reads stay on local paths (PyMuPDF, Pillow and send_file need them): a
+file that is not on this node is fetched into a small read-through cache
+(STORAGE_CACHE_DIR, least recently used first out past
+STORAGE_CACHE_MAX_MB). The PDF template can live in the backend too
+(PDF_TEMPLATE_KEY) and is then served from the same cache.
+
+Keys mirror the file delivery URIs: "uploads/<path under UPLOAD_FOLDER>"
+and "generated_pdfs/<path under PDF_OUTPUT_DIR>". Database rows keep
+their local file paths; deleting a file through the lifecycle or upload
+service deletes its object as well. Without STORAGE_BACKEND nothing
+changes: files only live on local disk.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Union
+
+from services import metrics
+from utils.sharding import shard_path
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # S3 backend unavailable
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Key prefix -> config key of the local root it mirrors
+ARTIFACT_KINDS = {
+    'generated_pdfs': 'PDF_OUTPUT_DIR',
+    'uploads': 'UPLOAD_FOLDER',
+}
+
+
+class StorageError(RuntimeError):
+    """Raised when the storage backend is misconfigured or unavailable"""
+
+
+def _atomic_write(path: Path, chunks: Iterator[bytes]) -> int:
+    """Write chunks to a temporary file next to `path`, then rename it into place"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix='.incoming-', suffix='.tmp')
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in chunks:
+                out.write(chunk)
+                size += len(chunk)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+    return size
+
+
+def _read_chunks(stream: BinaryIO) -> Iterator[bytes]:
+    return iter(lambda: stream.read(CHUNK_SIZE), b'')
+
+
+class StorageBackend:
+    """Key -> bytes store with streaming reads and writes"""
+
+    def save(self, key: str, stream: BinaryIO) -> None:
+        """Store a binary stream under `key` (read in chunks, never whole)"""
+        raise NotImplementedError
+
+    def save_file(self, key: str, path: Union[str, Path]) -> None:
+        """Store a local file under `key`"""
+        with open(path, 'rb') as f:
+            self.save(key, f)
+
+    def iter_bytes(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Stream an object, or `length` bytes of it from `start`
+
+        Raises:
+            FileNotFoundError: If there is no such object
+        """
+        raise NotImplementedError
+
+    def download(self, key: str, path: Union[str, Path]) -> None:
+        """Copy an object to a local file (atomically replaced)"""
+        _atomic_write(Path(path), self.iter_bytes(key))
+
+    def size(self, key: str) -> int:
+        """
+        Size of an object in bytes
+
+        Raises:
+            FileNotFoundError: If there is no such object
+        """
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.size(key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete(self, key: str) -> None:
+        """Delete an object (missing objects are ignored)"""
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    """Objects as files under a root directory"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        parts = Path(key).parts
+        if not parts or Path(key).is_absolute() or '..' in parts:
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return self.root.joinpath(*parts)
+
+    def save(self, key: str, stream: BinaryIO) -> None:
+        _atomic_write(self._path(key), _read_chunks(stream))
+
+    def iter_bytes(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        f = open(self._path(key), 'rb')  # FileNotFoundError before the first chunk is asked for
+
+        def chunks():
+            with f:
+                f.seek(start)
+                remaining = length
+                while remaining is None or remaining > 0:
+                    chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        return
+                    if remaining is not None:
+                        remaining -= len(chunk)
+                    yield chunk
+
+        return chunks()
+
+    def size(self, key: str) -> int:
+        return self._path(key).stat().st_size
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+
+class S3Storage(StorageBackend):
+    """Objects in an S3-compatible bucket (requires boto3)"""
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = '',
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        multipart_threshold_mb: int = 16,
+        multipart_chunk_mb: int = 8,
+        client=None
+    ):
+        """
+        Args:
+            bucket: Bucket name
+            prefix: Prepended to every key (e.g. "playbook/prod")
+            endpoint_url: Non-AWS endpoint (MinIO etc.)
+            region: Bucket region
+            multipart_threshold_mb: Objects from this size move in parts
+            multipart_chunk_mb: Part size (S3 requires at least 5 MB)
+            client: Existing boto3 S3 client (credentials otherwise come
+                from the usual AWS_* environment variables)
+
+        Raises:
+            StorageError: If boto3 is not installed
+        """
+        if boto3 is None:
+            raise StorageError("The S3 storage backend requires boto3 (pip install boto3)")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = client or boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold_mb * 1024 * 1024,
+            multipart_chunksize=max(5, multipart_chunk_mb) * 1024 * 1024
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    @staticmethod
+    def _missing(error: 'ClientError') -> bool:
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def save(self, key: str, stream: BinaryIO) -> None:
+        self.client.upload_fileobj(stream, self.bucket, self._key(key), Config=self.transfer_config)
+
+    def save_file(self, key: str, path: Union[str, Path]) -> None:
+        self.client.upload_file(str(path), self.bucket, self._key(key), Config=self.transfer_config)
+
+    def iter_bytes(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if length is not None:
+            if length <= 0:
+                return iter(())
+            params['Range'] = f"bytes={start}-{start + length - 1}"
+        elif start:
+            params['Range'] = f"bytes={start}-"
+        try:
+            body = self.client.get_object(**params)['Body']
+        except ClientError as e:
+            if self._missing(e):
+                raise FileNotFoundError(f"No stored object {key}") from e
+            raise
+        return body.iter_chunks(CHUNK_SIZE)
+
+    def download(self, key: str, path: Union[str, Path]) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix='.incoming-', suffix='.tmp')
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self._key(key), temp_name, Config=self.transfer_config)
+            os.replace(temp_name, path)
+        except ClientError as e:
+            Path(temp_name).unlink(missing_ok=True)
+            if self._missing(e):
+                raise FileNotFoundError(f"No stored object {key}") from e
+            raise
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+
+    def size(self, key: str) -> int:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))['ContentLength']
+        except ClientError as e:
+            if self._missing(e):
+                raise FileNotFoundError(f"No stored object {key}") from e
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+def create_backend(config) -> Optional[StorageBackend]:
+    """
+    Storage backend for STORAGE_BACKEND ('' = none, 'local' or 's3')
+
+    Raises:
+        StorageError: If the backend is unknown or misconfigured
+    """
+    kind = (config.get('STORAGE_BACKEND') or '').strip().lower()
+    if not kind:
+        return None
+    if kind == 'local':
+        if not config.get('STORAGE_LOCAL_ROOT'):
+            raise StorageError("STORAGE_BACKEND=local requires STORAGE_LOCAL_ROOT")
+        return LocalStorage(config['STORAGE_LOCAL_ROOT'])
+    if kind == 's3':
+        if not config.get('S3_BUCKET'):
+            raise StorageError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        return S3Storage(
+            config['S3_BUCKET'],
+            prefix=config.get('S3_PREFIX', ''),
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region=config.get('S3_REGION'),
+            multipart_threshold_mb=config.get('STORAGE_MULTIPART_THRESHOLD_MB', 16),
+            multipart_chunk_mb=config.get('STORAGE_MULTIPART_CHUNK_MB', 8)
+        )
+    raise StorageError(f"Unknown STORAGE_BACKEND: {kind}")
+
+
+# ============================================================================
+# READ-THROUGH CACHE
+# ============================================================================
+
+class ReadThroughCache:
+    """Local copies of backend objects, least recently used evicted past max_bytes"""
+
+    def __init__(self, backend: StorageBackend, directory: Union[str, Path], max_bytes: int):
+        self.backend = backend
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> Path:
+        """Cache location of a key (whether or not it is cached)"""
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest() + Path(key).suffix
+        return shard_path(self.directory, name)
+
+    def get(self, key: str) -> Path:
+        """
+        Local path of an object, fetched on a miss
+
+        Raises:
+            FileNotFoundError: If the backend has no such object
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path, None)  # mtime is the LRU clock
+            metrics.increment('storage.cache_hits')
+            return path
+        except FileNotFoundError:
+            pass
+
+        metrics.increment('storage.cache_misses')
+        self.backend.download(key, path)
+        self._evict(keep=path)
+        return path
+
+    def discard(self, key: str) -> None:
+        self.path_for(key).unlink(missing_ok=True)
+
+    def contains_path(self, path: Union[str, Path]) -> bool:
+        return self.directory.resolve() in Path(path).resolve().parents
+
+    def _evict(self, keep: Path) -> None:
+        """Remove the least recently used files until the cache fits max_bytes"""
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            files, total = [], 0
+            for dirpath, _, filenames in os.walk(self.directory):
+                for filename in filenames:
+                    if filename.startswith('.'):
+                        continue  # Downloads in progress
+                    path = Path(dirpath) / filename
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, path, stat.st_size))
+                    total += stat.st_size
+
+            for _, path, size in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                path.unlink(missing_ok=True)
+                total -= size
+                metrics.increment('storage.cache_evictions')
+
+
+# ============================================================================
+# APP INTEGRATION
+# ============================================================================
+
+class ArtifactStore:
+    """Mirrors the local upload and PDF roots into the configured backend"""
+
+    def __init__(self):
+        self._app = None
+        self.backend: Optional[StorageBackend] = None
+        self.cache: Optional[ReadThroughCache] = None
+
+    def init_app(self, app) -> None:
+        """Bind to the Flask app and create the backend (none unless STORAGE_BACKEND is set)"""
+        self._app = app
+        self.backend = create_backend(app.config)
+        self.cache = None
+        if self.backend is not None:
+            self.cache = ReadThroughCache(
+                self.backend,
+                app.config['STORAGE_CACHE_DIR'],
+                app.config.get('STORAGE_CACHE_MAX_MB', 512) * 1024 * 1024
+            )
+            logger.info(f"Artifact storage: {type(self.backend).__name__}")
+        app.extensions['artifact_storage'] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def key_for(self, path: Union[str, Path]) -> Optional[str]:
+        """Storage key of a file under one of the local roots, or None"""
+        if self._app is None:
+            return None
+        resolved = Path(path).resolve()
+        for kind, config_key in ARTIFACT_KINDS.items():
+            root = Path(self._app.config[config_key]).resolve()
+            if root in resolved.parents:
+                return f"{kind}/{resolved.relative_to(root).as_posix()}"
+        return None
+
+    def publish(self, path: Union[str, Path]) -> None:
+        """Copy a newly written local artifact to the backend (no-op without one)"""
+        key = self.key_for(path) if self.enabled else None
+        if key is None:
+            return
+        self.backend.save_file(key, path)
+        metrics.increment('storage.published')
+
+    def local_path(self, path: Union[str, Path]) -> Optional[Path]:
+        """
+        A local file with the artifact's content: the file itself when this
+        node has it, otherwise a cached copy from the backend
+
+        Returns:
+            Path, or None if the artifact exists nowhere
+        """
+        if Path(path).is_file():
+            return Path(path)
+        key = self.key_for(path) if self.enabled else None
+        if key is None:
+            return None
+        try:
+            return self.cache.get(key)
+        except FileNotFoundError:
+            return None
+
+    def localize(self, files: Dict[str, str]) -> Dict[str, str]:
+        """local_path of every value (e.g. a project's images); unavailable ones are kept as-is"""
+        localized = {}
+        for name, path in files.items():
+            local = self.local_path(path) if path else None
+            localized[name] = str(local) if local is not None else path
+        return localized
+
+    def exists(self, path: Union[str, Path]) -> bool:
+        """Whether the artifact is on this node or in the backend"""
+        if Path(path).is_file():
+            return True
+        key = self.key_for(path) if self.enabled else None
+        return key is not None and self.backend.exists(key)
+
+    def remove(self, path: Union[str, Path]) -> None:
+        """Delete the artifact's object and cached copy (the caller removes the local file)"""
+        key = self.key_for(path) if self.enabled else None
+        if key is None:
+            return
+        try:
+            self.backend.delete(key)
+            self.cache.discard(key)
+        except Exception as e:
+            logger.warning(f"Could not remove stored object {key}: {e}")
+
+    def is_cached_copy(self, path: Union[str, Path]) -> bool:
+        return self.cache is not None and self.cache.contains_path(path)
+
+    def template_path(self) -> str:
+        """PDF template: the cached copy of PDF_TEMPLATE_KEY, or PDF_TEMPLATE_PATH"""
+        key = self._app.config.get('PDF_TEMPLATE_KEY')
+        if key and self.enabled:
+            return str(self.cache.get(key))
+        return str(self._app.config['PDF_TEMPLATE_PATH'])
+
+
+# Shared instance (one per worker process)
+artifacts = ArtifactStore()
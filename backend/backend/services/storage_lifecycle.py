@@ -0,0 +1,445 @@
+"""
+Storage Lifecycle Manager
+Keeps PDF_OUTPUT_DIR and UPLOAD_FOLDER bounded:
+
+- Retention: keep only the latest N generated PDFs per project
+- Disk budget: evict least-recently-used generated PDFs (they can be
+  regenerated) once stored bytes exceed STORAGE_BUDGET_MB
+- Orphan sweep: delete local files no GeneratedPDF/ImageUpload/Blob row
+  references
+- Blob collection: delete content-addressed images no upload has used
+  for BLOB_RETENTION_SECONDS
+
+Retention and blob collection delete the shared storage object too; the
+disk budget and the orphan sweep only ever touch this node's files.
+
+Work runs in small steps on a background thread (and the
+storage_maintenance.py CLI), so request handling never waits for it.
+Only one worker at a time runs a step (file lock).
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import func
+
+from models import db, GeneratedPDF, ImageUpload, Blob
+from services.background import PeriodicTask
+from services.blob_store import collect_unused_blobs
+from services.storage import artifacts
+from services import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILENAME = '.lifecycle.lock'
+
+# Tables whose file_path column references files under the storage roots
+REFERENCE_COLUMNS = (
+    GeneratedPDF.file_path, ImageUpload.file_path, Blob.file_path,
+    ImageUpload.thumbnail_path, ImageUpload.rendition_path
+)
+
+
+# Downloads refresh GeneratedPDF.last_accessed_at at most this often
+ACCESS_TOUCH_INTERVAL = timedelta(hours=1)
+
+
+def touch_access_time(pdf_record) -> None:
+    """Record a download of a generated PDF (drives LRU eviction; commits)."""
+    now = datetime.utcnow()
+    last = pdf_record.last_accessed_at
+    if last is not None and now - last < ACCESS_TOUCH_INTERVAL:
+        return
+    GeneratedPDF.query.filter_by(id=pdf_record.id).update(
+        {GeneratedPDF.last_accessed_at: now}, synchronize_session=False
+    )
+    db.session.commit()
+
+
+class StorageLifecycleManager:
+    """Retention, disk budget and orphan sweeping for stored files"""
+
+    def __init__(self):
+        self._app = None
+        self._walker: Optional[Iterator[Path]] = None
+        self._spellings: Dict[Path, set] = {}
+        self._task = PeriodicTask('storage-lifecycle', 300, self.run_step)
+
+    def init_app(self, app) -> None:
+        """Bind to the Flask app and read lifecycle settings"""
+        self._app = app
+        self._task.interval = app.config.get('STORAGE_SWEEP_INTERVAL_SECONDS', 300)
+        app.extensions['storage_lifecycle'] = self
+
+    def ensure_started(self) -> None:
+        """Start the background sweeper in this process (no-op if disabled)"""
+        if self._app is not None and self._task.interval > 0:
+            self._task.ensure_started()
+
+    @property
+    def config(self) -> dict:
+        return self._app.config
+
+    @property
+    def roots(self) -> List[Path]:
+        return [Path(self.config['PDF_OUTPUT_DIR']), Path(self.config['UPLOAD_FOLDER'])]
+
+    # ========================================================================
+    # RETENTION
+    # ========================================================================
+
+    def enforce_retention(self, project_id: int, keep: Optional[int] = None) -> int:
+        """
+        Delete all but the latest `keep` generated PDFs of a project
+
+        Args:
+            project_id: Project ID
+            keep: PDFs to keep (default PDF_RETENTION_PER_PROJECT; 0 disables)
+
+        Returns:
+            int: Number of PDFs removed
+        """
+        keep = self.config.get('PDF_RETENTION_PER_PROJECT', 5) if keep is None else keep
+        if keep <= 0:
+            return 0
+
+        stale = (
+            GeneratedPDF.query
+            .filter_by(project_id=project_id)
+            .order_by(GeneratedPDF.generated_at.desc(), GeneratedPDF.id.desc())
+            .offset(keep)
+            .all()
+        )
+        for pdf_record in stale:
+            self._remove_artifact(pdf_record.file_path)
+            db.session.delete(pdf_record)
+
+        if stale:
+            db.session.commit()
+            metrics.increment('storage.retention_removed', len(stale))
+            logger.info(f"Retention: removed {len(stale)} old PDFs of project {project_id}")
+
+        return len(stale)
+
+    # ========================================================================
+    # DISK BUDGET
+    # ========================================================================
+
+    def stored_bytes(self) -> int:
+        """Local bytes per the GeneratedPDF (not evicted), legacy ImageUpload and Blob rows (no disk walk)"""
+        return self._pdf_bytes() + self._upload_bytes()
+
+    @staticmethod
+    def _pdf_bytes() -> int:
+        """Bytes of generated PDFs with a local copy (the evictable part)"""
+        return int(db.session.query(func.coalesce(func.sum(GeneratedPDF.file_size), 0)).filter(
+            GeneratedPDF.evicted_at.is_(None)
+        ).scalar())
+
+    @staticmethod
+    def _upload_bytes() -> int:
+        image_bytes = db.session.query(func.coalesce(func.sum(ImageUpload.file_size), 0)).filter(
+            ImageUpload.content_hash.is_(None)
+        ).scalar()
+        blob_bytes = db.session.query(func.coalesce(func.sum(Blob.file_size), 0)).scalar()
+        return int(image_bytes) + int(blob_bytes)
+
+    def enforce_budget(self, max_evictions: int = 100) -> int:
+        """
+        Evict least-recently-used generated PDFs while over STORAGE_BUDGET_MB
+
+        Uploads are never evicted: only PDFs can be regenerated. If uploads
+        alone exceed the budget nothing is evicted, since no number of PDF
+        evictions could meet it. With a shared storage backend only the
+        local copy is dropped (the row is marked evicted_at and later reads
+        go through the read-through cache); otherwise the row goes too.
+
+        Returns:
+            int: Bytes freed
+        """
+        budget_mb = self.config.get('STORAGE_BUDGET_MB', 0)
+        if budget_mb <= 0:
+            return 0
+
+        budget = budget_mb * 1024 * 1024
+        upload_bytes = self._upload_bytes()
+        excess = self._pdf_bytes() + upload_bytes - budget
+        if excess <= 0:
+            return 0
+        if upload_bytes >= budget:
+            logger.warning(
+                f"Disk budget: uploads alone use {upload_bytes:,} of {budget:,} bytes; "
+                f"evicting PDFs cannot help, raise STORAGE_BUDGET_MB"
+            )
+            return 0
+
+        # Least recently downloaded first (index on evicted_at, last_accessed_at)
+        candidates = (
+            db.session.query(GeneratedPDF.id, GeneratedPDF.file_path, GeneratedPDF.file_size)
+            .filter(GeneratedPDF.evicted_at.is_(None))
+            .order_by(GeneratedPDF.last_accessed_at, GeneratedPDF.id)
+            .limit(max_evictions)
+            .all()
+        )
+
+        freed = 0
+        evicted_ids = []
+        for pdf_id, file_path, file_size in candidates:
+            if freed >= excess:
+                break
+            self._remove_local(file_path)
+            evicted_ids.append(pdf_id)
+            freed += file_size or 0
+
+        if evicted_ids:
+            evicted = GeneratedPDF.query.filter(GeneratedPDF.id.in_(evicted_ids))
+            if artifacts.enabled:
+                evicted.update({GeneratedPDF.evicted_at: datetime.utcnow()}, synchronize_session=False)
+            else:
+                evicted.delete(synchronize_session=False)
+            db.session.commit()
+            metrics.increment('storage.budget_evicted', len(evicted_ids))
+            logger.info(f"Disk budget: evicted {len(evicted_ids)} PDFs ({freed:,} bytes)")
+
+        return freed
+
+    # ========================================================================
+    # BLOB COLLECTION
+    # ========================================================================
+
+    def collect_blobs(self, batch_size: int = 200) -> Dict[str, int]:
+        """
+        Delete one batch of unreferenced blobs past BLOB_RETENTION_SECONDS
+
+        A blob counts as removed once both its row and its file are gone.
+        Its file is kept (and the blob counted as skipped) when it was
+        stored again meanwhile, is already missing, or cannot be deleted.
+
+        Returns:
+            dict: {'removed': int, 'skipped': int}; both 0 once nothing is left
+        """
+        retention = self.config.get('BLOB_RETENTION_SECONDS', 7 * 24 * 3600)
+        deleted_rows = collect_unused_blobs(retention, batch_size)
+        removed = 0
+        for file_path in deleted_rows:
+            try:
+                if os.stat(file_path).st_mtime > time.time() - retention:
+                    continue  # Stored again meanwhile: the new row owns the file
+            except OSError:
+                continue
+            if self._remove_artifact(file_path):
+                removed += 1
+
+        skipped = len(deleted_rows) - removed
+        if removed:
+            metrics.increment('storage.blobs_removed', removed)
+        if skipped:
+            metrics.increment('storage.blobs_skipped', skipped)
+        if deleted_rows:
+            logger.info(f"Blob collection: removed {removed} unreferenced blobs, "
+                        f"kept the files of {skipped}")
+
+        return {'removed': removed, 'skipped': skipped}
+
+    # ========================================================================
+    # ORPHAN SWEEP
+    # ========================================================================
+
+    def sweep_orphans_step(self, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Examine the next batch of files and delete unreferenced ones
+
+        The directory walk resumes where the previous step stopped and
+        restarts from the top once every root has been visited. Files are
+        matched against the rows by their path relative to the root, under
+        every spelling of the root the rows use (relative, absolute,
+        symlinked). Nothing under a root is deleted while no row can be
+        matched to it: a moved root or changed setting must not look like
+        a directory full of orphans.
+
+        Returns:
+            dict: {'scanned': int, 'removed': int, 'completed_pass': 0|1}
+        """
+        batch_size = batch_size or self.config.get('STORAGE_SWEEP_BATCH', 500)
+        grace = self.config.get('STORAGE_ORPHAN_GRACE_SECONDS', 3600)
+        cutoff = time.time() - grace
+
+        if self._walker is None:
+            self._walker = self._walk_files()
+            self._spellings = self._root_spellings()
+
+        batch = []
+        completed_pass = 0
+        for path in self._walker:
+            batch.append(path)
+            if len(batch) >= batch_size:
+                break
+        else:
+            self._walker = None
+            completed_pass = 1
+
+        # Only files past the grace period: an upload or render may not
+        # have committed its row yet
+        old_files = []
+        for path in batch:
+            try:
+                if path.stat().st_mtime < cutoff and self._spellings.get(self._root_of(path)):
+                    old_files.append(path)
+            except OSError:
+                continue
+
+        referenced = self._referenced_paths(old_files)
+        removed = 0
+        for path in old_files:
+            if path not in referenced:
+                self._remove_local(str(path))
+                removed += 1
+
+        if removed:
+            metrics.increment('storage.orphans_removed', removed)
+            logger.info(f"Orphan sweep: removed {removed} unreferenced files")
+
+        return {'scanned': len(batch), 'removed': removed, 'completed_pass': completed_pass}
+
+    def _walk_files(self) -> Iterator[Path]:
+        for root in self.roots:
+            if not root.exists():
+                continue
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.startswith('.'):
+                        continue  # Lock files and other dotfiles
+                    yield Path(dirpath) / filename
+
+    def _root_of(self, path: Path) -> Optional[Path]:
+        for root in self.roots:
+            if root in path.parents:
+                return root
+        return None
+
+    def _root_spellings(self, sample_size: int = 20) -> Dict[Path, set]:
+        """
+        How the rows spell each root: prefixes of recent stored paths that
+        resolve under it (empty for a root no sampled row resolves into)
+        """
+        resolved_roots = {root: root.resolve() for root in self.roots}
+        spellings = {root: set() for root in self.roots}
+        for column in REFERENCE_COLUMNS:
+            stored_paths = (
+                db.session.query(column).filter(column.isnot(None))
+                .order_by(*[key.desc() for key in column.class_.__table__.primary_key]).limit(sample_size)
+            )
+            for (stored,) in stored_paths:
+                resolved = Path(stored).resolve()
+                for root, resolved_root in resolved_roots.items():
+                    if resolved_root not in resolved.parents:
+                        continue
+                    relative = resolved.relative_to(resolved_root)
+                    if Path(stored).parts[-len(relative.parts):] != relative.parts:
+                        continue  # Spelled with symlinks or ".." below the root
+                    prefix = Path(stored)
+                    for _ in relative.parts:
+                        prefix = prefix.parent
+                    spellings[root].update({str(prefix), str(root), str(resolved_root)})
+        return spellings
+
+    def _referenced_paths(self, paths: List[Path]) -> set:
+        """Subset of paths referenced by any row, under any spelling of their root."""
+        spelled = {}
+        for path in paths:
+            root = self._root_of(path)
+            relative = path.relative_to(root)
+            for prefix in self._spellings.get(root, ()):
+                spelled[str(Path(prefix) / relative)] = path
+                spelled[f"{prefix.rstrip('/')}/{relative.as_posix()}"] = path
+
+        candidates = list(spelled)
+        referenced = set()
+        for start in range(0, len(candidates), 500):
+            chunk = candidates[start:start + 500]
+            for column in REFERENCE_COLUMNS:
+                referenced.update(
+                    spelled[stored] for (stored,) in db.session.query(column).filter(column.in_(chunk))
+                )
+        return referenced
+
+    # ========================================================================
+    # SCHEDULING
+    # ========================================================================
+
+    def run_step(self) -> Dict[str, int]:
+        """One bounded unit of lifecycle work (budget + one blob batch + one orphan batch)"""
+        with self._app.app_context(), self._exclusive() as acquired:
+            if not acquired:
+                return {}
+            try:
+                freed = self.enforce_budget()
+                blobs = self.collect_blobs()
+                sweep = self.sweep_orphans_step()
+                return {'bytes_freed': freed, 'blobs_removed': blobs['removed'],
+                        'blobs_skipped': blobs['skipped'], **sweep}
+            finally:
+                db.session.remove()
+
+    @contextmanager
+    def _exclusive(self):
+        """Non-blocking inter-process lock; yields False if another worker holds it."""
+        if fcntl is None:
+            yield True
+            return
+
+        lock_path = Path(self.config['PDF_OUTPUT_DIR']) / LOCK_FILENAME
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _remove_artifact(self, file_path: str) -> bool:
+        """Delete a file everywhere: the shared storage object and the local copy."""
+        artifacts.remove(file_path)
+        return self._remove_local(file_path)
+
+    def _remove_local(self, file_path: str) -> bool:
+        """Delete this node's copy of a file (shared storage keeps its object); False if it was not deleted."""
+        path = Path(file_path)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {e}")
+            return False
+
+        # Prune now-empty shard directories (never the roots themselves)
+        roots = {root.resolve() for root in self.roots}
+        parent = path.parent.resolve()
+        if not roots.intersection(parent.parents):
+            return True
+        while parent not in roots:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+        return True
+
+
+# Shared instance (one per worker process)
+lifecycle = StorageLifecycleManager()
@@ -0,0 +1,260 @@
+"""
+Stream Renderer
+Render playbook PDFs from a stream of JSONL records, without a Flask app
+or database: for data pipelines, and as a repeatable load generator.
+
+A record is one JSON object per line:
+
+    {"id": "asha-3", "responses": {"field": "value", ...},
+     "images": {"field": "path/to/image.png" | "data:image/png;base64,..."}}
+
+"id" (optional) names the output, `<id>.pdf`; records without one are
+named after their line number. Images are file paths or inline data URLs
+(PNG or JPEG), which are decoded into a scratch directory for the render
+and removed after it.
+
+Records are rendered on a RenderPool (one warm generator per worker, or
+inline with workers=0) a few records ahead of the output, and the PDFs are
+written in input order to a sink: a directory, a tar stream or a single
+raw PDF on stdout. Every record produces one result (see render_stream),
+so a bad line or failed render is reported and the stream carries on.
+"""
+import base64
+import binascii
+import json
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from services.render_pool import RenderPool
+
+_DATA_URL_RE = re.compile(r'^data:image/(png|jpeg);base64,(.*)$', re.IGNORECASE | re.DOTALL)
+
+
+class RecordError(ValueError):
+    """Raised when a JSONL record is not valid input"""
+
+
+def read_records(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    """
+    Parse JSONL lines, skipping blank ones
+
+    Yields:
+        tuple: (line number, record dict or RecordError)
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, RecordError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield number, RecordError("Record is not a JSON object")
+            continue
+        yield number, record
+
+
+def output_name(record: Dict[str, Any], number: int) -> str:
+    """File name of a record's PDF"""
+    name = secure_filename(str(record.get('id') or ''))
+    return f"{name or f'record-{number:06d}'}.pdf"
+
+
+def _image_path(value: Any, field_name: str, scratch: Path, number: int) -> str:
+    if not isinstance(value, str) or not value:
+        raise RecordError(f"Image '{field_name}' must be a path or a data URL")
+
+    match = _DATA_URL_RE.match(value.strip())
+    if not match:
+        if value.startswith('data:'):
+            raise RecordError(f"Image '{field_name}' is not a PNG or JPEG data URL")
+        if not Path(value).is_file():
+            raise RecordError(f"Image '{field_name}' not found: {value}")
+        return value
+
+    try:
+        raw = base64.b64decode(match.group(2), validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise RecordError(f"Invalid base64 payload for image '{field_name}': {e}")
+    suffix = '.png' if match.group(1).lower() == 'png' else '.jpg'
+    path = scratch / f"{number}_{secure_filename(field_name) or 'image'}{suffix}"
+    path.write_bytes(raw)
+    return str(path)
+
+
+def build_job(record: Dict[str, Any], number: int, scratch: Path) -> Dict[str, Any]:
+    """
+    RenderPool job for a record
+
+    Args:
+        record: Parsed JSONL record
+        number: Line number (names unnamed outputs and inline images)
+        scratch: Directory for decoded inline images
+
+    Raises:
+        RecordError: If the record is not valid input
+    """
+    responses = record.get('responses')
+    if not isinstance(responses, dict):
+        raise RecordError("Record has no 'responses' object")
+    images = record.get('images') or {}
+    if not isinstance(images, dict):
+        raise RecordError("'images' must be an object of field -> image")
+
+    return {
+        'responses': responses,
+        'images': {field: _image_path(value, field, scratch, number) for field, value in images.items()},
+        'filename': output_name(record, number)
+    }
+
+
+# ============================================================================
+# SINKS
+# ============================================================================
+
+class DirectorySink:
+    """Move each PDF to `<directory>/<name>`"""
+
+    def __init__(self, directory: Path, render_dir: Path):
+        self.render_dir = render_dir
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, name: str, path: Path) -> None:
+        shutil.move(str(path), str(self.directory / name))
+
+    def close(self) -> None:
+        pass
+
+
+class TarSink:
+    """Append each PDF to an uncompressed tar stream (a file or stdout) and delete it"""
+
+    def __init__(self, stream: BinaryIO, render_dir: Path):
+        self.render_dir = render_dir
+        self._tar = tarfile.open(fileobj=stream, mode='w|')
+
+    def write(self, name: str, path: Path) -> None:
+        info = self._tar.gettarinfo(str(path), arcname=name)
+        with open(path, 'rb') as f:
+            self._tar.addfile(info, f)
+        path.unlink()
+
+    def close(self) -> None:
+        self._tar.close()
+
+
+class SingleFileSink:
+    """Copy one PDF to a binary stream (stdout); a second record is an error"""
+
+    def __init__(self, stream: BinaryIO, render_dir: Path):
+        self.render_dir = render_dir
+        self._stream = stream
+        self._written = False
+
+    def write(self, name: str, path: Path) -> None:
+        if self._written:
+            path.unlink()
+            raise RecordError("Only one PDF can be written to stdout; use a tar stream for more")
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self._stream)
+        self._stream.flush()
+        path.unlink()
+        self._written = True
+
+    def close(self) -> None:
+        pass
+
+
+# ============================================================================
+# RENDERING
+# ============================================================================
+
+def render_stream(
+    records: Iterable[Tuple[int, Any]],
+    sink,
+    pool: RenderPool,
+    scratch: Path,
+    lookahead: int = 4
+) -> Iterator[Dict[str, Any]]:
+    """
+    Render records in order, `lookahead` records ahead of the sink
+
+    Args:
+        records: (line number, record or RecordError) pairs, as read_records yields
+        sink: DirectorySink, TarSink or SingleFileSink (see open_sink); the
+            pool must render into its render_dir
+        pool: RenderPool
+        scratch: Directory for decoded inline images
+        lookahead: Records queued on the pool ahead of the one being written
+
+    Yields:
+        dict: One result per record, in input order: {"line", "name", "status"
+            ("ok" or "error"), "seconds" (render time), "latency" (queued to
+            written), "size", "error"}
+    """
+    records = iter(records)
+    pending = deque()
+
+    def plan_ahead():
+        while len(pending) < max(1, lookahead):
+            item = next(records, None)
+            if item is None:
+                return
+            number, record = item
+            queued = time.perf_counter()
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                job = build_job(record, number, scratch)
+                inline = [Path(path) for path in job['images'].values() if Path(path).parent == scratch]
+                pending.append((number, job['filename'], queued, pool.submit(job), inline, None))
+            except RecordError as e:
+                name = output_name(record, number) if isinstance(record, dict) else None
+                pending.append((number, name, queued, None, [], e))
+
+    plan_ahead()
+    while pending:
+        number, name, queued, future, inline, error = pending.popleft()
+        result = {'line': number, 'name': name, 'status': 'ok'}
+        try:
+            if error is not None:
+                raise error
+            rendered = future.result()
+            sink.write(name, Path(rendered['path']))
+            result.update(seconds=round(rendered['seconds'], 4), size=rendered['size'])
+        except Exception as e:
+            result.update(status='error', error=str(e))
+        for path in inline:
+            path.unlink(missing_ok=True)
+        result['latency'] = round(time.perf_counter() - queued, 4)
+
+        plan_ahead()
+        yield result
+
+
+def open_sink(output_dir: Optional[Path] = None, tar_stream: Optional[BinaryIO] = None,
+              pdf_stream: Optional[BinaryIO] = None):
+    """
+    Sink for exactly one of the outputs, plus the scratch directory to remove afterwards
+
+    Returns:
+        tuple: (sink, scratch Path); the pool renders under scratch and
+        the sink moves or copies each PDF out
+    """
+    scratch = Path(tempfile.mkdtemp(prefix='render_jsonl_'))
+    render_dir = scratch / 'pdfs'
+    if output_dir is not None:
+        return DirectorySink(output_dir, render_dir), scratch
+    if tar_stream is not None:
+        return TarSink(tar_stream, render_dir), scratch
+    return SingleFileSink(pdf_stream, render_dir), scratch
@@ -0,0 +1,141 @@
+"""
+Image Upload Storage
+Shared by the single-image and bulk sync endpoints: stores the uploaded
+file in the content-addressed blob store and points the project's
+ImageUpload row at it.
+"""
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from models import db, Blob, ImageUpload
+from auth import sanitize_filename
+from services.blob_store import store_blob
+from services.storage import artifacts
+
+logger = logging.getLogger(__name__)
+
+
+def store_uploaded_file(file, upload_root, user_id: int, project_id: int, field_name: str) -> Dict:
+    """
+    Save an uploaded (already validated) image file to the blob store
+
+    Args:
+        file: FileStorage from the request
+        upload_root: UPLOAD_FOLDER
+        user_id: Owner user ID
+        project_id: Project ID
+        field_name: Image field name
+
+    Returns:
+        dict: filename, file_path, file_size, mime_type, content_hash
+    """
+    blob = store_blob(file.stream, upload_root, file.content_type)
+    return describe_blob(blob, user_id, project_id, field_name, file.filename)
+
+
+def describe_blob(blob: Blob, user_id: int, project_id: int, field_name: str,
+                  original_filename: Optional[str] = None) -> Dict:
+    """
+    ImageUpload values for a stored blob
+
+    Args:
+        blob: Stored blob
+        user_id: Owner user ID
+        project_id: Project ID
+        field_name: Image field name
+        original_filename: Client file name (default: the blob's hash)
+
+    Returns:
+        dict: filename, file_path, file_size, mime_type, content_hash
+    """
+    sanitized_name = sanitize_filename(
+        secure_filename(original_filename or '') or blob.sha256[:16] + Path(blob.file_path).suffix
+    )
+
+    # Display name only; the file itself is named by its hash
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"{user_id}_{project_id}_{sanitize_filename(field_name)}_{timestamp}_{sanitized_name}"
+
+    return {
+        'filename': filename,
+        'file_path': blob.file_path,
+        'file_size': blob.file_size,
+        'mime_type': blob.mime_type,
+        'content_hash': blob.sha256
+    }
+
+
+def assign_image(
+    project_id: int,
+    field_name: str,
+    stored: Dict,
+    existing: Optional[ImageUpload] = None
+) -> Tuple[ImageUpload, Optional[str]]:
+    """
+    Point a project's image field at a stored file (does not commit)
+
+    Args:
+        project_id: Project ID
+        field_name: Image field name
+        stored: Result of store_uploaded_file
+        existing: Current ImageUpload for the field, if already loaded
+
+    Returns:
+        tuple: (image_record, replaced_file_path or None)
+    """
+    if existing is None:
+        existing = ImageUpload.query.filter_by(
+            project_id=project_id,
+            field_name=field_name
+        ).first()
+
+    if existing:
+        replaced_path = existing.file_path
+        existing.filename = stored['filename']
+        existing.file_path = stored['file_path']
+        existing.file_size = stored['file_size']
+        existing.mime_type = stored['mime_type']
+        existing.content_hash = stored.get('content_hash')
+        if existing.file_path != replaced_path:
+            existing.clear_derivatives()
+        existing.uploaded_at = datetime.utcnow()
+        return existing, replaced_path
+
+    image_record = ImageUpload(
+        project_id=project_id,
+        field_name=field_name,
+        **stored
+    )
+    db.session.add(image_record)
+    return image_record, None
+
+
+def release_file(file_path: Optional[str]) -> None:
+    """
+    Delete a replaced upload unless something still references it
+
+    Blob files are never deleted here: they are reference-counted and
+    reclaimed by the storage lifecycle. Legacy (per-upload) files may be
+    shared by provisioned projects.
+    """
+    if not file_path:
+        return
+    if db.session.query(Blob.sha256).filter_by(file_path=file_path).first() is not None:
+        return
+    if db.session.query(ImageUpload.id).filter_by(file_path=file_path).first() is None:
+        remove_file_quietly(file_path)
+
+
+def remove_file_quietly(file_path: Optional[str]) -> None:
+    """Delete a replaced or abandoned upload; failures are only logged."""
+    if not file_path:
+        return
+    artifacts.remove(file_path)
+    try:
+        Path(file_path).unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Could not remove upload {file_path}: {e}")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Storage Maintenance CLI
+Run storage lifecycle passes outside the web workers
+
+Usage:
+    python storage_maintenance.py [OPTIONS]
+
+Options:
+    --retention         Keep only the latest N PDFs of every project
+    --keep N            PDFs to keep per project (default: PDF_RETENTION_PER_PROJECT)
+    --budget            Evict least-recently-used PDFs while over STORAGE_BUDGET_MB
+    --blobs             Delete images unreferenced for BLOB_RETENTION_SECONDS
+    --orphans           Delete files not referenced by any database row
+    --all               Run all passes
+
+Examples:
+    python storage_maintenance.py --all
+    python storage_maintenance.py --retention --keep 3
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import create_app
+from models import db, GeneratedPDF
+from services.storage_lifecycle import lifecycle
+
+
+def run_retention(keep=None):
+    """Apply per-project retention to every project with PDFs"""
+    project_ids = [pid for (pid,) in db.session.query(GeneratedPDF.project_id).distinct()]
+    removed = sum(lifecycle.enforce_retention(pid, keep) for pid in project_ids)
+    print(f"✓ Retention: {removed} PDFs removed across {len(project_ids)} projects")
+
+
+def run_budget():
+    """Evict until under the disk budget"""
+    total = 0
+    while True:
+        freed = lifecycle.enforce_budget()
+        if not freed:
+            break
+        total += freed
+    print(f"✓ Disk budget: {total:,} bytes freed ({lifecycle.stored_bytes():,} bytes stored)")
+
+
+def run_blobs():
+    """Collect every expired unreferenced blob"""
+    removed = skipped = 0
+    while True:
+        result = lifecycle.collect_blobs()
+        if not result['removed'] and not result['skipped']:
+            break
+        removed += result['removed']
+        skipped += result['skipped']
+    print(f"✓ Blob collection: {removed} unreferenced blobs removed, {skipped} skipped (file reused, missing or not deletable)")
+
+
+def run_orphans():
+    """Complete one full orphan sweep pass"""
+    scanned = removed = 0
+    while True:
+        result = lifecycle.sweep_orphans_step()
+        scanned += result['scanned']
+        removed += result['removed']
+        if result['completed_pass']:
+            break
+    print(f"✓ Orphan sweep: {scanned} files scanned, {removed} removed")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Storage Maintenance Tool",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+
+    parser.add_argument('--retention', action='store_true',
+                        help='Keep only the latest N PDFs per project')
+    parser.add_argument('--keep', type=int,
+                        help='PDFs to keep per project')
+    parser.add_argument('--budget', action='store_true',
+                        help='Enforce the disk budget')
+    parser.add_argument('--blobs', action='store_true',
+                        help='Delete expired unreferenced blobs')
+    parser.add_argument('--orphans', action='store_true',
+                        help='Delete unreferenced files')
+    parser.add_argument('--all', action='store_true',
+                        help='Run all passes')
+
+    args = parser.parse_args()
+
+    if not (args.retention or args.budget or args.blobs or args.orphans or args.all):
+        parser.print_help()
+        return 1
+
+    app = create_app()
+
+    with app.app_context():
+        if args.all or args.retention:
+            run_retention(args.keep)
+
+        if args.all or args.budget:
+            run_budget()
+
+        if args.all or args.blobs:
+            run_blobs()
+
+        if args.all or args.orphans:
+            run_orphans()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Shared test fixtures
+
+`app` is a Flask app on a fresh database (in memory unless a module's
+`app_config` says otherwise) with the API blueprints registered, the
+shared services bound to it and the per-worker caches cleared. A module
+tunes it by overriding `app_config`, and seeds data by overriding `app`
+(an overriding fixture may request the one it overrides).
+"""
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+from auth import clear_auth_caches, generate_token
+from config import TestingConfig
+from models import db, init_db, User, Project, GeneratedPDF
+from routes.pdf_routes import pdf_bp
+from routes.project_routes import project_bp
+from services.counter_buffer import counters
+from services.storage import artifacts
+from services.storage_lifecycle import lifecycle
+
+DOWNLOAD_COUNTER = 'generated_pdfs.download_count'
+
+
+@pytest.fixture
+def app_config():
+    """Config overrides applied before init_db (override in a module)"""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.config.update({
+        'UPLOAD_FOLDER': tmp_path / 'uploads',
+        'PDF_OUTPUT_DIR': tmp_path / 'pdfs',
+        'ARCHIVE_DIR': tmp_path / 'archive',
+        'AUTOSAVE_SPOOL_DIR': tmp_path / 'spool',
+        'STORAGE_CACHE_DIR': tmp_path / 'cache',
+        'STORAGE_BACKEND': '',
+        'X_ACCEL_REDIRECT_ENABLED': False
+    })
+    app.config.update(app_config)
+    Path(app.config['UPLOAD_FOLDER']).mkdir(parents=True, exist_ok=True)
+    Path(app.config['PDF_OUTPUT_DIR']).mkdir(parents=True, exist_ok=True)
+
+    init_db(app)
+    app.register_blueprint(pdf_bp)
+    app.register_blueprint(project_bp)
+    artifacts.init_app(app)
+    lifecycle.init_app(app)
+    counters.register(DOWNLOAD_COUNTER, GeneratedPDF.__table__.c.download_count)
+    clear_auth_caches()
+
+    with app.app_context():
+        yield app
+        counters._pending.clear()
+        db.session.remove()
+        # A file database goes with tmp_path; buffers under test may still flush to it at exit
+        if app.config['SQLALCHEMY_DATABASE_URI'] == TestingConfig.SQLALCHEMY_DATABASE_URI:
+            db.drop_all()
+
+    # The services are shared by every test: leave no backend behind
+    app.config['STORAGE_BACKEND'] = ''
+    artifacts.init_app(app)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Factory: make_user(username, projects=0, **user_fields) -> User (committed)"""
+    def make(username='asha', projects=0, **fields):
+        user = User(username=username, email=f'{username}@x.com', **fields)
+        user.set_password('pw')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all(Project(user_id=user.id, title=f'{username} {n}') for n in range(projects))
+        db.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def student(make_user):
+    """User 'asha' owning project 1"""
+    user = make_user('asha')
+    db.session.add(Project(id=1, user_id=user.id, title='P'))
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers():
+    """Factory: auth_headers(user_id) -> Authorization header of that user"""
+    def headers(user_id=1):
+        return {'Authorization': f'Bearer {generate_token(user_id)}'}
+    return headers
@@ -0,0 +1,119 @@
+"""
+Test suite for the incrementally maintained school analytics
+"""
+import pytest
+
+from models import (
+    db, User, Project, Response, ImageUpload, AnalyticsDaily,
+    bulk_upsert_responses
+)
+from services.project_state import record_project_changes
+from services.analytics import analytics, rebuild, stage_project_event, summarize, _cohorts
+
+
+@pytest.fixture
+def app(app):
+    _cohorts.clear()  # User IDs repeat across test databases
+    analytics._pending.clear()  # Deltas buffered by other test modules
+    yield app
+    analytics.flush()
+
+
+@pytest.fixture
+def add_project(make_user):
+    """Factory: add_project(username, school, grade) -> the user's project, counted as created"""
+    def add(username, school, grade):
+        user = make_user(username, school=school, grade=grade)
+        project = Project(user_id=user.id, title='P')
+        db.session.add(project)
+        stage_project_event(user.id, projects_created=1)
+        db.session.commit()
+        return project
+    return add
+
+
+def _save(project, **values):
+    bulk_upsert_responses(project.id, [
+        {'field_name': field, 'field_value': value} for field, value in values.items()
+    ])
+    record_project_changes(project, responses=values)
+    db.session.commit()
+
+
+def _upload(project, field, path):
+    db.session.add(ImageUpload(project_id=project.id, field_name=field, filename='a.png', file_path=path))
+    record_project_changes(project, images={field: path})
+    db.session.commit()
+
+
+def _page(summary, page):
+    return next(entry for entry in summary['pages'] if entry['page'] == page)
+
+
+def test_saves_update_page_figures(app, add_project):
+    """Test fill rates, completion and text length follow saves and edits"""
+    asha = add_project('asha', 'SNS', '3')
+    ben = add_project('ben', 'SNS', '3')
+    add_project('chen', 'Other', '4')
+
+    _save(asha, problem_statement='Water', problem_who_it_helps='Kids', problem_because='Heat')
+    _save(ben, problem_statement='Bottles')
+    _save(ben, problem_statement='Plastic bottles')  # Edit: text length changes, fill count does not
+    _upload(asha, 'sad_space_drawing', '/tmp/a.png')
+    analytics.flush()
+
+    summary = summarize(school='SNS', grade='3')
+    assert summary['projects'] == 2
+    page3 = _page(summary, 3)
+    assert page3['fields_filled'] == 4
+    assert page3['fill_rate'] == round(4 / (2 * 3), 4)
+    assert page3['completion_rate'] == 0.5
+    assert page3['avg_text_length'] == round((5 + 4 + 4 + 15) / 4, 1)
+    assert _page(summary, 6)['images'] == 1
+    assert summary['activity']['totals']['edits'] == 5
+    assert summary['activity']['totals']['image_uploads'] == 1
+
+    assert summarize(school='Other')['projects'] == 1
+    assert summarize()['projects'] == 3
+
+    # Clearing a field takes it back out
+    _save(asha, problem_because='')
+    analytics.flush()
+    assert _page(summarize(school='SNS'), 3)['completion_rate'] == 0.0
+
+
+def test_rolled_back_changes_are_not_counted(app, add_project):
+    """Test staged deltas are dropped when the transaction rolls back"""
+    project = add_project('asha', 'SNS', '3')
+    db.session.add(Response(project_id=project.id, field_name='student_name', field_value='Asha'))
+    record_project_changes(project, responses={'student_name': 'Asha'})
+    db.session.rollback()
+    analytics.flush()
+
+    assert _page(summarize(), 1)['fields_filled'] == 0
+
+
+def test_rebuild_matches_incremental_figures(app, add_project):
+    """Test a streaming rebuild reproduces the incrementally maintained table"""
+    asha = add_project('asha', 'SNS', '3')
+    ben = add_project('ben', 'SNS', '4')
+    _save(asha, student_name='Asha', problem_statement='Water')
+    _save(ben, empathy_who='Grandma')
+    _upload(ben, 'idea_1_drawing', '/tmp/b.png')
+    analytics.flush()
+
+    def table():
+        return {
+            (row.school, row.grade, row.page): tuple(getattr(row, c) for c in AnalyticsDaily.COUNTER_COLUMNS)
+            for row in AnalyticsDaily.query
+        }
+
+    incremental = table()
+    result = rebuild(batch_size=1)
+
+    assert result['projects'] == 2
+    assert table() == incremental
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
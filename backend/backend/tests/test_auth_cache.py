@@ -0,0 +1,107 @@
+"""
+Test suite for cached authentication context
+"""
+import pytest
+from sqlalchemy import event
+
+from models import db, Project
+from auth import (
+    generate_token,
+    get_current_user,
+    user_owns_project
+)
+from utils.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def statements():
+    """Record SQL statements issued while the test runs"""
+    issued = []
+
+    def record(conn, cursor, statement, *args):
+        issued.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield issued
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_ttl_cache_expiry_and_lru():
+    """Test entries expire and the least recently used entry is evicted"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    cache.set('d', 4, ttl=0)
+    assert cache.get('d') is None
+
+
+def test_repeat_requests_skip_database(app, make_user, statements):
+    """Test a second request with the same token issues no queries"""
+    user = make_user('alice')
+    token = generate_token(user.id)
+
+    with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+        assert get_current_user().username == 'alice'
+
+    statements.clear()
+    with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+        identity = get_current_user()
+
+    assert identity.id == user.id
+    assert identity.to_dict()['email'] == 'alice@x.com'
+    assert statements == []
+
+
+def test_user_update_invalidates_identity(app, make_user):
+    """Test changing a user is visible on the next request"""
+    user = make_user('alice')
+    token = generate_token(user.id)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with app.test_request_context(headers=headers):
+        assert get_current_user().school is None
+
+    user.school = 'Springfield'
+    db.session.commit()
+
+    with app.test_request_context(headers=headers):
+        assert get_current_user().school == 'Springfield'
+
+    db.session.delete(user)
+    db.session.commit()
+
+    with app.test_request_context(headers=headers):
+        assert get_current_user() is None
+
+
+def test_project_ownership_cache(app, make_user, statements):
+    """Test ownership is cached and invalidated when the owner changes"""
+    alice = make_user('alice')
+    bob = make_user('bob')
+    project = Project(user_id=alice.id, title='P')
+    db.session.add(project)
+    db.session.commit()
+    project_id = project.id
+
+    assert user_owns_project(alice, project_id)
+    db.session.refresh(bob)
+    statements.clear()
+    assert user_owns_project(alice, project_id)
+    assert not user_owns_project(bob, project_id)
+    assert statements == []
+
+    project.user_id = bob.id
+    db.session.commit()
+
+    assert user_owns_project(bob, project_id)
+    assert not user_owns_project(alice, project_id)
+    assert not user_owns_project(alice, 'not-an-id')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
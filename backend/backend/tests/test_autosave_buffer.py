@@ -0,0 +1,144 @@
+"""
+Test suite for the autosave coalescing buffer
+"""
+import json
+
+import pytest
+
+from models import db, Project, Response
+from services.autosave_buffer import REJECTED_SUFFIX, AutosaveBuffer, fcntl
+
+pytestmark = [
+    pytest.mark.skipif(fcntl is None, reason="autosave buffer requires fcntl"),
+    pytest.mark.usefixtures('student')
+]
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+            'AUTOSAVE_BUFFER_ENABLED': True}  # Opt-in
+
+
+def test_saves_coalesce_to_latest_value(app):
+    """Test only the last value per field is written, and reads see pending saves"""
+    buffer = AutosaveBuffer()
+    buffer.init_app(app)
+
+    for text in ['H', 'He', 'Hel', 'Hello']:
+        buffer.put(1, 'student_name', text, 1)
+    buffer.put(1, 'final_message', 'bye')
+
+    assert buffer.pending(1) == {'student_name': 'Hello', 'final_message': 'bye'}
+    assert Response.query.count() == 0
+
+    assert buffer.flush() == 2
+    assert buffer.pending(1) == {}
+    assert {r.field_name: r.field_value for r in Response.query} == {
+        'student_name': 'Hello', 'final_message': 'bye'
+    }
+    assert db.session.get(Project, 1).snapshot['responses']['student_name'] == 'Hello'
+
+
+def test_spool_left_by_crash_is_replayed(app):
+    """Test saves spooled by a process that never flushed are written at startup"""
+    AutosaveBuffer().init_app(app)  # Creates the spool dir
+    crashed = AutosaveBuffer()
+    crashed._app = app
+    crashed._spool_dir = app.config['AUTOSAVE_SPOOL_DIR']
+    crashed.put(1, 'student_name', 'Ann')
+    with open(crashed._spool_path(1), 'a') as spool:
+        spool.write('{"field_name": "torn')  # Crash mid-write
+
+    AutosaveBuffer().init_app(app)
+
+    assert Response.query.filter_by(field_name='student_name').one().field_value == 'Ann'
+
+
+def test_saves_for_deleted_project_are_dropped(app):
+    """Test a deleted project does not block the flush of other projects"""
+    buffer = AutosaveBuffer()
+    buffer.init_app(app)
+    buffer.put(99, 'student_name', 'Ghost')
+    buffer.put(1, 'student_name', 'Ann')
+
+    assert buffer.flush() == 1
+    assert buffer.pending(99) == {}
+
+
+
+def test_table_values_are_stored_as_json(app):
+    """Test dict/list values (e.g. validation_scores) are normalized before spooling"""
+    buffer = AutosaveBuffer()
+    buffer.init_app(app)
+    buffer.put(1, 'validation_scores', {'feasible': 4, 'useful': 5}, 9)
+    buffer.put(1, 'idea_count', 3)
+
+    assert buffer.pending(1) == {'validation_scores': '{"feasible": 4, "useful": 5}', 'idea_count': '3'}
+    assert buffer.flush() == 2
+    assert Response.query.filter_by(field_name='validation_scores').one().field_value == \
+        '{"feasible": 4, "useful": 5}'
+
+
+def test_refused_saves_are_quarantined(app):
+    """Test a value the database refuses is set aside and the rest of the project is written"""
+    buffer = AutosaveBuffer()
+    buffer.init_app(app)
+    buffer.put(1, 'student_name', 'Ann')
+    spool_path = buffer._spool_path(1)
+    with open(spool_path, 'a') as spool:  # Spooled before values were normalized
+        spool.write(json.dumps({'field_name': 'validation_scores', 'field_value': {'a': 1}}) + '\n')
+
+    assert buffer.flush() == 1
+    assert not spool_path.exists()
+    rejected = [json.loads(line) for line in open(f'{spool_path}{REJECTED_SUFFIX}')]
+    assert [entry['field_name'] for entry in rejected] == ['validation_scores']
+
+    buffer.put(1, 'student_name', 'Bea')
+    assert buffer.flush_project(1) == 1
+    assert Response.query.filter_by(field_name='student_name').one().field_value == 'Bea'
+
+
+def test_append_after_torn_line_starts_a_new_line(app):
+    """Test a crashed writer's partial line does not swallow the next save"""
+    buffer = AutosaveBuffer()
+    buffer.init_app(app)
+    buffer.put(1, 'student_name', 'Ann')
+    with open(buffer._spool_path(1), 'a') as spool:
+        spool.write('{"field_name": "torn')
+
+    buffer.put(1, 'final_message', 'bye')
+
+    assert buffer.pending(1) == {'student_name': 'Ann', 'final_message': 'bye'}
+
+
+
+def test_reads_overlay_pending_saves_without_flushing(app, client, auth_headers):
+    """Test the responses and progress routes see buffered saves and leave them spooled"""
+    from services.autosave_buffer import autosave
+
+    autosave.init_app(app)
+    try:
+        headers = auth_headers(db.session.get(Project, 1).user_id)
+
+        saved = client.post('/api/save-response', headers=headers, json={
+            'project_id': 1, 'field_name': 'student_name', 'field_value': 'Ann', 'page_number': 1
+        }).get_json()
+        assert saved == {'success': True, 'response_id': None, 'buffered': True}
+
+        listed = client.get('/api/project/1/responses', headers=headers)
+        assert listed.get_json()['responses'] == {'student_name': 'Ann'}
+        assert listed.headers.get('ETag') is None
+        progress = client.get('/api/project/1/progress', headers=headers).get_json()['progress']
+        assert progress['filled'] == 1
+        assert Response.query.count() == 0 and autosave.pending(1)
+
+        autosave.flush()
+        listed = client.get('/api/project/1/responses', headers=headers)
+        assert listed.get_json()['responses'] == {'student_name': 'Ann'} and listed.headers['ETag']
+    finally:
+        autosave._app = None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,123 @@
+"""
+Test suite for the batch render checkpoint and resume contract
+"""
+from argparse import Namespace
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+
+import batch_render
+from models import db, Project, GeneratedPDF
+from services.project_state import save_response
+
+
+class FakePool:
+    """Renders inline by writing a stub PDF; records what was submitted"""
+
+    def __init__(self, output_dir, fail=(), interrupt_at=None):
+        self.output_dir = Path(output_dir)
+        self.fail = set(fail)
+        self.interrupt_at = interrupt_at
+        self.submitted = []
+
+    def __call__(self, template_path, output_dir, workers):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def submit(self, job):
+        project_id = job['project_id']
+        self.submitted.append(project_id)
+        if project_id == self.interrupt_at:
+            raise KeyboardInterrupt
+        future = Future()
+        if project_id in self.fail:
+            future.set_exception(RuntimeError('render failed'))
+            return future
+        path = self.output_dir / job['filename']
+        path.write_bytes(b'%PDF-1.7\n')
+        future.set_result({'path': str(path), 'size': path.stat().st_size,
+                           'content_hash': 'x' * 64, 'seconds': 0.01})
+        return future
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}"}
+
+
+@pytest.fixture
+def app(app, make_user):
+    user = make_user('asha')
+    # Projects 1-8 are rendered except 3 (no answers); 9 is archived
+    for project_id in range(1, 10):
+        db.session.add(Project(id=project_id, user_id=user.id, title=f'P{project_id}',
+                               status='archived' if project_id == 9 else 'in_progress'))
+    db.session.commit()
+    for project_id in [1, 2, 4, 5, 6, 7, 8, 9]:
+        save_response(project_id, 'student_name', f'Asha {project_id}')
+    return app
+
+
+def _args(tmp_path, restart=False):
+    return Namespace(school=None, grade=None, status=None, project=None, updated_since=None,
+                     missing_only=False, limit=None, workers=1, batch=3, restart=restart,
+                     checkpoint=tmp_path / 'batch.checkpoint', report_every=60)
+
+
+def _pdf_counts():
+    return dict(db.session.query(GeneratedPDF.project_id, db.func.count(GeneratedPDF.id))
+                .group_by(GeneratedPDF.project_id))
+
+
+def _checkpointed(tmp_path):
+    return sorted(int(line) for line in (tmp_path / 'batch.checkpoint').read_text().split())
+
+
+def test_resume_neither_repeats_nor_loses_work(app, tmp_path, monkeypatch):
+    """Test an interrupted run keeps its committed renders, and a rerun renders only
+    what is left, failed renders included"""
+    first = FakePool(tmp_path / 'pdfs', fail={2}, interrupt_at=8)
+    monkeypatch.setattr(batch_render, 'RenderPool', first)
+    with pytest.raises(KeyboardInterrupt):
+        batch_render.run(_args(tmp_path), app)
+
+    # 1, 4, 5 (+ skipped 3) in a mid-run batch; 6 and 7 written on the way out
+    assert first.submitted == [1, 2, 4, 5, 6, 7, 8]
+    assert _checkpointed(tmp_path) == [1, 3, 4, 5, 6, 7]
+    assert _pdf_counts() == {1: 1, 4: 1, 5: 1, 6: 1, 7: 1}
+
+    second = FakePool(tmp_path / 'pdfs')
+    monkeypatch.setattr(batch_render, 'RenderPool', second)
+    stats = batch_render.run(_args(tmp_path), app)
+
+    assert second.submitted == [2, 8]
+    assert (stats.rendered, stats.skipped, stats.failed) == (2, 0, 0)
+    assert _checkpointed(tmp_path) == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert _pdf_counts() == {n: 1 for n in [1, 2, 4, 5, 6, 7, 8]}
+
+    third = FakePool(tmp_path / 'pdfs')
+    monkeypatch.setattr(batch_render, 'RenderPool', third)
+    batch_render.run(_args(tmp_path), app)
+    assert third.submitted == []
+
+
+def test_restart_ignores_the_checkpoint(app, tmp_path, monkeypatch):
+    """Test --restart renders every eligible project again"""
+    (tmp_path / 'batch.checkpoint').write_text('1\n2\n')
+    pool = FakePool(tmp_path / 'pdfs')
+    monkeypatch.setattr(batch_render, 'RenderPool', pool)
+
+    batch_render.run(_args(tmp_path, restart=True), app)
+
+    assert pool.submitted == [1, 2, 4, 5, 6, 7, 8]
+    assert _checkpointed(tmp_path) == [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
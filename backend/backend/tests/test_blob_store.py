@@ -0,0 +1,120 @@
+"""
+Test suite for the content-addressed blob store
+"""
+import hashlib
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, ImageUpload, Blob
+from services.blob_store import store_blob, resolve_blobs, collect_unused_blobs, parse_hash_reference
+from services.upload_service import describe_blob, assign_image
+from services.provisioning import provision_projects
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'UPLOAD_FOLDER': tmp_path}
+
+
+@pytest.fixture
+def projects(make_user):
+    user = make_user('asha', projects=2)
+    return user.id, sorted(project.id for project in user.projects)
+
+
+def test_identical_content_is_stored_once(app, tmp_path):
+    """Test bytes and streams with the same content share one file"""
+    first = store_blob(b'png-bytes', tmp_path, 'image/png')
+    second = store_blob(io.BytesIO(b'png-bytes'), tmp_path, 'image/png')
+    db.session.commit()
+
+    assert first.sha256 == second.sha256 == hashlib.sha256(b'png-bytes').hexdigest()
+    assert first.file_path.endswith(first.sha256 + '.png')
+    assert Blob.query.count() == 1
+    assert [p.name for p in tmp_path.rglob('*') if p.is_file()] == [first.sha256 + '.png']
+
+    assert parse_hash_reference('sha256:' + first.sha256.upper()) == first.sha256
+    assert parse_hash_reference('data:image/png;base64,AAAA') is None
+    assert set(resolve_blobs([first.sha256, '0' * 64])) == {first.sha256}
+
+
+def test_ref_count_follows_image_rows(app, tmp_path, projects, make_user):
+    """Test assigning, replacing and provisioning images keep ref_count exact"""
+    user_id, (project_id, other_id) = projects
+    logo = store_blob(b'logo', tmp_path, 'image/png')
+    drawing = store_blob(b'drawing', tmp_path, 'image/png')
+
+    assign_image(project_id, 'class_image', describe_blob(logo, user_id, project_id, 'class_image'))
+    assign_image(other_id, 'class_image', describe_blob(logo, user_id, other_id, 'class_image'))
+    db.session.commit()
+    assert db.session.get(Blob, logo.sha256).ref_count == 2
+
+    assign_image(other_id, 'class_image', describe_blob(drawing, user_id, other_id, 'class_image'))
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(Blob, logo.sha256).ref_count == 1
+    assert db.session.get(Blob, drawing.sha256).ref_count == 1
+
+    student = make_user('ben')
+    provision_projects(project_id, user_ids=[student.id])
+    db.session.expire_all()
+    assert db.session.get(Blob, logo.sha256).ref_count == 2
+
+
+def test_collect_unused_blobs(app, tmp_path, projects):
+    """Test only expired unreferenced blobs are collected, after a recount"""
+    user_id, (project_id, _) = projects
+    unused = store_blob(b'unused', tmp_path, 'image/png')
+    drifted = store_blob(b'drifted', tmp_path, 'image/png')
+    assign_image(project_id, 'class_image', describe_blob(drifted, user_id, project_id, 'class_image'))
+    db.session.commit()
+
+    old = datetime.utcnow() - timedelta(days=30)
+    Blob.query.update({'last_used_at': old, 'ref_count': 0})
+    db.session.commit()
+
+    assert collect_unused_blobs(retention_seconds=3600) == [unused.file_path]
+    assert db.session.get(Blob, unused.sha256) is None
+    assert db.session.get(Blob, drifted.sha256).ref_count == 1
+    assert ImageUpload.query.one().content_hash == drifted.sha256
+
+
+
+def test_hash_lookups_are_scoped_to_the_owner(client, tmp_path, projects, make_user, auth_headers,
+                                               monkeypatch):
+    """Test users only see their own blobs, checks do not extend retention, and
+    anonymous direct renders neither resolve hashes nor keep their images"""
+    monkeypatch.delenv('PDF_API_KEY', raising=False)
+    user_id, (project_id, _) = projects
+    other = make_user('ben')
+    logo = store_blob(b'logo', tmp_path, 'image/png')
+    assign_image(project_id, 'class_image', describe_blob(logo, user_id, project_id, 'class_image'))
+    db.session.commit()
+    old = datetime.utcnow() - timedelta(days=1)
+    Blob.query.update({'last_used_at': old})
+    db.session.commit()
+
+    assert set(resolve_blobs([logo.sha256], touch=False, owner_id=user_id)) == {logo.sha256}
+    assert resolve_blobs([logo.sha256], touch=False, owner_id=other.id) == {}
+
+    check = {'hashes': [logo.sha256]}
+    assert client.post('/api/blobs/check', json=check).status_code == 401
+    for uid, present in [(user_id, [logo.sha256]), (other.id, [])]:
+        assert client.post('/api/blobs/check', json=check, headers=auth_headers(uid)).get_json()['present'] == present
+    assert db.session.get(Blob, logo.sha256).last_used_at == old
+
+    direct = client.post('/api/generate-pdf-direct', json={
+        'responses': {}, 'images': {'class_logo': f'sha256:{logo.sha256}'}
+    })
+    assert direct.status_code == 401
+    client.post('/api/generate-pdf-direct', json={
+        'responses': {}, 'images': {'idea_1_drawing': 'data:image/png;base64,' + 'iVBORw0KGgo='}
+    })
+    assert Blob.query.count() == 1
+    assert not list((tmp_path / 'direct').glob('*/*'))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
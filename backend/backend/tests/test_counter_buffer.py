@@ -0,0 +1,134 @@
+"""
+Test suite for the write-behind counter buffer
+"""
+import runpy
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from models import db, GeneratedPDF
+from services.counter_buffer import CounterBuffer, counters
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+COUNTER = 'generated_pdfs.download_count'
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+            'COUNTER_FLUSH_INTERVAL_SECONDS': 0}  # Flushes only when called
+
+
+@pytest.fixture
+def app(app, student):
+    db.session.add_all([
+        GeneratedPDF(id=n, project_id=1, filename=f'{n}.pdf', file_path=f'/tmp/{n}.pdf')
+        for n in range(1, 4)
+    ])
+    db.session.commit()
+    return app
+
+
+def _buffer(app):
+    buffer = CounterBuffer()
+    buffer._app = app
+    buffer.register(COUNTER, GeneratedPDF.__table__.c.download_count)
+    return buffer
+
+
+def _counts():
+    db.session.expire_all()
+    return {pdf.id: pdf.download_count for pdf in GeneratedPDF.query.order_by(GeneratedPDF.id)}
+
+
+def test_flush_is_one_batched_update(app):
+    """Test all rows of a counter are written by a single executemany UPDATE"""
+    buffer = _buffer(app)
+    for row_id in [1, 2, 2, 3, 3, 3]:
+        buffer.increment(COUNTER, row_id)
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE generated_pdfs'):
+            updates.append((executemany, len(parameters) if executemany else 1))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert buffer.flush() == 3
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert updates == [(True, 3)]
+    assert _counts() == {1: 1, 2: 2, 3: 3}
+    assert buffer.flush() == 0  # Nothing applied twice
+    assert _counts() == {1: 1, 2: 2, 3: 3}
+
+
+def test_failed_flush_keeps_deltas_once(app, monkeypatch):
+    """Test deltas of a failed write are retried, merged with newer ones, exactly once"""
+    buffer = _buffer(app)
+    buffer.increment(COUNTER, 1, 5)
+    write = buffer._write
+
+    def fail(batch):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(buffer, '_write', fail)
+    assert buffer.flush() == 0
+    buffer.increment(COUNTER, 1)
+    assert buffer.pending(COUNTER, 1) == 6
+
+    monkeypatch.setattr(buffer, '_write', write)
+    assert buffer.flush() == 1
+    assert _counts()[1] == 6 and buffer.pending(COUNTER, 1) == 0
+
+
+def test_worker_exit_flushes_buffered_counts(app, monkeypatch):
+    """Test gunicorn's worker_exit hook writes this worker's counts out"""
+    buffer = _buffer(app)
+    monkeypatch.setattr(counters, '_columns', buffer._columns)
+    monkeypatch.setattr(counters, '_pending', buffer._pending)
+    monkeypatch.setattr(counters, '_app', app)
+    counters.increment(COUNTER, 2, 4)
+
+    hooks = runpy.run_path(str(BACKEND_DIR / 'gunicorn.conf.py'))
+    hooks['worker_exit'](None, SimpleNamespace(pid=1234))
+
+    assert _counts()[2] == 4 and counters.pending(COUNTER, 2) == 0
+
+
+@pytest.mark.parametrize('interval', [0, 0.001], ids=['no-thread', 'flushing-thread'])
+def test_exit_flushes_buffered_counts(app, tmp_path, interval):
+    """Test a process that exits without flushing still writes its counts (atexit),
+    also while the background thread is mid-flush"""
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {str(BACKEND_DIR)!r})
+        from flask import Flask
+        from config import TestingConfig
+        from models import init_db, GeneratedPDF
+        from services.counter_buffer import counters
+
+        app = Flask(__name__)
+        app.config.from_object(TestingConfig)
+        app.config['SQLALCHEMY_DATABASE_URI'] = {app.config['SQLALCHEMY_DATABASE_URI']!r}
+        app.config['COUNTER_FLUSH_INTERVAL_SECONDS'] = {interval!r}
+        init_db(app)
+        counters.init_app(app)
+        counters.register({COUNTER!r}, GeneratedPDF.__table__.c.download_count)
+        for _ in range(7):
+            counters.increment({COUNTER!r}, 3)
+    """)
+
+    subprocess.run([sys.executable, '-c', script], cwd=tmp_path, check=True, capture_output=True)
+
+    assert _counts()[3] == 7
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
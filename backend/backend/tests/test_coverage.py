@@ -0,0 +1,42 @@
+"""
+Test suite for incremental project coverage counters
+"""
+import random
+
+import pytest
+
+from pdf_mappings import FIELD_INDEX
+from services.coverage import compute_coverage, update_coverage, empty_coverage
+
+
+def test_optional_fields_are_not_required():
+    """Test fields described as "(optional)" never appear as missing"""
+    assert FIELD_INDEX['welcome_message']['required'] is False
+    assert 'welcome_message' not in empty_coverage()['missing_required']
+    assert 'student_name' in empty_coverage()['missing_required']
+
+
+def test_incremental_updates_match_full_computation():
+    """Test applying random changes one at a time equals a full recount"""
+    rng = random.Random(7)
+    fields = list(FIELD_INDEX) + ['unmapped_field']
+    values = ['', '  ', 'text', None]
+    responses, images = {}, {}
+    coverage = empty_coverage()
+
+    for _ in range(500):
+        field = rng.choice(fields)
+        if rng.random() < 0.3:
+            change_responses, change_images = {}, {field: rng.choice(['/tmp/a.png', ''])}
+        else:
+            change_responses, change_images = {field: rng.choice(values)}, {}
+
+        coverage = update_coverage(coverage, responses, images, change_responses, change_images)
+        responses = {**responses, **change_responses}
+        images = {**images, **change_images}
+
+    assert coverage == compute_coverage(responses, images)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,37 @@
+"""
+Test suite for database engine profiles
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from services.db_profiles import engine_options_for, install_sqlite_pragmas
+
+
+def test_postgresql_profile_sets_pool_and_timeouts():
+    """Test the PostgreSQL profile sizes the pool and passes server timeouts"""
+    options = engine_options_for(
+        'postgresql://user:pw@localhost/db',
+        {'DB_POOL_SIZE': 3, 'DB_STATEMENT_TIMEOUT_MS': 1000, 'DB_LOCK_TIMEOUT_MS': 200}
+    )
+
+    assert options['pool_size'] == 3
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args']['options'] == '-c statement_timeout=1000 -c lock_timeout=200'
+
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path):
+    """Test each new SQLite connection gets WAL, busy timeout and cache pragmas"""
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    settings = {'DB_SQLITE_BUSY_TIMEOUT_MS': 1234}
+    engine = create_engine(url, **engine_options_for(url, settings))
+    install_sqlite_pragmas(engine, settings)
+
+    with engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 1234
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,103 @@
+"""
+Test suite for ingest-time image derivatives
+"""
+import pytest
+from PIL import Image
+
+from models import db, ImageUpload
+from services.image_derivatives import (
+    build_derivatives, content_box, dominant_mode, fit_image_to_field, usable_rendition, derivatives
+)
+
+FIELD = {'x': 100, 'y': 200, 'width': 120, 'height': 80, 'fit': 'contain', 'crop_padding': 0}
+
+
+def _drawing(tmp_path, color=(0, 0, 0)):
+    img = Image.new('RGB', (400, 400), (255, 255, 255))
+    img.paste(Image.new('RGB', (100, 50), color), (150, 100))
+    path = tmp_path / 'drawing.png'
+    img.save(path)
+    return path
+
+
+def test_metadata_and_fit(tmp_path):
+    """Test crop box, mode detection and placement in the field box"""
+    with Image.open(_drawing(tmp_path)) as img:
+        assert content_box(img) == (150, 100, 250, 150)
+        assert dominant_mode(img) == 'L'
+        resized, rect = fit_image_to_field(img, FIELD)
+        hi_res, hi_rect = fit_image_to_field(img, FIELD, dpi=144)
+
+    # Cropped to 100x50, scaled to the 120pt width and centered vertically
+    assert resized.size == (120, 60)
+    assert rect == (100, 210, 220, 270)
+    assert hi_rect == rect and hi_res.size == (240, 120)
+
+    assert dominant_mode(Image.new('RGB', (4, 4), (255, 0, 0))) == 'RGB'
+    assert dominant_mode(Image.new('RGBA', (4, 4), (0, 0, 0, 0))) == 'RGBA'
+
+
+def test_build_derivatives_reuses_files(tmp_path):
+    """Test thumbnail and rendition are written once per content and geometry"""
+    source = _drawing(tmp_path, color=(200, 30, 30))
+    values = build_derivatives(str(source), 'ab' * 32, FIELD, tmp_path, thumbnail_size=64)
+
+    assert (values['image_width'], values['image_height']) == (400, 400)
+    assert values['dominant_mode'] == 'RGB'
+    with Image.open(values['thumbnail_path']) as thumbnail:
+        assert max(thumbnail.size) == 64
+    rendition = {'path': values['rendition_path'], **values['rendition_meta']}
+    assert usable_rendition(rendition, FIELD)
+    assert not usable_rendition(rendition, {**FIELD, 'width': 300})
+
+    mtime = tmp_path.joinpath(values['rendition_path']).stat().st_mtime_ns
+    again = build_derivatives(str(source), 'ab' * 32, FIELD, tmp_path, thumbnail_size=64)
+    assert again == values
+    assert tmp_path.joinpath(values['rendition_path']).stat().st_mtime_ns == mtime
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'UPLOAD_FOLDER': tmp_path}
+
+
+@pytest.fixture
+def client(app, client, student, auth_headers):
+    derivatives.init_app(app)
+    client.environ_base['HTTP_AUTHORIZATION'] = auth_headers(student.id)['Authorization']
+    yield client
+    derivatives._app = None
+
+
+def _thumbnail(client, path):
+    image = ImageUpload(project_id=1, field_name='user_profile_image', filename=path.name, file_path=str(path))
+    db.session.add(image)
+    db.session.commit()
+    return client.get(f'/api/image/{image.id}/thumbnail')
+
+
+def test_thumbnail_is_built_on_demand(client, tmp_path):
+    """Test a missing thumbnail is built and served as JPEG"""
+    response = _thumbnail(client, _drawing(tmp_path))
+
+    assert response.status_code == 200 and response.mimetype == 'image/jpeg'
+    assert ImageUpload.query.one().thumbnail_path
+
+
+def test_thumbnail_of_undecodable_image_is_422(client, tmp_path):
+    """Test an upload that cannot be decoded gets 422, not a server error"""
+    path = tmp_path / 'broken.png'
+    path.write_bytes(b'not an image')
+
+    assert _thumbnail(client, path).status_code == 422
+
+
+def test_thumbnail_not_built_is_404(client, tmp_path, monkeypatch):
+    """Test a build that records nothing (e.g. the image was replaced) gets 404"""
+    monkeypatch.setattr(derivatives, 'process_image', lambda image_id: False)
+
+    assert _thumbnail(client, _drawing(tmp_path)).status_code == 404
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,98 @@
+"""
+Test suite for conditional, ranged and cached PDF downloads
+"""
+import hashlib
+
+import pytest
+
+from auth import generate_token
+from models import db, GeneratedPDF
+from services.counter_buffer import counters
+
+CONTENT = b'%PDF-1.7\n' + bytes(range(256)) * 8
+COUNTER = 'generated_pdfs.download_count'
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'PDF_OUTPUT_DIR': tmp_path, 'PDF_DOWNLOAD_MAX_AGE_SECONDS': 3600}
+
+
+@pytest.fixture
+def app(app, tmp_path, student, make_user):
+    make_user('ben')
+    path = tmp_path / 'playbook.pdf'
+    path.write_bytes(CONTENT)
+    db.session.add(GeneratedPDF(id=1, project_id=1, filename='playbook.pdf', file_path=str(path),
+                                file_size=len(CONTENT), content_hash=hashlib.sha256(CONTENT).hexdigest()))
+    db.session.commit()
+    return app
+
+
+def _get(client, user_id=1, **headers):
+    headers['Authorization'] = f'Bearer {generate_token(user_id)}'
+    return client.get('/api/download-pdf/1', headers={k.replace('_', '-'): v for k, v in headers.items()})
+
+
+def test_full_download_is_cacheable_and_counted(client):
+    """Test the PDF comes with a strong ETag and a private, immutable Cache-Control"""
+    response = _get(client)
+
+    assert response.status_code == 200 and response.data == CONTENT
+    assert response.headers['ETag'] == f'"{hashlib.sha256(CONTENT).hexdigest()}"'
+    assert response.cache_control.private and not response.cache_control.public
+    assert response.cache_control.max_age == 3600 and response.cache_control.immutable
+    assert 'attachment' in response.headers['Content-Disposition']
+    assert counters.pending(COUNTER, 1) == 1
+
+
+def test_matching_etag_gets_304(client):
+    """Test a revalidation with the current ETag gets 304 and is not a new download"""
+    etag = _get(client).headers['ETag']
+
+    response = _get(client, If_None_Match=etag)
+
+    assert response.status_code == 304 and response.data == b''
+    assert response.headers['ETag'] == etag
+    assert counters.pending(COUNTER, 1) == 1
+    assert _get(client, If_None_Match='"stale"').status_code == 200
+
+
+def test_range_requests_get_206(client):
+    """Test ranges are served partially and only a download from byte 0 counts"""
+    first = _get(client, Range='bytes=0-99')
+    resumed = _get(client, Range='bytes=100-')
+
+    assert first.status_code == 206 and first.data == CONTENT[:100]
+    assert first.headers['Content-Range'] == f'bytes 0-99/{len(CONTENT)}'
+    assert resumed.status_code == 206 and resumed.data == CONTENT[100:]
+    assert counters.pending(COUNTER, 1) == 1
+
+    etag = first.headers['ETag']
+    assert _get(client, Range='bytes=100-', If_Range=etag).status_code == 206
+    assert _get(client, Range='bytes=100-', If_Range='"changed"').status_code == 200
+    assert _get(client, Range=f'bytes={len(CONTENT)}-').status_code == 416
+
+
+def test_x_accel_counts_only_new_downloads(app, client):
+    """Test with nginx delivering, revalidations and resumed ranges are not counted"""
+    app.config['X_ACCEL_REDIRECT_ENABLED'] = True
+
+    assert 'X-Accel-Redirect' in _get(client).headers
+    _get(client, If_None_Match='"abc"')
+    _get(client, If_Modified_Since='Wed, 01 Jul 2026 00:00:00 GMT')
+    _get(client, Range='bytes=100-')
+    _get(client, Range='bytes=0-99')
+
+    assert counters.pending(COUNTER, 1) == 2
+
+
+def test_other_users_cannot_download(client):
+    """Test ownership is checked before anything is served"""
+    assert _get(client, user_id=2).status_code == 403
+    assert client.get('/api/download-pdf/1').status_code == 401
+    assert counters.pending(COUNTER, 1) == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
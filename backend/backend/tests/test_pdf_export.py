@@ -0,0 +1,146 @@
+"""
+Test suite for bulk class PDF exports and the streaming ZIP writer
+"""
+import io
+import os
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from models import db, GeneratedPDF, bulk_upsert_responses
+from services.pdf_export import (
+    ExportFilesChanged, complete_export, create_export, export_progress, resolve_entries
+)
+from services.project_state import record_project_changes
+from services.render_pool import RenderPool
+from utils.zipstream import archive_size, central_directory, crc32_file, stream_zip
+
+
+@pytest.fixture
+def pool(tmp_path):
+    # No template here: any project that needs a render fails
+    return RenderPool(tmp_path / 'missing-template.pdf', tmp_path / 'pdfs', workers=0)
+
+
+def _file(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    return path
+
+
+def _entry(path, name):
+    return {'name': name, 'path': str(path), 'size': path.stat().st_size,
+            'crc': crc32_file(path), 'modified': datetime(2026, 6, 30, 14, 5, 10)}
+
+
+@pytest.fixture
+def add_student(tmp_path, make_user):
+    """Factory: add_student(username, ...) -> the student's project"""
+    def add(username, school='SNS', grade='3', pdf=True, answered=True):
+        project = make_user(username, projects=1, school=school, grade=grade).projects[0]
+        if answered:
+            bulk_upsert_responses(project.id, [{'field_name': 'student_name', 'field_value': username}])
+            record_project_changes(project, responses={'student_name': username})
+        if pdf:
+            path = _file(tmp_path, f'{username}.pdf', 5000)
+            db.session.add(GeneratedPDF(project_id=project.id, filename=path.name, file_path=str(path),
+                                        file_size=5000, project_revision=project.revision))
+        db.session.commit()
+        return project
+    return add
+
+
+def test_stream_zip_layout_and_resume(tmp_path):
+    """Test stored entries read back and any suffix of the stream can be regenerated"""
+    entries = [_entry(_file(tmp_path, f'f{i}', size), f'é/{i}.pdf') for i, size in enumerate((0, 1, 70000))]
+
+    data = b''.join(stream_zip(iter(entries)))
+
+    assert len(data) == archive_size(entries)
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.testzip() is None
+    assert archive.namelist() == ['é/0.pdf', 'é/1.pdf', 'é/2.pdf']
+    assert archive.infolist()[2].compress_type == zipfile.ZIP_STORED
+    assert archive.infolist()[2].date_time == (2026, 6, 30, 14, 5, 10)
+    for start in (1, 31, len(data) // 2, len(data) - 5, len(data)):
+        assert b''.join(stream_zip(entries, start)) == data[start:]
+
+
+def test_zip64_end_records(tmp_path):
+    """Test offsets past 4 GiB switch the directory to ZIP64"""
+    entry = _entry(_file(tmp_path, 'f', 10), 'a.pdf')
+
+    classic = central_directory([entry], [0], 100)
+    large = central_directory([entry, entry], [0, 5 * 2 ** 30], 6 * 2 ** 30)
+
+    assert b'PK\x06\x06' not in classic
+    assert b'PK\x06\x06' in large and b'PK\x06\x07' in large
+
+
+def test_export_streams_class_pdfs_in_order(app, tmp_path, pool, add_student):
+    """Test fresh PDFs are reused, unanswered projects skipped and progress recorded"""
+    add_student('ben')
+    add_student('asha')
+    add_student('chen', answered=False, pdf=False)
+    add_student('dev', grade='4')
+    add_student('eve', school='Other')
+
+    export = create_export('SNS', grade='3')
+    assert export_progress(export)['status'] == 'pending'
+
+    data = b''.join(stream_zip(resolve_entries(export, pool)))
+
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.testzip() is None
+    assert [name.split('_')[0] for name in archive.namelist()] == ['asha', 'ben']
+    assert archive.read(archive.namelist()[0]) == (tmp_path / 'asha.pdf').read_bytes()
+
+    progress = export_progress(export)
+    assert progress['status'] == 'complete'
+    assert (progress['projects'], progress['reused'], progress['skipped']) == (3, 2, 1)
+    assert progress['size'] == len(data)
+
+
+def test_interrupted_export_resumes_with_same_bytes(app, tmp_path, pool, add_student):
+    """Test a download cut after the first entry resumes into an identical archive"""
+    for username in ('asha', 'ben', 'chen'):
+        add_student(username)
+    export = create_export('SNS')
+
+    stream = stream_zip(resolve_entries(export, pool))
+    received = next(stream) + next(stream)  # asha's header and file
+    stream.close()
+    assert export_progress(export)['processed'] == 1
+
+    entries = complete_export(export, pool)
+    resumed = b''.join(stream_zip(entries, len(received)))
+
+    assert zipfile.ZipFile(io.BytesIO(received + resumed)).testzip() is None
+    assert received + resumed == b''.join(stream_zip(entries))
+
+
+def test_outdated_pdfs_are_rerendered(app, tmp_path, pool, add_student):
+    """Test a PDF from an older revision is not reused (the render fails here)"""
+    project = add_student('asha')
+    record_project_changes(project, responses={'student_name': 'Asha'})
+    db.session.commit()
+
+    export = create_export('SNS')
+    assert list(resolve_entries(export, pool)) == []
+    assert export_progress(export)['failed'] == 1
+
+
+def test_removed_pdf_cannot_be_resumed(app, tmp_path, pool, add_student):
+    """Test an export whose recorded PDF was deleted refuses to resume"""
+    add_student('asha')
+    export = create_export('SNS')
+    complete_export(export, pool)
+
+    (tmp_path / 'asha.pdf').unlink()
+    with pytest.raises(ExportFilesChanged):
+        complete_export(export, pool)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
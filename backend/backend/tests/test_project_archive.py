@@ -0,0 +1,131 @@
+"""
+Test suite for the cold project archive
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Project, Response, ImageUpload, GeneratedPDF, ArchivedProject, ArchivedPDF
+from services.project_state import record_project_changes
+from services.project_archive import (
+    archive_dir_for, archive_project, ensure_hot, find_archivable, rehydrate_project
+)
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'PDF_OUTPUT_DIR': tmp_path}
+
+
+@pytest.fixture
+def completed_project(tmp_path, make_user):
+    """Factory: completed_project(days_ago) -> (project ID, image path, PDF path)"""
+    def complete(days_ago=400):
+        user = make_user('asha')
+        done = datetime.utcnow() - timedelta(days=days_ago)
+        project = Project(user_id=user.id, title='Water', status='completed',
+                          completed_at=done, updated_at=done)
+        db.session.add(project)
+        db.session.flush()
+
+        image_path = tmp_path / 'sketch.png'
+        image_path.write_bytes(b'png')
+        pdf_path = tmp_path / 'playbook.pdf'
+        pdf_path.write_bytes(b'%PDF')
+        db.session.add(Response(project_id=project.id, field_name='problem_statement',
+                                field_value='Clean water', page_number=1))
+        db.session.add(ImageUpload(project_id=project.id, field_name='sketch_image',
+                                   filename='sketch.png', file_path=str(image_path)))
+        db.session.add(GeneratedPDF(project_id=project.id, filename='playbook.pdf',
+                                    file_path=str(pdf_path)))
+        record_project_changes(project, responses={'problem_statement': 'Clean water'},
+                               images={'sketch_image': str(image_path)})
+        project.updated_at = done
+        db.session.commit()
+        return project.id, image_path, pdf_path
+    return complete
+
+
+def test_archive_and_rehydrate_round_trip(app, completed_project):
+    """Test rows and files move to the archive and come back intact"""
+    project_id, image_path, pdf_path = completed_project()
+    assert find_archivable(365) == [project_id]
+
+    result = archive_project(project_id, app.config['ARCHIVE_DIR'])
+
+    assert result['responses'] == 1 and result['images'] == 1 and result['generated_pdfs'] == 1
+    assert db.session.get(Project, project_id).status == 'archived'
+    assert Response.query.filter_by(project_id=project_id).count() == 0
+    assert ImageUpload.query.filter_by(project_id=project_id).count() == 0
+    assert not image_path.exists() and not pdf_path.exists()
+    assert db.session.get(ArchivedProject, project_id).file_count == 2
+
+    assert rehydrate_project(project_id, app.config['ARCHIVE_DIR'], app.config['UPLOAD_FOLDER'])
+
+    project = db.session.get(Project, project_id)
+    assert project.status == 'completed'
+    assert project.snapshot['responses'] == {'problem_statement': 'Clean water'}
+    assert Response.query.filter_by(project_id=project_id).one().field_value == 'Clean water'
+    assert ImageUpload.query.filter_by(project_id=project_id).one().file_path == str(image_path)
+    assert image_path.read_bytes() == b'png' and pdf_path.read_bytes() == b'%PDF'
+    assert db.session.get(ArchivedProject, project_id) is None
+    assert not archive_dir_for(app.config['ARCHIVE_DIR'], project_id).exists()
+
+
+def test_ensure_hot_rehydrates_archived_project(app, completed_project):
+    """Test the first access restores an archived project"""
+    project_id, _, _ = completed_project()
+    archive_project(project_id, app.config['ARCHIVE_DIR'])
+
+    assert ensure_hot(project_id) is True
+    assert ensure_hot(project_id) is False
+    assert Response.query.filter_by(project_id=project_id).count() == 1
+
+
+def test_recent_or_active_projects_are_not_archived(app, completed_project):
+    """Test only long-completed projects are eligible"""
+    project_id, _, _ = completed_project(days_ago=10)
+    assert find_archivable(365) == []
+
+    db.session.get(Project, project_id).status = 'in_progress'
+    db.session.commit()
+    assert archive_project(project_id, app.config['ARCHIVE_DIR']) is None
+    assert Response.query.filter_by(project_id=project_id).count() == 1
+
+
+@pytest.mark.parametrize('first_read', ['download', 'history'])
+def test_pdf_reads_rehydrate_archived_project(app, client, completed_project, auth_headers, first_read):
+    """Test an archived project's PDF link and history still work, restoring the project"""
+    project_id, _, pdf_path = completed_project()
+    pdf_id = GeneratedPDF.query.one().id
+    archive_project(project_id, app.config['ARCHIVE_DIR'])
+    assert db.session.get(ArchivedPDF, pdf_id).project_id == project_id
+    headers = auth_headers(1)
+
+    if first_read == 'history':
+        pdfs = client.get('/api/pdfs', headers=headers).get_json()['pdfs']
+        assert [pdf['id'] for pdf in pdfs] == [pdf_id]
+    response = client.get(f'/api/download-pdf/{pdf_id}', headers=headers)
+
+    assert response.status_code == 200 and response.data == b'%PDF'
+    assert db.session.get(Project, project_id).status == 'completed'
+    assert ArchivedPDF.query.count() == 0
+
+
+def test_archived_pdf_of_another_user_is_not_rehydrated(app, client, completed_project, make_user,
+                                                        auth_headers):
+    """Test ownership is checked before an archived project is restored"""
+    project_id, _, _ = completed_project()
+    pdf_id = GeneratedPDF.query.one().id
+    archive_project(project_id, app.config['ARCHIVE_DIR'])
+    headers = auth_headers(make_user('ben').id)
+
+    response = client.get(f'/api/download-pdf/{pdf_id}', headers=headers)
+
+    assert response.status_code == 403
+    assert db.session.get(Project, project_id).status == 'archived'
+    assert client.get('/api/download-pdf/999', headers=headers).status_code == 404
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,101 @@
+"""
+Test suite for the keyset-paginated project and PDF listings
+"""
+from datetime import datetime
+
+import pytest
+
+from models import db, Project, Response, GeneratedPDF
+
+
+@pytest.fixture
+def signed_in(make_user, auth_headers):
+    """Factory: signed_in(username, projects) -> headers of a new user"""
+    def sign_in(username='asha', projects=0):
+        user = make_user(username, projects)
+        # One timestamp for all: order must come from the ID alone
+        for project in user.projects:
+            project.created_at = datetime(2026, 1, 1)
+        db.session.commit()
+        return auth_headers(user.id)
+    return sign_in
+
+
+def _pages(client, url, headers, key):
+    """Follow next_cursor to the end; returns the IDs of each page"""
+    pages, cursor = [], None
+    while True:
+        page = client.get(url + (f'&cursor={cursor}' if cursor else ''), headers=headers).get_json()
+        pages.append([item['id'] for item in page[key]])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+        assert cursor == pages[-1][-1]  # The cursor is the last ID served
+
+
+@pytest.mark.parametrize('count, pages', [
+    (5, [[5, 4], [3, 2], [1]]),
+    (4, [[4, 3], [2, 1]]),  # Exact multiple: no trailing empty page
+    (0, [[]]),
+])
+def test_pages_cover_every_project_once(client, signed_in, count, pages):
+    """Test pages are newest first, end exactly at the last project and never repeat"""
+    headers = signed_in(projects=count)
+
+    assert _pages(client, '/api/projects?limit=2', headers, 'projects') == pages
+
+
+def test_cursor_is_stable_while_projects_are_added(client, signed_in):
+    """Test a project created mid-pagination neither shifts nor repeats the next page"""
+    headers = signed_in(projects=4)
+    first = client.get('/api/projects?limit=2', headers=headers).get_json()
+    signed_in('ben', projects=1)
+    db.session.add(Project(user_id=1, title='new'))
+    db.session.commit()
+
+    second = client.get(f"/api/projects?limit=2&cursor={first['next_cursor']}", headers=headers).get_json()
+
+    assert [p['id'] for p in second['projects']] == [2, 1]
+
+
+@pytest.mark.parametrize('query', ['cursor=abc', 'cursor=0', 'cursor=-3', 'limit=0', 'limit=x'])
+def test_bad_page_arguments(client, signed_in, query):
+    """Test non-positive or non-numeric limit and cursor are rejected"""
+    headers = signed_in(projects=1)
+
+    assert client.get(f'/api/projects?{query}', headers=headers).status_code == 400
+
+
+def test_listing_is_scoped_to_the_user_and_counts_rows(client, signed_in):
+    """Test other users' projects are invisible, aggregates come from the rows,
+    limit is capped, and archived projects report no row counts"""
+    headers = signed_in(projects=2)
+    signed_in('ben', projects=1)
+    db.session.add_all([
+        Response(project_id=2, field_name='student_name', field_value='Asha'),
+        GeneratedPDF(project_id=2, filename='a.pdf', file_path='/tmp/a.pdf', file_size=10),
+        GeneratedPDF(project_id=2, filename='b.pdf', file_path='/tmp/b.pdf', file_size=20),
+    ])
+    db.session.get(Project, 1).status = 'archived'
+    db.session.commit()
+
+    projects = client.get('/api/projects?limit=1000', headers=headers).get_json()['projects']
+
+    assert [p['id'] for p in projects] == [2, 1]
+    assert (projects[0]['field_count'], projects[0]['pdf_count'], projects[0]['last_pdf']['file_size']) == (1, 2, 20)
+    assert (projects[1]['field_count'], projects[1]['pdf_count'], projects[1]['last_pdf']) == (None, None, None)
+
+
+def test_pdf_history_pages_and_filters(client, signed_in):
+    """Test the PDF history pages by ID and can be narrowed to one project"""
+    headers = signed_in(projects=2)
+    for n in range(5):
+        db.session.add(GeneratedPDF(project_id=1 + n % 2, filename=f'{n}.pdf', file_path=f'/tmp/{n}.pdf'))
+    db.session.commit()
+
+    assert _pages(client, '/api/pdfs?limit=2', headers, 'pdfs') == [[5, 4], [3, 2], [1]]
+    assert _pages(client, '/api/pdfs?limit=2&project_id=1', headers, 'pdfs') == [[5, 3], [1]]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
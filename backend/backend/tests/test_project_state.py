@@ -0,0 +1,99 @@
+"""
+Test suite for project snapshots and coverage maintenance
+"""
+import pytest
+
+from models import db, Project, Response, ImageUpload
+from services.analytics import analytics
+from services.coverage import compute_coverage
+from services.project_state import (
+    record_project_changes, get_project_snapshot, get_project_coverage, save_response
+)
+
+
+@pytest.fixture
+def project(make_user):
+    return make_user('alice', projects=1).projects[0]
+
+
+def _legacy_rows(project):
+    """Rows written before the snapshot existed (no snapshot, no coverage)"""
+    db.session.add_all([
+        Response(project_id=project.id, field_name='student_name', field_value='Ann'),
+        Response(project_id=project.id, field_name='problem_statement', field_value='Water'),
+        ImageUpload(project_id=project.id, field_name='student_signature',
+                    filename='sig.png', file_path='/tmp/sig.png')
+    ])
+    db.session.commit()
+
+
+def test_first_change_builds_snapshot_from_rows(project):
+    """Test a project without a snapshot is rebuilt from its rows, changes included"""
+    _legacy_rows(project)
+    save_response(project.id, 'final_message', 'bye')
+
+    responses, images = get_project_snapshot(project)
+
+    assert responses == {'student_name': 'Ann', 'problem_statement': 'Water', 'final_message': 'bye'}
+    assert images == {'student_signature': '/tmp/sig.png'}
+    assert project.revision == 1
+    assert project.coverage == compute_coverage(responses, images)
+
+
+def test_changes_merge_into_snapshot_and_coverage(project):
+    """Test incremental coverage always equals a full recomputation"""
+    save_response(project.id, 'student_name', 'Ann')
+    save_response(project.id, 'problem_statement', 'Water')
+    save_response(project.id, 'problem_statement', '  ')  # Blank again
+    record_project_changes(project, images={'student_signature': '/tmp/sig.png'})
+    db.session.commit()
+
+    responses, images = get_project_snapshot(project)
+    assert responses == {'student_name': 'Ann', 'problem_statement': '  '}
+    assert project.snapshot['revisions'] == {'student_name': 1, 'problem_statement': 3}
+    assert project.coverage == compute_coverage(responses, images)
+    assert get_project_coverage(project) is project.coverage
+
+
+def test_changes_are_staged_for_analytics_only_on_commit(project):
+    """Test analytics deltas are staged on the session and dropped on rollback"""
+    analytics._pending.clear()
+    record_project_changes(project, responses={'student_name': 'Ann'})
+    db.session.rollback()
+    assert not analytics._pending
+
+    record_project_changes(project, responses={'student_name': 'Ann'})
+    db.session.commit()
+    assert analytics._pending
+    analytics._pending.clear()
+
+
+def test_snapshot_backfill_happens_once(project):
+    """Test reading a legacy project backfills snapshot and coverage a single time"""
+    _legacy_rows(project)
+
+    responses, images = get_project_snapshot(project)
+    revision = project.revision
+    db.session.add(Response(project_id=project.id, field_name='final_message', field_value='x'))
+    db.session.commit()
+
+    assert get_project_snapshot(project) == (responses, images)  # The snapshot, not the rows
+    assert project.revision == revision == 1
+    assert get_project_coverage(project)['images']['filled'] == 1
+
+
+def test_save_response_route_uses_the_helper(project, client, auth_headers):
+    """Test an unbuffered save writes the row and the snapshot and returns the row ID"""
+    headers = auth_headers(project.user_id)
+    body = {'project_id': project.id, 'field_name': 'student_name', 'field_value': 'Ann', 'page_number': 1}
+
+    first = client.post('/api/save-response', headers=headers, json=body).get_json()
+    second = client.post('/api/save-response', headers=headers, json={**body, 'field_value': 'Anna'}).get_json()
+
+    row = Response.query.filter_by(project_id=project.id).one()
+    assert first['response_id'] == second['response_id'] == row.id and row.field_value == 'Anna'
+    assert get_project_snapshot(project)[0] == {'student_name': 'Anna'} and project.revision == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
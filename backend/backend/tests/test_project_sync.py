@@ -0,0 +1,128 @@
+"""
+Test suite for bulk response upserts and the project sync endpoint
+"""
+import io
+import json
+
+import pytest
+
+import models
+from models import db, bulk_upsert_responses, User, Project, Response
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'UPLOAD_FOLDER': tmp_path}
+
+
+@pytest.fixture
+def app(app, make_user):
+    make_user('asha', projects=1)
+    make_user('ben', projects=1)
+    return app
+
+
+@pytest.fixture
+def headers(auth_headers):
+    """Factory: headers(username) -> Authorization header of that seeded user"""
+    return lambda username='asha': auth_headers({'asha': 1, 'ben': 2}[username])
+
+
+def _stored(project_id=1):
+    return {r.field_name: (r.field_value, r.page_number) for r in Response.query.filter_by(project_id=project_id)}
+
+
+@pytest.mark.parametrize('dialect_insert', [True, False], ids=['on-conflict', 'row-by-row'])
+def test_bulk_upsert_inserts_and_updates(app, monkeypatch, dialect_insert):
+    """Test new fields are inserted and existing ones updated in place, across chunks"""
+    if not dialect_insert:
+        monkeypatch.setattr(models, '_dialect_insert', lambda: None)
+    monkeypatch.setattr(models, 'UPSERT_CHUNK_SIZE', 2)
+    bulk_upsert_responses(1, [{'field_name': 'student_name', 'field_value': 'A', 'page_number': 1}])
+    db.session.commit()
+    first = Response.query.filter_by(field_name='student_name').one()
+    first_id, created_at = first.id, first.created_at
+
+    written = bulk_upsert_responses(1, [
+        {'field_name': 'student_name', 'field_value': 'Asha', 'page_number': 1},
+        {'field_name': 'problem_because', 'field_value': 'x'},
+        {'field_name': 'final_message', 'field_value': 'bye', 'page_number': 20}
+    ])
+    db.session.commit()
+    db.session.expire_all()
+
+    assert written == 3
+    assert _stored() == {
+        'student_name': ('Asha', 1), 'problem_because': ('x', None), 'final_message': ('bye', 20)
+    }
+    updated = Response.query.filter_by(field_name='student_name').one()
+    assert (updated.id, updated.created_at) == (first_id, created_at)
+    assert updated.updated_at >= created_at
+    assert bulk_upsert_responses(1, []) == 0
+
+
+def test_sync_normalizes_values(client, headers):
+    """Test table values become JSON, scalars strings and pages default to the mapping"""
+    result = client.post('/api/project/1/sync', headers=headers(), json={'responses': {
+        'student_name': 'Asha',
+        'validation_scores': {'useful': 5},
+        'idea_count': 3,
+        'problem_because': {'field_value': 'because', 'page_number': 4}
+    }})
+
+    assert result.status_code == 200 and result.get_json()['success'] is True
+    assert _stored() == {
+        'student_name': ('Asha', 1),
+        'validation_scores': ('{"useful": 5}', 9),
+        'idea_count': ('3', None),
+        'problem_because': ('because', 4)
+    }
+    assert db.session.get(Project, 1).snapshot['responses']['validation_scores'] == '{"useful": 5}'
+
+
+def test_sync_reports_bad_entries_and_saves_the_rest(client, headers):
+    """Test invalid entries get per-field errors without blocking valid ones"""
+    result = client.post('/api/project/1/sync', headers=headers(), json={'responses': {
+        'student_name': 'Asha',
+        'empty': None,
+        'bad_page': {'field_value': 'x', 'page_number': 'three'},
+        'f' * 101: 'too long'
+    }}).get_json()
+
+    assert result['success'] is False
+    assert result['responses']['student_name'] == {'status': 'saved'}
+    assert [result['responses'][f]['status'] for f in ['empty', 'bad_page', 'f' * 101]] == ['error'] * 3
+    assert _stored() == {'student_name': ('Asha', 1)}
+
+
+def test_sync_rejects_bad_requests(client, headers):
+    """Test malformed bodies and other users' projects are refused before any write"""
+    assert client.post('/api/project/1/sync', headers=headers('ben'),
+                       json={'responses': {'student_name': 'x'}}).status_code == 403
+    assert client.post('/api/project/1/sync', headers=headers(),
+                       json={'responses': ['student_name']}).status_code == 400
+    assert client.post('/api/project/1/sync', headers=headers(),
+                       data={'responses': '{not json'}).status_code == 400
+    assert client.post('/api/project/1/sync', json={'responses': {}}).status_code == 401
+    assert Response.query.count() == 0
+
+
+def test_sync_rolls_back_on_failure(client, headers, monkeypatch):
+    """Test a failing write leaves neither responses nor images behind"""
+    import routes.pdf_routes as pdf_routes
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('disk full')
+
+    monkeypatch.setattr(pdf_routes, 'record_project_changes', fail)
+    result = client.post('/api/project/1/sync', headers=headers(), data={
+        'responses': json.dumps({'student_name': 'Asha'}),
+        'images[user_profile_image]': (io.BytesIO(b'\x89PNG\r\n\x1a\n' + b'0' * 64), 'me.png')
+    })
+
+    assert result.status_code == 500 and result.get_json()['message'] == 'disk full'
+    assert Response.query.count() == 0 and db.session.get(Project, 1).revision in (None, 0)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,74 @@
+"""
+Test suite for starter project provisioning
+"""
+import pytest
+
+from models import db, User, Project, Response, ImageUpload
+from services.project_state import record_project_changes
+from services.provisioning import provision_projects, SourceProjectNotFound
+from services.upload_service import release_file
+
+
+@pytest.fixture
+def starter(tmp_path, make_user):
+    """A teacher's starter project in class SNS/3 with students asha and ben"""
+    teacher = make_user('teacher', school='SNS', grade='3')
+    students = [make_user(name, school='SNS', grade='3') for name in ('asha', 'ben')]
+
+    image_path = tmp_path / 'class.png'
+    image_path.write_bytes(b'png')
+    starter = Project(user_id=teacher.id, title='Starter')
+    db.session.add(starter)
+    db.session.flush()
+    db.session.add(Response(project_id=starter.id, field_name='problem_statement',
+                            field_value='Clean water', page_number=1))
+    db.session.add(ImageUpload(project_id=starter.id, field_name='class_image',
+                               filename='class.png', file_path=str(image_path)))
+    record_project_changes(starter, responses={'problem_statement': 'Clean water'},
+                           images={'class_image': str(image_path)})
+    db.session.commit()
+    return starter.id, [student.id for student in students], image_path
+
+
+def test_provision_clones_rows_and_shares_files(starter):
+    """Test responses, image references and the snapshot are copied to each student"""
+    starter_id, student_ids, image_path = starter
+
+    created = provision_projects(starter_id, user_ids=student_ids)
+
+    assert sorted(entry['user_id'] for entry in created) == sorted(student_ids)
+    for entry in created:
+        project = db.session.get(Project, entry['project_id'])
+        assert project.source_project_id == starter_id
+        assert project.snapshot['responses'] == {'problem_statement': 'Clean water'}
+        assert Response.query.filter_by(project_id=project.id).one().field_value == 'Clean water'
+        assert ImageUpload.query.filter_by(project_id=project.id).one().file_path == str(image_path)
+
+    # Repeating the request only fills in the users without a copy (the teacher)
+    teacher = User.query.filter_by(username='teacher').one()
+    again = provision_projects(starter_id, school='SNS', grade='3')
+    assert [entry['user_id'] for entry in again] == [teacher.id]
+
+
+def test_shared_file_survives_release(starter):
+    """Test a replaced shared image is only deleted with its last reference"""
+    starter_id, student_ids, image_path = starter
+    created = provision_projects(starter_id, user_ids=student_ids[:1])
+
+    ImageUpload.query.filter_by(project_id=created[0]['project_id']).delete()
+    release_file(str(image_path))
+    assert image_path.exists()
+
+    ImageUpload.query.filter_by(project_id=starter_id).delete()
+    release_file(str(image_path))
+    assert not image_path.exists()
+
+
+def test_missing_source(app):
+    """Test provisioning from an unknown project fails cleanly"""
+    with pytest.raises(SourceProjectNotFound):
+        provision_projects(999, user_ids=[1])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,86 @@
+"""
+Test suite for cooperative render cancellation
+"""
+import socket
+import time
+import pytest
+from pathlib import Path
+from services.render_cancellation import (
+    CancellationToken,
+    RenderCancelled,
+    REASON_DEADLINE,
+    REASON_CLIENT_DISCONNECT,
+    client_disconnect_probe
+)
+
+
+def test_token_not_cancelled_by_default():
+    """Test a fresh token lets work continue"""
+    token = CancellationToken.with_timeout(60)
+
+    assert not token.cancelled
+    token.check()  # Should not raise
+
+
+def test_token_deadline_trips():
+    """Test the deadline cancels the token"""
+    token = CancellationToken(deadline=time.monotonic() - 1)
+
+    with pytest.raises(RenderCancelled) as exc_info:
+        token.check()
+
+    assert exc_info.value.reason == REASON_DEADLINE
+
+
+def test_token_first_reason_wins():
+    """Test explicit cancel keeps the first reason"""
+    token = CancellationToken()
+    token.cancel('first')
+    token.cancel('second')
+
+    assert token.reason == 'first'
+
+
+def test_client_disconnect_probe():
+    """Test the probe notices a closed peer"""
+    server, client = socket.socketpair()
+    try:
+        probe = client_disconnect_probe({'gunicorn.socket': server})
+        assert probe() is None
+
+        client.close()
+        assert probe() == REASON_CLIENT_DISCONNECT
+    finally:
+        server.close()
+
+
+def test_client_disconnect_probe_without_socket():
+    """Test servers without a raw socket yield no probe"""
+    assert client_disconnect_probe({}) is None
+
+
+def test_generate_pdf_cancelled(tmp_path):
+    """Test a cancelled render never writes its file"""
+    template_path = '../SNS DT Playbook for SNS 1-5 Std Students.pptx.pdf'
+
+    if not Path(template_path).exists():
+        pytest.skip("PDF template not found")
+
+    from services.pdf_generator import PDFGeneratorService
+
+    generator = PDFGeneratorService(template_path, str(tmp_path))
+    token = CancellationToken()
+    token.cancel()
+
+    with pytest.raises(RenderCancelled):
+        generator.generate_filled_pdf(
+            user_responses={'student_name': 'Test'},
+            output_filename='cancelled.pdf',
+            cancel_token=token
+        )
+
+    assert list(tmp_path.glob('*.pdf')) == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
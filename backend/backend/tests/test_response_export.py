@@ -0,0 +1,123 @@
+"""
+Test suite for the pivoted response export
+"""
+import csv
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, ImageUpload, bulk_upsert_responses
+from services.project_archive import archive_project
+from services.project_state import record_project_changes
+from services.response_export import (
+    ExportError, export_columns, iter_export_batches, parse_export_time, stream_export
+)
+
+
+@pytest.fixture
+def add_project(make_user):
+    """Factory: add_project(username, school, grade, **answers) -> the user's project"""
+    def add(username, school='SNS', grade='3', **values):
+        project = make_user(username, projects=1, school=school, grade=grade).projects[0]
+        if values:
+            bulk_upsert_responses(project.id, [
+                {'field_name': field, 'field_value': value} for field, value in values.items()
+            ])
+            record_project_changes(project, responses=values)
+            db.session.commit()
+        return project
+    return add
+
+
+def _csv_rows(**filters):
+    data = b''.join(stream_export('csv', iter_export_batches(batch_size=1, **filters)))
+    return list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+
+
+def test_csv_export_pivots_one_row_per_project(app, add_project):
+    """Test each project becomes a row with one column per mapped field"""
+    asha = add_project('asha', student_name='Asha', problem_statement='Water, "bottles"')
+    db.session.add(ImageUpload(project_id=asha.id, field_name='sad_space_drawing',
+                               filename='a.png', file_path='/uploads/blobs/ab/abcdef.png'))
+    record_project_changes(asha, images={'sad_space_drawing': '/uploads/blobs/ab/abcdef.png'})
+    db.session.commit()
+    add_project('ben', school='Other', grade='4', student_name='Ben')
+    add_project('chen')  # No answers yet
+
+    rows = _csv_rows()
+
+    assert list(rows[0]) == export_columns()
+    assert 'username' not in rows[0]
+    assert [row['user_id'] for row in rows] == ['1', '2', '3']
+    assert rows[0]['problem_statement'] == 'Water, "bottles"'
+    assert rows[0]['sad_space_drawing'] == 'abcdef.png'
+    assert rows[1]['student_name'] == 'Ben' and rows[1]['problem_statement'] == ''
+    assert rows[2]['student_name'] == ''
+
+
+def test_export_filters_and_incremental_window(app, add_project):
+    """Test school/grade filters and the [since, cutoff) update window"""
+    old = add_project('asha', student_name='Asha')
+    add_project('ben', school='Other', student_name='Ben')
+    recent = add_project('chen', student_name='Chen')
+    old.updated_at = datetime.utcnow() - timedelta(days=10)
+    db.session.commit()
+
+    assert [row['student_name'] for row in _csv_rows(school='SNS')] == ['Asha', 'Chen']
+    assert _csv_rows(grade='9') == []
+
+    since = datetime.utcnow() - timedelta(days=1)
+    assert [row['student_name'] for row in _csv_rows(since=since)] == ['Ben', 'Chen']
+    assert [row['student_name'] for row in _csv_rows(cutoff=since)] == ['Asha']
+    assert recent.updated_at >= since
+
+
+def test_export_reads_archived_projects(app, add_project, tmp_path):
+    """Test archived projects export their answers from the archive document"""
+    project = add_project('asha', student_name='Asha', problem_statement='Shade')
+    project.status = 'completed'
+    db.session.commit()
+    assert archive_project(project.id, tmp_path / 'archive')
+
+    [row] = _csv_rows()
+    assert row['status'] == 'archived'
+    assert (row['student_name'], row['problem_statement']) == ('Asha', 'Shade')
+
+
+def test_parse_export_time():
+    """Test dates, timestamps and UTC offsets are accepted"""
+    assert parse_export_time('2026-09-01') == datetime(2026, 9, 1)
+    assert parse_export_time('2026-09-01T10:00:00+02:00') == datetime(2026, 9, 1, 8)
+    assert parse_export_time('2026-09-01T08:00:00Z') == datetime(2026, 9, 1, 8)
+    with pytest.raises(ExportError):
+        parse_export_time('yesterday')
+    with pytest.raises(ExportError):
+        list(stream_export('xlsx', iter([])))
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_columnar_export_round_trip(app, add_project, fmt):
+    """Test Parquet and Arrow IPC exports read back with typed columns"""
+    pa = pytest.importorskip('pyarrow')
+    add_project('asha', student_name='Asha')
+    add_project('ben', student_name='Ben', problem_statement='Plastic')
+    add_project('chen')
+
+    data = b''.join(stream_export(fmt, iter_export_batches(batch_size=2)))
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(pa.BufferReader(data))
+    else:
+        import pyarrow.ipc as pa_ipc
+        table = pa_ipc.open_stream(data).read_all()
+
+    assert table.column_names == export_columns()
+    assert table.num_rows == 3
+    assert table.column('student_name').to_pylist() == ['Asha', 'Ben', None]
+    assert table.schema.field('project_id').type == pa.int64()
+    assert pa.types.is_timestamp(table.schema.field('updated_at').type)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,84 @@
+"""
+Test suite for full-text search over responses
+"""
+import pytest
+
+from models import db, Response, bulk_upsert_responses
+from services.response_search import (
+    parse_query, fts5_match, pg_tsquery, search_responses, SearchQueryError
+)
+
+
+@pytest.fixture
+def add_project(make_user):
+    """Factory: add_project(username, school, grade) -> the user's project"""
+    return lambda username, school='SNS', grade='3': make_user(
+        username, projects=1, school=school, grade=grade).projects[0]
+
+
+def test_parse_query():
+    """Test words, phrases and prefixes become safe quoted terms"""
+    terms = parse_query('Water "plastic  bottle" recycl* ";DROP')
+    assert terms == [
+        {'words': ['water'], 'prefix': False},
+        {'words': ['plastic', 'bottle'], 'prefix': False},
+        {'words': ['recycl'], 'prefix': True},
+        {'words': ['drop'], 'prefix': False},
+    ]
+    assert fts5_match(terms) == '"water" "plastic bottle" "recycl"* "drop"'
+    assert pg_tsquery(terms) == "'water' & ('plastic' <-> 'bottle') & 'recycl':* & 'drop'"
+    assert parse_query('  "" ;; ') == []
+
+
+def test_search_ranks_filters_and_tracks_edits(app, add_project):
+    """Test the index follows inserts, upserts and deletes"""
+    asha = add_project('asha')
+    ben = add_project('ben', school='Other', grade='4')
+    db.session.add(Response(project_id=asha.id, field_name='problem_statement', page_number=2,
+                            field_value='Students forget their water bottle <b>every</b> day'))
+    db.session.add(Response(project_id=ben.id, field_name='idea_1', page_number=5,
+                            field_value='A water fountain'))
+    db.session.commit()
+
+    hits = search_responses('water')['results']
+    assert {hit['student']['username'] for hit in hits} == {'asha', 'ben'}
+
+    hit = search_responses('"water bottle"')['results'][0]
+    assert hit['project']['id'] == asha.id and hit['page_number'] == 2
+    assert '<mark>water bottle</mark>' in hit['snippet']
+    assert '&lt;b&gt;' in hit['snippet']  # Student text is escaped
+
+    assert [h['student']['username'] for h in search_responses('water', school='Other')['results']] == ['ben']
+    assert search_responses('water', page_number=2, grade='3')['results'][0]['field_name'] == 'problem_statement'
+    assert search_responses('fount*')['results'][0]['field_name'] == 'idea_1'
+
+    # Autosave-style upsert replaces the indexed text
+    bulk_upsert_responses(ben.id, [{'field_name': 'idea_1', 'field_value': 'A rain garden', 'page_number': 5}])
+    db.session.commit()
+    assert search_responses('fountain')['results'] == []
+    assert search_responses('rain')['results'][0]['project']['id'] == ben.id
+
+    Response.query.filter_by(project_id=asha.id).delete()
+    db.session.commit()
+    assert search_responses('bottle')['results'] == []
+
+
+def test_search_pagination(app, add_project):
+    """Test pages follow next_cursor to the end"""
+    for i in range(5):
+        project = add_project(f'student{i}')
+        db.session.add(Response(project_id=project.id, field_name='problem_statement',
+                                field_value=f'clean water {i}'))
+    db.session.commit()
+
+    first = search_responses('water', limit=3)
+    second = search_responses('water', limit=3, offset=first['next_cursor'])
+    assert len(first['results']) == 3 and first['next_cursor'] == 3
+    assert len(second['results']) == 2 and second['next_cursor'] is None
+
+    with pytest.raises(SearchQueryError):
+        search_responses('!!')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,48 @@
+"""
+Test suite for project revisions and delta sync
+"""
+import pytest
+
+from models import db, bulk_upsert_responses
+from services.project_state import record_project_changes, get_responses_since
+
+
+@pytest.fixture
+def project(make_user):
+    return make_user('alice', projects=1).projects[0]
+
+
+def _save(project, **values):
+    bulk_upsert_responses(project.id, [
+        {'field_name': field, 'field_value': value} for field, value in values.items()
+    ])
+    record_project_changes(project, responses=values)
+    db.session.commit()
+
+
+def test_every_change_bumps_revision(project):
+    """Test each committed change increments the project revision"""
+    assert project.revision == 0
+
+    _save(project, student_name='Ann')
+    _save(project, student_name='Ann B', final_message='bye')
+    record_project_changes(project, images={'student_signature': '/tmp/sig.png'})
+    db.session.commit()
+
+    assert project.revision == 3
+    assert project.snapshot['revisions'] == {'student_name': 2, 'final_message': 2}
+
+
+def test_responses_since_returns_only_later_changes(project):
+    """Test delta mode returns fields changed after the given revision"""
+    _save(project, a='1', b='2')
+    _save(project, b='3')
+    _save(project, c='4')
+
+    assert get_responses_since(project, 0) == {'a': '1', 'b': '3', 'c': '4'}
+    assert get_responses_since(project, 1) == {'b': '3', 'c': '4'}
+    assert get_responses_since(project, 3) == {}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,59 @@
+"""
+Test suite for bulk roster import
+"""
+import pytest
+
+from models import User
+from services.roster_import import parse_roster, import_roster, RosterFormatError
+
+
+def test_parse_csv_and_jsonl():
+    """Test both roster formats normalize to the same rows"""
+    csv_rows = parse_roster(b'\xef\xbb\xbfUsername,Email,Password\n asha ,asha@x.com,pw\n', 'csv')
+    jsonl_rows = parse_roster('{"username": "asha", "email": "asha@x.com", "password": "pw"}\n\n', 'jsonl')
+
+    assert csv_rows == jsonl_rows
+    assert csv_rows[0]['username'] == 'asha'
+    assert csv_rows[0]['school'] is None
+
+    with pytest.raises(RosterFormatError):
+        parse_roster('not json', 'jsonl')
+
+
+def test_import_reports_every_row(app, make_user):
+    """Test good rows are created and bad or duplicate rows are reported"""
+    make_user('taken')
+
+    rows = parse_roster(
+        'username,email,password,grade\n'
+        'asha,asha@x.com,pw1,\n'
+        'ben,ben@x.com,pw2,4\n'
+        'taken,new@x.com,pw,\n'
+        'asha,other@x.com,pw,\n'
+        'nopass,nopass@x.com,,\n',
+        'csv'
+    )
+    report = import_roster(rows, defaults={'school': 'SNS', 'grade': '3'}, hash_workers=1, batch_size=1)
+
+    assert report['created'] == 2
+    assert [entry['status'] for entry in report['rows']] == [
+        'created', 'created', 'duplicate', 'duplicate', 'error'
+    ]
+
+    asha = User.query.filter_by(username='asha').one()
+    assert asha.check_password('pw1')
+    assert (asha.school, asha.grade) == ('SNS', '3')
+    assert User.query.filter_by(username='ben').one().grade == '4'
+
+
+def test_dry_run_writes_nothing(app):
+    """Test a dry run validates without creating users"""
+    rows = parse_roster('username,email,password\nasha,asha@x.com,pw\n', 'csv')
+    report = import_roster(rows, dry_run=True)
+
+    assert report['rows'][0]['status'] == 'valid'
+    assert User.query.count() == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
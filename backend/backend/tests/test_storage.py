@@ -0,0 +1,166 @@
+"""
+Test suite for shared artifact storage (local and S3 backends, read-through cache)
+"""
+import io
+import os
+import time
+import zipfile
+
+import pytest
+from PIL import Image
+
+from models import db, ImageUpload, GeneratedPDF, bulk_upsert_responses
+from services.blob_store import resolve_blobs, store_blob
+from services.image_derivatives import derivatives
+from services.pdf_export import complete_export, create_export
+from services.project_state import record_project_changes
+from services.render_pool import RenderPool
+from services.storage import LocalStorage, ReadThroughCache, S3Storage, artifacts
+from services.upload_service import remove_file_quietly
+from utils.zipstream import stream_zip
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'STORAGE_BACKEND': 'local', 'STORAGE_LOCAL_ROOT': tmp_path / 'shared'}
+
+
+def test_local_storage_streams_and_ranges(tmp_path):
+    """Test streamed writes read back whole or by range, and bad keys are refused"""
+    storage = LocalStorage(tmp_path)
+    data = os.urandom(3 * 1024 * 1024 + 5)
+
+    storage.save('uploads/ab/cd/x.png', io.BytesIO(data))
+
+    assert b''.join(storage.iter_bytes('uploads/ab/cd/x.png')) == data
+    assert b''.join(storage.iter_bytes('uploads/ab/cd/x.png', 1024 * 1024 - 2, 10)) == data[1024 * 1024 - 2:][:10]
+    assert storage.size('uploads/ab/cd/x.png') == len(data)
+    assert not list(tmp_path.rglob('.incoming-*'))
+
+    storage.delete('uploads/ab/cd/x.png')
+    storage.delete('uploads/ab/cd/x.png')
+    assert not storage.exists('uploads/ab/cd/x.png')
+    with pytest.raises(FileNotFoundError):
+        storage.iter_bytes('uploads/ab/cd/x.png')
+    with pytest.raises(ValueError):
+        storage.save('../escape', io.BytesIO(b''))
+
+
+def test_cache_fetches_once_and_evicts_least_recently_used(tmp_path):
+    """Test hits skip the backend and the cache stays under its size limit"""
+    backend = LocalStorage(tmp_path / 'shared')
+    for name in 'abc':
+        backend.save(f'{name}.pdf', io.BytesIO(name.encode() * 400))
+    cache = ReadThroughCache(backend, tmp_path / 'cache', max_bytes=1000)
+
+    first = cache.get('a.pdf')
+    backend.delete('a.pdf')
+    assert cache.get('a.pdf') == first and first.read_bytes() == b'a' * 400
+
+    old = time.time() - 60
+    os.utime(first, (old, old))
+    cache.get('b.pdf')
+    cache.get('c.pdf')  # 1200 bytes: the oldest (a) goes
+
+    assert not first.exists()
+    assert cache.path_for('b.pdf').exists() and cache.path_for('c.pdf').exists()
+    with pytest.raises(FileNotFoundError):
+        cache.get('a.pdf')
+
+
+def test_artifacts_are_published_and_read_through(app, tmp_path):
+    """Test a blob stored on one node is readable after its local file is gone"""
+    blob = store_blob(b'png-bytes', app.config['UPLOAD_FOLDER'], 'image/png')
+    db.session.commit()
+    key = artifacts.key_for(blob.file_path)
+    assert key == f"uploads/blobs/{blob.sha256[:2]}/{blob.sha256[2:4]}/{blob.sha256}.png"
+    assert artifacts.backend.exists(key)
+
+    os.unlink(blob.file_path)  # Another node: no local copy
+    local = artifacts.local_path(blob.file_path)
+    assert local.read_bytes() == b'png-bytes' and artifacts.is_cached_copy(local)
+    assert set(resolve_blobs([blob.sha256])) == {blob.sha256}
+
+    remove_file_quietly(blob.file_path)
+    assert not artifacts.backend.exists(key)
+    assert artifacts.local_path(blob.file_path) is None
+    assert artifacts.key_for(tmp_path / 'elsewhere.pdf') is None
+
+
+def _published(path, data):
+    """A file published by another node: in the backend, not on local disk"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    artifacts.publish(path)
+    os.unlink(path)
+    return str(path)
+
+
+def test_derivatives_and_exports_use_shared_storage(app, client, make_user, auth_headers, tmp_path):
+    """Test thumbnails, derivative builds and class exports work on a node
+    that has none of the files locally"""
+    derivatives.init_app(app)
+    user = make_user('asha', projects=1, school='SNS')
+    project = user.projects[0]
+    png = io.BytesIO()
+    Image.new('RGB', (64, 32), (200, 30, 30)).save(png, format='PNG')
+    image = ImageUpload(project_id=project.id, field_name='user_profile_image', filename='me.png',
+                        file_path=_published(tmp_path / 'uploads' / 'me.png', png.getvalue()))
+    bulk_upsert_responses(project.id, [{'field_name': 'student_name', 'field_value': 'Asha'}])
+    record_project_changes(project, responses={'student_name': 'Asha'})
+    pdf_path = _published(tmp_path / 'pdfs' / 'asha.pdf', b'%PDF' * 100)
+    db.session.add(image)
+    db.session.add(GeneratedPDF(project_id=project.id, filename='asha.pdf', file_path=pdf_path,
+                                project_revision=project.revision))
+    db.session.commit()
+
+    try:
+        headers = auth_headers(user.id)
+        response = client.get(f'/api/image/{image.id}/thumbnail', headers=headers)
+        assert response.status_code == 200 and response.mimetype == 'image/jpeg'
+        assert artifacts.backend.exists(artifacts.key_for(image.thumbnail_path))
+
+        os.unlink(image.thumbnail_path)  # Built on another node
+        again = client.get(f'/api/image/{image.id}/thumbnail', headers=headers)
+        assert again.status_code == 200 and again.data == response.data
+    finally:
+        derivatives._app = None
+
+    export = create_export('SNS')
+    entries = complete_export(export, RenderPool(tmp_path / 'missing.pdf', tmp_path / 'pdfs', workers=0))
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_zip(entries))))
+    assert archive.read('asha_1.pdf') == b'%PDF' * 100
+    assert export.entries[0]['path'] == pdf_path and not entries[0]['rendered']
+
+
+def test_s3_multipart_round_trip(tmp_path):
+    """Test large objects go up in parts and stream back by range (moto stand-in)"""
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='artifacts')
+        storage = S3Storage('artifacts', prefix='/test/', client=client,
+                            multipart_threshold_mb=5, multipart_chunk_mb=5)
+        data = os.urandom(11 * 1024 * 1024)
+
+        storage.save('generated_pdfs/big.pdf', io.BytesIO(data))
+
+        head = client.head_object(Bucket='artifacts', Key='test/generated_pdfs/big.pdf')
+        assert head['ETag'].strip('"').endswith('-3')  # Three parts
+        assert storage.size('generated_pdfs/big.pdf') == len(data)
+        assert b''.join(storage.iter_bytes('generated_pdfs/big.pdf', 6 * 1024 * 1024, 100)) == \
+            data[6 * 1024 * 1024:][:100]
+        storage.download('generated_pdfs/big.pdf', tmp_path / 'big.pdf')
+        assert (tmp_path / 'big.pdf').read_bytes() == data
+
+        storage.delete('generated_pdfs/big.pdf')
+        assert not storage.exists('generated_pdfs/big.pdf')
+        with pytest.raises(FileNotFoundError):
+            storage.download('generated_pdfs/big.pdf', tmp_path / 'gone.pdf')
+        assert not list(tmp_path.glob('.incoming-*'))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
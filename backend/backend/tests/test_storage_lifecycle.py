@@ -0,0 +1,173 @@
+"""
+Test suite for storage retention, disk budget, blob collection and orphan sweeping
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from models import db, GeneratedPDF, ImageUpload, Blob
+from services.blob_store import store_blob
+from services.storage import artifacts
+from services.storage_lifecycle import StorageLifecycleManager, touch_access_time
+
+MB = 1024 * 1024
+
+pytestmark = pytest.mark.usefixtures('student')
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}"}
+
+
+@pytest.fixture
+def lifecycle(app):
+    manager = StorageLifecycleManager()
+    manager.init_app(app)
+    return manager
+
+
+def _pdf(app, name, size=MB, accessed_minutes_ago=0, path=None):
+    path = Path(path or Path(app.config['PDF_OUTPUT_DIR']) / 'ab' / name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'%' * 16)
+    now = datetime.utcnow()
+    record = GeneratedPDF(
+        project_id=1, filename=name, file_path=str(path), file_size=size,
+        generated_at=now - timedelta(minutes=accessed_minutes_ago),
+        last_accessed_at=now - timedelta(minutes=accessed_minutes_ago)
+    )
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def _age(path, seconds=7200):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_retention_keeps_latest_pdfs(app, lifecycle):
+    """Test only the newest PDFs of a project survive, files included"""
+    records = [_pdf(app, f'{n}.pdf', accessed_minutes_ago=10 - n) for n in range(4)]
+    paths = [Path(record.file_path) for record in records]
+
+    assert lifecycle.enforce_retention(1, keep=2) == 2
+
+    assert [pdf.filename for pdf in GeneratedPDF.query.order_by(GeneratedPDF.id)] == ['2.pdf', '3.pdf']
+    assert [path.exists() for path in paths] == [False, False, True, True]
+
+
+def test_budget_evicts_least_recently_downloaded(app, lifecycle):
+    """Test eviction follows last_accessed_at, which a download refreshes"""
+    app.config['STORAGE_BUDGET_MB'] = 2
+    records = [_pdf(app, f'{n}.pdf', accessed_minutes_ago=minutes)
+               for n, minutes in enumerate([300, 200, 100])]
+    paths = [Path(record.file_path) for record in records]
+    touch_access_time(records[0])
+
+    assert lifecycle.enforce_budget() == MB
+
+    assert {pdf.filename for pdf in GeneratedPDF.query} == {'0.pdf', '2.pdf'}
+    assert [path.exists() for path in paths] == [True, False, True]
+    assert lifecycle.enforce_budget() == 0
+
+
+def test_budget_leaves_pdfs_when_uploads_alone_exceed_it(app, lifecycle):
+    """Test PDFs are not evicted when no number of evictions can meet the budget"""
+    app.config['STORAGE_BUDGET_MB'] = 1
+    record = _pdf(app, 'a.pdf')
+    db.session.add(Blob(sha256='f' * 64, file_path='unused', file_size=2 * MB))
+    db.session.commit()
+
+    assert lifecycle.enforce_budget() == 0
+    assert Path(record.file_path).exists() and GeneratedPDF.query.count() == 1
+
+
+def test_budget_keeps_shared_objects(app, lifecycle, tmp_path):
+    """Test with shared storage only the local copy is evicted; retention removes the object"""
+    app.config['STORAGE_BACKEND'] = 'local'
+    app.config['STORAGE_LOCAL_ROOT'] = tmp_path / 'shared'
+    app.config['STORAGE_CACHE_DIR'] = tmp_path / 'cache'
+    artifacts.init_app(app)
+    app.config['STORAGE_BUDGET_MB'] = 1
+    first, second = _pdf(app, 'a.pdf', accessed_minutes_ago=60), _pdf(app, 'b.pdf')
+    artifacts.publish(first.file_path)
+    key = artifacts.key_for(first.file_path)
+
+    assert lifecycle.enforce_budget() == MB
+
+    db.session.refresh(first)
+    assert first.evicted_at is not None and not Path(first.file_path).exists()
+    assert artifacts.backend.exists(key)
+    assert artifacts.local_path(first.file_path).read_bytes() == b'%' * 16
+    assert lifecycle.enforce_budget() == 0  # Evicted bytes no longer count
+
+    assert lifecycle.enforce_retention(1, keep=1) == 1
+    assert not artifacts.backend.exists(key)
+    assert Path(second.file_path).exists()
+
+
+def test_collect_blobs_removes_unused_files(app, lifecycle):
+    """Test unreferenced blobs past retention go, used and fresh ones stay"""
+    app.config['BLOB_RETENTION_SECONDS'] = 3600
+    unused = store_blob(b'unused', app.config['UPLOAD_FOLDER'], 'image/png')
+    used = store_blob(b'used', app.config['UPLOAD_FOLDER'], 'image/png')
+    reused = store_blob(b'reused', app.config['UPLOAD_FOLDER'], 'image/png')
+    used.ref_count = 1
+    unused.last_used_at = used.last_used_at = reused.last_used_at = datetime.utcnow() - timedelta(hours=2)
+    db.session.commit()
+    unused_path, used_path, reused_path = unused.file_path, used.file_path, reused.file_path
+    _age(unused_path)  # reused's file is fresh: stored again since
+
+    assert lifecycle.collect_blobs() == {'removed': 1, 'skipped': 1}
+    assert lifecycle.collect_blobs() == {'removed': 0, 'skipped': 0}
+
+    assert not Path(unused_path).exists() and Path(used_path).exists() and Path(reused_path).exists()
+    assert [blob.sha256 for blob in Blob.query] == [used.sha256]
+
+
+def test_orphan_sweep_matches_any_spelling_of_the_root(app, lifecycle, tmp_path, monkeypatch):
+    """Test referenced files survive whether rows store relative or absolute paths"""
+    monkeypatch.chdir(tmp_path)
+    app.config['UPLOAD_FOLDER'] = Path('uploads')  # Rows below are relative
+    absolute = _pdf(app, 'kept.pdf')
+    orphan_pdf = Path(app.config['PDF_OUTPUT_DIR']) / 'ab' / 'orphan.pdf'
+    orphan_pdf.write_bytes(b'%')
+    image = Path('uploads/cd/photo.png')
+    image.parent.mkdir(parents=True)
+    image.write_bytes(b'png')
+    orphan_image = Path('uploads/cd/orphan.png')
+    orphan_image.write_bytes(b'png')
+    db.session.add(ImageUpload(project_id=1, field_name='f', filename='photo.png',
+                               file_path=str(image)))
+    db.session.commit()
+    app.config['UPLOAD_FOLDER'] = tmp_path / 'uploads'  # Setting now absolute
+    fresh = Path(app.config['UPLOAD_FOLDER']) / 'cd' / 'fresh.png'
+    fresh.write_bytes(b'png')
+    for path in [absolute.file_path, orphan_pdf, image, orphan_image]:
+        _age(path)
+
+    result = lifecycle.sweep_orphans_step(batch_size=100)
+
+    assert result == {'scanned': 5, 'removed': 2, 'completed_pass': 1}
+    assert Path(absolute.file_path).exists() and image.exists() and fresh.exists()
+    assert not orphan_pdf.exists() and not orphan_image.exists()
+
+
+def test_orphan_sweep_fails_safe_when_no_row_matches_a_root(app, lifecycle, tmp_path):
+    """Test a root no row resolves into is left alone (e.g. after the data moved)"""
+    moved = Path(_pdf(app, 'a.pdf').file_path)
+    GeneratedPDF.query.update({GeneratedPDF.file_path: str(tmp_path / 'old-mount' / 'ab' / 'a.pdf')})
+    db.session.commit()
+    _age(moved)
+
+    assert lifecycle.sweep_orphans_step(batch_size=100)['removed'] == 0
+    assert moved.exists()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,109 @@
+"""
+Test suite for the JSONL stream renderer
+"""
+import base64
+import io
+import json
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from services.render_pool import RenderPool
+from services.stream_renderer import (
+    RecordError, TarSink, build_job, open_sink, output_name, read_records, render_stream
+)
+
+TEMPLATE = Path('../SNS DT Playbook for SNS 1-5 Std Students.pptx.pdf')
+PNG = base64.b64encode(
+    bytes.fromhex('89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+                  '1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082')
+).decode()
+
+
+def _lines(*records):
+    return [json.dumps(record) if isinstance(record, dict) else record for record in records]
+
+
+def test_read_records_reports_bad_lines():
+    """Test blank lines are skipped and bad ones become RecordErrors with their line number"""
+    parsed = list(read_records(_lines({'responses': {}}, '', 'not json', '[1]')))
+
+    assert [number for number, _ in parsed] == [1, 3, 4]
+    assert parsed[0][1] == {'responses': {}}
+    assert all(isinstance(record, RecordError) for _, record in parsed[1:])
+
+
+def test_build_job_decodes_inline_images(tmp_path):
+    """Test data URLs are written to the scratch directory and paths are kept"""
+    photo = tmp_path / 'photo.png'
+    photo.write_bytes(base64.b64decode(PNG))
+    record = {'id': '../asha 3', 'responses': {'student_name': 'Asha'},
+              'images': {'user_profile_image': f'data:image/png;base64,{PNG}', 'other': str(photo)}}
+
+    job = build_job(record, 7, tmp_path)
+
+    assert job['filename'] == 'asha_3.pdf'
+    assert Path(job['images']['user_profile_image']).read_bytes() == photo.read_bytes()
+    assert job['images']['other'] == str(photo)
+    assert output_name({}, 7) == 'record-000007.pdf'
+
+
+@pytest.mark.parametrize('record', [
+    {'images': {}},
+    {'responses': {}, 'images': {'f': 'data:image/gif;base64,R0lG'}},
+    {'responses': {}, 'images': {'f': 'data:image/png;base64,***'}},
+    {'responses': {}, 'images': {'f': 'missing.png'}},
+])
+def test_build_job_rejects_bad_records(tmp_path, record):
+    """Test records without responses or with unusable images are rejected"""
+    with pytest.raises(RecordError):
+        build_job(record, 1, tmp_path)
+
+
+def test_failures_do_not_stop_the_stream(tmp_path):
+    """Test every record gets a result, in order, when lines are bad or renders fail"""
+    sink, scratch = open_sink(output_dir=tmp_path / 'out')
+    pool = RenderPool(tmp_path / 'missing-template.pdf', sink.render_dir, workers=0)
+
+    records = read_records(_lines({'id': 'a', 'responses': {'x': 1}}, 'oops', {'id': 'b', 'responses': {}}))
+    results = list(render_stream(records, sink, pool, scratch))
+
+    assert [(result['line'], result['name'], result['status']) for result in results] == [
+        (1, 'a.pdf', 'error'), (2, None, 'error'), (3, 'b.pdf', 'error')
+    ]
+
+
+def test_tar_sink_streams_and_removes_files(tmp_path):
+    """Test PDFs are appended to the tar stream under their names and deleted"""
+    stream = io.BytesIO()
+    sink = TarSink(stream, tmp_path)
+    rendered = tmp_path / '123_asha.pdf'
+    rendered.write_bytes(b'%PDF-1.7 test')
+
+    sink.write('asha.pdf', rendered)
+    sink.close()
+
+    archive = tarfile.open(fileobj=io.BytesIO(stream.getvalue()))
+    assert archive.getnames() == ['asha.pdf']
+    assert archive.extractfile('asha.pdf').read() == b'%PDF-1.7 test'
+    assert not rendered.exists()
+
+
+def test_render_to_directory(tmp_path):
+    """Test records render to <id>.pdf with timings"""
+    if not TEMPLATE.exists():
+        pytest.skip("PDF template not found")
+
+    sink, scratch = open_sink(output_dir=tmp_path / 'out')
+    pool = RenderPool(TEMPLATE, sink.render_dir, workers=0)
+    records = read_records(_lines({'id': 'asha', 'responses': {'student_name': 'Asha'}}))
+
+    results = list(render_stream(records, sink, pool, scratch))
+
+    assert results[0]['status'] == 'ok' and results[0]['seconds'] > 0
+    assert (tmp_path / 'out' / 'asha.pdf').read_bytes().startswith(b'%PDF')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,25 @@
+"""
+File Hashing Utilities
+"""
+import hashlib
+from pathlib import Path
+from typing import Union
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+def sha256_file(path: Union[str, Path]) -> str:
+    """
+    Compute the SHA-256 hex digest of a file without loading it into memory
+
+    Args:
+        path: File path
+
+    Returns:
+        str: 64-character hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,25 @@
+"""
+Sharded Storage Paths
+Spread files over hashed subdirectories (root/ab/cd/name) so no single
+directory grows to tens of thousands of entries.
+"""
+import hashlib
+from pathlib import Path
+from typing import Union
+
+
+def shard_path(root: Union[str, Path], name: str, levels: int = 2) -> Path:
+    """
+    Get the sharded path for a file name (directories are not created)
+
+    Args:
+        root: Storage root directory
+        name: File name (the shard is derived from it)
+        levels: Number of 2-hex-character directory levels
+
+    Returns:
+        Path: root/<h0h1>/<h2h3>/name
+    """
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()
+    parts = [digest[i * 2:i * 2 + 2] for i in range(levels)]
+    return Path(root).joinpath(*parts, name)
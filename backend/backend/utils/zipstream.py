@@ -0,0 +1,178 @@
+"""
+Streaming ZIP Writer
+Produce a ZIP archive of existing files as a byte stream, never holding
+more than one read chunk in memory and writing nothing to disk.
+
+Entries are stored (PDFs and images are already compressed) and their
+size and CRC-32 go into the local headers, so no data descriptors are
+needed and the byte layout is a pure function of the entry list: an
+interrupted download resumes by regenerating the stream from an offset.
+ZIP64 records are added only where a size, offset or the entry count
+exceeds the classic limits.
+
+An entry is a dict: {"name", "path", "size", "crc", "modified"}.
+"""
+import struct
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+_ZIP32_MAX = 0xFFFFFFFF
+_ZIP16_MAX = 0xFFFF
+_UTF8_FLAG = 0x0800
+_VERSION_ZIP64 = 45
+_VERSION_DEFAULT = 20
+_FILE_ATTRIBUTES = 0o100644 << 16
+
+
+def crc32_file(path: Union[str, Path]) -> int:
+    """CRC-32 of a file, read in chunks"""
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _dos_datetime(moment: Optional[datetime]):
+    moment = moment or datetime(1980, 1, 1)
+    if moment.year < 1980:
+        moment = datetime(1980, 1, 1)
+    time = (moment.hour << 11) | (moment.minute << 5) | (moment.second // 2)
+    date = ((moment.year - 1980) << 9) | (moment.month << 5) | moment.day
+    return time, date
+
+
+def local_header(entry: Dict[str, Any]) -> bytes:
+    """Local file header of a stored entry"""
+    name = entry['name'].encode('utf-8')
+    size = entry['size']
+    zip64 = size >= _ZIP32_MAX
+    extra = struct.pack('<HHQQ', 0x0001, 16, size, size) if zip64 else b''
+    time, date = _dos_datetime(entry.get('modified'))
+    return struct.pack(
+        '<IHHHHHIIIHH', 0x04034B50,
+        _VERSION_ZIP64 if zip64 else _VERSION_DEFAULT, _UTF8_FLAG, 0, time, date,
+        entry['crc'], _ZIP32_MAX if zip64 else size, _ZIP32_MAX if zip64 else size,
+        len(name), len(extra)
+    ) + name + extra
+
+
+def _central_record(entry: Dict[str, Any], offset: int) -> bytes:
+    name = entry['name'].encode('utf-8')
+    size = entry['size']
+    extra_values = []
+    if size >= _ZIP32_MAX:
+        extra_values += [size, size]
+    if offset >= _ZIP32_MAX:
+        extra_values.append(offset)
+    extra = struct.pack(f'<HH{len(extra_values)}Q', 0x0001, 8 * len(extra_values), *extra_values) \
+        if extra_values else b''
+    version = _VERSION_ZIP64 if extra_values else _VERSION_DEFAULT
+    time, date = _dos_datetime(entry.get('modified'))
+    return struct.pack(
+        '<IHHHHHHIIIHHHHHII', 0x02014B50,
+        (3 << 8) | version, version, _UTF8_FLAG, 0, time, date, entry['crc'],
+        min(size, _ZIP32_MAX), min(size, _ZIP32_MAX), len(name), len(extra), 0, 0, 0,
+        _FILE_ATTRIBUTES, min(offset, _ZIP32_MAX)
+    ) + name + extra
+
+
+def central_directory(entries: List[Dict[str, Any]], offsets: List[int], start: int) -> bytes:
+    """
+    Central directory and end records
+
+    Args:
+        entries: All entries, in archive order
+        offsets: Offset of each entry's local header
+        start: Offset of the central directory (end of the last entry)
+    """
+    records = b''.join(_central_record(entry, offset) for entry, offset in zip(entries, offsets))
+    count, size = len(entries), len(records)
+
+    tail = b''
+    if count >= _ZIP16_MAX or size >= _ZIP32_MAX or start >= _ZIP32_MAX:
+        zip64_end = start + size
+        tail = struct.pack(
+            '<IQHHIIQQQQ', 0x06064B50, 44, _VERSION_ZIP64, _VERSION_ZIP64, 0, 0,
+            count, count, size, start
+        ) + struct.pack('<IIQI', 0x07064B50, 0, zip64_end, 1)
+
+    tail += struct.pack(
+        '<IHHHHIIH', 0x06054B50, 0, 0,
+        min(count, _ZIP16_MAX), min(count, _ZIP16_MAX),
+        min(size, _ZIP32_MAX), min(start, _ZIP32_MAX), 0
+    )
+    return records + tail
+
+
+def archive_size(entries: List[Dict[str, Any]]) -> int:
+    """Total size in bytes of the archive of `entries`"""
+    offsets, position = [], 0
+    for entry in entries:
+        offsets.append(position)
+        position += len(local_header(entry)) + entry['size']
+    return position + len(central_directory(entries, offsets, position))
+
+
+def _file_bytes(entry: Dict[str, Any], skip: int) -> Iterator[bytes]:
+    with open(entry['path'], 'rb') as f:
+        f.seek(skip)
+        remaining = entry['size'] - skip
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise IOError(f"{entry['path']} is shorter than its recorded size")
+            remaining -= len(chunk)
+            yield chunk
+
+
+def stream_zip(entries: Iterable[Dict[str, Any]], start: int = 0) -> Iterator[bytes]:
+    """
+    Stream the archive of `entries`, from byte offset `start`
+
+    `entries` may be a lazy iterable (e.g. entries rendered on the fly);
+    each is consumed just before its bytes are needed.
+
+    Args:
+        entries: Entries in archive order
+        start: First byte to produce (to resume a download)
+
+    Yields:
+        bytes: Archive chunks
+
+    Raises:
+        IOError: If a file no longer matches its recorded size
+    """
+    position = 0
+    written: List[Dict[str, Any]] = []
+    offsets: List[int] = []
+
+    def part(data: bytes):
+        nonlocal position
+        begin = position
+        position += len(data)
+        if position > start:
+            return data[max(0, start - begin):]
+        return b''
+
+    for entry in entries:
+        offsets.append(position)
+        written.append(entry)
+        header = part(local_header(entry))
+        if header:
+            yield header
+
+        begin = position
+        position += entry['size']
+        if position > start:
+            if Path(entry['path']).stat().st_size != entry['size']:
+                raise IOError(f"{entry['path']} changed after it was added to the archive")
+            yield from _file_bytes(entry, max(0, start - begin))
+
+    tail = part(central_directory(written, offsets, position))
+    if tail:
+        yield tail